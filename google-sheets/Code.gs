@@ -106,123 +106,22 @@ function fetchFromSupabase(endpoint, params = {}) {
 // ============================================
 
 /**
- * Fetches monthly sales data for a marketplace
+ * Fetches the sheet-ready pivot feed for a marketplace.
+ * The ASIN x period grid is built server-side by refresh_sheet_pivot_feed()
+ * (migrations/004_sheet_pivot_feed.sql), refreshed with the materialized views.
  * @param {string} marketplaceId - UUID of the marketplace
- * @returns {Array} - Monthly sales data
+ * @returns {Object|null} - { version, generated_at, headers: [...], rows: [[...], ...] }
  */
-function getMonthlyData(marketplaceId) {
-  return fetchFromSupabase('/rest/v1/sp_monthly_asin_data', {
-    'marketplace_id': `eq.${marketplaceId}`,
-    'select': 'month,child_asin,units_ordered,ordered_product_sales,sessions,page_views,avg_conversion_rate',
-    'order': 'month.asc'
+function getPivotFeed(marketplaceId) {
+  return fetchFromSupabase('/rest/v1/rpc/get_sheet_pivot_feed', {
+    'p_marketplace_id': marketplaceId
   });
 }
 
-/**
- * Fetches weekly sales data for a marketplace
- * @param {string} marketplaceId - UUID of the marketplace
- * @returns {Array} - Weekly sales data
- */
-function getWeeklyData(marketplaceId) {
-  return fetchFromSupabase('/rest/v1/sp_weekly_asin_data', {
-    'marketplace_id': `eq.${marketplaceId}`,
-    'select': 'week_start,iso_week_number,child_asin,units_ordered,ordered_product_sales,sessions',
-    'order': 'week_start.asc'
-  });
-}
-
-/**
- * Fetches product info (name, category) for a marketplace
- * @param {string} marketplaceId - UUID of the marketplace
- * @returns {Object} - Map of ASIN to product info
- */
-function getProductInfo(marketplaceId) {
-  const data = fetchFromSupabase('/rest/v1/product_variants', {
-    'select': 'child_asin,product_name,product_id,products!inner(category_name,marketplace_id)',
-    'products.marketplace_id': `eq.${marketplaceId}`
-  });
-
-  // Convert to lookup map
-  const productMap = {};
-  for (const item of data) {
-    productMap[item.child_asin] = {
-      name: item.product_name || 'Unknown',
-      category: item.products?.category_name || 'Uncategorized'
-    };
-  }
-
-  return productMap;
-}
-
-// ============================================
-// DATA TRANSFORMATION
-// ============================================
-
-/**
- * Pivots monthly data from rows to columns
- * @param {Array} data - Raw monthly data
- * @returns {Object} - { months: [...], dataByAsin: { asin: { month: value } } }
- */
-function pivotMonthlyData(data) {
-  const months = [...new Set(data.map(d => d.month))].sort();
-  const dataByAsin = {};
-
-  for (const row of data) {
-    if (!dataByAsin[row.child_asin]) {
-      dataByAsin[row.child_asin] = {};
-    }
-    dataByAsin[row.child_asin][row.month] = {
-      units: row.units_ordered || 0,
-      revenue: parseFloat(row.ordered_product_sales) || 0,
-      sessions: row.sessions || 0
-    };
-  }
-
-  return { months, dataByAsin };
-}
-
-/**
- * Pivots weekly data from rows to columns
- * @param {Array} data - Raw weekly data
- * @returns {Object} - { weeks: [...], dataByAsin: { asin: { week: value } } }
- */
-function pivotWeeklyData(data) {
-  const weeks = [...new Set(data.map(d => d.week_start))].sort();
-  const dataByAsin = {};
-
-  for (const row of data) {
-    if (!dataByAsin[row.child_asin]) {
-      dataByAsin[row.child_asin] = {};
-    }
-    dataByAsin[row.child_asin][row.week_start] = {
-      units: row.units_ordered || 0,
-      revenue: parseFloat(row.ordered_product_sales) || 0,
-      sessions: row.sessions || 0
-    };
-  }
-
-  return { weeks, dataByAsin };
-}
-
 // ============================================
 // SHEET WRITING
 // ============================================
 
-/**
- * Formats a date string to readable format
- * @param {string} dateStr - ISO date string
- * @param {string} type - 'month' or 'week'
- * @returns {string} - Formatted date
- */
-function formatDate(dateStr, type) {
-  const date = new Date(dateStr);
-  if (type === 'month') {
-    return Utilities.formatDate(date, 'UTC', 'MMM yyyy');
-  } else {
-    return `Wk ${Utilities.formatDate(date, 'UTC', 'w')}`;
-  }
-}
-
 /**
  * Refreshes data for a specific marketplace
  * @param {string} marketplaceCode - 'CA' or 'USA'
@@ -240,71 +139,20 @@ function refreshMarketplace(marketplaceCode) {
 
   Logger.log(`Refreshing ${marketplaceCode}...`);
 
-  // Fetch all data
-  const monthlyData = getMonthlyData(marketplaceId);
-  const weeklyData = getWeeklyData(marketplaceId);
-  const productInfo = getProductInfo(marketplaceId);
-
-  Logger.log(`Fetched ${monthlyData.length} monthly rows, ${weeklyData.length} weekly rows`);
-
-  // Pivot data
-  const { months, dataByAsin: monthlyByAsin } = pivotMonthlyData(monthlyData);
-  const { weeks, dataByAsin: weeklyByAsin } = pivotWeeklyData(weeklyData);
-
-  // Get all unique ASINs
-  const allAsins = [...new Set([...Object.keys(monthlyByAsin), ...Object.keys(weeklyByAsin)])].sort();
-
-  Logger.log(`Found ${allAsins.length} unique ASINs, ${months.length} months, ${weeks.length} weeks`);
-
-  // Build header row
-  const headers = ['ASIN', 'Name', 'Category'];
-
-  // Add monthly headers (Units)
-  for (const month of months) {
-    headers.push(formatDate(month, 'month') + ' Units');
-  }
-
-  // Add weekly headers (Units)
-  for (const week of weeks) {
-    headers.push(formatDate(week, 'week') + ' Units');
+  // Fetch the pre-pivoted grid (header row + one row per ASIN)
+  const feed = getPivotFeed(marketplaceId);
+  if (!feed || !feed.headers || feed.headers.length === 0) {
+    throw new Error(`No pivot feed for ${marketplaceCode} — run scripts/refresh_views.py first`);
   }
 
-  // Add monthly revenue columns
-  for (const month of months) {
-    headers.push(formatDate(month, 'month') + ' Rev');
-  }
-
-  // Build data rows
-  const rows = [headers];
-
-  for (const asin of allAsins) {
-    const product = productInfo[asin] || { name: 'Unknown', category: 'Unknown' };
-    const row = [asin, product.name, product.category];
+  const headers = feed.headers;
+  const rows = [headers].concat(feed.rows);
 
-    // Monthly units
-    for (const month of months) {
-      const monthData = monthlyByAsin[asin]?.[month];
-      row.push(monthData ? monthData.units : 0);
-    }
-
-    // Weekly units
-    for (const week of weeks) {
-      const weekData = weeklyByAsin[asin]?.[week];
-      row.push(weekData ? weekData.units : 0);
-    }
-
-    // Monthly revenue
-    for (const month of months) {
-      const monthData = monthlyByAsin[asin]?.[month];
-      row.push(monthData ? monthData.revenue : 0);
-    }
-
-    rows.push(row);
-  }
+  Logger.log(`Fetched pivot feed v${feed.version} (${feed.generated_at}): ${feed.rows.length} ASINs, ${headers.length} columns`);
 
   // Clear and write to sheet
   sheet.clear();
-  sheet.getRange(1, 1, rows.length, rows[0].length).setValues(rows);
+  sheet.getRange(1, 1, rows.length, headers.length).setValues(rows);
 
   // Format header row
   const headerRange = sheet.getRange(1, 1, 1, headers.length);
@@ -321,7 +169,7 @@ function refreshMarketplace(marketplaceCode) {
     sheet.autoResizeColumn(i);
   }
 
-  Logger.log(`${marketplaceCode} refresh complete: ${allAsins.length} products, ${headers.length} columns`);
+  Logger.log(`${marketplaceCode} refresh complete: ${feed.rows.length} products, ${headers.length} columns`);
 }
 
 // ============================================
@@ -307,23 +307,18 @@ function getSKUASINMap(marketplaceId, config) {
   return fetchAllFromSupabase(url, config);
 }
 
-/** FBA fee estimates */
-function getFBAFeeEstimates(marketplaceId, config) {
-  var url = config.url + '/rest/v1/sp_fba_fee_estimates?' +
-    'marketplace_id=eq.' + marketplaceId +
-    '&select=asin,sku,product_size_tier,your_price,estimated_fee_total,estimated_referral_fee_per_unit,estimated_pick_pack_fee_per_unit,estimated_weight_handling_fee_per_unit,currency_code' +
-    '&order=asin.asc';
-
-  return fetchAllFromSupabase(url, config);
-}
-
-/** Settlement-derived per-SKU average fees */
-function getSettlementFeesBySKU(marketplaceId, config) {
-  var url = config.url + '/rest/v1/sp_settlement_fees_by_sku?' +
-    'marketplace_id=eq.' + marketplaceId +
-    '&select=sku,avg_fba_fee_per_unit,avg_referral_fee_per_unit,fba_fee_qty_basis,referral_fee_qty_basis';
+/**
+ * FBA fee estimates joined with settlement-derived per-SKU average fees.
+ * One row per SKU, built server-side by get_sku_fee_feed() from the
+ * per-SKU monthly settlement rollup (migrations/011_settlement_fee_rollups.sql).
+ * One RPC call — the result is a single JSON value, so it isn't paginated.
+ */
+function getSKUFeeFeed(marketplaceId, config) {
+  var feed = fetchFromSupabase('/rest/v1/rpc/get_sku_fee_feed', {
+    'p_marketplace_id': marketplaceId
+  }, config);
 
-  return fetchAllFromSupabase(url, config);
+  return (feed && feed.rows) || [];
 }
 
 /** Storage fees by ASIN (latest month) */
@@ -379,12 +374,218 @@ function getOrCreateDumpSheet(prefix, country, headers) {
 }
 
 
+// ============================================
+// SHEET HELPER: DIFF WRITER
+// ============================================
+// Writes only the rows that actually changed instead of clear + rewrite.
+// Existing rows keep their position (formulas use SUMIFS / MATCH, so order
+// does not matter). Deleted rows free a slot that new rows reuse; anything
+// left over is appended or compacted at the bottom. Contiguous changed rows
+// are written with one setValues call each.
+
+// Changed blocks separated by this many unchanged rows or fewer are merged
+// into one write — a few redundant cells are cheaper than an extra API call.
+var DIFF_WRITE_MERGE_GAP = 5;
+
+/**
+ * Normalizes a cell value for comparison.
+ * Sheets turns 'YYYY-MM-DD' strings into Date objects and numeric strings
+ * into numbers on write, so both sides are reduced to the same string form.
+ */
+function _diffCellValue(v) {
+  if (v === null || v === undefined) return '';
+  if (v instanceof Date) {
+    return v.getFullYear() + '-' +
+      String(v.getMonth() + 1).padStart(2, '0') + '-' +
+      String(v.getDate()).padStart(2, '0');
+  }
+  if (typeof v === 'number') return String(v);
+  var s = String(v);
+  if (/^-?\d+(\.\d+)?$/.test(s.trim())) return String(Number(s));
+  return s;
+}
+
+/** Builds the row key from the given column indexes. */
+function _diffRowKey(row, keyCols) {
+  var parts = [];
+  for (var k = 0; k < keyCols.length; k++) parts.push(_diffCellValue(row[keyCols[k]]));
+  return parts.join('|');
+}
+
+/** True if two rows differ in any of the first numCols columns. */
+function _diffRowChanged(a, b, numCols) {
+  for (var c = 0; c < numCols; c++) {
+    if (_diffCellValue(a[c]) !== _diffCellValue(b[c])) return true;
+  }
+  return false;
+}
+
+/**
+ * True if the first headers.length cells of the header row are `headers`.
+ * Columns to the right (e.g. helper formulas added by hand) are ignored.
+ * A mismatch means the dump sheet layout changed and needs a full rewrite.
+ */
+function dumpSheetSchemaMatches(sheet, headers) {
+  if (sheet.getLastRow() < 1) return false;
+  var currentHeaders = sheet.getRange(1, 1, 1, headers.length).getValues()[0];
+  for (var h = 0; h < headers.length; h++) {
+    if (String(currentHeaders[h]) !== headers[h]) return false;
+  }
+  return true;
+}
+
+/**
+ * Writes rows to a dump sheet, touching only changed ranges.
+ *
+ * Args:
+ *   sheet   — dump sheet (row 1 = headers)
+ *   headers — expected header row
+ *   rows    — fresh data rows (same column order as headers)
+ *   keyCols — 0-indexed columns that uniquely identify a row
+ *   options — { deleteMissing: true } — if false, existing rows whose key is
+ *             not in `rows` are kept (incremental refresh)
+ *
+ * A full rewrite happens only when the sheet is empty or the header row
+ * no longer matches `headers` (schema change).
+ *
+ * Returns: { mode, inserted, updated, deleted, unchanged, blocks }
+ */
+function writeDumpSheetDiff(sheet, headers, rows, keyCols, options) {
+  options = options || {};
+  var deleteMissing = options.deleteMissing !== false;
+  var numCols = headers.length;
+  var lastRow = sheet.getLastRow();
+  var lastCol = sheet.getLastColumn();
+  var schemaChanged = !dumpSheetSchemaMatches(sheet, headers);
+
+  // Full rewrite: empty sheet or schema change
+  if (schemaChanged || lastRow <= 1) {
+    if (lastRow > 0) sheet.getRange(1, 1, lastRow, Math.max(lastCol, numCols)).clear();
+    sheet.getRange(1, 1, 1, numCols).setValues([headers]);
+    sheet.getRange(1, 1, 1, numCols).setFontWeight('bold');
+    if (rows.length > 0) sheet.getRange(2, 1, rows.length, numCols).setValues(rows);
+    return {
+      mode: schemaChanged && lastRow > 1 ? 'schema_rewrite' : 'full',
+      inserted: rows.length, updated: 0, deleted: 0, unchanged: 0,
+      blocks: rows.length > 0 ? 1 : 0
+    };
+  }
+
+  var existing = sheet.getRange(2, 1, lastRow - 1, numCols).getValues();
+
+  // Index fresh rows by key (last occurrence wins, same as the old dedup pass)
+  var freshByKey = {};
+  var freshOrder = [];
+  for (var i = 0; i < rows.length; i++) {
+    var fk = _diffRowKey(rows[i], keyCols);
+    if (!(fk in freshByKey)) freshOrder.push(fk);
+    freshByKey[fk] = rows[i];
+  }
+
+  // Lay out the target: existing positions first, holes where rows were removed
+  var target = [];
+  var holes = [];
+  var seen = {};
+  var updated = 0, deleted = 0, unchanged = 0;
+  for (var e = 0; e < existing.length; e++) {
+    var ek = _diffRowKey(existing[e], keyCols);
+    if (seen[ek]) {
+      // Duplicate key already on the sheet — drop it
+      target.push(null);
+      holes.push(e);
+      deleted++;
+      continue;
+    }
+    seen[ek] = true;
+
+    if (ek in freshByKey) {
+      var fresh = freshByKey[ek];
+      if (_diffRowChanged(existing[e], fresh, numCols)) {
+        target.push(fresh);
+        updated++;
+      } else {
+        target.push(existing[e]);
+        unchanged++;
+      }
+    } else if (deleteMissing) {
+      target.push(null);
+      holes.push(e);
+      deleted++;
+    } else {
+      target.push(existing[e]);
+      unchanged++;
+    }
+  }
+
+  // New keys fill holes first, then append
+  var inserted = 0;
+  var h2 = 0;
+  for (var n = 0; n < freshOrder.length; n++) {
+    if (seen[freshOrder[n]]) continue;
+    inserted++;
+    if (h2 < holes.length) {
+      target[holes[h2++]] = freshByKey[freshOrder[n]];
+    } else {
+      target.push(freshByKey[freshOrder[n]]);
+    }
+  }
+
+  // Unfilled holes: compact (rows below shift up and become part of the diff)
+  if (h2 < holes.length) {
+    var compacted = [];
+    for (var t = 0; t < target.length; t++) {
+      if (target[t] !== null) compacted.push(target[t]);
+    }
+    target = compacted;
+  }
+
+  // Positional diff against what is on the sheet → contiguous dirty blocks
+  var blocks = [];
+  var blockStart = -1, blockEnd = -1;
+  for (var p = 0; p < target.length; p++) {
+    var dirty = p >= existing.length || _diffRowChanged(existing[p], target[p], numCols);
+    if (!dirty) continue;
+    if (blockStart >= 0 && p - blockEnd - 1 <= DIFF_WRITE_MERGE_GAP) {
+      blockEnd = p;
+    } else {
+      if (blockStart >= 0) blocks.push([blockStart, blockEnd]);
+      blockStart = p;
+      blockEnd = p;
+    }
+  }
+  if (blockStart >= 0) blocks.push([blockStart, blockEnd]);
+
+  for (var b = 0; b < blocks.length; b++) {
+    var start = blocks[b][0], end = blocks[b][1];
+    sheet.getRange(start + 2, 1, end - start + 1, numCols).setValues(target.slice(start, end + 1));
+  }
+
+  // Sheet got shorter — clear the leftover tail
+  if (target.length < existing.length) {
+    sheet.getRange(target.length + 2, 1, existing.length - target.length, numCols).clear();
+  }
+
+  return {
+    mode: 'diff',
+    inserted: inserted, updated: updated, deleted: deleted, unchanged: unchanged,
+    blocks: blocks.length
+  };
+}
+
+/** One-line summary of a writeDumpSheetDiff() result for Logger. */
+function _diffSummary(stats) {
+  return stats.mode + ' (+' + stats.inserted + ' ~' + stats.updated + ' -' + stats.deleted +
+    ' =' + stats.unchanged + ', ' + stats.blocks + ' write block(s))';
+}
+
+
 // ============================================
 // REFRESH FUNCTION 1: SP DATA (Weekly/Monthly)
 // ============================================
 // Dump sheet: "SP Data {country}"
 // Columns: data_type | child_asin | period | units | units_b2b | revenue | revenue_b2b | sessions | page_views | buy_box% | conversion%
-// First run: fetches ALL history. Subsequent: incremental (last month + last 4 weeks).
+// First run: fetches ALL history. Subsequent: incremental (last month + last 4 weeks),
+// written back with writeDumpSheetDiff() so only changed rows are touched.
 
 function refreshSPData(country, configKey) {
   try {
@@ -401,7 +602,8 @@ function refreshSPData(country, configKey) {
     ];
     var sheet = getOrCreateDumpSheet('SP Data', country, headers);
     var lastRow = sheet.getLastRow();
-    var isFirstRun = (lastRow <= 1);
+    // Schema change forces a full fetch — the writer will rewrite the whole sheet
+    var isFirstRun = (lastRow <= 1) || !dumpSheetSchemaMatches(sheet, headers);
 
     // Cutoff dates for incremental fetch
     var now = new Date();
@@ -439,63 +641,11 @@ function refreshSPData(country, configKey) {
       return (a[1] || '').localeCompare(b[1] || '');
     });
 
-    if (isFirstRun) {
-      if (freshRows.length > 0) {
-        sheet.getRange(2, 1, freshRows.length, 11).setValues(freshRows);
-      }
-      Logger.log('SP Data ' + country + ' (full): ' + freshRows.length + ' rows');
-    } else {
-      // Incremental: remove stale rows that match fresh data, then append
-      var freshKeys = {};
-      for (var f = 0; f < freshRows.length; f++) {
-        freshKeys[freshRows[f][0] + '|' + freshRows[f][2] + '|' + freshRows[f][1]] = true;
-      }
-
-      var existingData = sheet.getRange(2, 1, lastRow - 1, 11).getValues();
-      var keptRows = [];
-      for (var e = 0; e < existingData.length; e++) {
-        // Format date column (index 2) consistently — Sheets converts date strings
-        // to Date objects, so String(date) gives "Sat Jan 01..." instead of "2026-01-01"
-        var period = existingData[e][2];
-        if (period instanceof Date) {
-          period = period.getFullYear() + '-' +
-            String(period.getMonth() + 1).padStart(2, '0') + '-' +
-            String(period.getDate()).padStart(2, '0');
-        }
-        var key = String(existingData[e][0]) + '|' + period + '|' + String(existingData[e][1]);
-        if (!freshKeys[key]) keptRows.push(existingData[e]);
-      }
-
-      var finalRows = keptRows.concat(freshRows);
-
-      // Safety dedup pass — prevent any remaining duplicates from accumulating
-      var seenKeys = {};
-      var dedupedRows = [];
-      for (var d = finalRows.length - 1; d >= 0; d--) {
-        var dp = finalRows[d][2];
-        if (dp instanceof Date) {
-          dp = dp.getFullYear() + '-' +
-            String(dp.getMonth() + 1).padStart(2, '0') + '-' +
-            String(dp.getDate()).padStart(2, '0');
-        }
-        var dk = String(finalRows[d][0]) + '|' + dp + '|' + String(finalRows[d][1]);
-        if (!seenKeys[dk]) {
-          seenKeys[dk] = true;
-          dedupedRows.push(finalRows[d]);
-        }
-      }
-      dedupedRows.reverse(); // restore original order
-      if (dedupedRows.length < finalRows.length) {
-        Logger.log('Dedup removed ' + (finalRows.length - dedupedRows.length) + ' duplicate rows');
-      }
-
-      var maxClear = Math.max(lastRow - 1, dedupedRows.length);
-      sheet.getRange(2, 1, maxClear, 11).clear();
-      if (dedupedRows.length > 0) {
-        sheet.getRange(2, 1, dedupedRows.length, 11).setValues(dedupedRows);
-      }
-      Logger.log('SP Data ' + country + ' (incremental): total ' + dedupedRows.length);
-    }
+    // Incremental runs only fetch recent periods, so rows outside the fresh
+    // set are kept (deleteMissing: false); changed rows are rewritten in place.
+    var stats = writeDumpSheetDiff(sheet, headers, freshRows, [0, 2, 1], { deleteMissing: false });
+    Logger.log('SP Data ' + country + (isFirstRun ? ' (full): ' : ' (incremental): ') +
+      freshRows.length + ' fresh rows, ' + _diffSummary(stats));
     updateRefreshTimestamp(country, 'sales');
   } catch (e) {
     Logger.log('Error refreshing SP Data ' + country + ': ' + e.message + '\n' + e.stack);
@@ -510,7 +660,7 @@ function refreshSPData(country, configKey) {
 // ============================================
 // Dump sheet: "SP Daily {country}"
 // Columns: child_asin | date | units | units_b2b | revenue | revenue_b2b | sessions | page_views | buy_box% | conversion%
-// Full clear + rewrite each run (data is small: ~100 ASINs x 35 days = ~3500 rows).
+// Full 35-day fetch each run; only changed rows are written (writeDumpSheetDiff).
 // Uses the DEDUPED view (prefers Sales&Traffic over Orders, avoids double-counting).
 
 function refreshDailyDumpData(country, configKey) {
@@ -541,9 +691,6 @@ function refreshDailyDumpData(country, configKey) {
 
     var sheet = getOrCreateDumpSheet('SP Daily', country, headers);
 
-    var lastRow = sheet.getLastRow();
-    if (lastRow > 1) sheet.getRange(2, 1, lastRow - 1, headers.length).clear();
-
     var output = [];
     for (var i = 0; i < data.length; i++) {
       var r = data[i];
@@ -556,10 +703,8 @@ function refreshDailyDumpData(country, configKey) {
       ]);
     }
 
-    if (output.length > 0) {
-      sheet.getRange(2, 1, output.length, headers.length).setValues(output);
-    }
-    Logger.log('SP Daily ' + country + ': ' + output.length + ' rows');
+    var stats = writeDumpSheetDiff(sheet, headers, output, [0, 1]);
+    Logger.log('SP Daily ' + country + ': ' + output.length + ' rows, ' + _diffSummary(stats));
     updateRefreshTimestamp(country, 'full_daily');
   } catch (e) {
     Logger.log('Error refreshing SP Daily ' + country + ': ' + e.message + '\n' + e.stack);
@@ -573,7 +718,7 @@ function refreshDailyDumpData(country, configKey) {
 // REFRESH FUNCTION 3: SP ROLLING (7/14/30/60-day)
 // ============================================
 // Dump sheet: "SP Rolling {country}"
-// One row per ASIN. Full clear + rewrite each run.
+// One row per ASIN. Only changed rows are written (writeDumpSheetDiff).
 
 function refreshRollingData(country, configKey) {
   try {
@@ -603,9 +748,6 @@ function refreshRollingData(country, configKey) {
 
     var sheet = getOrCreateDumpSheet('SP Rolling', country, headers);
 
-    var lastRow = sheet.getLastRow();
-    if (lastRow > 1) sheet.getRange(2, 1, lastRow - 1, headers.length).clear();
-
     var output = [];
     for (var i = 0; i < data.length; i++) {
       var r = data[i];
@@ -637,10 +779,8 @@ function refreshRollingData(country, configKey) {
       ]);
     }
 
-    if (output.length > 0) {
-      sheet.getRange(2, 1, output.length, headers.length).setValues(output);
-    }
-    Logger.log('SP Rolling ' + country + ': ' + output.length + ' rows');
+    var stats = writeDumpSheetDiff(sheet, headers, output, [0]);
+    Logger.log('SP Rolling ' + country + ': ' + output.length + ' rows, ' + _diffSummary(stats));
     updateRefreshTimestamp(country, 'rolling');
   } catch (e) {
     Logger.log('Error refreshing SP Rolling ' + country + ': ' + e.message + '\n' + e.stack);
@@ -685,9 +825,6 @@ function refreshInventoryData(country, configKey) {
 
     var sheet = getOrCreateDumpSheet('SP Inventory', country, headers);
 
-    var lastRow = sheet.getLastRow();
-    if (lastRow > 1) sheet.getRange(2, 1, lastRow - 1, headers.length).clear();
-
     var output = [];
     for (var f = 0; f < fbaData.length; f++) {
       var fba = fbaData[f];
@@ -730,10 +867,8 @@ function refreshInventoryData(country, configKey) {
       }
     }
 
-    if (output.length > 0) {
-      sheet.getRange(2, 1, output.length, headers.length).setValues(output);
-    }
-    Logger.log('SP Inventory ' + country + ': FBA=' + fbaData.length + ' AWD=' + awdData.length);
+    var stats = writeDumpSheetDiff(sheet, headers, output, [1]);
+    Logger.log('SP Inventory ' + country + ': FBA=' + fbaData.length + ' AWD=' + awdData.length + ', ' + _diffSummary(stats));
     updateRefreshTimestamp(country, 'inventory');
   } catch (e) {
     Logger.log('Error refreshing SP Inventory ' + country + ': ' + e.message + '\n' + e.stack);
@@ -747,7 +882,8 @@ function refreshInventoryData(country, configKey) {
 // REFRESH FUNCTION 5: SP FEES (Estimates + Settlement + Storage)
 // ============================================
 // Dump sheet: "SP Fees {country}"
-// Joins fee estimates + settlement-derived actuals + storage fees.
+// Fee estimates + settlement-derived actuals come joined per SKU from
+// get_sku_fee_feed(); storage fees are joined here by ASIN.
 
 function refreshFeesData(country, configKey) {
   try {
@@ -757,14 +893,9 @@ function refreshFeesData(country, configKey) {
 
     SpreadsheetApp.getActiveSpreadsheet().toast('Fetching ' + country + ' fee data...', 'Please wait', 30);
 
-    var feeEstimates = getFBAFeeEstimates(marketplaceId, config);
-    var settleFees = getSettlementFeesBySKU(marketplaceId, config);
+    var feeRows = getSKUFeeFeed(marketplaceId, config);
     var storageFees = getStorageFeesByASIN(marketplaceId, config);
 
-    var settleBySKU = {};
-    for (var s = 0; s < settleFees.length; s++) {
-      settleBySKU[settleFees[s].sku] = settleFees[s];
-    }
     var storageByASIN = {};
     for (var st = 0; st < storageFees.length; st++) {
       storageByASIN[storageFees[st].asin] = storageFees[st];
@@ -779,13 +910,11 @@ function refreshFeesData(country, configKey) {
 
     var sheet = getOrCreateDumpSheet('SP Fees', country, headers);
 
-    var lastRow = sheet.getLastRow();
-    if (lastRow > 1) sheet.getRange(2, 1, lastRow - 1, headers.length).clear();
-
     var output = [];
-    for (var i = 0; i < feeEstimates.length; i++) {
-      var fee = feeEstimates[i];
-      var settle = settleBySKU[fee.sku] || {};
+    var settleCount = 0;
+    for (var i = 0; i < feeRows.length; i++) {
+      var fee = feeRows[i];
+      if (fee.fba_fee_qty_basis || fee.referral_fee_qty_basis) settleCount++;
       var storage = storageByASIN[fee.asin] || {};
 
       var estFeeTotal = parseFloat(fee.estimated_fee_total) || 0;
@@ -802,18 +931,16 @@ function refreshFeesData(country, configKey) {
         fee.asin || '', fee.sku || '', fee.product_size_tier || '',
         parseFloat(fee.your_price) || 0,
         estFeeTotal, estReferral, estFbaFee,
-        parseFloat(settle.avg_fba_fee_per_unit) || 0,
-        parseFloat(settle.avg_referral_fee_per_unit) || 0,
-        settle.fba_fee_qty_basis || 0,
+        parseFloat(fee.avg_fba_fee_per_unit) || 0,
+        parseFloat(fee.avg_referral_fee_per_unit) || 0,
+        fee.fba_fee_qty_basis || 0,
         parseFloat(storage.total_storage_fee) || 0,
         parseFloat(storage.total_avg_qty_on_hand) || 0
       ]);
     }
 
-    if (output.length > 0) {
-      sheet.getRange(2, 1, output.length, headers.length).setValues(output);
-    }
-    Logger.log('SP Fees ' + country + ': estimates=' + feeEstimates.length + ' settlements=' + settleFees.length + ' storage=' + storageFees.length);
+    var stats = writeDumpSheetDiff(sheet, headers, output, [0, 1]);
+    Logger.log('SP Fees ' + country + ': estimates=' + feeRows.length + ' with settlements=' + settleCount + ' storage=' + storageFees.length + ', ' + _diffSummary(stats));
     updateRefreshTimestamp(country, 'fees');
   } catch (e) {
     Logger.log('Error refreshing SP Fees ' + country + ': ' + e.message + '\n' + e.stack);
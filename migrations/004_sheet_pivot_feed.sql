@@ -0,0 +1,223 @@
+-- Migration: Server-side sheet pivot feed for google-sheets/Code.gs
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: Code.gs used to download every monthly/weekly view row and pivot
+-- them into an ASIN x period grid inside Apps Script. This migration moves
+-- the pivot into Postgres:
+-- 1. sp_sheet_pivot_versions - one row per marketplace: current version + header row
+-- 2. sp_sheet_pivot_rows     - one row per ASIN per version, cells already laid out
+-- 3. refresh_sheet_pivot_feed() - rebuilds the feed from the materialized views
+-- 4. get_sheet_pivot_feed()     - returns { version, headers, rows } in one call
+--
+-- refresh_sheet_pivot_feed() runs from scripts/refresh_views.py right after
+-- the weekly/monthly materialized views are refreshed.
+
+-- ============================================================
+-- STEP 1: Create feed tables
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS sp_sheet_pivot_versions (
+    marketplace_id UUID PRIMARY KEY REFERENCES marketplaces(id),
+
+    -- Bumped on every refresh; rows of older versions are deleted
+    version BIGINT NOT NULL DEFAULT 0,
+
+    -- Header row as a JSON array: ASIN, Name, Category, <month> Units..., Wk <n> Units..., <month> Rev...
+    headers JSONB NOT NULL DEFAULT '[]'::jsonb,
+
+    month_count INTEGER DEFAULT 0,
+    week_count INTEGER DEFAULT 0,
+    asin_count INTEGER DEFAULT 0,
+    generated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS sp_sheet_pivot_rows (
+    marketplace_id UUID NOT NULL REFERENCES marketplaces(id),
+    version BIGINT NOT NULL,
+    row_num INTEGER NOT NULL,
+    child_asin TEXT NOT NULL,
+
+    -- One sheet row as a JSON array, same column order as the version's headers
+    cells JSONB NOT NULL,
+
+    PRIMARY KEY (marketplace_id, version, row_num)
+);
+
+
+-- ============================================================
+-- STEP 2: Refresh function (service role — called by refresh_views.py)
+-- ============================================================
+-- Rebuilds the feed for one marketplace, or all marketplaces present in the
+-- monthly/weekly materialized views when p_marketplace_id is NULL.
+-- The views are grouped by parent_asin too, so a child ASIN can appear
+-- under several parents — values are summed per child ASIN here.
+-- Returns the number of ASIN rows written.
+
+CREATE OR REPLACE FUNCTION refresh_sheet_pivot_feed(p_marketplace_id UUID DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    mp UUID;
+    new_version BIGINT;
+    v_months DATE[];
+    v_weeks DATE[];
+    v_headers JSONB;
+    v_asin_count INTEGER;
+    v_total INTEGER := 0;
+BEGIN
+    FOR mp IN
+        SELECT m.marketplace_id FROM sp_monthly_asin_data_mat m
+        WHERE p_marketplace_id IS NULL OR m.marketplace_id = p_marketplace_id
+        UNION
+        SELECT w.marketplace_id FROM sp_weekly_asin_data_mat w
+        WHERE p_marketplace_id IS NULL OR w.marketplace_id = p_marketplace_id
+    LOOP
+        SELECT COALESCE(array_agg(DISTINCT m.month ORDER BY m.month), '{}')
+        INTO v_months
+        FROM sp_monthly_asin_data_mat m
+        WHERE m.marketplace_id = mp;
+
+        SELECT COALESCE(array_agg(DISTINCT w.week_start ORDER BY w.week_start), '{}')
+        INTO v_weeks
+        FROM sp_weekly_asin_data_mat w
+        WHERE w.marketplace_id = mp;
+
+        v_headers := jsonb_build_array('ASIN', 'Name', 'Category')
+            || COALESCE((SELECT jsonb_agg(to_char(mo, 'Mon YYYY') || ' Units' ORDER BY mo)
+                         FROM unnest(v_months) AS mo), '[]'::jsonb)
+            || COALESCE((SELECT jsonb_agg('Wk ' || EXTRACT(week FROM wk)::integer || ' Units' ORDER BY wk)
+                         FROM unnest(v_weeks) AS wk), '[]'::jsonb)
+            || COALESCE((SELECT jsonb_agg(to_char(mo, 'Mon YYYY') || ' Rev' ORDER BY mo)
+                         FROM unnest(v_months) AS mo), '[]'::jsonb);
+
+        SELECT COALESCE(MAX(v.version), 0) + 1
+        INTO new_version
+        FROM sp_sheet_pivot_versions v
+        WHERE v.marketplace_id = mp;
+
+        WITH monthly AS (
+            SELECT m.child_asin, m.month,
+                   SUM(m.units_ordered) AS units,
+                   SUM(m.ordered_product_sales) AS revenue
+            FROM sp_monthly_asin_data_mat m
+            WHERE m.marketplace_id = mp
+            GROUP BY m.child_asin, m.month
+        ),
+        weekly AS (
+            SELECT w.child_asin, w.week_start,
+                   SUM(w.units_ordered) AS units
+            FROM sp_weekly_asin_data_mat w
+            WHERE w.marketplace_id = mp
+            GROUP BY w.child_asin, w.week_start
+        ),
+        asins AS (
+            SELECT child_asin FROM monthly
+            UNION
+            SELECT child_asin FROM weekly
+        ),
+        monthly_cells AS (
+            SELECT a.child_asin,
+                   jsonb_agg(COALESCE(m.units, 0) ORDER BY mo.month) AS units,
+                   jsonb_agg(COALESCE(m.revenue, 0) ORDER BY mo.month) AS revenue
+            FROM asins a
+            CROSS JOIN unnest(v_months) AS mo(month)
+            LEFT JOIN monthly m ON m.child_asin = a.child_asin AND m.month = mo.month
+            GROUP BY a.child_asin
+        ),
+        weekly_cells AS (
+            SELECT a.child_asin,
+                   jsonb_agg(COALESCE(w.units, 0) ORDER BY wk.week_start) AS units
+            FROM asins a
+            CROSS JOIN unnest(v_weeks) AS wk(week_start)
+            LEFT JOIN weekly w ON w.child_asin = a.child_asin AND w.week_start = wk.week_start
+            GROUP BY a.child_asin
+        ),
+        info AS (
+            SELECT DISTINCT ON (pv.child_asin)
+                   pv.child_asin,
+                   COALESCE(pv.product_name, 'Unknown') AS name,
+                   COALESCE(p.category_name, 'Uncategorized') AS category
+            FROM product_variants pv
+            JOIN products p ON p.id = pv.product_id
+            WHERE p.marketplace_id = mp
+            ORDER BY pv.child_asin
+        )
+        INSERT INTO sp_sheet_pivot_rows (marketplace_id, version, row_num, child_asin, cells)
+        SELECT
+            mp,
+            new_version,
+            ROW_NUMBER() OVER (ORDER BY a.child_asin)::integer,
+            a.child_asin,
+            jsonb_build_array(a.child_asin, COALESCE(i.name, 'Unknown'), COALESCE(i.category, 'Unknown'))
+                || COALESCE(mc.units, '[]'::jsonb)
+                || COALESCE(wc.units, '[]'::jsonb)
+                || COALESCE(mc.revenue, '[]'::jsonb)
+        FROM asins a
+        LEFT JOIN monthly_cells mc ON mc.child_asin = a.child_asin
+        LEFT JOIN weekly_cells wc ON wc.child_asin = a.child_asin
+        LEFT JOIN info i ON i.child_asin = a.child_asin;
+
+        GET DIAGNOSTICS v_asin_count = ROW_COUNT;
+
+        INSERT INTO sp_sheet_pivot_versions
+            (marketplace_id, version, headers, month_count, week_count, asin_count, generated_at)
+        VALUES
+            (mp, new_version, v_headers, cardinality(v_months), cardinality(v_weeks), v_asin_count, NOW())
+        ON CONFLICT (marketplace_id) DO UPDATE SET
+            version = EXCLUDED.version,
+            headers = EXCLUDED.headers,
+            month_count = EXCLUDED.month_count,
+            week_count = EXCLUDED.week_count,
+            asin_count = EXCLUDED.asin_count,
+            generated_at = EXCLUDED.generated_at;
+
+        DELETE FROM sp_sheet_pivot_rows r
+        WHERE r.marketplace_id = mp AND r.version < new_version;
+
+        v_total := v_total + v_asin_count;
+    END LOOP;
+
+    RETURN v_total;
+END;
+$$;
+
+
+-- ============================================================
+-- STEP 3: Read function (anon — called by Code.gs)
+-- ============================================================
+-- Returns the whole current version for a marketplace as one JSON object:
+--   { "version": 12, "generated_at": "...", "headers": [...], "rows": [[...], ...] }
+-- A scalar RPC result is not paginated by PostgREST, so one GET returns the
+-- full grid. Returns NULL if the feed has never been built.
+
+CREATE OR REPLACE FUNCTION get_sheet_pivot_feed(p_marketplace_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'version', v.version,
+        'generated_at', v.generated_at,
+        'headers', v.headers,
+        'rows', COALESCE((
+            SELECT jsonb_agg(r.cells ORDER BY r.row_num)
+            FROM sp_sheet_pivot_rows r
+            WHERE r.marketplace_id = v.marketplace_id
+              AND r.version = v.version
+        ), '[]'::jsonb)
+    )
+    FROM sp_sheet_pivot_versions v
+    WHERE v.marketplace_id = p_marketplace_id;
+$$;
+
+GRANT SELECT ON sp_sheet_pivot_versions TO anon;
+GRANT SELECT ON sp_sheet_pivot_rows TO anon;
+GRANT EXECUTE ON FUNCTION get_sheet_pivot_feed(UUID) TO anon;
+
+
+-- ============================================================
+-- STEP 4: Initial build
+-- ============================================================
+
+SELECT refresh_sheet_pivot_feed();
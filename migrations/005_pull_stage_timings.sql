@@ -0,0 +1,98 @@
+-- Migration: Per-stage pull timings
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: processing_time_ms on the pull tables is one number per pull. Every
+-- pull script now collects structured stage timings (scripts/utils/metrics.py
+-- PullTimings): token fetch, createReport, queue wait, poll count, document
+-- download bytes/seconds, parse, upsert seconds/chunks, rate-limit waits and
+-- retry backoff. This migration stores them:
+-- 1. stage_timings JSONB on each pull table - the full breakdown next to the pull record
+-- 2. sp_pull_stage_timings - one row per pull per stage, for querying across pulls
+-- 3. sp_pull_stage_weekly  - weekly rollup per pull type / marketplace / stage
+-- 4. sp_pull_bottlenecks   - slowest stage of every pull
+--
+-- Written by db.record_pull_timings(); persisting timings never fails a pull.
+
+-- ============================================================
+-- STEP 1: stage_timings on the existing pull tables
+-- ============================================================
+
+ALTER TABLE sp_api_pulls ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+ALTER TABLE sp_sqp_pulls ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+ALTER TABLE sp_search_terms_pulls ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+ALTER TABLE sp_financial_pulls ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+ALTER TABLE sp_inventory_pulls ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+
+
+-- ============================================================
+-- STEP 2: Per-stage rollup table
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS sp_pull_stage_timings (
+    id BIGSERIAL PRIMARY KEY,
+
+    -- Which pull ('sales_traffic', 'orders', 'sqp', 'scp', 'search_terms', 'fba_inventory', 'settlements', ...)
+    pull_type TEXT NOT NULL,
+    -- Pull record this belongs to (NULL for pulls without one, e.g. orders)
+    pull_table TEXT,
+    pull_id UUID,
+
+    marketplace_id UUID REFERENCES marketplaces(id),
+    marketplace_code TEXT,
+    region TEXT,
+    pull_date DATE,
+    -- When this pull attempt started (distinguishes re-pulls of the same date)
+    pull_started_at TIMESTAMPTZ NOT NULL,
+    pull_total_seconds NUMERIC,
+
+    stage TEXT NOT NULL,
+    seconds NUMERIC NOT NULL,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    bytes BIGINT,
+
+    recorded_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pull_stage_type_date ON sp_pull_stage_timings(pull_type, pull_date);
+CREATE INDEX IF NOT EXISTS idx_pull_stage_marketplace ON sp_pull_stage_timings(marketplace_code, pull_type, stage);
+CREATE INDEX IF NOT EXISTS idx_pull_stage_started ON sp_pull_stage_timings(pull_started_at);
+CREATE INDEX IF NOT EXISTS idx_pull_stage_pull ON sp_pull_stage_timings(pull_id);
+
+COMMENT ON TABLE sp_pull_stage_timings IS
+'One row per pull attempt per stage (see PullTimings in scripts/utils/metrics.py for stage names). Nested stages overlap: queue_wait contains poll, db_upsert contains db_upsert_chunk.';
+
+
+-- ============================================================
+-- STEP 3: Rollup views
+-- ============================================================
+
+CREATE OR REPLACE VIEW sp_pull_stage_weekly AS
+SELECT
+    date_trunc('week', t.pull_started_at)::date AS week_start,
+    t.pull_type,
+    t.marketplace_code AS marketplace,
+    t.stage,
+    COUNT(DISTINCT t.pull_started_at) AS pulls,
+    SUM(t.call_count) AS calls,
+    ROUND(SUM(t.seconds), 1) AS total_seconds,
+    ROUND(AVG(t.seconds), 2) AS avg_seconds,
+    ROUND((PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY t.seconds))::numeric, 2) AS p95_seconds,
+    MAX(t.seconds) AS max_seconds,
+    SUM(t.bytes) AS total_bytes
+FROM sp_pull_stage_timings t
+GROUP BY 1, 2, 3, 4;
+
+-- Slowest top-level stage per pull attempt (poll / db_upsert_chunk are nested, so excluded)
+CREATE OR REPLACE VIEW sp_pull_bottlenecks AS
+SELECT DISTINCT ON (t.pull_type, t.marketplace_code, t.pull_started_at)
+    t.pull_type,
+    t.marketplace_code AS marketplace,
+    t.pull_date,
+    t.pull_started_at,
+    t.pull_total_seconds,
+    t.stage AS bottleneck_stage,
+    t.seconds AS bottleneck_seconds,
+    ROUND(100 * t.seconds / NULLIF(t.pull_total_seconds, 0), 1) AS bottleneck_pct
+FROM sp_pull_stage_timings t
+WHERE t.stage NOT IN ('poll', 'db_upsert_chunk')
+ORDER BY t.pull_type, t.marketplace_code, t.pull_started_at, t.seconds DESC;
@@ -0,0 +1,59 @@
+-- Migration: Peak RSS per pull stage
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: the memory budget (scripts/utils/memory.py) records the peak
+-- process RSS of each stage while a pull runs. Storing it next to the stage
+-- seconds shows how much RAM each pull type / stage needs, for sizing the
+-- GitHub Actions runners and SP_MEMORY_BUDGET_MB.
+-- 1. peak_rss_mb on sp_pull_stage_timings
+-- 2. sp_pull_stage_weekly gains max / p95 peak RSS per stage
+-- 3. sp_pull_memory_peaks - heaviest stage per pull type / marketplace, last 30 days
+
+-- ============================================================
+-- STEP 1: peak_rss_mb column
+-- ============================================================
+
+ALTER TABLE sp_pull_stage_timings ADD COLUMN IF NOT EXISTS peak_rss_mb NUMERIC;
+
+
+-- ============================================================
+-- STEP 2: Weekly rollup with memory
+-- ============================================================
+
+DROP VIEW IF EXISTS sp_pull_stage_weekly;
+
+CREATE VIEW sp_pull_stage_weekly AS
+SELECT
+    date_trunc('week', t.pull_started_at)::date AS week_start,
+    t.pull_type,
+    t.marketplace_code AS marketplace,
+    t.stage,
+    COUNT(DISTINCT t.pull_started_at) AS pulls,
+    SUM(t.call_count) AS calls,
+    ROUND(SUM(t.seconds), 1) AS total_seconds,
+    ROUND(AVG(t.seconds), 2) AS avg_seconds,
+    ROUND((PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY t.seconds))::numeric, 2) AS p95_seconds,
+    MAX(t.seconds) AS max_seconds,
+    SUM(t.bytes) AS total_bytes,
+    MAX(t.peak_rss_mb) AS max_peak_rss_mb,
+    ROUND((PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY t.peak_rss_mb))::numeric, 1) AS p95_peak_rss_mb
+FROM sp_pull_stage_timings t
+GROUP BY 1, 2, 3, 4;
+
+
+-- ============================================================
+-- STEP 3: Memory-heaviest stage per pull type / marketplace
+-- ============================================================
+
+CREATE OR REPLACE VIEW sp_pull_memory_peaks AS
+SELECT DISTINCT ON (t.pull_type, t.marketplace_code)
+    t.pull_type,
+    t.marketplace_code AS marketplace,
+    t.stage AS heaviest_stage,
+    t.peak_rss_mb,
+    t.pull_date,
+    t.pull_started_at
+FROM sp_pull_stage_timings t
+WHERE t.peak_rss_mb IS NOT NULL
+  AND t.pull_started_at > NOW() - INTERVAL '30 days'
+ORDER BY t.pull_type, t.marketplace_code, t.peak_rss_mb DESC;
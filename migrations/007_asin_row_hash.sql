@@ -0,0 +1,30 @@
+-- Migration: Row-hash change detection for sp_daily_asin_data
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: refresh runs re-pull days that are already stored, and most
+-- ASINs' numbers haven't changed. db.upsert_asin_data() now hashes each row's
+-- content (scripts/utils/change_detection.py), compares it with the stored
+-- hash and only upserts new or changed rows, cutting WAL and index churn.
+-- 1. row_hash on sp_daily_asin_data
+-- 2. new / changed / unchanged row counts on sp_api_pulls
+--
+-- Existing rows have row_hash NULL and count as changed on their next pull,
+-- which fills the hash in.
+
+-- ============================================================
+-- STEP 1: row_hash column
+-- ============================================================
+
+ALTER TABLE sp_daily_asin_data ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+
+-- ============================================================
+-- STEP 2: Change counts per pull
+-- ============================================================
+
+ALTER TABLE sp_api_pulls ADD COLUMN IF NOT EXISTS rows_new INTEGER;
+ALTER TABLE sp_api_pulls ADD COLUMN IF NOT EXISTS rows_changed INTEGER;
+ALTER TABLE sp_api_pulls ADD COLUMN IF NOT EXISTS rows_unchanged INTEGER;
+
+COMMENT ON COLUMN sp_daily_asin_data.row_hash IS 'MD5 of the row content fields (change_detection.py); NULL for orders-only rows';
+COMMENT ON COLUMN sp_api_pulls.rows_unchanged IS 'ASIN rows skipped because their row_hash matched the stored row';
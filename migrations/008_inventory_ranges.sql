@@ -0,0 +1,365 @@
+-- Migration: Delta-encoded FBA inventory storage
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: sp_fba_inventory stores a full row per SKU per day, so it grows
+-- as SKUs x days although most SKUs' quantities don't change from one day
+-- to the next. sp_fba_inventory_ranges stores one row per SKU per run of
+-- identical quantities, valid from valid_from up to (not including) valid_to.
+-- 1. sp_fba_inventory_ranges + sp_fba_inventory_days (days that were pulled)
+-- 2. sp_fba_inventory_content_hash() - what counts as "changed"
+-- 3. apply_fba_inventory_day() / close_missing_fba_inventory() - called by
+--    pull_inventory.py (SP_INVENTORY_STORAGE=ranges or both)
+-- 4. sp_fba_inventory_snapshots - compatibility view, one row per SKU per
+--    pulled day, same columns as sp_fba_inventory
+-- 5. compact_fba_inventory_history() - one-time conversion of existing
+--    sp_fba_inventory history (scripts/compact_inventory_history.py)
+-- 6. fba_inventory_storage_stats() - sizes for the before/after benchmark
+--
+-- Rollout: apply, run pulls with SP_INVENTORY_STORAGE=both, compact, compare
+-- with compact_inventory_history.py --benchmark, then switch to ranges and
+-- prune sp_fba_inventory (--prune-before).
+
+-- ============================================================
+-- STEP 1: Tables
+-- ============================================================
+
+-- Same columns as sp_fba_inventory (incl. generated total_quantity), minus date
+CREATE TABLE IF NOT EXISTS sp_fba_inventory_ranges (
+    LIKE sp_fba_inventory INCLUDING DEFAULTS INCLUDING GENERATED
+);
+
+ALTER TABLE sp_fba_inventory_ranges DROP COLUMN IF EXISTS date;
+ALTER TABLE sp_fba_inventory_ranges ADD COLUMN IF NOT EXISTS valid_from DATE NOT NULL;
+ALTER TABLE sp_fba_inventory_ranges ADD COLUMN IF NOT EXISTS valid_to DATE;  -- exclusive; NULL = current
+ALTER TABLE sp_fba_inventory_ranges ADD COLUMN IF NOT EXISTS row_hash TEXT NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inv_ranges_key
+    ON sp_fba_inventory_ranges(marketplace_id, sku, valid_from);
+
+-- Snapshot lookups: ranges starting on/before a day
+CREATE INDEX IF NOT EXISTS idx_inv_ranges_mp_from
+    ON sp_fba_inventory_ranges(marketplace_id, valid_from);
+
+-- Current state (what each pull compares against)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inv_ranges_open
+    ON sp_fba_inventory_ranges(marketplace_id, sku) WHERE valid_to IS NULL;
+
+-- Days with a completed inventory pull: a SKU missing on one of these days is
+-- out of stock / removed; days not listed are gaps, not zeros
+CREATE TABLE IF NOT EXISTS sp_fba_inventory_days (
+    marketplace_id UUID NOT NULL REFERENCES marketplaces(id),
+    date DATE NOT NULL,
+    PRIMARY KEY (marketplace_id, date)
+);
+
+
+-- ============================================================
+-- STEP 2: Content hash
+-- ============================================================
+
+-- Quantities and product fields only; keys, validity and tracking columns
+-- are left out. Both the pull and the compaction hash the same row type, so
+-- their hashes agree.
+CREATE OR REPLACE FUNCTION sp_fba_inventory_content_hash(r sp_fba_inventory_ranges)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT md5((to_jsonb(r) - ARRAY[
+        'id', 'marketplace_id', 'valid_from', 'valid_to', 'row_hash',
+        'import_id', 'created_at', 'updated_at', 'total_quantity'
+    ])::text);
+$$;
+
+-- Insertable columns (not generated, not row identity / audit defaults)
+CREATE OR REPLACE FUNCTION sp_fba_inventory_range_columns()
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT string_agg(quote_ident(column_name), ', ' ORDER BY ordinal_position)
+    FROM information_schema.columns
+    WHERE table_schema = 'public'
+      AND table_name = 'sp_fba_inventory_ranges'
+      AND is_generated = 'NEVER'
+      AND column_name NOT IN ('id', 'created_at', 'updated_at');
+$$;
+
+
+-- ============================================================
+-- STEP 3: Write path
+-- ============================================================
+
+-- Apply one batch of a marketplace's inventory for p_date (rows as sent to
+-- sp_fba_inventory, without date/marketplace_id). Unchanged SKUs are not
+-- written; a changed SKU closes its open range and starts a new one. A
+-- re-pull of the same day replaces that day's range. Rows for a day older
+-- than the SKU's open range are ignored (stale). The day is not recorded in
+-- sp_fba_inventory_days here: a pull that fails after its first batches
+-- would otherwise show up as a complete snapshot.
+CREATE OR REPLACE FUNCTION apply_fba_inventory_day(
+    p_marketplace_id UUID,
+    p_date DATE,
+    p_rows JSONB
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_counts JSONB;
+BEGIN
+    DROP TABLE IF EXISTS _inv_incoming;
+    CREATE TEMP TABLE _inv_incoming ON COMMIT DROP AS
+    SELECT DISTINCT ON (n.sku)
+        n.sku,
+        sp_fba_inventory_content_hash(n) AS row_hash,
+        n AS rec,
+        o.valid_from AS open_from,
+        o.row_hash AS open_hash
+    FROM jsonb_populate_recordset(NULL::sp_fba_inventory_ranges, p_rows) n
+    LEFT JOIN sp_fba_inventory_ranges o
+        ON o.marketplace_id = p_marketplace_id
+        AND o.sku = n.sku
+        AND o.valid_to IS NULL
+    WHERE COALESCE(n.sku, '') <> '';
+
+    SELECT jsonb_build_object(
+        'new', COUNT(*) FILTER (WHERE open_hash IS NULL),
+        'changed', COUNT(*) FILTER (WHERE open_hash <> row_hash AND open_from <= p_date),
+        'unchanged', COUNT(*) FILTER (WHERE open_hash = row_hash),
+        'stale', COUNT(*) FILTER (WHERE open_hash <> row_hash AND open_from > p_date)
+    ) INTO v_counts
+    FROM _inv_incoming;
+
+    -- Changed since an earlier day: close the open range
+    UPDATE sp_fba_inventory_ranges o
+    SET valid_to = p_date
+    FROM _inv_incoming n
+    WHERE o.marketplace_id = p_marketplace_id
+      AND o.sku = n.sku
+      AND o.valid_to IS NULL
+      AND o.valid_from < p_date
+      AND n.open_hash <> n.row_hash;
+
+    -- Changed since an earlier pull of the same day: replace it
+    DELETE FROM sp_fba_inventory_ranges o
+    USING _inv_incoming n
+    WHERE o.marketplace_id = p_marketplace_id
+      AND o.sku = n.sku
+      AND o.valid_to IS NULL
+      AND o.valid_from = p_date
+      AND n.open_hash <> n.row_hash;
+
+    EXECUTE format(
+        'INSERT INTO sp_fba_inventory_ranges (%1$s)
+         SELECT %1$s FROM (
+             SELECT (jsonb_populate_record(n.rec, jsonb_build_object(
+                 ''marketplace_id'', $1, ''valid_from'', $2, ''valid_to'', NULL, ''row_hash'', n.row_hash
+             ))).*
+             FROM _inv_incoming n
+             WHERE n.open_hash IS NULL OR (n.open_hash <> n.row_hash AND n.open_from <= $2)
+         ) s',
+        sp_fba_inventory_range_columns()
+    ) USING p_marketplace_id, p_date;
+
+    RETURN v_counts;
+END;
+$$;
+
+-- After a marketplace's full pull for p_date: SKUs that were not in it
+-- (p_skus = every SKU sent that day) are no longer in inventory, and the
+-- day becomes a snapshot day (sp_fba_inventory_days)
+CREATE OR REPLACE FUNCTION close_missing_fba_inventory(
+    p_marketplace_id UUID,
+    p_date DATE,
+    p_skus TEXT[]
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_closed INTEGER;
+BEGIN
+    INSERT INTO sp_fba_inventory_days (marketplace_id, date)
+    VALUES (p_marketplace_id, p_date)
+    ON CONFLICT DO NOTHING;
+
+    UPDATE sp_fba_inventory_ranges
+    SET valid_to = p_date
+    WHERE marketplace_id = p_marketplace_id
+      AND valid_to IS NULL
+      AND valid_from < p_date
+      AND NOT (sku = ANY(p_skus));
+    GET DIAGNOSTICS v_closed = ROW_COUNT;
+    RETURN v_closed;
+END;
+$$;
+
+
+-- ============================================================
+-- STEP 4: Compatibility view
+-- ============================================================
+
+-- Full snapshot for every pulled day, sp_fba_inventory's columns. Filter on
+-- date (and marketplace_id): the day is looked up first, then only ranges
+-- covering it are read.
+CREATE OR REPLACE VIEW sp_fba_inventory_snapshots AS
+SELECT
+    d.date,
+    r.*
+FROM sp_fba_inventory_days d
+JOIN sp_fba_inventory_ranges r
+    ON r.marketplace_id = d.marketplace_id
+    AND r.valid_from <= d.date
+    AND (r.valid_to IS NULL OR r.valid_to > d.date);
+
+
+-- ============================================================
+-- STEP 5: One-time compaction of sp_fba_inventory history
+-- ============================================================
+
+-- Rebuilds a marketplace's ranges (all marketplaces if NULL) from
+-- sp_fba_inventory: consecutive pulled days with the same content hash
+-- become one range. Safe to re-run while sp_fba_inventory still has every
+-- day; refuses once days exist only as ranges. p_prune_before deletes the
+-- compacted sp_fba_inventory rows before that date.
+CREATE OR REPLACE FUNCTION compact_fba_inventory_history(
+    p_marketplace_id UUID DEFAULT NULL,
+    p_prune_before DATE DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+    v_ranges BIGINT;
+    v_pruned BIGINT := 0;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM sp_fba_inventory_days d
+        WHERE (p_marketplace_id IS NULL OR d.marketplace_id = p_marketplace_id)
+          AND NOT EXISTS (
+              SELECT 1 FROM sp_fba_inventory i
+              WHERE i.marketplace_id = d.marketplace_id AND i.date = d.date
+          )
+    ) THEN
+        RAISE EXCEPTION 'sp_fba_inventory_ranges holds days that are no longer in sp_fba_inventory; not rebuilding';
+    END IF;
+
+    INSERT INTO sp_fba_inventory_days (marketplace_id, date)
+    SELECT DISTINCT marketplace_id, date
+    FROM sp_fba_inventory
+    WHERE p_marketplace_id IS NULL OR marketplace_id = p_marketplace_id
+    ON CONFLICT DO NOTHING;
+
+    DROP TABLE IF EXISTS _inv_islands;
+    CREATE TEMP TABLE _inv_islands ON COMMIT DROP AS
+    WITH days AS (
+        SELECT
+            marketplace_id,
+            date,
+            ROW_NUMBER() OVER (PARTITION BY marketplace_id ORDER BY date) AS day_no,
+            LEAD(date) OVER (PARTITION BY marketplace_id ORDER BY date) AS next_date
+        FROM sp_fba_inventory_days
+        WHERE p_marketplace_id IS NULL OR marketplace_id = p_marketplace_id
+    ),
+    hashed AS (
+        SELECT
+            i.marketplace_id,
+            i.sku,
+            i.date,
+            d.day_no,
+            d.next_date,
+            r AS rec,
+            sp_fba_inventory_content_hash(r) AS row_hash
+        FROM sp_fba_inventory i
+        JOIN days d ON d.marketplace_id = i.marketplace_id AND d.date = i.date
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::sp_fba_inventory_ranges, to_jsonb(i) - 'id') r
+        WHERE COALESCE(i.sku, '') <> ''
+    ),
+    marked AS (
+        -- A range starts when the content changes or the SKU was missing on the previous pulled day
+        SELECT *,
+            CASE
+                WHEN LAG(row_hash) OVER w = row_hash AND LAG(day_no) OVER w = day_no - 1 THEN 0
+                ELSE 1
+            END AS starts
+        FROM hashed
+        WINDOW w AS (PARTITION BY marketplace_id, sku ORDER BY date)
+    ),
+    numbered AS (
+        SELECT *,
+            SUM(starts) OVER (PARTITION BY marketplace_id, sku ORDER BY date) AS island
+        FROM marked
+    )
+    -- Last day of each island carries its values; the range ends at the next pulled day
+    SELECT DISTINCT ON (marketplace_id, sku, island)
+        marketplace_id,
+        sku,
+        MIN(date) OVER (PARTITION BY marketplace_id, sku, island) AS valid_from,
+        next_date AS valid_to,
+        row_hash,
+        rec
+    FROM numbered
+    ORDER BY marketplace_id, sku, island, date DESC;
+
+    -- Open ranges end at NULL, not at a day that hasn't been pulled yet
+    DELETE FROM sp_fba_inventory_ranges
+    WHERE p_marketplace_id IS NULL OR marketplace_id = p_marketplace_id;
+
+    EXECUTE format(
+        'INSERT INTO sp_fba_inventory_ranges (%1$s)
+         SELECT %1$s FROM (
+             SELECT (jsonb_populate_record(x.rec, jsonb_build_object(
+                 ''marketplace_id'', x.marketplace_id, ''valid_from'', x.valid_from,
+                 ''valid_to'', x.valid_to, ''row_hash'', x.row_hash
+             ))).*
+             FROM _inv_islands x
+         ) s',
+        sp_fba_inventory_range_columns()
+    );
+    GET DIAGNOSTICS v_ranges = ROW_COUNT;
+
+    SELECT COUNT(*) INTO v_rows
+    FROM sp_fba_inventory
+    WHERE p_marketplace_id IS NULL OR marketplace_id = p_marketplace_id;
+
+    IF p_prune_before IS NOT NULL THEN
+        DELETE FROM sp_fba_inventory
+        WHERE (p_marketplace_id IS NULL OR marketplace_id = p_marketplace_id)
+          AND date < p_prune_before;
+        GET DIAGNOSTICS v_pruned = ROW_COUNT;
+    END IF;
+
+    RETURN jsonb_build_object('daily_rows', v_rows, 'ranges', v_ranges, 'pruned', v_pruned);
+END;
+$$;
+
+
+-- ============================================================
+-- STEP 6: Storage stats for benchmarks
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION fba_inventory_storage_stats()
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'daily_rows', (SELECT COUNT(*) FROM sp_fba_inventory),
+        'daily_bytes', pg_total_relation_size('sp_fba_inventory'),
+        'range_rows', (SELECT COUNT(*) FROM sp_fba_inventory_ranges),
+        'range_bytes', pg_total_relation_size('sp_fba_inventory_ranges'),
+        'days', (SELECT COUNT(*) FROM sp_fba_inventory_days)
+    );
+$$;
+
+
+COMMENT ON TABLE sp_fba_inventory_ranges IS
+    'Delta-encoded FBA inventory: one row per SKU per run of unchanged quantities (valid_from inclusive, valid_to exclusive, NULL = current)';
+
+COMMENT ON TABLE sp_fba_inventory_days IS
+    'Days with a completed FBA inventory pull per marketplace (snapshot days for sp_fba_inventory_snapshots)';
+
+COMMENT ON VIEW sp_fba_inventory_snapshots IS
+    'sp_fba_inventory reconstructed from ranges: full SKU snapshot for every pulled day';
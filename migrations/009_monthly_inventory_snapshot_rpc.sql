@@ -0,0 +1,140 @@
+-- Migration: Server-side monthly inventory snapshots
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: capture_monthly_inventory.py used to select every sp_fba_inventory
+-- row through PostgREST (silently cut off at the API row limit), rename the
+-- fields in Python and upsert them back 100 at a time. The snapshot is now
+-- one INSERT ... SELECT ... ON CONFLICT per month and marketplace inside
+-- the database, so it costs the same round trip whatever the SKU count.
+-- 1. capture_inventory_monthly_snapshots() - one or many months, returns counts
+--
+-- Source day per month and marketplace: the first pulled day in that month
+-- (normally the 1st). For the current month only, if nothing has been pulled
+-- yet, the latest earlier day is used (as before).
+--
+-- Field mapping from sp_fba_inventory (the Python version read keys that
+-- don't exist there, so these columns were always 0):
+--   pending_transshipment_qty  -> reserved_fc_transfers
+--   fc_processing_qty          -> reserved_fc_processing
+--   pending_customer_order_qty -> reserved_customer_orders
+--   unsellable_quantity        -> unfulfillable_quantity
+--   researching_qty            -> researching_quantity
+
+-- ============================================================
+-- STEP 1: Snapshot function
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION capture_inventory_monthly_snapshots(
+    p_from_month DATE,
+    p_to_month DATE DEFAULT NULL,
+    p_marketplace_id UUID DEFAULT NULL,
+    p_source TEXT DEFAULT 'sp_fba_inventory',  -- or sp_fba_inventory_snapshots (ranges storage)
+    p_dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+    snapshot_date DATE,
+    marketplace_id UUID,
+    source_date DATE,
+    records BIGINT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_month DATE;
+    v_marketplace UUID;
+    v_source_date DATE;
+    v_records BIGINT;
+    v_current_month DATE := date_trunc('month', CURRENT_DATE)::date;
+BEGIN
+    IF p_source NOT IN ('sp_fba_inventory', 'sp_fba_inventory_snapshots') THEN
+        RAISE EXCEPTION 'Unknown inventory source: %', p_source;
+    END IF;
+
+    FOR v_month IN
+        SELECT generate_series(
+            date_trunc('month', p_from_month),
+            date_trunc('month', COALESCE(p_to_month, p_from_month)),
+            INTERVAL '1 month'
+        )::date
+    LOOP
+        FOR v_marketplace IN
+            SELECT m.id FROM marketplaces m
+            WHERE p_marketplace_id IS NULL OR m.id = p_marketplace_id
+        LOOP
+            -- First pulled day of the month (index range scan on date)
+            EXECUTE format(
+                'SELECT MIN(date) FROM %I WHERE marketplace_id = $1 AND date >= $2 AND date < $3',
+                p_source
+            ) INTO v_source_date
+            USING v_marketplace, v_month, (v_month + INTERVAL '1 month')::date;
+
+            IF v_source_date IS NULL AND v_month = v_current_month THEN
+                EXECUTE format(
+                    'SELECT MAX(date) FROM %I WHERE marketplace_id = $1 AND date < $2',
+                    p_source
+                ) INTO v_source_date
+                USING v_marketplace, v_month;
+            END IF;
+
+            CONTINUE WHEN v_source_date IS NULL;
+
+            IF p_dry_run THEN
+                EXECUTE format(
+                    'SELECT COUNT(*) FROM %I WHERE marketplace_id = $1 AND date = $2',
+                    p_source
+                ) INTO v_records
+                USING v_marketplace, v_source_date;
+            ELSE
+                EXECUTE format(
+                    'INSERT INTO sp_inventory_monthly_snapshots (
+                         snapshot_date, marketplace_id, sku, asin, fnsku, product_name,
+                         fulfillable_quantity, reserved_quantity,
+                         reserved_fc_transfers, reserved_fc_processing, reserved_customer_orders,
+                         inbound_working_quantity, inbound_shipped_quantity, inbound_receiving_quantity,
+                         unfulfillable_quantity, researching_quantity,
+                         source_date, captured_at
+                     )
+                     SELECT
+                         $3, i.marketplace_id, i.sku, i.asin, i.fnsku, i.product_name,
+                         COALESCE(i.fulfillable_quantity, 0), COALESCE(i.reserved_quantity, 0),
+                         COALESCE(i.pending_transshipment_qty, 0), COALESCE(i.fc_processing_qty, 0),
+                         COALESCE(i.pending_customer_order_qty, 0),
+                         COALESCE(i.inbound_working_quantity, 0), COALESCE(i.inbound_shipped_quantity, 0),
+                         COALESCE(i.inbound_receiving_quantity, 0),
+                         COALESCE(i.unsellable_quantity, 0), COALESCE(i.researching_qty, 0),
+                         $2, NOW()
+                     FROM %I i
+                     WHERE i.marketplace_id = $1 AND i.date = $2 AND COALESCE(i.sku, '''') <> ''''
+                     ON CONFLICT (snapshot_date, marketplace_id, sku) DO UPDATE SET
+                         asin = EXCLUDED.asin,
+                         fnsku = EXCLUDED.fnsku,
+                         product_name = EXCLUDED.product_name,
+                         fulfillable_quantity = EXCLUDED.fulfillable_quantity,
+                         reserved_quantity = EXCLUDED.reserved_quantity,
+                         reserved_fc_transfers = EXCLUDED.reserved_fc_transfers,
+                         reserved_fc_processing = EXCLUDED.reserved_fc_processing,
+                         reserved_customer_orders = EXCLUDED.reserved_customer_orders,
+                         inbound_working_quantity = EXCLUDED.inbound_working_quantity,
+                         inbound_shipped_quantity = EXCLUDED.inbound_shipped_quantity,
+                         inbound_receiving_quantity = EXCLUDED.inbound_receiving_quantity,
+                         unfulfillable_quantity = EXCLUDED.unfulfillable_quantity,
+                         researching_quantity = EXCLUDED.researching_quantity,
+                         source_date = EXCLUDED.source_date,
+                         captured_at = EXCLUDED.captured_at',
+                    p_source
+                ) USING v_marketplace, v_source_date, v_month;
+                GET DIAGNOSTICS v_records = ROW_COUNT;
+            END IF;
+
+            snapshot_date := v_month;
+            marketplace_id := v_marketplace;
+            source_date := v_source_date;
+            records := v_records;
+            RETURN NEXT;
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+COMMENT ON FUNCTION capture_inventory_monthly_snapshots IS
+    'Copy each marketplace''s inventory on the first pulled day of every month in [p_from_month, p_to_month] into sp_inventory_monthly_snapshots; one row of counts per month/marketplace';
@@ -0,0 +1,114 @@
+-- Migration: Processed-settlement registry
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: pull_settlements.py and backfill_settlements.py used to select
+-- every completed settlement_id from sp_financial_pulls on each run and
+-- dedup in Python. That read grows with history and is silently cut off at
+-- the PostgREST row limit, after which old settlements would be downloaded
+-- and imported again. Settlements now get one row each in a small registry
+-- keyed on settlement_id (and unique on report_document_id), and the
+-- scripts ask "which of these IDs exist" for just the listed reports.
+-- 1. sp_processed_settlements - one row per stored settlement
+-- 2. Trigger on sp_financial_pulls - registers a settlement when its pull completes
+-- 3. Backfill from completed settlement pulls
+-- 4. find_processed_settlements() - bulk existence check by settlement or document ID
+
+-- ============================================================
+-- STEP 1: Registry table
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS sp_processed_settlements (
+    settlement_id TEXT PRIMARY KEY,
+    report_document_id TEXT UNIQUE,
+    report_id TEXT,
+    pull_id UUID,
+    row_count INTEGER,
+    processed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE sp_processed_settlements IS
+    'One row per settlement report stored in sp_settlement_transactions; maintained by trg_register_processed_settlement';
+
+-- ============================================================
+-- STEP 2: Register settlements as their pulls complete
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION register_processed_settlement()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO sp_processed_settlements (
+        settlement_id, report_document_id, report_id, pull_id, row_count, processed_at
+    )
+    VALUES (
+        NEW.settlement_id, NEW.report_document_id, NEW.report_id, NEW.id, NEW.row_count,
+        COALESCE(NEW.completed_at, NOW())
+    )
+    ON CONFLICT (settlement_id) DO UPDATE SET
+        report_document_id = COALESCE(sp_processed_settlements.report_document_id, EXCLUDED.report_document_id),
+        report_id = COALESCE(sp_processed_settlements.report_id, EXCLUDED.report_id),
+        pull_id = EXCLUDED.pull_id,
+        row_count = EXCLUDED.row_count,
+        processed_at = EXCLUDED.processed_at;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_register_processed_settlement ON sp_financial_pulls;
+
+CREATE TRIGGER trg_register_processed_settlement
+    AFTER INSERT OR UPDATE OF status ON sp_financial_pulls
+    FOR EACH ROW
+    WHEN (
+        NEW.status = 'completed'
+        AND NEW.settlement_id IS NOT NULL
+        AND NEW.report_type = 'GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2'
+    )
+    EXECUTE FUNCTION register_processed_settlement();
+
+-- ============================================================
+-- STEP 3: Backfill from existing pulls (latest completed pull per settlement)
+-- ============================================================
+
+INSERT INTO sp_processed_settlements (
+    settlement_id, report_document_id, report_id, pull_id, row_count, processed_at
+)
+SELECT DISTINCT ON (p.settlement_id)
+    p.settlement_id, p.report_document_id, p.report_id, p.id, p.row_count,
+    COALESCE(p.completed_at, p.started_at, NOW())
+FROM sp_financial_pulls p
+WHERE p.report_type = 'GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2'
+  AND p.status = 'completed'
+  AND p.settlement_id IS NOT NULL
+ORDER BY p.settlement_id, p.report_document_id IS NULL, p.completed_at DESC NULLS LAST
+ON CONFLICT DO NOTHING;
+
+-- ============================================================
+-- STEP 4: Bulk existence check
+-- ============================================================
+
+-- Two index lookups (primary key, report_document_id unique index);
+-- at most one row per matched settlement
+CREATE OR REPLACE FUNCTION find_processed_settlements(
+    p_settlement_ids TEXT[] DEFAULT '{}',
+    p_report_document_ids TEXT[] DEFAULT '{}'
+)
+RETURNS TABLE (
+    settlement_id TEXT,
+    report_document_id TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.settlement_id, s.report_document_id
+    FROM sp_processed_settlements s
+    WHERE s.settlement_id = ANY(COALESCE(p_settlement_ids, '{}'))
+    UNION
+    SELECT s.settlement_id, s.report_document_id
+    FROM sp_processed_settlements s
+    WHERE s.report_document_id = ANY(COALESCE(p_report_document_ids, '{}'));
+$$;
+
+COMMENT ON FUNCTION find_processed_settlements IS
+    'Which of these settlement IDs / report document IDs are already stored; one (settlement_id, report_document_id) row per match';
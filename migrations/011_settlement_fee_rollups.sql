@@ -0,0 +1,197 @@
+-- Migration: Per-SKU settlement fee rollups and the Sheets fee feed
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: the SP Fees refresh in google-sheets/supabase_sales.gs fetched
+-- every sp_fba_fee_estimates row plus sp_settlement_fees_by_sku (aggregated
+-- over all of sp_settlement_transactions on each read) page by page and
+-- joined them in Apps Script. Settlement rows are now rolled up per
+-- marketplace, SKU, month and amount type/description as each settlement is
+-- stored, and the sheet reads one JSON feed with a row per SKU.
+-- 1. sp_settlement_sku_fees_monthly  - rollup rows, one set per settlement
+-- 2. refresh_settlement_fee_rollup() - rebuilds one settlement's rows (or all)
+-- 3. sp_settlement_fees_by_sku_month - rollup summed across settlements
+-- 4. get_sku_fee_feed()              - fee estimates + settlement actuals per SKU
+--
+-- refresh_settlement_fee_rollup(settlement_id) runs from the settlement
+-- pipeline's store stage (scripts/pull_settlements.py) right after the
+-- settlement's transactions are upserted. Rows are kept per settlement, so a
+-- settlement imported again replaces its own rows instead of adding to them.
+
+-- ============================================================
+-- STEP 1: Rollup table
+-- ============================================================
+
+-- Rebuilding one settlement filters sp_settlement_transactions by settlement_id
+CREATE INDEX IF NOT EXISTS idx_settlement_transactions_settlement_id
+    ON sp_settlement_transactions (settlement_id);
+
+CREATE TABLE IF NOT EXISTS sp_settlement_sku_fees_monthly (
+    marketplace_id UUID NOT NULL REFERENCES marketplaces(id),
+    settlement_id TEXT NOT NULL,
+    sku TEXT NOT NULL DEFAULT '',               -- '' for rows without a SKU (e.g. storage fees)
+    month DATE NOT NULL,                        -- month of posted_date
+    transaction_type TEXT NOT NULL DEFAULT '',
+    amount_type TEXT NOT NULL DEFAULT '',
+    amount_description TEXT NOT NULL DEFAULT '',
+
+    amount NUMERIC NOT NULL DEFAULT 0,
+    quantity BIGINT NOT NULL DEFAULT 0,         -- SUM(quantity_purchased)
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    currency_code TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (marketplace_id, settlement_id, sku, month, transaction_type, amount_type, amount_description)
+);
+
+CREATE INDEX IF NOT EXISTS idx_settlement_sku_fees_monthly_sku
+    ON sp_settlement_sku_fees_monthly (marketplace_id, sku, month);
+
+CREATE INDEX IF NOT EXISTS idx_settlement_sku_fees_monthly_settlement
+    ON sp_settlement_sku_fees_monthly (settlement_id);
+
+COMMENT ON TABLE sp_settlement_sku_fees_monthly IS
+    'sp_settlement_transactions summed per marketplace, settlement, SKU, month and amount type/description; maintained by refresh_settlement_fee_rollup()';
+
+
+-- ============================================================
+-- STEP 2: Refresh function (service role — called per settlement)
+-- ============================================================
+-- Replaces the rollup rows of one settlement, or of every settlement when
+-- p_settlement_id is NULL. Returns the number of rollup rows written.
+
+CREATE OR REPLACE FUNCTION refresh_settlement_fee_rollup(p_settlement_id TEXT DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM sp_settlement_sku_fees_monthly r
+    WHERE p_settlement_id IS NULL OR r.settlement_id = p_settlement_id;
+
+    INSERT INTO sp_settlement_sku_fees_monthly (
+        marketplace_id, settlement_id, sku, month,
+        transaction_type, amount_type, amount_description,
+        amount, quantity, transaction_count, currency_code, updated_at
+    )
+    SELECT
+        t.marketplace_id,
+        t.settlement_id,
+        COALESCE(t.sku, ''),
+        date_trunc('month', COALESCE(t.posted_date, t.posted_date_time::date, t.settlement_start_date::date))::date,
+        COALESCE(t.transaction_type, ''),
+        COALESCE(t.amount_type, ''),
+        COALESCE(t.amount_description, ''),
+        COALESCE(SUM(t.amount), 0),
+        COALESCE(SUM(t.quantity_purchased), 0),
+        COUNT(*)::integer,
+        MAX(t.currency_code),
+        NOW()
+    FROM sp_settlement_transactions t
+    WHERE (p_settlement_id IS NULL OR t.settlement_id = p_settlement_id)
+      AND t.marketplace_id IS NOT NULL
+      AND COALESCE(t.posted_date, t.posted_date_time::date, t.settlement_start_date::date) IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5, 6, 7;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+COMMENT ON FUNCTION refresh_settlement_fee_rollup IS
+    'Rebuild sp_settlement_sku_fees_monthly rows for one settlement (or all when NULL); returns rows written';
+
+
+-- ============================================================
+-- STEP 3: Rollup across settlements
+-- ============================================================
+
+CREATE OR REPLACE VIEW sp_settlement_fees_by_sku_month AS
+SELECT
+    r.marketplace_id,
+    r.sku,
+    r.month,
+    r.transaction_type,
+    r.amount_type,
+    r.amount_description,
+    SUM(r.amount) AS amount,
+    SUM(r.quantity) AS quantity,
+    SUM(r.transaction_count) AS transaction_count,
+    MAX(r.currency_code) AS currency_code
+FROM sp_settlement_sku_fees_monthly r
+GROUP BY r.marketplace_id, r.sku, r.month, r.transaction_type, r.amount_type, r.amount_description;
+
+COMMENT ON VIEW sp_settlement_fees_by_sku_month IS
+    'Settlement amounts per marketplace, SKU, month and amount type/description (summed over sp_settlement_sku_fees_monthly)';
+
+
+-- ============================================================
+-- STEP 4: Fee feed (anon — called by supabase_sales.gs)
+-- ============================================================
+-- One JSON object per SKU with a fee estimate, in the same shape the SP Fees
+-- sheet used to assemble client-side:
+--   { "generated_at": "...", "rows": [{ asin, sku, product_size_tier, your_price,
+--     estimated_fee_total, estimated_referral_fee_per_unit,
+--     estimated_pick_pack_fee_per_unit, estimated_weight_handling_fee_per_unit,
+--     currency_code, avg_fba_fee_per_unit, avg_referral_fee_per_unit,
+--     fba_fee_qty_basis, referral_fee_qty_basis }, ...] }
+-- Settlement averages are positive per-unit costs over Order rows:
+-- FBAPerUnitFulfillmentFee / Commission amounts divided by the units on
+-- those rows, from p_since_month on (all history when NULL).
+-- A scalar RPC result is not paginated by PostgREST, so one GET returns every SKU.
+
+CREATE OR REPLACE FUNCTION get_sku_fee_feed(
+    p_marketplace_id UUID,
+    p_since_month DATE DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH settle AS (
+        SELECT
+            r.sku,
+            SUM(r.amount) FILTER (WHERE r.amount_description = 'FBAPerUnitFulfillmentFee') AS fba_amount,
+            SUM(r.quantity) FILTER (WHERE r.amount_description = 'FBAPerUnitFulfillmentFee') AS fba_qty,
+            SUM(r.amount) FILTER (WHERE r.amount_description = 'Commission') AS referral_amount,
+            SUM(r.quantity) FILTER (WHERE r.amount_description = 'Commission') AS referral_qty
+        FROM sp_settlement_sku_fees_monthly r
+        WHERE r.marketplace_id = p_marketplace_id
+          AND r.transaction_type = 'Order'
+          AND r.amount_description IN ('FBAPerUnitFulfillmentFee', 'Commission')
+          AND (p_since_month IS NULL OR r.month >= date_trunc('month', p_since_month)::date)
+        GROUP BY r.sku
+    )
+    SELECT jsonb_build_object(
+        'generated_at', NOW(),
+        'rows', COALESCE(jsonb_agg(jsonb_build_object(
+            'asin', e.asin,
+            'sku', e.sku,
+            'product_size_tier', e.product_size_tier,
+            'your_price', e.your_price,
+            'estimated_fee_total', e.estimated_fee_total,
+            'estimated_referral_fee_per_unit', e.estimated_referral_fee_per_unit,
+            'estimated_pick_pack_fee_per_unit', e.estimated_pick_pack_fee_per_unit,
+            'estimated_weight_handling_fee_per_unit', e.estimated_weight_handling_fee_per_unit,
+            'currency_code', e.currency_code,
+            'avg_fba_fee_per_unit', ROUND(-s.fba_amount / NULLIF(s.fba_qty, 0), 2),
+            'avg_referral_fee_per_unit', ROUND(-s.referral_amount / NULLIF(s.referral_qty, 0), 2),
+            'fba_fee_qty_basis', COALESCE(s.fba_qty, 0),
+            'referral_fee_qty_basis', COALESCE(s.referral_qty, 0)
+        ) ORDER BY e.asin, e.sku), '[]'::jsonb)
+    )
+    FROM sp_fba_fee_estimates e
+    LEFT JOIN settle s ON s.sku = e.sku
+    WHERE e.marketplace_id = p_marketplace_id;
+$$;
+
+GRANT SELECT ON sp_settlement_sku_fees_monthly TO anon;
+GRANT SELECT ON sp_settlement_fees_by_sku_month TO anon;
+GRANT EXECUTE ON FUNCTION get_sku_fee_feed(UUID, DATE) TO anon;
+
+
+-- ============================================================
+-- STEP 5: Initial build
+-- ============================================================
+
+SELECT refresh_settlement_fee_rollup();
@@ -0,0 +1,72 @@
+-- Migration: Watermarks for incremental reimbursement and fee estimate pulls
+-- Run this migration via Supabase MCP or SQL editor
+--
+-- Purpose: pull_reimbursements.py requested a fixed 60-day window every week
+-- and re-upserted every reimbursement in it; pull_fba_fees.py rewrote the
+-- fee estimate of every SKU every day, overwriting the previous estimate.
+-- 1. sp_pull_watermarks - per region + report type: last approval date seen
+-- 2. row_hash on sp_fba_fee_estimates - last fee hash per SKU (change_detection.py)
+-- 3. sp_fba_fee_history - one row per SKU each time its estimate changes
+--
+-- Reimbursement windows now start a few days before the region's watermark.
+-- Fee pulls compare each SKU's row_hash with the stored one, upsert only new
+-- or changed SKUs and append those to sp_fba_fee_history. Existing estimates
+-- have row_hash NULL and count as changed on their next pull, which fills the
+-- hash in and seeds the history.
+
+-- ============================================================
+-- STEP 1: Watermark store
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS sp_pull_watermarks (
+    region TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    watermark_date DATE NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (region, report_type)
+);
+
+COMMENT ON TABLE sp_pull_watermarks IS
+    'Latest data date stored per region and report type (e.g. last reimbursement approval date); incremental pulls start from it';
+
+
+-- ============================================================
+-- STEP 2: Fee estimate hash
+-- ============================================================
+
+ALTER TABLE sp_fba_fee_estimates ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+COMMENT ON COLUMN sp_fba_fee_estimates.row_hash IS
+    'MD5 of the estimate fields (db.FEE_ESTIMATE_HASH_FIELDS); unchanged SKUs are not rewritten, so pull_date is the date of the last change';
+
+
+-- ============================================================
+-- STEP 3: Fee estimate history
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS sp_fba_fee_history (
+    marketplace_id UUID NOT NULL REFERENCES marketplaces(id),
+    sku TEXT NOT NULL,
+    valid_from DATE NOT NULL,                   -- pull date the estimate was first seen
+
+    asin TEXT,
+    product_size_tier TEXT,
+    currency_code TEXT,
+    your_price NUMERIC,
+    estimated_fee_total NUMERIC,
+    estimated_referral_fee_per_unit NUMERIC,
+    estimated_variable_closing_fee NUMERIC,
+    estimated_pick_pack_fee_per_unit NUMERIC,
+    estimated_weight_handling_fee_per_unit NUMERIC,
+    item_package_weight NUMERIC,
+    unit_of_weight TEXT,
+
+    row_hash TEXT NOT NULL,
+    import_id UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (marketplace_id, sku, valid_from)
+);
+
+COMMENT ON TABLE sp_fba_fee_history IS
+    'Append-only FBA fee estimates: a row per SKU whenever its estimate changes (written by pull_fba_fees.py)';
@@ -42,7 +42,9 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token, get_refresh_token_for_region
+from scripts.utils.auth import get_access_token, get_refresh_token_for_region, get_token_provider
+from scripts.utils.api_client import SPAPIClient
+from scripts.utils.async_client import get_sp_api_client
 from scripts.utils.reports import pull_single_day_report, MARKETPLACE_IDS
 from scripts.utils.db import (
     create_data_import,
@@ -53,6 +55,7 @@ from scripts.utils.db import (
     upsert_totals,
     get_existing_pull
 )
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Configuration
 MAX_HISTORY_DAYS = 730  # 2 years (Amazon SP-API limit)
@@ -186,11 +189,15 @@ def pull_single_day(
     marketplace_code: str,
     report_date: date,
     region: str = "NA",
-    access_token: Optional[str] = None
+    access_token: Optional[str] = None,
+    client: Optional[SPAPIClient] = None
 ) -> dict:
     """
     Pull data for a single marketplace and date.
 
+    Pass a provider-backed SPAPIClient for long runs; access_token is kept
+    for one-off calls.
+
     Returns:
         Dict with status and counts
     """
@@ -205,8 +212,8 @@ def pull_single_day(
     start_time = time.time()
 
     try:
-        # Get fresh access token if not provided
-        if not access_token:
+        # Get fresh access token if neither a client nor a token was provided
+        if client is None and not access_token:
             access_token = get_access_token(region=region)
 
         # Create tracking records
@@ -221,7 +228,8 @@ def pull_single_day(
             access_token=access_token,
             marketplace_code=marketplace_code,
             report_date=report_date,
-            region=region
+            region=region,
+            client=client
         )
 
         # Store ASIN data
@@ -380,10 +388,12 @@ def run_backfill(
         "errors": []
     }
 
-    # Get initial access token
+    # Shared token provider, refreshed ahead of expiry in the background
     print("\n🔑 Getting access token...")
-    access_token = get_access_token(region=region)
-    token_time = time.time()
+    token_provider = get_token_provider(region)
+    token_provider.get_token()
+    token_provider.start_background_refresh()
+    client = get_sp_api_client(region=region, token_provider=token_provider)
 
     # Process in batches
     request_count = 0
@@ -403,18 +413,12 @@ def run_backfill(
                 stats["skipped"] += 1
                 continue
 
-            # Refresh token every 30 minutes
-            if time.time() - token_time > 1800:
-                print("🔑 Refreshing access token...")
-                access_token = get_access_token(region=region)
-                token_time = time.time()
-
             # Pull data
             result = pull_single_day(
                 marketplace_code=marketplace_code,
                 report_date=report_date,
                 region=region,
-                access_token=access_token
+                client=client
             )
 
             # Update stats
@@ -527,7 +531,9 @@ def main():
         help="Show what would be pulled without actually pulling"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "backfill_historical")
 
     # Determine date range
     if args.end_date:
@@ -7,9 +7,16 @@ Default: January 2024 (matching GorillaROI historical data).
 
 Settlement reports are auto-generated by Amazon every ~2 weeks.
 At ~26 reports/year × 3 marketplaces = ~78 reports/year.
-Each download takes ~5 seconds + parsing. Full backfill ~30-45 minutes.
+Reports go through the same bounded pipeline as pull_settlements.py
+(run_settlement_pipeline): several downloads at once within the
+getReportDocument quota, parsing in a process pool and upserts on a shared
+DB writer pool, so a backfill is limited by Amazon's quota, not fixed sleeps.
 
 This script automatically skips already-processed settlements (idempotent).
+Stored settlements are found with one registry lookup for the listed
+reportDocumentIds (sp_processed_settlements); other settlement IDs come from
+the local settlement index or a Range peek of the document header, so
+skipped reports are never downloaded in full.
 
 Usage:
     python backfill_settlements.py                       # Default: since Jan 2024
@@ -35,37 +42,25 @@ from typing import Dict, List, Any
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
-from utils.financial_reports import (
-    list_settlement_reports,
-    download_settlement_report,
-    parse_settlement_rows,
-    FINANCIAL_REPORT_TYPES
-)
+from utils.api_client import SPAPIClient
+from utils.financial_reports import list_settlement_reports
 from utils.inventory_reports import MARKETPLACE_IDS
-from utils.db import (
-    create_data_import,
-    update_data_import,
-    create_financial_pull_record,
-    update_financial_pull_status,
-    get_processed_settlement_ids,
-    upsert_settlement_transactions,
-    upsert_settlement_summary,
-    MARKETPLACE_UUIDS,
+from utils.settlement_index import SettlementIndex
+from utils.profiling import add_profile_argument, start_profiling
+from pull_settlements import (
+    load_processed_settlements,
+    run_settlement_pipeline,
+    count_settlement_results,
 )
 
 # Default backfill start
 DEFAULT_SINCE = "2024-01-01"
 
-# Rate limits
-DOWNLOAD_DELAY = 10       # Seconds between report downloads (increased from 5s - was getting 429s)
-
 # GitHub Actions timeout safety
 MAX_RUNTIME_SECONDS = 5.5 * 60 * 60  # 5.5 hours (GitHub max is 6)
 
 
 def backfill_settlements(
-    access_token: str,
     since_date: str,
     region: str = "NA",
     dry_run: bool = False,
@@ -81,7 +76,6 @@ def backfill_settlements(
     rows to the correct marketplace using the marketplace-name field.
 
     Args:
-        access_token: Valid SP-API access token
         since_date: ISO date string
         region: API region
         dry_run: If True, don't write to database
@@ -91,7 +85,6 @@ def backfill_settlements(
     Returns:
         Dict with backfill statistics
     """
-    report_type = FINANCIAL_REPORT_TYPES["SETTLEMENT"]
     mp_start = time.time()
 
     print(f"\n{'='*60}")
@@ -99,10 +92,14 @@ def backfill_settlements(
     print(f"Since: {since_date}")
     print(f"{'='*60}")
 
+    # Tokens come from the refreshing provider; a backfill outlives one token
+    client = SPAPIClient(region=region)
+
     # Step 1: List ALL available reports since the backfill date
     try:
         reports = list_settlement_reports(
-            access_token, list_marketplace, region, since_date, max_results=100
+            None, list_marketplace, region, since_date, max_results=100,
+            client=client
         )
     except Exception as e:
         print(f"  ✗ Error listing reports: {e}")
@@ -126,163 +123,38 @@ def backfill_settlements(
             "total_transactions": 0
         }
 
-    # Step 2: Get already-processed settlement IDs (globally)
+    index = SettlementIndex()
+
+    # Step 2: Check which of the listed settlements are already processed (globally)
     if not dry_run:
-        processed_ids = get_processed_settlement_ids()
-        processed_set = set(processed_ids)
-        print(f"  Already processed: {len(processed_set)} settlements")
+        processed_set = load_processed_settlements(reports, index)
+        print(f"  Already processed: {len(processed_set)} of {len(reports)} listed settlements")
     else:
         processed_set = set()
 
     # Step 3: Process reports newest-first (most recent data first)
     reports.sort(key=lambda r: r.get("createdTime", ""), reverse=True)
 
-    reports_processed = 0
-    reports_skipped = 0
-    total_transactions = 0
-    errors = []
-
-    for i, report in enumerate(reports):
-        # Check timeout
-        if start_time and (time.time() - start_time) > MAX_RUNTIME_SECONDS:
-            print(f"\n  ⏱️  Approaching timeout limit — stopping.")
-            print(f"  Processed {reports_processed} reports so far. Will continue next run.")
-            break
-
-        report_id = report.get("reportId", "")
-        report_doc_id = report.get("reportDocumentId", "")
-        created_time = report.get("createdTime", "")
-
-        if not report_doc_id:
-            continue
-
-        print(f"\n  [{i+1}/{len(reports)}] Report: {report_id}")
-        print(f"    Created: {created_time}")
-
-        try:
-            # Rate limit
-            if reports_processed > 0 or reports_skipped > 0:
-                time.sleep(DOWNLOAD_DELAY)
-
-            # Download report
-            rows = download_settlement_report(access_token, report_doc_id, region)
-
-            if not rows:
-                print(f"    ⚠️  Empty report — skipping")
-                continue
-
-            # Get settlement ID
-            settlement_id = (rows[0].get("settlement-id") or "").strip()
-            if not settlement_id:
-                continue
-
-            print(f"    Settlement: {settlement_id} ({len(rows)} rows)")
-
-            # Skip if already processed
-            if settlement_id in processed_set:
-                print(f"    ⏭️  Already processed")
-                reports_skipped += 1
-                continue
-
-            if dry_run:
-                transactions, summary = parse_settlement_rows(
-                    rows, MARKETPLACE_UUIDS.get("USA", ""),
-                    marketplace_uuids=MARKETPLACE_UUIDS
-                )
-                # Count by marketplace
-                mp_counts = {}
-                for tx in transactions:
-                    mp_id = tx["marketplace_id"]
-                    mp_counts[mp_id] = mp_counts.get(mp_id, 0) + 1
-                mp_labels = {v: k for k, v in MARKETPLACE_UUIDS.items()}
-                mp_summary = ", ".join(
-                    f"{mp_labels.get(mp_id, mp_id)}: {count}"
-                    for mp_id, count in sorted(mp_counts.items(), key=lambda x: -x[1])
-                )
-                period = ""
-                if summary:
-                    period = (f" ({summary.get('settlement_start_date', '?')}"
-                              f" to {summary.get('settlement_end_date', '?')})")
-                print(f"    [DRY RUN] {len(transactions)} transactions ({mp_summary}){period}")
-                total_transactions += len(transactions)
-                reports_processed += 1
-                continue
-
-            # Create tracking
-            import_id = create_data_import(
-                "USA",
-                date.today(),
-                import_type="sp_api_settlement"
-            )
-
-            pull_id = create_financial_pull_record(
-                marketplace_code="USA",
-                report_type=report_type,
-                pull_date=date.today(),
-                import_id=import_id,
-                settlement_id=settlement_id,
-                report_id=report_id,
-                report_document_id=report_doc_id
-            )
-
-            # Parse and upsert with per-row marketplace attribution
-            transactions, summary = parse_settlement_rows(
-                rows, MARKETPLACE_UUIDS.get("USA", ""),
-                import_id=import_id,
-                marketplace_uuids=MARKETPLACE_UUIDS
-            )
-
-            # Log marketplace breakdown
-            mp_counts = {}
-            for tx in transactions:
-                mp_id = tx["marketplace_id"]
-                mp_counts[mp_id] = mp_counts.get(mp_id, 0) + 1
-            mp_labels = {v: k for k, v in MARKETPLACE_UUIDS.items()}
-            for mp_id, count in sorted(mp_counts.items(), key=lambda x: -x[1]):
-                print(f"    → {mp_labels.get(mp_id, mp_id)}: {count} transactions")
-
-            tx_count = upsert_settlement_transactions(transactions)
-            print(f"    ✅ {tx_count} transactions")
-
-            if summary:
-                upsert_settlement_summary(summary)
-                print(f"    ✅ Summary: {summary.get('settlement_start_date', '?')} "
-                      f"to {summary.get('settlement_end_date', '?')}, "
-                      f"total: {summary.get('total_amount', '?')} "
-                      f"{summary.get('currency_code', '?')}")
-
-            # Update tracking
-            processing_time = int((time.time() - mp_start) * 1000)
-            update_financial_pull_status(
-                pull_id, "completed",
-                row_count=tx_count,
-                processing_time_ms=processing_time
-            )
-            update_data_import(
-                import_id, "completed",
-                row_count=tx_count,
-                processing_time_ms=processing_time
-            )
-
-            total_transactions += tx_count
-            reports_processed += 1
-            processed_set.add(settlement_id)
-
-        except Exception as e:
-            error_msg = str(e)
-            print(f"    ✗ Error: {error_msg}")
-            errors.append({"report_id": report_id, "error": error_msg})
+    deadline = start_time + MAX_RUNTIME_SECONDS if start_time else None
+
+    results = run_settlement_pipeline(
+        reports, region, client, processed_set, index,
+        dry_run=dry_run, deadline=deadline
+    )
+    index.save()
+    counts = count_settlement_results(results)
+
+    if len(results) < len(reports):
+        print(f"\n  ⏱️  Approaching timeout limit — stopped starting new reports.")
+        print(f"  Processed {counts['reports_processed']} reports so far. Will continue next run.")
 
     processing_time = int((time.time() - mp_start) * 1000)
 
     return {
-        "status": "completed" if not errors else "partial",
+        "status": "completed" if not counts["errors"] else "partial",
         "marketplace": "NA",
         "reports_found": len(reports),
-        "reports_processed": reports_processed,
-        "reports_skipped": reports_skipped,
-        "total_transactions": total_transactions,
-        "errors": len(errors),
+        **counts,
         "processing_time_ms": processing_time
     }
 
@@ -316,7 +188,9 @@ def main():
         help="Download and parse but don't write to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "backfill_settlements")
     region = args.region.upper()
 
     since_date = f"{args.since}T00:00:00Z"
@@ -336,16 +210,10 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("=" * 60)
 
-    # Get access token
-    print("\nGetting access token...")
-    access_token = get_access_token(region=region)
-    print("✓ Access token obtained")
-
     script_start = time.time()
 
     # Process all settlement reports (single run for entire region)
     result = backfill_settlements(
-        access_token,
         since_date,
         region=region,
         dry_run=args.dry_run,
@@ -43,8 +43,9 @@ from typing import List, Tuple
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token
+from scripts.utils.auth import get_token_provider
 from scripts.utils.api_client import SPAPIClient, SPAPIError
+from scripts.utils.async_client import get_sp_api_client
 from scripts.utils.alerting import alert_failure, send_summary
 from scripts.utils.db import (
     get_existing_sqp_pull,
@@ -55,6 +56,7 @@ from scripts.utils.sqp_reports import (
     get_latest_available_week,
     get_latest_available_month,
 )
+from scripts.utils.profiling import add_profile_argument, start_profiling
 from scripts.pull_sqp import pull_for_marketplace
 
 # Configure logging
@@ -78,9 +80,6 @@ MARKETPLACES_BY_REGION = {
     "UAE": ["UAE"]
 }
 
-# Token refresh interval (30 minutes)
-TOKEN_REFRESH_INTERVAL = 30 * 60
-
 
 def check_backfill_progress(
     period_type: str,
@@ -150,7 +149,9 @@ def main():
     )
     parser.add_argument("--dry-run", action="store_true", help="Show plan without executing")
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "backfill_sqp")
 
     # Determine parameters
     start_date = date.fromisoformat(args.start_date) if args.start_date else DEFAULT_BACKFILL_START
@@ -224,11 +225,12 @@ def main():
         print("No periods to process. Backfill is complete.")
         return
 
-    # Get access token and create client
+    # Create client backed by the shared token provider (refreshed in the background)
     print(f"\nGetting access token for region {args.region}...")
-    access_token = get_access_token(region=args.region)
-    client = SPAPIClient(access_token, region=args.region)
-    last_token_refresh = time.time()
+    token_provider = get_token_provider(args.region)
+    token_provider.get_token()
+    token_provider.start_background_refresh()
+    client = get_sp_api_client(region=args.region, token_provider=token_provider)
 
     all_results = []
     total_start_time = time.time()
@@ -239,14 +241,6 @@ def main():
         print(f"{'='*60}")
 
         for marketplace_code in marketplaces:
-            # Refresh token if needed
-            elapsed = time.time() - last_token_refresh
-            if elapsed > TOKEN_REFRESH_INTERVAL:
-                print(f"Refreshing access token for region {args.region}...")
-                access_token = get_access_token(region=args.region)
-                client = SPAPIClient(access_token, region=args.region)
-                last_token_refresh = time.time()
-
             for report_type in report_types:
                 result = pull_for_marketplace(
                     client=client,
@@ -0,0 +1,10 @@
+# Pipeline benchmarks: synthetic reports at configurable scale, timed stages,
+# results stored per git commit. See scripts/run_benchmarks.py for the CLI.
+
+from .fixtures import BenchmarkScale, ROWS_PER_ASIN
+from .stages import STAGES, Stage
+from .runner import run_benchmarks, measure_stage
+from .results import (
+    DEFAULT_RESULTS_PATH, build_record, save_result, load_results,
+    find_baseline, compare, format_comparison,
+)
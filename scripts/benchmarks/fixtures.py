@@ -0,0 +1,153 @@
+"""
+Benchmark Fixtures
+Builds synthetic report inputs at a configurable scale.
+
+Scale is ASINs x days x marketplaces: every stage processes one document per
+(day, marketplace), each sized from the ASIN count via ROWS_PER_ASIN (an SQP
+report has ~10 search queries per ASIN, a settlement ~20 fee/charge lines per
+ASIN, ...). Documents come from the simulator's generators, so they have the
+same shape the real parsers read.
+"""
+
+import gzip
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Any, Tuple
+
+from scripts.simulator.documents import (
+    sales_traffic_report, sqp_report, scp_report, search_terms_report,
+    orders_rows, settlement_rows, inventory_rows, to_tsv,
+)
+
+# Rows per ASIN in each document type
+ROWS_PER_ASIN = {
+    "sales_traffic": 1,
+    "sqp": 10,
+    "scp": 1,
+    "search_terms": 10,
+    "orders": 5,
+    "settlement": 20,
+    "inventory": 1,
+}
+
+# Marketplaces in the order --marketplaces N picks them
+MARKETPLACE_ORDER = ["USA", "CA", "MX", "UK", "DE", "FR", "IT", "ES", "UAE", "AU", "JP"]
+
+EU_MARKETPLACES = {"UK", "DE", "FR", "IT", "ES"}
+
+# Benchmark data is dated in 2000 so DB stages never collide with real pulls
+BASE_DATE = date(2000, 1, 1)
+
+
+class BenchmarkScale:
+    """
+    Size of a benchmark run.
+
+    Args:
+        asins: ASINs per document
+        days: Documents per marketplace (one per day / period)
+        marketplaces: Number of marketplaces (taken from MARKETPLACE_ORDER)
+        seed: Random seed, so every run of a scale sees identical data
+    """
+
+    def __init__(self, asins: int = 1000, days: int = 1, marketplaces: int = 1, seed: int = 0):
+        if marketplaces < 1 or marketplaces > len(MARKETPLACE_ORDER):
+            raise ValueError(f"marketplaces must be between 1 and {len(MARKETPLACE_ORDER)}")
+        self.asins = asins
+        self.days = days
+        self.marketplaces = marketplaces
+        self.seed = seed
+
+    @property
+    def marketplace_codes(self) -> List[str]:
+        return MARKETPLACE_ORDER[:self.marketplaces]
+
+    def rows(self, kind: str) -> int:
+        """Rows in one document of this kind."""
+        return max(1, self.asins * ROWS_PER_ASIN[kind])
+
+    def documents(self) -> List[Tuple[str, date, random.Random]]:
+        """(marketplace_code, date, rng) for every document, deterministic per seed."""
+        docs = []
+        for i, code in enumerate(self.marketplace_codes):
+            for day in range(self.days):
+                rng = random.Random(self.seed * 1000003 + i * 10007 + day)
+                docs.append((code, BASE_DATE + timedelta(days=day), rng))
+        return docs
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "asins": self.asins,
+            "days": self.days,
+            "marketplaces": self.marketplaces,
+            "seed": self.seed,
+        }
+
+    def __repr__(self) -> str:
+        return f"BenchmarkScale(asins={self.asins}, days={self.days}, marketplaces={self.marketplaces})"
+
+
+def _amazon_id(code: str) -> str:
+    from utils.db import AMAZON_MARKETPLACE_IDS
+    return AMAZON_MARKETPLACE_IDS[code]
+
+
+def build_sales_traffic(scale: BenchmarkScale) -> List[Tuple[str, date, Dict[str, Any]]]:
+    return [
+        (code, day, sales_traffic_report(scale.rows("sales_traffic"), rng, day, _amazon_id(code)))
+        for code, day, rng in scale.documents()
+    ]
+
+
+def build_sqp(scale: BenchmarkScale) -> List[Tuple[str, date, Dict[str, Any]]]:
+    return [
+        (code, day, sqp_report(scale.rows("sqp"), rng, _amazon_id(code)))
+        for code, day, rng in scale.documents()
+    ]
+
+
+def build_scp(scale: BenchmarkScale) -> List[Tuple[str, date, Dict[str, Any]]]:
+    return [
+        (code, day, scp_report(scale.rows("scp"), rng, _amazon_id(code)))
+        for code, day, rng in scale.documents()
+    ]
+
+
+def build_search_terms(scale: BenchmarkScale) -> List[Tuple[str, date, Dict[str, Any]]]:
+    return [
+        (code, day, search_terms_report(scale.rows("search_terms"), rng, _amazon_id(code)))
+        for code, day, rng in scale.documents()
+    ]
+
+
+def build_orders(scale: BenchmarkScale) -> List[Tuple[str, date, List[Dict[str, str]]]]:
+    return [
+        (code, day, orders_rows(scale.rows("orders"), rng, day, _amazon_id(code)))
+        for code, day, rng in scale.documents()
+    ]
+
+
+def build_settlements(scale: BenchmarkScale) -> List[Tuple[str, date, List[Dict[str, str]]]]:
+    return [
+        (code, day, settlement_rows(
+            scale.rows("settlement"), rng,
+            marketplace_id=_amazon_id(code),
+            european_dates=code in EU_MARKETPLACES
+        ))
+        for code, day, rng in scale.documents()
+    ]
+
+
+def build_settlement_documents(scale: BenchmarkScale) -> List[Tuple[str, date, bytes]]:
+    """build_settlements() as gzipped TSV documents, the way they are downloaded."""
+    return [
+        (code, day, gzip.compress(to_tsv(settlement).encode("utf-8")))
+        for code, day, settlement in build_settlements(scale)
+    ]
+
+
+def build_inventory(scale: BenchmarkScale) -> List[Tuple[str, date, List[Dict[str, str]]]]:
+    return [
+        (code, day, inventory_rows(scale.rows("inventory"), rng))
+        for code, day, rng in scale.documents()
+    ]
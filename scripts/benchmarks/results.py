@@ -0,0 +1,176 @@
+"""
+Benchmark Results Store
+Appends each run to a JSON-lines file keyed by git commit, and compares a run
+against the most recent earlier commit at the same scale.
+
+Default file: scripts/benchmarks/results.jsonl (override with
+SP_BENCHMARK_RESULTS or --results). Commit it alongside code changes so
+`git log -p` on the file shows the trend.
+"""
+
+import os
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+DEFAULT_RESULTS_PATH = os.environ.get(
+    "SP_BENCHMARK_RESULTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+)
+
+# Relative change that counts as a regression (rows/sec drop or memory growth)
+DEFAULT_THRESHOLD = 0.10
+
+# Memory growth below this many MB is allocator noise, never a regression
+MIN_MEMORY_DELTA_MB = 5.0
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=30
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def git_info() -> Dict[str, Any]:
+    """Current commit, subject and whether the tree has uncommitted changes."""
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "subject": _git("log", "-1", "--format=%s"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def build_record(
+    scale: Dict[str, int],
+    stages: Dict[str, Dict[str, Any]],
+    repeat: int,
+    isolated: bool = True
+) -> Dict[str, Any]:
+    """A results-file line for one benchmark run."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **git_info(),
+        "python": platform.python_version(),
+        "platform": platform.platform(terse=True),
+        "scale": scale,
+        "repeat": repeat,
+        "isolated": isolated,
+        "stages": {
+            name: {k: v for k, v in result.items() if k != "traceback"}
+            for name, result in stages.items()
+        },
+    }
+
+
+def save_result(record: Dict[str, Any], path: str = DEFAULT_RESULTS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+def load_results(path: str = DEFAULT_RESULTS_PATH) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def find_baseline(
+    records: List[Dict[str, Any]],
+    record: Dict[str, Any],
+    commit: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Latest run in records (earlier runs) at the same scale and isolation mode
+    to compare against.
+
+    With commit set, the latest run of that commit; otherwise the latest run
+    of any commit other than this one.
+    """
+    for candidate in reversed(records):
+        if candidate.get("scale") != record.get("scale") or candidate.get("isolated") != record.get("isolated"):
+            continue
+        if commit is not None:
+            if (candidate.get("commit") or "").startswith(commit):
+                return candidate
+        elif candidate.get("commit") != record.get("commit"):
+            return candidate
+    return None
+
+
+def compare(
+    record: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """
+    Per-stage comparison of two runs.
+
+    A stage regresses when rows/sec drops, or the memory it allocates
+    (stage_rss_mb) grows, by more than threshold (memory growth must also
+    exceed MIN_MEMORY_DELTA_MB).
+    """
+    rows = []
+    for name, current in record["stages"].items():
+        previous = baseline["stages"].get(name)
+        if not previous or "error" in current or "error" in previous:
+            continue
+
+        speed_change = None
+        if previous.get("rows_per_sec") and current.get("rows_per_sec") is not None:
+            speed_change = current["rows_per_sec"] / previous["rows_per_sec"] - 1
+
+        memory_change = None
+        if previous.get("stage_rss_mb"):
+            memory_change = current["stage_rss_mb"] / previous["stage_rss_mb"] - 1
+
+        rows.append({
+            "stage": name,
+            "rows_per_sec": current.get("rows_per_sec"),
+            "previous_rows_per_sec": previous.get("rows_per_sec"),
+            "speed_change": speed_change,
+            "stage_rss_mb": current.get("stage_rss_mb"),
+            "previous_stage_rss_mb": previous.get("stage_rss_mb"),
+            "memory_change": memory_change,
+            "regression": (
+                (speed_change is not None and speed_change < -threshold)
+                or (
+                    memory_change is not None and memory_change > threshold
+                    and current["stage_rss_mb"] - previous["stage_rss_mb"] > MIN_MEMORY_DELTA_MB
+                )
+            ),
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]], record: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    def pct(value):
+        return "     n/a" if value is None else f"{value:+8.1%}"
+
+    lines = [
+        f"Compared with {baseline.get('commit')} ({baseline.get('timestamp')}): {baseline.get('subject') or ''}",
+        f"{'stage':<36}{'rows/s':>14}{'change':>10}{'stage MB':>10}{'change':>10}",
+    ]
+    for row in rows:
+        flag = "  << REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['stage']:<36}{row['rows_per_sec'] or 0:>14,.0f}{pct(row['speed_change']):>10}"
+            f"{row['stage_rss_mb']:>10.1f}{pct(row['memory_change']):>10}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,119 @@
+"""
+Benchmark Runner
+Times stages and measures their memory.
+
+Each stage runs in a fresh spawned interpreter by default, so peak RSS
+(ru_maxrss) belongs to that stage alone rather than to whichever stage ran
+before it. Reported per stage:
+- rows, seconds (best of --repeat runs), rows_per_sec
+- baseline_rss_mb: resident memory after prepare() built the input
+- peak_rss_mb: process high-water mark after the timed runs
+- stage_rss_mb: peak minus baseline, i.e. what the stage itself allocated
+"""
+
+import gc
+import sys
+import time
+import resource
+import traceback
+import multiprocessing
+from typing import Dict, List, Any
+
+from .fixtures import BenchmarkScale
+from .stages import STAGES
+
+
+def _current_rss_mb() -> float:
+    """Resident set size now (Linux /proc), falling back to the high-water mark."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure_stage(name: str, scale: BenchmarkScale, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Run one stage in this process and return its measurements.
+
+    Returns a dict with an "error" key instead of timings if the stage fails.
+    """
+    stage = STAGES[name]
+    context = None
+    try:
+        context = stage.prepare(scale)
+        gc.collect()
+        baseline = _current_rss_mb()
+
+        best = None
+        rows = 0
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            rows = stage.run(context)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        peak = _peak_rss_mb()
+        return {
+            "rows": rows,
+            "seconds": round(best, 4),
+            "rows_per_sec": round(rows / best, 1) if best else None,
+            "baseline_rss_mb": round(baseline, 1),
+            "peak_rss_mb": round(peak, 1),
+            "stage_rss_mb": round(max(0.0, peak - baseline), 1),
+        }
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc(limit=5)}
+    finally:
+        if context is not None and stage.cleanup is not None:
+            try:
+                stage.cleanup(context)
+            except Exception:
+                pass
+
+
+def _measure_in_child(name: str, scale_dict: Dict[str, int], repeat: int) -> Dict[str, Any]:
+    return measure_stage(name, BenchmarkScale(**scale_dict), repeat)
+
+
+def run_benchmarks(
+    stage_names: List[str],
+    scale: BenchmarkScale,
+    repeat: int = 1,
+    isolate: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run stages in order and return {stage_name: measurements}.
+
+    Args:
+        stage_names: Stages from STAGES
+        scale: Input size
+        repeat: Timed runs per stage (best is kept)
+        isolate: Run each stage in its own spawned process (accurate peak RSS)
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn") if isolate else None
+
+    for name in stage_names:
+        print(f"  {name} ...", end=" ", flush=True)
+        if context is None:
+            result = measure_stage(name, scale, repeat)
+        else:
+            with context.Pool(1) as pool:
+                result = pool.apply(_measure_in_child, (name, scale.to_dict(), repeat))
+
+        if "error" in result:
+            print(f"FAILED: {result['error']}")
+        else:
+            print(f"{result['rows']:,} rows in {result['seconds']:.3f}s "
+                  f"({result['rows_per_sec'] or 0:,.0f} rows/s, +{result['stage_rss_mb']} MB, peak {result['peak_rss_mb']} MB)")
+        results[name] = result
+
+    return results
@@ -0,0 +1,406 @@
+"""
+Benchmark Stages
+Each stage times one piece of the existing pipeline code on synthetic input.
+
+A stage has three parts:
+- prepare(scale) builds its input (not timed)
+- run(context) does the work and returns the number of rows processed (timed)
+- cleanup(context) releases anything prepare started (not timed)
+
+Download stages run against an in-process SP-API simulator. DB stages write
+to whatever SUPABASE_URL points at — a local stack (`supabase start`), never
+production; run_benchmarks.py refuses non-local URLs unless told otherwise.
+
+Modules are imported as utils.X (scripts/ on sys.path), matching the pull
+scripts that use financial_reports.
+"""
+
+import io
+import os
+import contextlib
+from datetime import timedelta
+from typing import Dict, List, Any, Callable, Optional
+
+from .fixtures import (
+    BenchmarkScale,
+    build_sales_traffic, build_sqp, build_scp, build_search_terms,
+    build_orders, build_settlements, build_settlement_documents, build_inventory,
+)
+
+
+class Stage:
+    """
+    One timed benchmark stage.
+
+    Args:
+        name: Stage name used in results
+        prepare: scale -> context (untimed)
+        run: context -> rows processed (timed)
+        cleanup: context -> None (untimed, optional)
+        needs_db: Requires a Supabase/PostgREST connection
+        description: One line for --list
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prepare: Callable[[BenchmarkScale], Any],
+        run: Callable[[Any], int],
+        cleanup: Optional[Callable[[Any], None]] = None,
+        needs_db: bool = False,
+        description: str = ""
+    ):
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+        self.cleanup = cleanup
+        self.needs_db = needs_db
+        self.description = description
+
+
+# Share of SKUs whose quantities change from one day to the next (db_inventory_* stages)
+INVENTORY_DAILY_CHURN = 0.05
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress prints the pipeline functions emit."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _marketplace_uuid(code: str) -> str:
+    from utils.db import MARKETPLACE_UUIDS
+    return MARKETPLACE_UUIDS[code]
+
+
+# =============================================================================
+# Download stages (SP-API simulator)
+# =============================================================================
+
+def _prepare_download(scale: BenchmarkScale, report_type: str, rows: int) -> Dict[str, Any]:
+    from scripts.simulator import SPAPISimulator, SimulatorConfig
+    from utils.db import AMAZON_MARKETPLACE_IDS
+    from utils.api_client import SPAPIClient
+
+    simulator = SPAPISimulator(SimulatorConfig(
+        rate_scale=1_000_000,
+        queue_seconds=0,
+        processing_seconds=0,
+        report_rows={report_type: rows},
+        seed=scale.seed
+    )).start()
+    simulator.apply()
+
+    document_ids = [
+        simulator.seed_report(report_type, [AMAZON_MARKETPLACE_IDS[code]])["reportDocumentId"]
+        for code, _, _ in scale.documents()
+    ]
+    return {
+        "simulator": simulator,
+        "document_ids": document_ids,
+        "client": SPAPIClient(access_token="benchmark", region="NA"),
+    }
+
+
+def _cleanup_download(context: Dict[str, Any]):
+    context["client"].session.close()
+    context["simulator"].stop()
+
+
+def _run_download_sales_traffic(context: Dict[str, Any]) -> int:
+    from utils.reports import download_report
+    rows = 0
+    with quiet():
+        for document_id in context["document_ids"]:
+            report = download_report(report_document_id=document_id, region="NA", client=context["client"])
+            rows += len(report.get("salesAndTrafficByAsin", []))
+    return rows
+
+
+def _run_download_inventory(context: Dict[str, Any]) -> int:
+    from utils.inventory_reports import download_report
+    rows = 0
+    with quiet():
+        for document_id in context["document_ids"]:
+            rows += len(download_report("benchmark", document_id, region="NA"))
+    return rows
+
+
+# =============================================================================
+# Parse / transform stages
+# =============================================================================
+
+def _run_parse_sqp(documents) -> int:
+    from utils.sqp_reports import parse_sqp_response
+    rows = 0
+    for code, day, report in documents:
+        rows += len(parse_sqp_response(report, _marketplace_uuid(code), day, day, "WEEK"))
+    return rows
+
+
+def _run_parse_scp(documents) -> int:
+    from utils.sqp_reports import parse_scp_response
+    rows = 0
+    for code, day, report in documents:
+        rows += len(parse_scp_response(report, _marketplace_uuid(code), day, day, "WEEK"))
+    return rows
+
+
+def _run_transform_search_terms(documents) -> int:
+    from utils.search_terms_reports import transform_search_term_row
+    rows = 0
+    for code, day, report in documents:
+        marketplace_id = _marketplace_uuid(code)
+        for item in report["dataByDepartmentAndSearchTerm"]:
+            transform_search_term_row(item, marketplace_id, day, day, "WEEK")
+            rows += 1
+    return rows
+
+
+def _run_aggregate_orders(documents) -> int:
+    from utils.orders_reports import aggregate_orders_by_asin
+    rows = 0
+    with quiet():
+        for code, day, line_items in documents:
+            aggregate_orders_by_asin(line_items, day, code)
+            rows += len(line_items)
+    return rows
+
+
+def _run_parse_settlements(documents) -> int:
+    from utils.db import MARKETPLACE_UUIDS
+    from utils.financial_reports import parse_settlement_rows
+    rows = 0
+    with quiet():
+        for code, day, settlement in documents:
+            parse_settlement_rows(settlement, MARKETPLACE_UUIDS[code], marketplace_uuids=MARKETPLACE_UUIDS)
+            rows += len(settlement)
+    return rows
+
+
+def _run_parse_settlement_bodies(documents) -> int:
+    """Columnar parse of whole settlement documents."""
+    from utils.db import MARKETPLACE_UUIDS
+    from utils.financial_reports import read_settlement_columns, parse_settlement_columns
+    rows = 0
+    with quiet():
+        for code, day, body in documents:
+            columns = read_settlement_columns(io.BytesIO(body), "GZIP")
+            transactions, _ = parse_settlement_columns(
+                columns, MARKETPLACE_UUIDS[code], marketplace_uuids=MARKETPLACE_UUIDS
+            )
+            rows += len(transactions)
+    return rows
+
+
+def _run_parse_settlement_chunks(documents) -> int:
+    """As the settlement pipeline's store stage parses: iter_settlement_chunks() over the document."""
+    from utils.db import MARKETPLACE_UUIDS
+    from utils.financial_reports import iter_settlement_chunks
+    rows = 0
+    with quiet():
+        for code, day, body in documents:
+            for transactions, _ in iter_settlement_chunks(
+                io.BytesIO(body), "GZIP", MARKETPLACE_UUIDS[code], MARKETPLACE_UUIDS
+            ):
+                rows += len(transactions)
+    return rows
+
+
+def _run_parse_inventory(documents) -> int:
+    from utils.inventory_reports import parse_fba_inventory_report_row
+    rows = 0
+    for code, day, inventory in documents:
+        for row in inventory:
+            parse_fba_inventory_report_row(row)
+            rows += 1
+    return rows
+
+
+# =============================================================================
+# DB stages (local Postgres via PostgREST)
+# =============================================================================
+
+def _prepare_db_asin_data(scale: BenchmarkScale) -> List[Any]:
+    from utils.db import create_data_import
+    return [
+        (code, day, report, create_data_import(code, day, import_type="benchmark"))
+        for code, day, report in build_sales_traffic(scale)
+    ]
+
+
+def _run_db_asin_data(documents) -> int:
+    from utils.db import upsert_asin_data
+    return sum(upsert_asin_data(report, code, day, import_id) for code, day, report, import_id in documents)
+
+
+def _prepare_db_sqp(scale: BenchmarkScale) -> List[Dict]:
+    from utils.sqp_reports import parse_sqp_response
+    rows = []
+    for code, day, report in build_sqp(scale):
+        rows.extend(parse_sqp_response(report, _marketplace_uuid(code), day, day, "WEEK"))
+    return rows
+
+
+def _run_db_sqp(rows: List[Dict]) -> int:
+    from utils.db import upsert_sqp_data
+    with quiet():
+        return upsert_sqp_data(rows)
+
+
+def _prepare_db_search_terms(scale: BenchmarkScale) -> List[Dict]:
+    from utils.search_terms_reports import transform_search_term_row
+    return [
+        transform_search_term_row(item, _marketplace_uuid(code), day, day, "WEEK")
+        for code, day, report in build_search_terms(scale)
+        for item in report["dataByDepartmentAndSearchTerm"]
+    ]
+
+
+def _run_db_search_terms(rows: List[Dict]) -> int:
+    from utils.db import upsert_search_terms_data
+    with quiet():
+        return upsert_search_terms_data(rows)
+
+
+def _prepare_db_settlements(scale: BenchmarkScale) -> List[Dict]:
+    from utils.db import MARKETPLACE_UUIDS
+    from utils.financial_reports import parse_settlement_rows
+    transactions = []
+    with quiet():
+        for code, day, settlement in build_settlements(scale):
+            parsed, _ = parse_settlement_rows(settlement, MARKETPLACE_UUIDS[code], marketplace_uuids=MARKETPLACE_UUIDS)
+            transactions.extend(parsed)
+    return transactions
+
+
+def _run_db_settlements(transactions: List[Dict]) -> int:
+    from utils.db import upsert_settlement_transactions
+    with quiet():
+        return upsert_settlement_transactions(transactions)
+
+
+def _prepare_db_inventory(scale: BenchmarkScale) -> List[Any]:
+    """
+    One parsed inventory snapshot per (marketplace, day). Day 1 comes from
+    the fixture; each later day changes INVENTORY_DAILY_CHURN of the SKUs,
+    roughly what real catalogs do, so the ranges stage has something to skip.
+    """
+    import random
+    from utils.inventory_reports import parse_fba_inventory_report_row
+    rng = random.Random(scale.seed)
+    first_days = BenchmarkScale(scale.asins, 1, scale.marketplaces, scale.seed)
+    snapshots = []
+    for code, first_day, inventory in build_inventory(first_days):
+        rows = [parse_fba_inventory_report_row(row) for row in inventory]
+        for offset in range(scale.days):
+            if offset:
+                rows = [dict(row) for row in rows]
+                for row in rng.sample(rows, int(len(rows) * INVENTORY_DAILY_CHURN)):
+                    row["fulfillable_quantity"] = max(0, row["fulfillable_quantity"] + rng.randint(-20, 20))
+            snapshots.append((code, first_day + timedelta(days=offset), rows))
+    return snapshots
+
+
+def _run_db_inventory_daily(snapshots) -> int:
+    """sp_fba_inventory layout: every SKU every day (as pull_inventory.upsert_fba_inventory)."""
+    from utils.db import get_supabase_client
+    client = get_supabase_client()
+    written = 0
+    for code, day, rows in snapshots:
+        db_rows = [{"date": day.isoformat(), "marketplace_id": _marketplace_uuid(code), **row} for row in rows]
+        for i in range(0, len(db_rows), 500):
+            client.table("sp_fba_inventory").upsert(db_rows[i:i + 500], on_conflict="date,marketplace_id,sku").execute()
+        written += len(db_rows)
+    return written
+
+
+def _run_db_inventory_ranges(snapshots) -> int:
+    """sp_fba_inventory_ranges layout: only changed SKUs are written."""
+    from utils.inventory_storage import InventoryRangeWriter
+    written = 0
+    for code, day, rows in sorted(snapshots, key=lambda s: s[1]):
+        ranges = InventoryRangeWriter(_marketplace_uuid(code), day)
+        written += ranges.write(rows)
+        ranges.finish()
+    return written
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+STAGES: Dict[str, Stage] = {stage.name: stage for stage in [
+    Stage(
+        "download_report",
+        lambda scale: _prepare_download(scale, "GET_SALES_AND_TRAFFIC_REPORT", scale.rows("sales_traffic")),
+        _run_download_sales_traffic,
+        _cleanup_download,
+        description="reports.download_report: document URL + gzip download + JSON parse (simulator)"
+    ),
+    Stage(
+        "download_inventory_report",
+        lambda scale: _prepare_download(scale, "GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA", scale.rows("inventory")),
+        _run_download_inventory,
+        _cleanup_download,
+        description="inventory_reports.download_report: gzip TSV download + csv parse (simulator)"
+    ),
+    Stage(
+        "parse_sqp_response", build_sqp, _run_parse_sqp,
+        description="sqp_reports.parse_sqp_response on SQP JSON"
+    ),
+    Stage(
+        "parse_scp_response", build_scp, _run_parse_scp,
+        description="sqp_reports.parse_scp_response on SCP JSON"
+    ),
+    Stage(
+        "transform_search_term_row", build_search_terms, _run_transform_search_terms,
+        description="search_terms_reports.transform_search_term_row per Search Terms item"
+    ),
+    Stage(
+        "aggregate_orders_by_asin", build_orders, _run_aggregate_orders,
+        description="orders_reports.aggregate_orders_by_asin on order line items"
+    ),
+    Stage(
+        "parse_settlement_rows", build_settlements, _run_parse_settlements,
+        description="financial_reports.parse_settlement_rows (incl. row hashing)"
+    ),
+    Stage(
+        "parse_settlement_report_body", build_settlement_documents,
+        _run_parse_settlement_bodies,
+        description="financial_reports columnar parse of gzipped settlement TSV (MD5 row_hash)"
+    ),
+    Stage(
+        "iter_settlement_chunks", build_settlement_documents, _run_parse_settlement_chunks,
+        description="financial_reports.iter_settlement_chunks (500-row chunks, as the settlement pipeline parses)"
+    ),
+    Stage(
+        "parse_fba_inventory_report_row", build_inventory, _run_parse_inventory,
+        description="inventory_reports.parse_fba_inventory_report_row per inventory row"
+    ),
+    Stage(
+        "db_upsert_asin_data", _prepare_db_asin_data, _run_db_asin_data, needs_db=True,
+        description="db.upsert_asin_data into sp_daily_asin_data"
+    ),
+    Stage(
+        "db_upsert_sqp_data", _prepare_db_sqp, _run_db_sqp, needs_db=True,
+        description="db.upsert_sqp_data into sp_sqp_data"
+    ),
+    Stage(
+        "db_upsert_search_terms_data", _prepare_db_search_terms, _run_db_search_terms, needs_db=True,
+        description="db.upsert_search_terms_data into sp_search_terms_data"
+    ),
+    Stage(
+        "db_upsert_settlement_transactions", _prepare_db_settlements, _run_db_settlements, needs_db=True,
+        description="db.upsert_settlement_transactions into sp_settlement_transactions"
+    ),
+    Stage(
+        "db_inventory_daily_rows", _prepare_db_inventory, _run_db_inventory_daily, needs_db=True,
+        description="FBA inventory days as full sp_fba_inventory rows"
+    ),
+    Stage(
+        "db_inventory_ranges", _prepare_db_inventory, _run_db_inventory_ranges, needs_db=True,
+        description="Same days via apply_fba_inventory_day (changed SKUs only)"
+    ),
+]}
@@ -13,23 +13,35 @@ Usage:
     python capture_monthly_inventory.py --force            # Force capture regardless of date
     python capture_monthly_inventory.py --month 2026-02    # Capture for specific month
     python capture_monthly_inventory.py --dry-run          # Show what would be captured
+    python capture_monthly_inventory.py --from-month 2025-06 --to-month 2026-01  # Backfill
+
+The snapshot is taken server-side by capture_inventory_monthly_snapshots()
+(migrations/009_monthly_inventory_snapshot_rpc.sql): one call per run, however
+many months, marketplaces or SKUs. Each marketplace's source day is the first
+day pulled in that month (the current month falls back to the latest day).
 
 Environment Variables Required:
     SUPABASE_URL          - Supabase project URL
     SUPABASE_SERVICE_KEY  - Supabase service role key
+
+Optional Environment Variables:
+    SP_INVENTORY_STORAGE  - ranges: read sp_fba_inventory_snapshots instead of
+                            sp_fba_inventory (see utils/inventory_storage.py)
 """
 
 import os
 import sys
 import argparse
 import time
-from datetime import date, datetime
+from datetime import date
 from typing import List, Dict, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.utils.db import get_supabase_client, MARKETPLACE_UUIDS
+from scripts.utils.inventory_storage import inventory_source_table
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 
 def should_capture_today() -> bool:
@@ -56,120 +68,40 @@ def get_snapshot_date(month_str: Optional[str] = None) -> date:
         return date(today.year, today.month, 1)
 
 
-def get_latest_inventory_date() -> Optional[date]:
-    """Get the most recent date we have inventory data for."""
-    client = get_supabase_client()
-
-    result = client.table("sp_fba_inventory") \
-        .select("date") \
-        .order("date", desc=True) \
-        .limit(1) \
-        .execute()
-
-    if result.data:
-        return date.fromisoformat(result.data[0]["date"])
-    return None
-
-
-def get_inventory_for_snapshot(source_date: date) -> List[Dict]:
-    """
-    Get all inventory records for a given date.
-
-    Args:
-        source_date: The date to get inventory from
-
-    Returns:
-        List of inventory records
-    """
-    client = get_supabase_client()
-
-    result = client.table("sp_fba_inventory") \
-        .select("*") \
-        .eq("date", source_date.isoformat()) \
-        .execute()
-
-    return result.data
-
-
-def capture_monthly_snapshot(
-    snapshot_date: date,
-    source_date: date,
+def capture_monthly_snapshots(
+    from_month: date,
+    to_month: Optional[date] = None,
     dry_run: bool = False
-) -> Dict:
+) -> List[Dict]:
     """
-    Capture inventory snapshot for a month.
+    Capture inventory snapshots for one month or a range of months.
+
+    Runs capture_inventory_monthly_snapshots() (migrations/009), which copies
+    each marketplace's inventory on the first pulled day of the month with a
+    single INSERT ... SELECT ... ON CONFLICT - nothing is fetched or
+    re-uploaded from here, so the time doesn't grow with the SKU count.
 
     Args:
-        snapshot_date: 1st of the month to store as snapshot_date
-        source_date: Actual date the inventory data is from
-        dry_run: If True, don't actually save
+        from_month: 1st of the first month to capture
+        to_month: 1st of the last month to capture (default: from_month)
+        dry_run: If True, only count the records that would be captured
 
     Returns:
-        Dict with capture statistics
+        One dict per month and marketplace: snapshot_date, marketplace_id,
+        source_date, records
     """
-    print(f"\n📸 Capturing monthly inventory snapshot")
-    print(f"   Snapshot date: {snapshot_date} (1st of month)")
-    print(f"   Source date: {source_date}")
-
-    # Get inventory data
-    inventory_records = get_inventory_for_snapshot(source_date)
-
-    if not inventory_records:
-        print(f"   ⚠️  No inventory data found for {source_date}")
-        return {"status": "no_data", "records": 0}
-
-    print(f"   📦 Found {len(inventory_records)} inventory records")
-
-    if dry_run:
-        print(f"   🏃 DRY RUN - Would capture {len(inventory_records)} records")
-        return {"status": "dry_run", "records": len(inventory_records)}
-
-    # Transform records for snapshot table
-    snapshot_records = []
-    for inv in inventory_records:
-        snapshot_record = {
-            "snapshot_date": snapshot_date.isoformat(),
-            "marketplace_id": inv["marketplace_id"],
-            "sku": inv["sku"],
-            "asin": inv.get("asin"),
-            "fnsku": inv.get("fnsku"),
-            "product_name": inv.get("product_name"),
-            "fulfillable_quantity": inv.get("fulfillable_quantity", 0),
-            "reserved_quantity": inv.get("reserved_quantity", 0),
-            "reserved_fc_transfers": inv.get("reserved_fc_transfers", 0),
-            "reserved_fc_processing": inv.get("reserved_fc_processing", 0),
-            "reserved_customer_orders": inv.get("reserved_customer_orders", 0),
-            "inbound_working_quantity": inv.get("inbound_working_quantity", 0),
-            "inbound_shipped_quantity": inv.get("inbound_shipped_quantity", 0),
-            "inbound_receiving_quantity": inv.get("inbound_receiving_quantity", 0),
-            "unfulfillable_quantity": inv.get("unfulfillable_quantity", 0),
-            "researching_quantity": inv.get("researching_quantity", 0),
-            "source_date": source_date.isoformat(),
-            "captured_at": datetime.now().isoformat()
-        }
-        snapshot_records.append(snapshot_record)
-
-    # Upsert to snapshot table (idempotent)
     client = get_supabase_client()
 
-    # Insert in chunks to avoid timeout
-    chunk_size = 100
-    inserted_count = 0
-
-    for i in range(0, len(snapshot_records), chunk_size):
-        chunk = snapshot_records[i:i + chunk_size]
-        client.table("sp_inventory_monthly_snapshots") \
-            .upsert(chunk, on_conflict="snapshot_date,marketplace_id,sku") \
-            .execute()
-        inserted_count += len(chunk)
-        print(f"   ✅ Saved {inserted_count}/{len(snapshot_records)} records")
+    started = time.perf_counter()
+    result = client.rpc("capture_inventory_monthly_snapshots", {
+        "p_from_month": from_month.isoformat(),
+        "p_to_month": (to_month or from_month).isoformat(),
+        "p_source": inventory_source_table(),
+        "p_dry_run": dry_run
+    }).execute()
+    print(f"   ⏱️  Snapshot query took {time.perf_counter() - started:.1f}s")
 
-    return {
-        "status": "success",
-        "records": len(snapshot_records),
-        "snapshot_date": snapshot_date.isoformat(),
-        "source_date": source_date.isoformat()
-    }
+    return result.data or []
 
 
 def check_existing_snapshot(snapshot_date: date) -> int:
@@ -194,6 +126,16 @@ def main():
         type=str,
         help="Month to capture (YYYY-MM format). Default: current month"
     )
+    parser.add_argument(
+        "--from-month",
+        type=str,
+        help="Backfill: first month to capture (YYYY-MM), up to --to-month"
+    )
+    parser.add_argument(
+        "--to-month",
+        type=str,
+        help="Backfill: last month to capture (YYYY-MM). Default: current month"
+    )
     parser.add_argument(
         "--force",
         action="store_true",
@@ -205,64 +147,74 @@ def main():
         help="Show what would be captured without saving"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "capture_monthly_inventory")
+
+    backfill = bool(args.from_month)
 
     # Check if we should run today
-    if not args.force and not args.month and not should_capture_today():
+    if not args.force and not args.month and not backfill and not should_capture_today():
         print(f"📅 Today is {date.today()}, not 1st or 2nd of month")
         print("   Use --force to capture anyway, or --month YYYY-MM for specific month")
         return
 
-    # Determine snapshot date (1st of month)
-    snapshot_date = get_snapshot_date(args.month)
+    # Determine snapshot date(s) (1st of month)
+    if backfill:
+        from_month = get_snapshot_date(args.from_month)
+        to_month = get_snapshot_date(args.to_month)
+    else:
+        from_month = to_month = get_snapshot_date(args.month)
+
+    if to_month < from_month:
+        print(f"   ❌ --to-month {to_month:%Y-%m} is before --from-month {from_month:%Y-%m}")
+        sys.exit(1)
 
     print("\n" + "=" * 60)
     print("📸 MONTHLY INVENTORY SNAPSHOT CAPTURE")
     print("=" * 60)
-    print(f"📅 Snapshot month: {snapshot_date.strftime('%B %Y')}")
-
-    # Check for existing snapshot
-    existing_count = check_existing_snapshot(snapshot_date)
-    if existing_count > 0:
-        print(f"   ⚠️  Existing snapshot found ({existing_count} records)")
-        print("   Will update/replace existing records (idempotent)")
-
-    # Get latest inventory date
-    latest_inv_date = get_latest_inventory_date()
-    if not latest_inv_date:
-        print("   ❌ No inventory data found in database")
-        sys.exit(1)
-
-    print(f"   📦 Latest inventory data: {latest_inv_date}")
+    if backfill:
+        print(f"📅 Snapshot months: {from_month.strftime('%B %Y')} - {to_month.strftime('%B %Y')}")
+    else:
+        print(f"📅 Snapshot month: {from_month.strftime('%B %Y')}")
 
-    # Determine source date
-    # Prefer 1st of month, but use latest if 1st not available
-    source_date = snapshot_date if snapshot_date <= latest_inv_date else latest_inv_date
+        # Check for existing snapshot
+        existing_count = check_existing_snapshot(from_month)
+        if existing_count > 0:
+            print(f"   ⚠️  Existing snapshot found ({existing_count} records)")
+            print("   Will update/replace existing records (idempotent)")
 
-    # Warn if source date is not exactly the 1st
-    if source_date != snapshot_date:
-        print(f"   ⚠️  Using {source_date} as source (1st not available)")
+    print(f"   📦 Source: {inventory_source_table()}")
 
-    # Capture snapshot
-    result = capture_monthly_snapshot(
-        snapshot_date=snapshot_date,
-        source_date=source_date,
+    # Capture snapshot(s)
+    results = capture_monthly_snapshots(
+        from_month=from_month,
+        to_month=to_month,
         dry_run=args.dry_run
     )
 
+    codes = {uuid: code for code, uuid in MARKETPLACE_UUIDS.items()}
+    for row in results:
+        code = codes.get(row["marketplace_id"], row["marketplace_id"])
+        note = "" if row["source_date"] == row["snapshot_date"] else f" (from {row['source_date']}, 1st not available)"
+        print(f"   ✅ {row['snapshot_date'][:7]} {code}: {row['records']:,} records{note}")
+
     # Summary
+    total = sum(row["records"] for row in results)
+    months = len({row["snapshot_date"] for row in results})
+
     print("\n" + "=" * 60)
     print("📊 CAPTURE SUMMARY")
     print("=" * 60)
-    print(f"   Status: {result['status']}")
-    print(f"   Records: {result['records']}")
+    print(f"   Months: {months}")
+    print(f"   Records: {total:,}")
 
-    if result["status"] == "success":
-        print(f"   ✅ Monthly snapshot captured successfully!")
-    elif result["status"] == "dry_run":
+    if not total:
+        print(f"   ⚠️  No inventory data found for the requested month(s)")
+    elif args.dry_run:
         print(f"   🏃 Dry run complete - no data saved")
     else:
-        print(f"   ⚠️  No data captured")
+        print(f"   ✅ Monthly snapshot captured successfully!")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Compact FBA Inventory History Script
+
+One-time conversion of sp_fba_inventory's daily rows into validity ranges
+(sp_fba_inventory_ranges, migrations/008_inventory_ranges.sql): consecutive
+pulled days on which a SKU's quantities didn't change become one row.
+Runs compact_fba_inventory_history() per marketplace; re-runnable while
+sp_fba_inventory still has every day.
+
+--benchmark measures storage (rows, bytes) and a one-day snapshot query
+against sp_fba_inventory and sp_fba_inventory_snapshots, before and after.
+
+Usage:
+    python compact_inventory_history.py --benchmark              # Compact all marketplaces, measure
+    python compact_inventory_history.py --marketplace USA        # One marketplace
+    python compact_inventory_history.py --stats                  # Only show storage stats
+    python compact_inventory_history.py --prune-before 2026-03-01  # Also delete compacted daily rows
+
+Switch pulls to SP_INVENTORY_STORAGE=ranges only after comparing snapshots,
+and prune only after that.
+
+Environment Variables Required:
+    SUPABASE_URL          - Supabase project URL
+    SUPABASE_SERVICE_KEY  - Supabase service role key
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date
+from typing import Dict, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils.db import get_supabase_client, MARKETPLACE_UUIDS
+from scripts.utils.profiling import add_profile_argument, start_profiling
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = 1000
+
+
+def storage_stats() -> Dict:
+    return get_supabase_client().rpc("fba_inventory_storage_stats", {}).execute().data
+
+
+def latest_day(marketplace_id: str) -> Optional[str]:
+    result = get_supabase_client().table("sp_fba_inventory") \
+        .select("date") \
+        .eq("marketplace_id", marketplace_id) \
+        .order("date", desc=True) \
+        .limit(1) \
+        .execute()
+    return result.data[0]["date"] if result.data else None
+
+
+def time_snapshot_query(table: str, marketplace_id: str, day: str) -> Dict:
+    """Read one marketplace's full snapshot for a day, page by page."""
+    client = get_supabase_client()
+    started = time.perf_counter()
+    rows = 0
+    while True:
+        page = client.table(table).select("*") \
+            .eq("marketplace_id", marketplace_id) \
+            .eq("date", day) \
+            .order("sku") \
+            .range(rows, rows + PAGE_SIZE - 1) \
+            .execute().data or []
+        rows += len(page)
+        if len(page) < PAGE_SIZE:
+            break
+    return {"rows": rows, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def measure(marketplaces: Dict[str, str]) -> Dict:
+    """Storage stats plus a snapshot query per marketplace on its latest day."""
+    result = {"storage": storage_stats(), "queries": {}}
+    for code, marketplace_id in marketplaces.items():
+        day = latest_day(marketplace_id)
+        if not day:
+            continue
+        result["queries"][code] = {
+            "date": day,
+            "sp_fba_inventory": time_snapshot_query("sp_fba_inventory", marketplace_id, day),
+            "sp_fba_inventory_snapshots": time_snapshot_query("sp_fba_inventory_snapshots", marketplace_id, day),
+        }
+    return result
+
+
+def print_measurement(label: str, measurement: Dict):
+    storage = measurement["storage"]
+    mb = 1024 * 1024
+    print(f"\n📏 {label}")
+    print(f"   sp_fba_inventory:        {storage['daily_rows']:>10,} rows  {storage['daily_bytes'] / mb:>8.1f} MB")
+    print(f"   sp_fba_inventory_ranges: {storage['range_rows']:>10,} rows  {storage['range_bytes'] / mb:>8.1f} MB"
+          f"  ({storage['days']} pulled days)")
+    for code, query in measurement["queries"].items():
+        daily, ranges = query["sp_fba_inventory"], query["sp_fba_inventory_snapshots"]
+        match = "✅" if daily["rows"] == ranges["rows"] else "❌"
+        print(f"   {code} {query['date']}: daily {daily['rows']} rows in {daily['seconds']:.3f}s, "
+              f"snapshot view {ranges['rows']} rows in {ranges['seconds']:.3f}s {match}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact sp_fba_inventory history into validity ranges")
+    parser.add_argument("--marketplace", action="append", help="Marketplace code (repeatable). Default: all")
+    parser.add_argument("--stats", action="store_true", help="Only show storage stats")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Measure storage and snapshot queries before and after compacting")
+    parser.add_argument("--prune-before", type=str,
+                        help="Delete sp_fba_inventory rows before this date (YYYY-MM-DD) after compacting")
+    parser.add_argument("--output", type=str, help="Write benchmark results to this JSON file")
+
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_profiling(args.profile, "compact_inventory_history")
+
+    codes = [code.upper() for code in args.marketplace] if args.marketplace else list(MARKETPLACE_UUIDS)
+    marketplaces = {code: MARKETPLACE_UUIDS[code] for code in codes}
+    prune_before = date.fromisoformat(args.prune_before).isoformat() if args.prune_before else None
+
+    if args.stats:
+        print_measurement("Storage", {"storage": storage_stats(), "queries": {}})
+        return
+
+    results = {}
+    if args.benchmark:
+        results["before"] = measure(marketplaces)
+        print_measurement("Before", results["before"])
+
+    client = get_supabase_client()
+    results["compaction"] = {}
+    for code, marketplace_id in marketplaces.items():
+        print(f"\n🗜️  Compacting {code}...")
+        started = time.perf_counter()
+        summary = client.rpc("compact_fba_inventory_history", {
+            "p_marketplace_id": marketplace_id,
+            "p_prune_before": prune_before
+        }).execute().data
+        summary["seconds"] = round(time.perf_counter() - started, 1)
+        results["compaction"][code] = summary
+        if summary["daily_rows"]:
+            print(f"   ✅ {summary['daily_rows']:,} daily rows -> {summary['ranges']:,} ranges "
+                  f"({summary['ranges'] / summary['daily_rows']:.1%}) in {summary['seconds']}s"
+                  + (f", pruned {summary['pruned']:,}" if summary["pruned"] else ""))
+        else:
+            print("   ⏭️  No inventory history")
+
+    if args.benchmark:
+        results["after"] = measure(marketplaces)
+        print_measurement("After", results["after"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
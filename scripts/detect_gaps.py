@@ -39,9 +39,9 @@ from typing import List, Dict, Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.utils.db import get_supabase_client, MARKETPLACE_UUIDS, AMAZON_MARKETPLACE_IDS
-from scripts.utils.auth import get_access_token
 from scripts.utils.api_client import SPAPIClient
 from scripts.utils.alerting import get_alert_manager
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Import pull function directly
 from scripts.pull_daily_sales import pull_marketplace_data, MARKETPLACES_BY_REGION
@@ -202,8 +202,7 @@ def repair_gaps(
         logger.info(f"Repairing {len(region_gaps)} gaps in {region} region")
 
         try:
-            access_token = get_access_token(region=region)
-            client = SPAPIClient(access_token, region=region)
+            client = SPAPIClient(region=region)
         except Exception as e:
             logger.error(f"Failed to authenticate for {region}: {e}")
             for gap in region_gaps:
@@ -370,7 +369,9 @@ def main():
         help="End date for check window (YYYY-MM-DD, default: yesterday)"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "detect_gaps")
 
     end_date = date.fromisoformat(args.end_date) if args.end_date else None
 
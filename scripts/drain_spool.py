@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Drain Write-Ahead Spool Script
+
+Writes records that pull scripts spooled to disk (wal/<stream>/) but could
+not store because Supabase was down or rejected them. Records are applied in
+order with retries, and the spool resumes from the last acknowledged record,
+so this is safe to run repeatedly (and alongside nothing else: one drainer
+per stream holds a lock).
+
+pull_daily_sales.py and pull_orders_daily.py also drain their stream at
+startup, so this is only needed to flush a backlog without pulling.
+
+Usage:
+    python drain_spool.py                     # Drain every stream
+    python drain_spool.py --stream orders     # One stream
+    python drain_spool.py --status            # Show pending counts only
+    python drain_spool.py --dead-letter       # Also move records that keep failing transiently aside
+
+Environment Variables Required:
+    SUPABASE_URL          - Supabase project URL
+    SUPABASE_SERVICE_KEY  - Supabase service role key
+    SP_WAL_DIR            - Spool root (default: wal)
+"""
+
+import os
+import sys
+import argparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# db registers the spool sinks
+import scripts.utils.db  # noqa: F401
+from scripts.utils.spool import WAL_DIR, DRAIN_RETRIES, get_spool
+from scripts.utils.profiling import add_profile_argument, start_profiling
+
+
+def list_streams(directory: str = WAL_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write spooled pull records to Supabase")
+    parser.add_argument("--stream", action="append", help="Stream to drain (repeatable). Default: all")
+    parser.add_argument("--status", action="store_true", help="Only show pending record counts")
+    parser.add_argument("--retries", type=int, default=DRAIN_RETRIES,
+                        help=f"Attempts per record (default: {DRAIN_RETRIES})")
+    parser.add_argument("--dead-letter", action="store_true",
+                        help="Move records that still fail to dead.jsonl.gz instead of stopping")
+
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_profiling(args.profile, "drain_spool")
+
+    streams = args.stream or list_streams()
+    if not streams:
+        print(f"Nothing spooled in {WAL_DIR}/")
+        return
+
+    blocked = 0
+    for stream in streams:
+        spool = get_spool(stream)
+        pending = spool.pending()
+        if args.status or not pending:
+            print(f"📼 {stream}: {pending} pending")
+            continue
+
+        print(f"📼 {stream}: draining {pending} record(s)...")
+        summary = spool.drain(retries=args.retries, dead_letter=args.dead_letter)
+        print(f"   ✅ Applied {summary['applied']}"
+              + (f", ☠️  {summary['dead_lettered']} dead-lettered" if summary["dead_lettered"] else ""))
+        if summary["pending"]:
+            blocked += 1
+            print(f"   ❌ {summary['pending']} still pending: {(summary['error'] or '')[:200]}")
+
+    if blocked:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
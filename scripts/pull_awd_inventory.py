@@ -32,18 +32,19 @@ from typing import Dict, List, Any
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
 from utils.awd_api import pull_awd_inventory
 from utils.db import (
     get_supabase_client,
     create_data_import,
     update_data_import,
+    InventoryPullStatusBatch,
     MARKETPLACE_UUIDS
 )
 
 # Import new resilience modules
 from utils.api_client import SPAPIClient, SPAPIError
 from utils.alerting import alert_failure
+from utils.profiling import add_profile_argument, start_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -154,12 +155,31 @@ def upsert_awd_inventory(
     return len(db_rows)
 
 
+def record_failure(
+    import_id: str,
+    pull_id: str,
+    error_msg: str,
+    record: Dict[str, Any] = None,
+    statuses: InventoryPullStatusBatch = None
+):
+    """Mark the AWD pull failed (batched when running under pull_inventory_all.py)."""
+    if statuses is not None and record is not None:
+        statuses.add(record, "failed", error_message=error_msg)
+        return
+    if import_id:
+        update_data_import(import_id, "failed", error_message=error_msg)
+    if pull_id:
+        update_awd_pull_status(pull_id, "failed", error_message=error_msg)
+
+
 def pull_awd(
     marketplace_code: str = "USA",
     region: str = "NA",
     dry_run: bool = False,
     client: SPAPIClient = None,
-    access_token: str = None
+    access_token: str = None,
+    record: Dict[str, Any] = None,
+    statuses: InventoryPullStatusBatch = None
 ) -> Dict[str, Any]:
     """
     Pull AWD inventory.
@@ -170,6 +190,10 @@ def pull_awd(
         dry_run: If True, don't write to database
         client: SPAPIClient instance (handles retry and rate limiting)
         access_token: Access token (deprecated, use client instead)
+        record: Tracking record already created by
+            create_inventory_pull_records_batch (pull_inventory_all.py)
+        statuses: Batch that the final status is added to instead of being
+            written directly
 
     Returns:
         Dict with status information
@@ -184,7 +208,9 @@ def pull_awd(
     import_id = None
     pull_id = None
 
-    if not dry_run:
+    if not dry_run and record is not None:
+        import_id, pull_id = record["import_id"], record["pull_id"]
+    elif not dry_run:
         import_id = create_data_import(
             marketplace_code,
             date.today(),
@@ -220,8 +246,11 @@ def pull_awd(
         processing_time = int((time.time() - start_time) * 1000)
 
         # Update tracking
-        update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
-        update_awd_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+        if statuses is not None and record is not None:
+            statuses.add(record, "completed", row_count=row_count, processing_time_ms=processing_time)
+        else:
+            update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+            update_awd_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
 
         print(f"\n✓ Completed: {row_count} AWD inventory records")
 
@@ -241,10 +270,7 @@ def pull_awd(
         retry_count = client.stats.get("retries", 0) if client else 0
         alert_failure("awd_inventory", marketplace_code, error_msg, retry_count)
 
-        if not dry_run and import_id:
-            update_data_import(import_id, "failed", error_message=error_msg)
-        if not dry_run and pull_id:
-            update_awd_pull_status(pull_id, "failed", error_message=error_msg)
+        record_failure(import_id, pull_id, error_msg, record, statuses)
 
         return {
             "status": "failed",
@@ -260,10 +286,7 @@ def pull_awd(
         # Send alert
         alert_failure("awd_inventory", marketplace_code, error_msg, 0)
 
-        if not dry_run and import_id:
-            update_data_import(import_id, "failed", error_message=error_msg)
-        if not dry_run and pull_id:
-            update_awd_pull_status(pull_id, "failed", error_message=error_msg)
+        record_failure(import_id, pull_id, error_msg, record, statuses)
 
         return {
             "status": "failed",
@@ -280,7 +303,9 @@ def main():
         help="Pull data but don't write to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_awd_inventory")
 
     print("="*60)
     print("AWD INVENTORY PULL (API)")
@@ -289,13 +314,8 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("="*60)
 
-    # Get access token and create API client
-    print("\nGetting access token...")
-    access_token = get_access_token()
-    print("✓ Access token obtained")
-
-    # Create SPAPIClient with retry and rate limiting
-    client = SPAPIClient(access_token, region="NA")
+    # Create SPAPIClient with retry and rate limiting (refreshing tokens)
+    client = SPAPIClient(region="NA")
 
     # Pull AWD inventory
     result = pull_awd(
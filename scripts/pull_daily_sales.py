@@ -10,6 +10,9 @@ Features:
 - Rate limit handling via SPAPIClient
 - Checkpoint-based resume capability via PullTracker
 - Slack alerts on failures (if SLACK_WEBHOOK_URL is set)
+- Marketplaces pipelined: report requests, parsing and DB writes overlap
+- --region ALL pulls every region concurrently (own client/token per region,
+  one shared DB writer pool, one consolidated summary)
 
 Usage:
     python pull_daily_sales.py                    # Pull today's data for all NA marketplaces (timezone-aware)
@@ -17,6 +20,7 @@ Usage:
     python pull_daily_sales.py --marketplace USA  # Pull specific marketplace only
     python pull_daily_sales.py --days-ago 1       # Pull data from 1 day ago
     python pull_daily_sales.py --resume           # Resume incomplete pull
+    python pull_daily_sales.py --region ALL       # All regions concurrently
 
 Environment Variables Required:
     SP_LWA_CLIENT_ID      - Login With Amazon Client ID
@@ -28,6 +32,7 @@ Environment Variables Required:
 Optional Environment Variables:
     SLACK_WEBHOOK_URL     - Slack webhook for failure alerts
     SP_API_MAX_RETRIES    - Max retry attempts (default: 5)
+    SP_PIPELINE_*         - Pipeline workers / queue size (see utils/pipeline.py)
 """
 
 import os
@@ -42,22 +47,27 @@ from typing import List, Optional
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token, get_refresh_token_for_region
-from scripts.utils.reports import pull_single_day_report, MARKETPLACE_IDS
+from scripts.utils.auth import get_refresh_token_for_region
+from scripts.utils.reports import fetch_single_day_report_body, parse_report_body, MARKETPLACE_IDS
 from scripts.utils.db import (
     create_data_import,
     update_data_import,
     create_pull_record,
     update_pull_status,
-    upsert_asin_data,
-    upsert_totals,
-    get_existing_pull
+    get_existing_pull,
+    record_pull_timings
 )
+from scripts.utils.spool import get_spool, drain_pending, SpoolPending
+from scripts.utils.pipeline import Pipeline, Stage, Done, WriterPool, API_WORKERS, DB_WORKERS
+from scripts.utils.region_runner import run_regions, send_region_summary
 
 # Import new resilience modules
 from scripts.utils.api_client import SPAPIClient, SPAPIError
+from scripts.utils.async_client import get_sp_api_client
 from scripts.utils.pull_tracker import PullTracker
 from scripts.utils.alerting import alert_failure, alert_partial, send_summary
+from scripts.utils.metrics import PullTimings
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -112,44 +122,62 @@ def get_marketplace_date(marketplace_code: str, days_ago: int = 0) -> date:
     return target_date
 
 
-def pull_marketplace_data(
-    marketplace_code: str,
-    report_date: date,
+def run_sales_pipeline(
+    targets: List[tuple],
     region: str = "NA",
     skip_existing: bool = True,
     client: SPAPIClient = None,
-    tracker: PullTracker = None
-) -> dict:
+    tracker: PullTracker = None,
+    writer_pool: Optional[WriterPool] = None
+) -> List[dict]:
     """
-    Pull data for a single marketplace and date.
+    Pull and store Sales & Traffic reports for (marketplace_code, report_date) targets.
+
+    Marketplaces overlap instead of running one after another: create/poll/
+    download run on API worker threads, JSON parsing in a process pool, and
+    the spooled Supabase writes on DB worker threads, with bounded queues in
+    between (see utils/pipeline.py).
 
     Args:
-        marketplace_code: Marketplace code (e.g., 'USA')
-        report_date: Date to pull data for
+        targets: (marketplace_code, report_date) pairs
         region: API region ('NA', 'EU', 'FE')
         skip_existing: Skip if data already exists
         client: SPAPIClient instance (handles retry and rate limiting)
         tracker: PullTracker instance (handles checkpoint/resume)
+        writer_pool: DB writers shared with other regions' pipelines
 
     Returns:
-        Dict with status and counts
+        One result dict per target, in order
     """
-    result = {
-        "marketplace": marketplace_code,
-        "date": report_date.isoformat(),
-        "status": "pending",
-        "asin_count": 0,
-        "error": None,
-        "retryable": False
-    }
-
-    start_time = time.time()
-
-    # Mark marketplace as in progress in tracker
-    if tracker:
-        tracker.start_marketplace(marketplace_code)
-
-    try:
+    if client is None:
+        client = get_sp_api_client(region=region)
+
+    def new_job(target) -> dict:
+        marketplace_code, report_date = target
+        return {
+            "marketplace": marketplace_code,
+            "date": report_date,
+            "timings": PullTimings("sales_traffic", marketplace_code, report_date, region),
+            "started": time.time(),
+            "import_id": None,
+            "pull_id": None,
+            "result": {
+                "marketplace": marketplace_code,
+                "date": report_date.isoformat(),
+                "status": "pending",
+                "asin_count": 0,
+                "error": None,
+                "retryable": False
+            },
+        }
+
+    def fetch(job: dict):
+        marketplace_code, report_date, result = job["marketplace"], job["date"], job["result"]
+
+        # Mark marketplace as in progress in tracker
+        if tracker:
+            tracker.start_marketplace(marketplace_code)
+
         # Check if already pulled (only skip if we have actual data)
         if skip_existing:
             existing = get_existing_pull(marketplace_code, report_date)
@@ -161,62 +189,59 @@ def pull_marketplace_data(
                     result["asin_count"] = asin_count
                     if tracker:
                         tracker.complete_marketplace(marketplace_code, asin_count)
-                    return result
+                    return Done(result)
                 else:
                     print(f"🔄 {marketplace_code} {report_date} has 0 ASINs, re-pulling...")
 
-        print(f"\n{'='*50}")
         print(f"📊 Pulling {marketplace_code} data for {report_date}")
-        print(f"{'='*50}")
 
         # Create tracking records
-        import_id = create_data_import(marketplace_code, report_date)
-        pull_id = create_pull_record(marketplace_code, report_date, import_id=import_id)
-
-        # Get access token (if no client provided)
-        if client is None:
-            print("🔑 Getting access token...")
-            access_token = get_access_token()
-        else:
-            access_token = None  # Client already has token
+        job["import_id"] = create_data_import(marketplace_code, report_date)
+        job["pull_id"] = create_pull_record(marketplace_code, report_date, import_id=job["import_id"])
 
         # Update pull status to processing
-        update_pull_status(pull_id, "processing")
+        update_pull_status(job["pull_id"], "processing")
 
-        # Pull the report (client handles retry and rate limiting)
-        print("📥 Requesting report from Amazon...")
-        report_data = pull_single_day_report(
-            access_token=access_token,
+        # Request the report (client handles retry and rate limiting); parsed in the next stage
+        print(f"📥 Requesting {marketplace_code} report from Amazon...")
+        job["body"], job["compression"] = fetch_single_day_report_body(
             marketplace_code=marketplace_code,
             report_date=report_date,
             region=region,
             client=client
         )
+        return job
 
-        # Store ASIN data
-        print("💾 Storing ASIN data...")
-        asin_count = upsert_asin_data(report_data, marketplace_code, report_date, import_id)
-
-        # Store totals
-        print("💾 Storing daily totals...")
-        upsert_totals(report_data, marketplace_code, report_date, import_id)
+    def parsed(job: dict, report_data: dict) -> dict:
+        job["body"] = None
+        job["report_data"] = report_data
+        return job
 
-        # Calculate processing time
-        processing_time_ms = int((time.time() - start_time) * 1000)
+    def store(job: dict) -> dict:
+        marketplace_code, result, timings = job["marketplace"], job["result"], job["timings"]
 
-        # Update tracking records
-        update_pull_status(
-            pull_id,
-            "completed",
-            asin_count=asin_count,
-            processing_time_ms=processing_time_ms
-        )
-        update_data_import(
-            import_id,
-            "completed",
-            row_count=asin_count,
-            processing_time_ms=processing_time_ms
-        )
+        # Store ASIN data + totals and complete the tracking records.
+        # The report is spooled to disk first: if Supabase stays down it
+        # is written by the next run instead of being re-requested.
+        print(f"💾 Storing {marketplace_code} ASIN data and daily totals...")
+        try:
+            asin_count = get_spool("sales_traffic").write_through(
+                "store_sales_traffic_report",
+                report_data=job.pop("report_data"),
+                marketplace_code=marketplace_code,
+                report_date=job["date"],
+                import_id=job["import_id"],
+                pull_id=job["pull_id"],
+                started_at=job["started"]
+            )
+        except SpoolPending as e:
+            result["status"] = "spooled"
+            result["error"] = e.error
+            print(f"📼 {marketplace_code}: {e}")
+            return result
+
+        processing_time_ms = int((time.time() - job["started"]) * 1000)
+        record_pull_timings(timings, "sp_api_pulls", job["pull_id"])
 
         result["status"] = "completed"
         result["asin_count"] = asin_count
@@ -226,19 +251,26 @@ def pull_marketplace_data(
             tracker.complete_marketplace(marketplace_code, asin_count)
 
         print(f"✅ {marketplace_code} completed: {asin_count} ASINs in {processing_time_ms}ms")
+        print(f"⏱️  {timings.summary_line()}")
+        return result
 
-    except SPAPIError as e:
-        # SP-API specific error (may be retryable)
-        error_msg = str(e)
+    def failed(job: dict, stage: str, error: Exception) -> dict:
+        marketplace_code, result = job["marketplace"], job["result"]
+        error_msg = str(error)
         result["status"] = "failed"
         result["error"] = error_msg
-        result["retryable"] = True  # SP-API errors are generally retryable
 
-        logger.error(f"{marketplace_code} failed with SP-API error: {error_msg}")
+        if isinstance(error, SPAPIError):
+            # SP-API specific error (may be retryable)
+            result["retryable"] = True
+            logger.error(f"{marketplace_code} failed with SP-API error: {error_msg}")
+            retry_count = client.stats.get("retries", 0)
+        else:
+            logger.error(f"{marketplace_code} failed ({stage}): {error_msg}")
+            retry_count = 0
         print(f"❌ {marketplace_code} failed: {error_msg}")
 
         # Send alert
-        retry_count = client.stats.get("retries", 0) if client else 0
         alert_failure("sales_traffic", marketplace_code, error_msg, retry_count)
 
         # Update tracker
@@ -247,39 +279,58 @@ def pull_marketplace_data(
 
         # Try to update tracking records
         try:
-            if 'pull_id' in locals():
-                update_pull_status(pull_id, "failed", error_message=error_msg)
-            if 'import_id' in locals():
-                update_data_import(import_id, "failed", error_message=error_msg)
-        except:
+            if job["pull_id"]:
+                update_pull_status(job["pull_id"], "failed", error_message=error_msg)
+                record_pull_timings(job["timings"], "sp_api_pulls", job["pull_id"])
+            if job["import_id"]:
+                update_data_import(job["import_id"], "failed", error_message=error_msg)
+        except Exception:
             pass
 
-    except Exception as e:
-        # General error
-        error_msg = str(e)
-        result["status"] = "failed"
-        result["error"] = error_msg
+        return result
 
-        logger.error(f"{marketplace_code} failed: {error_msg}")
-        print(f"❌ {marketplace_code} failed: {error_msg}")
+    pipeline = Pipeline(f"sales_traffic_{region.lower()}", [
+        Stage("report", fetch, workers=API_WORKERS),
+        Stage(
+            "parse", parse_report_body, processes=True,
+            args=lambda job: (job["body"], job["compression"]),
+            merge=parsed
+        ),
+        Stage("store", store, workers=DB_WORKERS, executor=writer_pool),
+    ], timings_of=lambda job: job["timings"], on_error=failed)
 
-        # Send alert
-        alert_failure("sales_traffic", marketplace_code, error_msg, 0)
+    return pipeline.run(new_job(target) for target in targets)
 
-        # Update tracker
-        if tracker:
-            tracker.fail_marketplace(marketplace_code, error_msg)
 
-        # Try to update tracking records
-        try:
-            if 'pull_id' in locals():
-                update_pull_status(pull_id, "failed", error_message=error_msg)
-            if 'import_id' in locals():
-                update_data_import(import_id, "failed", error_message=error_msg)
-        except:
-            pass
+def pull_marketplace_data(
+    marketplace_code: str,
+    report_date: date,
+    region: str = "NA",
+    skip_existing: bool = True,
+    client: SPAPIClient = None,
+    tracker: PullTracker = None
+) -> dict:
+    """
+    Pull data for a single marketplace and date.
 
-    return result
+    Args:
+        marketplace_code: Marketplace code (e.g., 'USA')
+        report_date: Date to pull data for
+        region: API region ('NA', 'EU', 'FE')
+        skip_existing: Skip if data already exists
+        client: SPAPIClient instance (handles retry and rate limiting)
+        tracker: PullTracker instance (handles checkpoint/resume)
+
+    Returns:
+        Dict with status and counts
+    """
+    return run_sales_pipeline(
+        [(marketplace_code, report_date)],
+        region=region,
+        skip_existing=skip_existing,
+        client=client,
+        tracker=tracker
+    )[0]
 
 
 def pull_region_data(
@@ -287,7 +338,9 @@ def pull_region_data(
     report_date: date = None,
     skip_existing: bool = True,
     resume: bool = True,
-    days_ago: int = None
+    days_ago: int = None,
+    writer_pool: Optional[WriterPool] = None,
+    send_alerts: bool = True
 ) -> List[dict]:
     """
     Pull data for all marketplaces in a region.
@@ -298,18 +351,18 @@ def pull_region_data(
         skip_existing: Skip if data already exists
         resume: Resume from checkpoint if previous pull was incomplete
         days_ago: Days ago to pull (used when report_date is None)
+        writer_pool: DB writers shared across regions (--region ALL)
+        send_alerts: Send this region's summary/alerts (off when the caller
+            sends one consolidated summary for several regions)
 
     Returns:
         List of results for each marketplace
     """
     pull_start_time = time.time()
 
-    # Get access token once for all marketplaces (region-aware)
-    print("🔑 Getting access token...")
-    access_token = get_access_token(region=region)
-
-    # Create SPAPIClient with retry and rate limiting
-    client = SPAPIClient(access_token, region=region)
+    # SP-API client (async transport when httpx is installed) with retry and
+    # rate limiting; tokens come from the region's refreshing token provider
+    client = get_sp_api_client(region=region)
 
     # Create PullTracker for checkpoint/resume capability
     # Use a placeholder date for tracker if using per-marketplace dates
@@ -327,8 +380,7 @@ def pull_region_data(
     else:
         marketplaces = all_marketplaces
 
-    results = []
-
+    targets = []
     for marketplace_code in marketplaces:
         # Determine date for this marketplace
         if report_date is not None:
@@ -336,19 +388,18 @@ def pull_region_data(
         else:
             mp_date = get_marketplace_date(marketplace_code, days_ago or 0)
             print(f"   📅 {marketplace_code}: {mp_date}")
-
-        # SPAPIClient handles rate limiting automatically - no need for fixed sleep
-        # The client will wait based on x-amzn-RateLimit-* headers
-
-        result = pull_marketplace_data(
-            marketplace_code=marketplace_code,
-            report_date=mp_date,
-            region=region,
-            skip_existing=skip_existing,
-            client=client,
-            tracker=tracker
-        )
-        results.append(result)
+        targets.append((marketplace_code, mp_date))
+
+    # SPAPIClient handles rate limiting automatically (shared by the pipeline's
+    # worker threads) - the client waits based on x-amzn-RateLimit-* headers
+    results = run_sales_pipeline(
+        targets,
+        region=region,
+        skip_existing=skip_existing,
+        client=client,
+        tracker=tracker,
+        writer_pool=writer_pool
+    )
 
     # Finish tracking and determine final status
     final_status = tracker.finish_pull()
@@ -357,12 +408,16 @@ def pull_region_data(
     stats = client.get_stats()
     logger.info(f"API stats: {stats['requests']} requests, {stats['retries']} retries, {stats['rate_limit_waits']} rate limit waits")
 
+    if not send_alerts:
+        return results
+
     # Send summary/alerts
     total_rows = sum(r["asin_count"] for r in results)
     duration = time.time() - pull_start_time
 
     completed = [r["marketplace"] for r in results if r["status"] == "completed"]
-    failed = [r["marketplace"] for r in results if r["status"] == "failed"]
+    # Spooled rows aren't in Supabase yet: alert like a failure
+    failed = [r["marketplace"] for r in results if r["status"] in ("failed", "spooled")]
 
     # Compute display_date safely (report_date is None when running on schedule)
     if report_date:
@@ -373,7 +428,10 @@ def pull_region_data(
         display_date = date.today().isoformat()
 
     if failed:
-        errors = {r["marketplace"]: r.get("error", "Unknown") for r in results if r["status"] == "failed"}
+        errors = {
+            r["marketplace"]: ("spooled, not yet written: " if r["status"] == "spooled" else "") + (r.get("error") or "Unknown")
+            for r in results if r["status"] in ("failed", "spooled")
+        }
         alert_partial("sales_traffic", display_date, completed, failed, errors)
     else:
         send_summary("sales_traffic", display_date, results, total_rows, duration)
@@ -405,8 +463,8 @@ def main():
         "--region",
         type=str,
         default="NA",
-        choices=["NA", "EU", "FE", "UAE"],
-        help="Region to pull. Default: NA"
+        choices=["NA", "EU", "FE", "UAE", "ALL"],
+        help="Region to pull (ALL = every region concurrently). Default: NA"
     )
     parser.add_argument(
         "--force",
@@ -425,7 +483,9 @@ def main():
         help="Do not resume, start fresh"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_daily_sales")
 
     # Handle resume flag
     resume = args.resume and not args.no_resume
@@ -443,16 +503,36 @@ def main():
     print(f"🌎 Region: {args.region}")
     print(f"🔄 Resume: {resume}")
 
+    # Write anything an earlier run spooled but couldn't store
+    drain_pending("sales_traffic")
+
     # Pull data
-    if args.marketplace:
+    if args.region == "ALL":
+        if args.marketplace:
+            parser.error("--marketplace needs a single --region")
+        started = time.time()
+        results_by_region = run_regions(
+            list(MARKETPLACES_BY_REGION),
+            lambda region, writers: pull_region_data(
+                region=region,
+                report_date=fixed_date,
+                skip_existing=not args.force,
+                resume=resume,
+                days_ago=days_ago if not use_fixed_date else None,
+                writer_pool=writers,
+                send_alerts=False
+            )
+        )
+        display_date = fixed_date.isoformat() if fixed_date else get_marketplace_date("USA", days_ago).isoformat()
+        send_region_summary("sales_traffic", display_date, results_by_region, time.time() - started)
+        results = [r for region_results in results_by_region.values() for r in region_results]
+    elif args.marketplace:
         # Single marketplace - create client and tracker inline
         mp_code = args.marketplace.upper()
         report_date = fixed_date if use_fixed_date else get_marketplace_date(mp_code, days_ago)
         print(f"📍 {mp_code}: pulling date {report_date}")
 
-        print("🔑 Getting access token...")
-        access_token = get_access_token(region=args.region)
-        client = SPAPIClient(access_token, region=args.region)
+        client = get_sp_api_client(region=args.region)
 
         results = [pull_marketplace_data(
             marketplace_code=mp_code,
@@ -487,20 +567,27 @@ def main():
 
     completed = sum(1 for r in results if r["status"] == "completed")
     skipped = sum(1 for r in results if r["status"] == "skipped")
+    spooled = sum(1 for r in results if r["status"] == "spooled")
     failed = sum(1 for r in results if r["status"] == "failed")
     total_asins = sum(r["asin_count"] for r in results)
 
     for r in results:
-        status_emoji = {"completed": "✅", "skipped": "⏭️", "failed": "❌"}.get(r["status"], "❓")
-        print(f"  {status_emoji} {r['marketplace']}: {r['status']} ({r['asin_count']} ASINs)")
+        status_emoji = {"completed": "✅", "skipped": "⏭️", "spooled": "📼", "failed": "❌"}.get(r["status"], "❓")
+        label = f"{r['region']}/{r['marketplace']}" if "region" in r else r["marketplace"]
+        print(f"  {status_emoji} {label}: {r['status']} ({r['asin_count']} ASINs)")
         if r.get("error"):
             print(f"     Error: {r['error'][:100]}")
 
-    print(f"\nTotal: {completed} completed, {skipped} skipped, {failed} failed")
+    print(f"\nTotal: {completed} completed, {skipped} skipped, {spooled} spooled, {failed} failed")
     print(f"Total ASINs: {total_asins}")
 
-    # Exit with error code if any failed
-    if failed > 0:
+    # Records still on disk (this run's or an earlier one's) aren't in Supabase yet
+    pending = get_spool("sales_traffic").pending()
+    if pending:
+        print(f"📼 {pending} spooled record(s) not yet written to Supabase")
+
+    # Exit with error code if any failed or are still spooled
+    if failed > 0 or pending > 0:
         sys.exit(1)
 
 
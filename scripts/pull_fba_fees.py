@@ -22,6 +22,11 @@ Fields captured:
 - your_price, sales_price
 - item dimensions and weight
 
+Only SKUs whose estimate changed since the last pull are written: each row's
+row_hash is compared with the stored one (db.upsert_fba_fee_estimate_changes).
+New and changed estimates are also appended to sp_fba_fee_history, so
+earlier estimates are kept instead of overwritten.
+
 Usage:
     python pull_fba_fees.py                        # All NA marketplaces
     python pull_fba_fees.py --marketplace USA       # Single marketplace
@@ -45,7 +50,7 @@ from typing import Dict, List, Any
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
+from utils.api_client import SPAPIClient
 from utils.financial_reports import (
     pull_fba_fee_report,
     FINANCIAL_REPORT_TYPES
@@ -57,9 +62,10 @@ from utils.db import (
     update_data_import,
     create_financial_pull_record,
     update_financial_pull_status,
-    upsert_fba_fee_estimates,
+    upsert_fba_fee_estimate_changes,
     MARKETPLACE_UUIDS,
 )
+from utils.profiling import add_profile_argument, start_profiling
 
 # Default marketplaces
 DEFAULT_MARKETPLACES = ["USA", "CA", "MX"]
@@ -164,7 +170,7 @@ def transform_fee_estimate_rows(
 
 
 def pull_marketplace_fba_fees(
-    access_token: str,
+    client: SPAPIClient,
     marketplace_code: str,
     region: str = "NA",
     dry_run: bool = False
@@ -198,7 +204,7 @@ def pull_marketplace_fba_fees(
 
     try:
         # Pull the report (create → poll → download)
-        rows = pull_fba_fee_report(access_token, marketplace_code, region)
+        rows = pull_fba_fee_report(None, marketplace_code, region, client=client)
 
         print(f"  Downloaded: {len(rows)} raw rows")
 
@@ -219,8 +225,9 @@ def pull_marketplace_fba_fees(
                 "row_count": len(db_rows)
             }
 
-        # Upsert to database
-        row_count = upsert_fba_fee_estimates(db_rows)
+        # Upsert new/changed estimates (and append them to the fee history)
+        counts = upsert_fba_fee_estimate_changes(db_rows)
+        row_count = counts["total"]
         processing_time = int((time.time() - start_time) * 1000)
 
         # Update tracking
@@ -235,12 +242,14 @@ def pull_marketplace_fba_fees(
             processing_time_ms=processing_time
         )
 
-        print(f"\n  ✓ Completed: {row_count} fee estimate records")
+        print(f"\n  ✓ Completed: {row_count} fee estimate records "
+              f"({counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged)")
 
         return {
             "status": "completed",
             "marketplace": marketplace_code,
             "row_count": row_count,
+            "rows_changed": counts["new"] + counts["changed"],
             "processing_time_ms": processing_time
         }
 
@@ -282,7 +291,9 @@ def main():
         help="Pull data but don't write to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_fba_fees")
 
     region = args.region.upper()
 
@@ -305,10 +316,8 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("=" * 60)
 
-    # Get access token
-    print("\nGetting access token...")
-    access_token = get_access_token(region=region)
-    print("✓ Access token obtained")
+    # Shared client: refreshing tokens, retry and rate limiting
+    client = SPAPIClient(region=region)
 
     # Process each marketplace
     # NOTE: This report can only be requested once per day per seller.
@@ -320,7 +329,7 @@ def main():
             time.sleep(65)
 
         result = pull_marketplace_fba_fees(
-            access_token,
+            client,
             marketplace,
             region=region,
             dry_run=args.dry_run
@@ -341,7 +350,9 @@ def main():
         if status in ["completed", "dry_run"]:
             row_count = result.get("row_count", 0)
             total_rows += row_count
-            print(f"  {marketplace}: ✓ {row_count} records")
+            changed = result.get("rows_changed")
+            print(f"  {marketplace}: ✓ {row_count} records"
+                  + (f" ({changed} new/changed)" if changed is not None else ""))
         else:
             failed += 1
             print(f"  {marketplace}: ✗ {result.get('error', 'Unknown error')}")
@@ -17,6 +17,11 @@ Features:
 - Automatic retry with exponential backoff on API failures
 - Rate limit handling via SPAPIClient
 - Slack alerts on failures (if SLACK_WEBHOOK_URL is set)
+- Marketplaces pipelined: fetching, parsing and DB writes overlap (SP_PIPELINE_*, see utils/pipeline.py)
+- NA API pages are streamed: each batch is upserted while the next page is
+  fetched, so memory doesn't grow with catalog size
+- SP_INVENTORY_STORAGE=ranges|both writes changed SKUs only, as validity
+  ranges (sp_fba_inventory_ranges, see utils/inventory_storage.py)
 
 Usage:
     python pull_inventory.py                          # All NA marketplaces
@@ -36,8 +41,7 @@ from typing import Dict, List, Any
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
-from utils.fba_inventory_api import pull_fba_inventory, MARKETPLACE_IDS
+from utils.fba_inventory_api import iter_fba_inventory_batches, MARKETPLACE_IDS
 from utils.inventory_reports import (
     pull_fba_inventory_report,
     parse_fba_inventory_report_row,
@@ -46,12 +50,19 @@ from utils.db import (
     get_supabase_client,
     create_data_import,
     update_data_import,
+    record_pull_timings,
+    InventoryPullStatusBatch,
     MARKETPLACE_UUIDS
 )
 
 # Import new resilience modules
 from utils.api_client import SPAPIClient, SPAPIError
+from utils.async_client import get_sp_api_client
 from utils.alerting import alert_failure
+from utils.metrics import PullTimings, get_metrics, timed_stage
+from utils.pipeline import Pipeline, Stage, WriterPool, API_WORKERS, DB_WORKERS
+from utils.inventory_storage import InventoryRangeWriter, writes_daily_rows, writes_ranges
+from utils.profiling import add_profile_argument, start_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -71,6 +82,16 @@ MARKETPLACES_BY_REGION = {
 }
 
 
+def uses_inventory_report(region: str) -> bool:
+    """EU/FE/UAE pull the MYI report (includes EFN cross-border stock), NA the API."""
+    return region.upper() in ("EU", "FE", "UAE")
+
+
+def inventory_report_type(region: str) -> str:
+    """sp_inventory_pulls.report_type for a region's FBA inventory pull."""
+    return "FBA_INVENTORY_REPORT" if uses_inventory_report(region) else "FBA_INVENTORY_API"
+
+
 def create_inventory_pull_record(
     marketplace_code: str,
     report_type: str,
@@ -119,10 +140,12 @@ def update_inventory_pull_status(
     client.table("sp_inventory_pulls").update(update_data).eq("id", pull_id).execute()
 
 
+@timed_stage("db_upsert")
 def upsert_fba_inventory(
     rows: List[Dict[str, Any]],
     marketplace_code: str,
-    import_id: str
+    import_id: str,
+    ranges: InventoryRangeWriter = None
 ) -> int:
     """
     Upsert FBA inventory data to database.
@@ -131,6 +154,7 @@ def upsert_fba_inventory(
         rows: Transformed inventory records from the API
         marketplace_code: Marketplace code
         import_id: Data import tracking ID
+        ranges: Range writer for the marketplace's pull (SP_INVENTORY_STORAGE=ranges/both)
 
     Returns:
         Number of rows upserted
@@ -142,6 +166,11 @@ def upsert_fba_inventory(
     if not rows:
         return 0
 
+    if ranges is not None:
+        ranges.write(rows, import_id)
+    if not writes_daily_rows():
+        return len(rows)
+
     # Add date, marketplace_id, and import_id to each row
     db_rows = []
     for row in rows:
@@ -158,23 +187,27 @@ def upsert_fba_inventory(
         chunk_size = 500
         for i in range(0, len(db_rows), chunk_size):
             chunk = db_rows[i:i + chunk_size]
-            client.table("sp_fba_inventory").upsert(
-                chunk,
-                on_conflict="date,marketplace_id,sku"
-            ).execute()
+            with get_metrics().timed("db_upsert_chunk"):
+                client.table("sp_fba_inventory").upsert(
+                    chunk,
+                    on_conflict="date,marketplace_id,sku"
+                ).execute()
 
     return len(db_rows)
 
 
-def pull_marketplace_inventory(
-    marketplace_code: str,
+def run_inventory_pipeline(
+    marketplaces: List[str],
     region: str = "NA",
     dry_run: bool = False,
     client: SPAPIClient = None,
-    access_token: str = None
-) -> Dict[str, Any]:
+    access_token: str = None,
+    records: Dict[str, Dict[str, Any]] = None,
+    statuses: InventoryPullStatusBatch = None,
+    writer_pool: WriterPool = None
+) -> List[Dict[str, Any]]:
     """
-    Pull FBA inventory for a single marketplace.
+    Pull FBA inventory for several marketplaces, overlapping them.
 
     For EU/FE regions, uses GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA report
     which includes Pan-European FBA (EFN) cross-border stock. The FBA Inventory
@@ -182,87 +215,158 @@ def pull_marketplace_inventory(
     like UAE where most inventory is fulfilled cross-border.
 
     For NA region, uses the FBA Inventory API v1 (faster, includes detailed
-    breakdowns like reserved sub-types and damaged sub-types).
+    breakdowns like reserved sub-types and damaged sub-types). Its pages are
+    streamed: batches are upserted by a store thread while the fetch thread
+    requests the next page (see stream_api_inventory), and marketplaces
+    share the client's "inventory" rate limit.
+
+    Fetching (API pages / report download), row parsing and the DB upsert of
+    different marketplaces run at the same time, with bounded queues in
+    between (see utils/pipeline.py). Report rows are parsed on a thread:
+    they may be spilled to disk (RowSpool), so they aren't shipped to a
+    worker process.
 
     Args:
-        marketplace_code: Marketplace code (e.g., 'USA')
+        marketplaces: Marketplace codes (e.g., ['USA', 'CA'])
         region: API region
         dry_run: If True, don't write to database
         client: SPAPIClient instance (handles retry and rate limiting)
         access_token: Access token (used for report-based approach)
+        records: Marketplace -> tracking record already created by
+            create_inventory_pull_records_batch (pull_inventory_all.py)
+        statuses: Batch that final statuses are added to instead of being
+            written one by one
+        writer_pool: Shared WriterPool for the store stage (multi-task runs)
 
     Returns:
-        Dict with status information
+        One status dict per marketplace, in order
     """
-    start_time = time.time()
-    use_report = region.upper() in ("EU", "FE", "UAE")
-    report_type = "FBA_INVENTORY_REPORT" if use_report else "FBA_INVENTORY_API"
-
-    print(f"\n{'='*50}")
-    print(f"Pulling FBA inventory for {marketplace_code} ({'report' if use_report else 'API'})")
-    print(f"{'='*50}")
-
-    # Create tracking records
-    import_id = None
-    pull_id = None
-
-    if not dry_run:
-        import_id = create_data_import(
-            marketplace_code,
-            date.today(),
-            import_type="sp_api_fba_inventory"
-        )
-        pull_id = create_inventory_pull_record(marketplace_code, report_type, import_id)
-
-    try:
+    use_report = uses_inventory_report(region)
+    report_type = inventory_report_type(region)
+
+    def new_job(marketplace_code: str) -> dict:
+        return {
+            "marketplace": marketplace_code,
+            "timings": PullTimings("fba_inventory", marketplace_code, date.today(), region),
+            "started": time.time(),
+            "import_id": None,
+            "pull_id": None,
+            "ranges": None,
+        }
+
+    def stream_api_inventory(job: dict) -> int:
+        """Fetch API pages and upsert each batch while the next page is fetched."""
+        marketplace_code = job["marketplace"]
+
+        def store_batch(rows: List[Dict[str, Any]]) -> int:
+            if "sample" not in job:
+                job["sample"] = rows[0]
+            if dry_run:
+                return len(rows)
+            return upsert_fba_inventory(rows, marketplace_code, job["import_id"], job["ranges"])
+
+        # The queue between fetching and storing holds at most SP_PIPELINE_QUEUE_SIZE batches
+        pages = Pipeline(f"fba_inventory_{marketplace_code.lower()}_pages", [
+            Stage("store", store_batch),
+        ], timings_of=lambda rows: job["timings"])
+        return sum(pages.run(iter_fba_inventory_batches(
+            access_token=access_token,
+            marketplace_code=marketplace_code,
+            region=region,
+            client=client
+        )))
+
+    def fetch(job: dict) -> dict:
+        marketplace_code = job["marketplace"]
+        print(f"Pulling FBA inventory for {marketplace_code} ({'report' if use_report else 'API'})")
+
+        # Create tracking records
+        if not dry_run:
+            if records and marketplace_code in records:
+                job["record"] = records[marketplace_code]
+                job["import_id"], job["pull_id"] = job["record"]["import_id"], job["record"]["pull_id"]
+            else:
+                job["import_id"] = create_data_import(
+                    marketplace_code,
+                    date.today(),
+                    import_type="sp_api_fba_inventory"
+                )
+                job["pull_id"] = create_inventory_pull_record(marketplace_code, report_type, job["import_id"])
+            if writes_ranges():
+                job["ranges"] = InventoryRangeWriter(MARKETPLACE_UUIDS[marketplace_code], date.today())
+
         if use_report:
             # EU/FE: Use report-based approach for correct EFN cross-border fulfillable
-            print(f"  Using GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA report (includes EFN cross-border)...")
-            raw_rows = pull_fba_inventory_report(
+            print(f"  {marketplace_code}: using GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA report (includes EFN cross-border)...")
+            job["raw_rows"] = pull_fba_inventory_report(
                 access_token=access_token,
                 marketplace_code=marketplace_code,
-                region=region
+                region=region,
+                client=client
             )
-            # Parse report rows to DB format
-            rows = []
+        else:
+            # NA: Use FBA Inventory API (includes detailed breakdowns), written page by page
+            job["row_count"] = stream_api_inventory(job)
+        return job
+
+    def parse(job: dict) -> dict:
+        raw_rows = job.pop("raw_rows", None)
+        if raw_rows is None:
+            return job
+        # Parse report rows to DB format
+        rows = []
+        with get_metrics().timed("parse"):
             for raw_row in raw_rows:
                 parsed = parse_fba_inventory_report_row(raw_row)
                 if parsed["sku"]:
                     rows.append(parsed)
-            print(f"  Parsed {len(rows)} inventory records from report")
-        else:
-            # NA: Use FBA Inventory API (includes detailed breakdowns)
-            rows = pull_fba_inventory(
-                access_token=access_token,
-                marketplace_code=marketplace_code,
-                region=region,
-                client=client
-            )
+        if hasattr(raw_rows, "close"):
+            raw_rows.close()
+        print(f"  Parsed {len(rows)} inventory records from {job['marketplace']} report")
+        job["rows"] = rows
+        return job
+
+    def store(job: dict) -> Dict[str, Any]:
+        marketplace_code, timings = job["marketplace"], job["timings"]
+        # API pulls were already upserted page by page while fetching
+        streamed = "row_count" in job
+        rows = job.get("rows", [])
+        row_count = job["row_count"] if streamed else len(rows)
 
         if dry_run:
-            print(f"\n[DRY RUN] Would upsert {len(rows)} inventory records")
+            print(f"\n[DRY RUN] Would upsert {row_count} {marketplace_code} inventory records")
             # Print sample
-            if rows:
+            sample = job.get("sample") or (rows[0] if rows else None)
+            if sample:
                 print("\nSample row:")
-                sample = rows[0]
                 for key, value in sample.items():
                     print(f"  {key}: {value}")
             return {
                 "status": "dry_run",
                 "marketplace": marketplace_code,
-                "row_count": len(rows)
+                "row_count": row_count
             }
 
         # Upsert to database
-        row_count = upsert_fba_inventory(rows, marketplace_code, import_id)
+        if not streamed:
+            row_count = upsert_fba_inventory(rows, marketplace_code, job["import_id"], job["ranges"])
+        if job["ranges"] is not None:
+            # The whole marketplace is in: SKUs missing from it are closed
+            job["ranges"].finish()
+            print(f"  {marketplace_code} {job['ranges'].summary_line()}")
 
-        processing_time = int((time.time() - start_time) * 1000)
+        processing_time = int((time.time() - job["started"]) * 1000)
 
         # Update tracking
-        update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
-        update_inventory_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+        if statuses is not None and "record" in job:
+            statuses.add(job["record"], "completed", row_count=row_count, processing_time_ms=processing_time)
+        else:
+            update_data_import(job["import_id"], "completed", row_count=row_count, processing_time_ms=processing_time)
+            update_inventory_pull_status(job["pull_id"], "completed", row_count=row_count, processing_time_ms=processing_time)
+        record_pull_timings(timings, "sp_inventory_pulls", job["pull_id"])
 
         print(f"\n✓ Completed: {row_count} inventory records for {marketplace_code}")
+        print(f"⏱️  {timings.summary_line()}")
 
         return {
             "status": "completed",
@@ -271,19 +375,29 @@ def pull_marketplace_inventory(
             "processing_time_ms": processing_time
         }
 
-    except SPAPIError as e:
-        error_msg = str(e)
-        logger.error(f"SP-API error for {marketplace_code}: {error_msg}")
+    def failed(job: dict, stage: str, error: Exception) -> Dict[str, Any]:
+        marketplace_code = job["marketplace"]
+        error_msg = str(error)
+
+        if isinstance(error, SPAPIError):
+            logger.error(f"SP-API error for {marketplace_code}: {error_msg}")
+            retry_count = client.stats.get("retries", 0) if client else 0
+        else:
+            logger.error(f"Error for {marketplace_code} ({stage}): {error_msg}")
+            retry_count = 0
         print(f"\n✗ Error for {marketplace_code}: {error_msg}")
 
         # Send alert
-        retry_count = client.stats.get("retries", 0) if client else 0
         alert_failure("fba_inventory", marketplace_code, error_msg, retry_count)
 
-        if not dry_run and import_id:
-            update_data_import(import_id, "failed", error_message=error_msg)
-        if not dry_run and pull_id:
-            update_inventory_pull_status(pull_id, "failed", error_message=error_msg)
+        if not dry_run and statuses is not None and "record" in job:
+            statuses.add(job["record"], "failed", error_message=error_msg)
+        elif not dry_run and job["import_id"]:
+            update_data_import(job["import_id"], "failed", error_message=error_msg)
+            if job["pull_id"]:
+                update_inventory_pull_status(job["pull_id"], "failed", error_message=error_msg)
+        if not dry_run and job["pull_id"]:
+            record_pull_timings(job["timings"], "sp_inventory_pulls", job["pull_id"])
 
         return {
             "status": "failed",
@@ -291,24 +405,30 @@ def pull_marketplace_inventory(
             "error": error_msg
         }
 
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Error for {marketplace_code}: {error_msg}")
-        print(f"\n✗ Error for {marketplace_code}: {error_msg}")
+    pipeline = Pipeline("fba_inventory", [
+        Stage("fetch", fetch, workers=API_WORKERS),
+        Stage("parse", parse),
+        Stage("store", store, workers=DB_WORKERS, executor=writer_pool),
+    ], timings_of=lambda job: job["timings"], on_error=failed)
 
-        # Send alert
-        alert_failure("fba_inventory", marketplace_code, error_msg, 0)
+    return pipeline.run(new_job(marketplace_code) for marketplace_code in marketplaces)
 
-        if not dry_run and import_id:
-            update_data_import(import_id, "failed", error_message=error_msg)
-        if not dry_run and pull_id:
-            update_inventory_pull_status(pull_id, "failed", error_message=error_msg)
 
-        return {
-            "status": "failed",
-            "marketplace": marketplace_code,
-            "error": error_msg
-        }
+def pull_marketplace_inventory(
+    marketplace_code: str,
+    region: str = "NA",
+    dry_run: bool = False,
+    client: SPAPIClient = None,
+    access_token: str = None
+) -> Dict[str, Any]:
+    """Pull FBA inventory for a single marketplace (see run_inventory_pipeline)."""
+    return run_inventory_pipeline(
+        [marketplace_code],
+        region=region,
+        dry_run=dry_run,
+        client=client,
+        access_token=access_token
+    )[0]
 
 
 def main():
@@ -331,7 +451,9 @@ def main():
         help="Pull data but don't write to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_inventory")
 
     region = args.region.upper()
 
@@ -356,27 +478,17 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("="*60)
 
-    # Get access token and create API client
-    print("\nGetting access token...")
-    access_token = get_access_token(region=region)
-    print("✓ Access token obtained")
-
-    # Create SPAPIClient with retry and rate limiting
-    client = SPAPIClient(access_token, region=region)
-
-    # Process each marketplace
-    results = []
-    for i, marketplace in enumerate(marketplaces):
-        # SPAPIClient handles rate limiting automatically - no fixed sleep needed
+    # SP-API client (async transport when httpx is installed) with retry,
+    # rate limiting and refreshing tokens
+    client = get_sp_api_client(region=region)
 
-        result = pull_marketplace_inventory(
-            marketplace_code=marketplace,
-            region=region,
-            dry_run=args.dry_run,
-            client=client,
-            access_token=access_token
-        )
-        results.append(result)
+    # Process the marketplaces (SPAPIClient handles rate limiting across the pipeline's threads)
+    results = run_inventory_pipeline(
+        marketplaces,
+        region=region,
+        dry_run=args.dry_run,
+        client=client
+    )
 
     # Log client stats
     stats = client.get_stats()
@@ -32,15 +32,17 @@ from decimal import Decimal
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
 from utils.inventory_reports import pull_inventory_report, MARKETPLACE_IDS
 from utils.db import (
     get_supabase_client,
     create_data_import,
     update_data_import,
+    InventoryPullStatusBatch,
     MARKETPLACE_UUIDS,
     AMAZON_MARKETPLACE_IDS
 )
+from utils.api_client import SPAPIClient
+from utils.profiling import add_profile_argument, start_profiling
 
 # Default marketplaces to pull
 DEFAULT_MARKETPLACES = ["USA", "CA", "MX"]
@@ -186,13 +188,19 @@ def pull_marketplace_inventory_age(
     marketplace_code: str,
     region: str = "NA",
     dry_run: bool = False,
-    use_fallback: bool = False
+    use_fallback: bool = False,
+    client: SPAPIClient = None,
+    record: Dict[str, Any] = None,
+    statuses: InventoryPullStatusBatch = None
 ) -> Dict[str, Any]:
     """
     Pull inventory age for a single marketplace.
 
     Args:
         use_fallback: If True, use GET_FBA_MYI_ALL_INVENTORY_DATA instead of INVENTORY_AGE
+        client: Shared SPAPIClient (retry, rate limiting); access_token may then be None
+        record: Tracking record already created by create_inventory_pull_records_batch
+        statuses: Batch that the final status is added to instead of being written directly
     """
     start_time = time.time()
     report_type_key = "FBA_ALL_INVENTORY" if use_fallback else "INVENTORY_AGE"
@@ -206,7 +214,9 @@ def pull_marketplace_inventory_age(
     import_id = None
     pull_id = None
 
-    if not dry_run:
+    if not dry_run and record is not None:
+        import_id, pull_id = record["import_id"], record["pull_id"]
+    elif not dry_run:
         import_id = create_data_import(
             marketplace_code,
             date.today(),
@@ -216,7 +226,7 @@ def pull_marketplace_inventory_age(
 
     try:
         # Pull the report
-        rows = pull_inventory_report(access_token, marketplace_code, report_type_key, region)
+        rows = pull_inventory_report(access_token, marketplace_code, report_type_key, region, client=client)
 
         if dry_run:
             print(f"\n[DRY RUN] Would upsert {len(rows)} inventory age records")
@@ -238,8 +248,11 @@ def pull_marketplace_inventory_age(
         processing_time = int((time.time() - start_time) * 1000)
 
         # Update tracking
-        update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
-        update_inventory_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+        if statuses is not None and record is not None:
+            statuses.add(record, "completed", row_count=row_count, processing_time_ms=processing_time)
+        else:
+            update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+            update_inventory_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
 
         print(f"\n✓ Completed: {row_count} inventory age records for {marketplace_code}")
 
@@ -254,10 +267,13 @@ def pull_marketplace_inventory_age(
         error_msg = str(e)
         print(f"\n✗ Error for {marketplace_code}: {error_msg}")
 
-        if not dry_run and import_id:
-            update_data_import(import_id, "failed", error_message=error_msg)
-        if not dry_run and pull_id:
-            update_inventory_pull_status(pull_id, "failed", error_message=error_msg)
+        if not dry_run and statuses is not None and record is not None:
+            statuses.add(record, "failed", error_message=error_msg)
+        else:
+            if not dry_run and import_id:
+                update_data_import(import_id, "failed", error_message=error_msg)
+            if not dry_run and pull_id:
+                update_inventory_pull_status(pull_id, "failed", error_message=error_msg)
 
         return {
             "status": "failed",
@@ -284,7 +300,9 @@ def main():
         help="Use fallback report type (GET_FBA_MYI_ALL_INVENTORY_DATA)"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_inventory_age")
 
     # Determine marketplaces to process
     if args.marketplace:
@@ -308,10 +326,8 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("="*60)
 
-    # Get access token
-    print("\nGetting access token...")
-    access_token = get_access_token()
-    print("✓ Access token obtained")
+    # Shared client: refreshing tokens, retry and rate limiting
+    client = SPAPIClient(region="NA")
 
     # Process each marketplace
     results = []
@@ -321,11 +337,12 @@ def main():
             time.sleep(65)
 
         result = pull_marketplace_inventory_age(
-            access_token,
+            None,
             marketplace,
             region="NA",
             dry_run=args.dry_run,
-            use_fallback=args.fallback
+            use_fallback=args.fallback,
+            client=client
         )
         results.append(result)
 
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Pull all Inventory Data in one run
+
+Runs the FBA inventory, AWD inventory, inventory age and storage fee pulls
+(pull_inventory.py, pull_awd_inventory.py, pull_inventory_age.py,
+pull_storage_fees.py) as concurrent tasks in a single process, instead of
+one workflow step after another with fixed sleeps in between.
+
+Features:
+- All regions run at once (utils/region_runner.py); in each region the tasks
+  run at the same time, so the FBA/AWD API paginations overlap with the
+  report-based pulls waiting on Amazon
+- One access token and one SPAPIClient per region shared by every task:
+  one token refresh, one pooled HTTP session, and one rate limiter, which
+  spaces createReport calls instead of the scripts' fixed 65-second sleeps
+- One WriterPool shared by the FBA inventory store stages of all regions
+- Tracking is batched: every data_imports / sp_inventory_pulls record is
+  created up front in two requests and final statuses are written in bulk
+  (InventoryPullStatusBatch)
+- One consolidated Slack summary / partial-failure alert for the whole run
+
+Tasks (--tasks, comma-separated):
+- fba:     FBA inventory, every region (API in NA, MYI report elsewhere)
+- awd:     AWD inventory, NA (USA) only
+- age:     Inventory age report, NA marketplaces
+- storage: Storage fee report for --storage-month (default: previous month),
+           every region. Included by default only on STORAGE_FEE_DAYS, the
+           days Amazon's late-published data is retried on
+
+Usage:
+    python pull_inventory_all.py                          # Everything due today, all regions
+    python pull_inventory_all.py --region NA              # One region
+    python pull_inventory_all.py --tasks fba,awd          # Only some tasks
+    python pull_inventory_all.py --tasks storage --storage-month 2026-01
+    python pull_inventory_all.py --dry-run                # Test without DB writes
+
+Environment Variables Required:
+    SP_LWA_CLIENT_ID, SP_LWA_CLIENT_SECRET, SP_REFRESH_TOKEN_<REGION>
+    SUPABASE_URL, SUPABASE_SERVICE_KEY
+"""
+
+import os
+import sys
+import argparse
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.api_client import SPAPIClient
+from utils.db import create_inventory_pull_records_batch, InventoryPullStatusBatch
+from utils.inventory_reports import MARKETPLACE_IDS, REPORT_TYPES
+from utils.pipeline import WriterPool
+from utils.region_runner import ALL_REGIONS, configured_regions, run_regions, send_region_summary
+from utils.profiling import add_profile_argument, start_profiling
+
+from pull_inventory import run_inventory_pipeline, inventory_report_type, MARKETPLACES_BY_REGION
+from pull_awd_inventory import pull_awd, DEFAULT_MARKETPLACE as AWD_MARKETPLACE
+from pull_inventory_age import pull_marketplace_inventory_age, DEFAULT_MARKETPLACES as AGE_MARKETPLACES
+from pull_storage_fees import pull_marketplace_storage_fees
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ALL_TASKS = ["fba", "awd", "age", "storage"]
+
+# Tasks whose failures are reported (summary, Slack alert) but don't fail the
+# run's exit code: the inventory age report often ends FATAL / isn't ready,
+# and its workflow step used to be continue-on-error
+NON_FATAL_TASKS = ("age",)
+
+# Days of the month the storage fee report is pulled by default (see storage-fees-monthly.yml)
+STORAGE_FEE_DAYS = (5, 10, 15)
+
+
+def previous_month(today: date) -> date:
+    """1st of the month before today's."""
+    if today.month == 1:
+        return date(today.year - 1, 12, 1)
+    return date(today.year, today.month - 1, 1)
+
+
+def plan_region(
+    region: str,
+    tasks: List[str],
+    marketplace: Optional[str],
+    storage_month: date,
+    age_fallback: bool
+) -> List[Dict[str, Any]]:
+    """
+    The (task, marketplace) units one region will pull, with the
+    sp_inventory_pulls report type and date each is tracked under.
+    """
+    region_marketplaces = MARKETPLACES_BY_REGION[region]
+    if marketplace:
+        region_marketplaces = [mp for mp in region_marketplaces if mp == marketplace]
+
+    age_report = REPORT_TYPES["FBA_ALL_INVENTORY" if age_fallback else "INVENTORY_AGE"]
+    units = []
+    for task in tasks:
+        if task == "fba":
+            units += [{"task": task, "marketplace": mp, "report_type": inventory_report_type(region),
+                       "pull_date": date.today(), "import_type": "sp_api_fba_inventory"}
+                      for mp in region_marketplaces]
+        elif task == "awd" and region == "NA" and marketplace in (None, AWD_MARKETPLACE):
+            units.append({"task": task, "marketplace": AWD_MARKETPLACE, "report_type": "AWD_INVENTORY_API",
+                          "pull_date": date.today(), "import_type": "sp_api_awd_inventory"})
+        elif task == "age":
+            units += [{"task": task, "marketplace": mp, "report_type": age_report,
+                       "pull_date": date.today(), "import_type": "sp_api_inventory_age"}
+                      for mp in region_marketplaces if mp in AGE_MARKETPLACES]
+        elif task == "storage":
+            units += [{"task": task, "marketplace": mp, "report_type": REPORT_TYPES["STORAGE_FEES"],
+                       "pull_date": storage_month, "import_type": "sp_api_storage_fees"}
+                      for mp in region_marketplaces]
+    return units
+
+
+def pull_region_inventory(
+    region: str,
+    units: List[Dict[str, Any]],
+    storage_month: date,
+    age_fallback: bool,
+    dry_run: bool,
+    statuses: Optional[InventoryPullStatusBatch],
+    writer_pool: WriterPool
+) -> List[Dict[str, Any]]:
+    """
+    Run one region's units concurrently on a shared SPAPIClient.
+
+    The FBA inventory marketplaces form one task (they already run as a
+    pipeline); AWD and every report marketplace are tasks of their own.
+    The client's rate limiter keeps their createReport calls spaced.
+    """
+    # One token provider, session and rate limiter for every task in the region
+    client = SPAPIClient(region=region)
+
+    def run_fba(fba_units: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return run_inventory_pipeline(
+            [unit["marketplace"] for unit in fba_units],
+            region=region,
+            dry_run=dry_run,
+            client=client,
+            records={unit["marketplace"]: unit["record"] for unit in fba_units if unit.get("record")},
+            statuses=statuses,
+            writer_pool=writer_pool
+        )
+
+    def run_unit(unit: Dict[str, Any]) -> List[Dict[str, Any]]:
+        common = {"dry_run": dry_run, "client": client, "record": unit.get("record"), "statuses": statuses}
+        if unit["task"] == "awd":
+            return [pull_awd(marketplace_code=unit["marketplace"], region=region, **common)]
+        if unit["task"] == "age":
+            return [pull_marketplace_inventory_age(None, unit["marketplace"], region=region,
+                                                   use_fallback=age_fallback, **common)]
+        return [pull_marketplace_storage_fees(None, unit["marketplace"], storage_month, region=region, **common)]
+
+    fba_units = [unit for unit in units if unit["task"] == "fba"]
+    tasks: List[tuple] = [(unit["task"], lambda unit=unit: run_unit(unit)) for unit in units if unit["task"] != "fba"]
+    if fba_units:
+        tasks.insert(0, ("fba", lambda: run_fba(fba_units)))
+
+    def run_task(task: str, func: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        started = time.time()
+        results = func()
+        for result in results:
+            result["task"] = task
+        print(f"📦 {region} {task} ({', '.join(r['marketplace'] for r in results)}) "
+              f"finished in {time.time() - started:.1f}s")
+        return results
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(len(tasks), 1), thread_name_prefix=f"inv-{region}") as executor:
+        futures = [executor.submit(run_task, task, func) for task, func in tasks]
+        for future in futures:
+            results += future.result()
+
+    stats = client.get_stats()
+    logger.info(f"{region} API stats: {stats['requests']} requests, {stats['retries']} retries")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull FBA, AWD, inventory age and storage fee data concurrently")
+    parser.add_argument(
+        "--region",
+        type=str,
+        default="ALL",
+        choices=ALL_REGIONS + ["ALL"],
+        help="Region to pull. Default: ALL"
+    )
+    parser.add_argument(
+        "--marketplace",
+        type=str,
+        help="Only this marketplace (e.g., USA)"
+    )
+    parser.add_argument(
+        "--tasks",
+        type=str,
+        help=f"Comma-separated tasks ({','.join(ALL_TASKS)}). "
+             f"Default: fba,awd,age (+storage on days {', '.join(map(str, STORAGE_FEE_DAYS))})"
+    )
+    parser.add_argument(
+        "--storage-month",
+        type=str,
+        help="Month to pull storage fees for (YYYY-MM). Default: previous month"
+    )
+    parser.add_argument(
+        "--age-fallback",
+        action="store_true",
+        help="Use fallback report type for inventory age (GET_FBA_MYI_ALL_INVENTORY_DATA)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Pull data but don't write to database"
+    )
+
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_profiling(args.profile, "pull_inventory_all")
+
+    if args.tasks:
+        tasks = [task.strip().lower() for task in args.tasks.split(",") if task.strip()]
+        unknown = [task for task in tasks if task not in ALL_TASKS]
+        if unknown:
+            print(f"Error: Unknown task(s) {', '.join(unknown)}. Valid: {', '.join(ALL_TASKS)}")
+            sys.exit(1)
+    else:
+        tasks = ["fba", "awd", "age"]
+        if date.today().day in STORAGE_FEE_DAYS:
+            tasks.append("storage")
+
+    if args.storage_month:
+        try:
+            storage_month = datetime.strptime(args.storage_month, "%Y-%m").date()
+        except ValueError:
+            print(f"Error: Invalid month format '{args.storage_month}'. Use YYYY-MM.")
+            sys.exit(1)
+    else:
+        storage_month = previous_month(date.today())
+
+    marketplace = args.marketplace.upper() if args.marketplace else None
+    if marketplace and marketplace not in MARKETPLACE_IDS:
+        print(f"Error: Invalid marketplace '{marketplace}'")
+        sys.exit(1)
+
+    # Regions without a refresh token are skipped before any records are created
+    regions = configured_regions(ALL_REGIONS if args.region == "ALL" else [args.region])
+
+    print("=" * 60)
+    print("INVENTORY PULL (ALL TASKS)")
+    print(f"Date: {date.today()}")
+    print(f"Regions: {', '.join(regions)}")
+    print(f"Tasks: {', '.join(tasks)}" + (f" (storage month {storage_month:%Y-%m})" if "storage" in tasks else ""))
+    print(f"Dry run: {args.dry_run}")
+    print("=" * 60)
+
+    units_by_region = {
+        region: plan_region(region, tasks, marketplace, storage_month, args.age_fallback)
+        for region in regions
+    }
+
+    # All tracking records in two requests; statuses are written in bulk as tasks finish
+    statuses = None
+    if not args.dry_run:
+        all_units = [unit for units in units_by_region.values() for unit in units]
+        records = create_inventory_pull_records_batch([
+            (unit["marketplace"], unit["report_type"], unit["pull_date"], unit["import_type"])
+            for unit in all_units
+        ])
+        for unit, record in zip(all_units, records):
+            unit["record"] = record
+        statuses = InventoryPullStatusBatch()
+
+    started = time.time()
+    try:
+        results_by_region = run_regions(
+            regions,
+            lambda region, writers: pull_region_inventory(
+                region,
+                units_by_region[region],
+                storage_month,
+                args.age_fallback,
+                args.dry_run,
+                statuses,
+                writers
+            )
+        )
+    finally:
+        if statuses is not None:
+            statuses.flush()
+    duration = time.time() - started
+
+    # Summary
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+
+    failed = 0
+    non_fatal = 0
+    total_rows = 0
+    for region, results in results_by_region.items():
+        for result in results:
+            # Label by task as well: one marketplace has several results
+            result["marketplace"] = f"{result['marketplace']} {result.get('task', region)}"
+            if result["status"] in ("completed", "dry_run"):
+                total_rows += result.get("row_count", 0) or 0
+                print(f"  {region}/{result['marketplace']}: ✓ {result.get('row_count', 0)} records")
+            else:
+                if result.get("task") in NON_FATAL_TASKS:
+                    non_fatal += 1
+                else:
+                    failed += 1
+                print(f"  {region}/{result['marketplace']}: ✗ {result.get('error', 'Unknown error')}")
+
+    print(f"\nTotal: {total_rows} records in {duration:.1f}s, {failed} failed")
+    if non_fatal:
+        print(f"  + {non_fatal} inventory age failures (reported, not failing the run)")
+
+    if not args.dry_run:
+        send_region_summary("inventory", date.today().isoformat(), results_by_region, duration, row_key="row_count")
+
+    if failed > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,7 @@ Environment Variables Required:
 
 Optional Environment Variables:
     SLACK_WEBHOOK_URL     - Slack webhook for failure alerts
+    SP_PIPELINE_*         - Pipeline workers / queue size (see utils/pipeline.py)
 """
 
 import os
@@ -43,11 +44,14 @@ from typing import List, Optional
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token
-from scripts.utils.orders_reports import pull_orders_report
-from scripts.utils.db import upsert_orders_asin_data, MARKETPLACE_UUIDS
-from scripts.utils.api_client import SPAPIClient, SPAPIError
+from scripts.utils.orders_reports import fetch_orders_report_body, parse_orders_report_body
+from scripts.utils.db import record_pull_timings, MARKETPLACE_UUIDS
+from scripts.utils.api_client import SPAPIClient
 from scripts.utils.alerting import alert_failure, send_summary
+from scripts.utils.metrics import PullTimings
+from scripts.utils.spool import get_spool, drain_pending, SpoolPending
+from scripts.utils.pipeline import Pipeline, Stage, API_WORKERS, DB_WORKERS
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -91,89 +95,118 @@ def get_marketplace_date(marketplace_code: str, days_ago: int = 0) -> date:
     return target_date
 
 
-def pull_orders_for_marketplace(
-    marketplace_code: str,
-    report_date: date,
+def run_orders_pipeline(
+    targets: List[tuple],
     region: str = "NA",
     client: SPAPIClient = None,
     dry_run: bool = False
-) -> dict:
+) -> List[dict]:
     """
-    Pull and upsert orders data for a single marketplace and date.
+    Pull and upsert orders for (marketplace_code, report_date) targets.
 
-    Args:
-        marketplace_code: Marketplace code (e.g., 'USA')
-        report_date: Date to pull orders for
-        region: API region
-        client: SPAPIClient instance
-        dry_run: If True, pull and aggregate but don't upsert
+    Reports overlap instead of running one after another: create/poll/download
+    run on API worker threads, TSV parsing + ASIN aggregation in a process
+    pool, and upserts on DB worker threads, with bounded queues in between
+    (see utils/pipeline.py).
 
     Returns:
-        Dict with status and counts
+        One result dict per target, in order
     """
-    result = {
-        "marketplace": marketplace_code,
-        "date": report_date.isoformat(),
-        "status": "pending",
-        "asin_count": 0,
-        "error": None
-    }
-
-    start_time = time.time()
-
-    try:
-        print(f"\n{'='*50}")
-        print(f"📦 Pulling orders for {marketplace_code} on {report_date}")
-        print(f"{'='*50}")
-
-        # Pull orders report (create → poll → download → aggregate)
-        aggregated = pull_orders_report(
-            marketplace_code=marketplace_code,
-            report_date=report_date,
+    def new_job(target) -> dict:
+        marketplace_code, report_date = target
+        return {
+            "marketplace": marketplace_code,
+            "date": report_date,
+            "timings": PullTimings("orders", marketplace_code, report_date, region),
+            "started": time.time(),
+            "result": {
+                "marketplace": marketplace_code,
+                "date": report_date.isoformat(),
+                "status": "pending",
+                "asin_count": 0,
+                "error": None
+            },
+        }
+
+    def fetch(job: dict) -> dict:
+        print(f"📦 Pulling orders for {job['marketplace']} on {job['date']}")
+        # create → poll → download (parsed in the next stage)
+        job["body"], job["compression"] = fetch_orders_report_body(
+            marketplace_code=job["marketplace"],
+            report_date=job["date"],
             region=region,
             client=client
         )
+        return job
+
+    def parsed(job: dict, aggregated: list) -> dict:
+        job["body"] = None
+        job["rows"] = aggregated
+        return job
+
+    def store(job: dict) -> dict:
+        marketplace_code, result, timings = job["marketplace"], job["result"], job["timings"]
+        aggregated = job["rows"]
 
         if not aggregated:
-            print(f"⚠️  No orders data for {marketplace_code} on {report_date}")
+            print(f"⚠️  No orders data for {marketplace_code} on {job['date']}")
             result["status"] = "completed"
-            result["asin_count"] = 0
-            return result
-
-        # Upsert to database (skips ASINs with existing S&T data)
-        if dry_run:
-            print(f"🏃 DRY RUN - would upsert {len(aggregated)} ASINs")
+        elif dry_run:
+            print(f"🏃 DRY RUN - would upsert {len(aggregated)} ASINs for {marketplace_code} {job['date']}")
             result["asin_count"] = len(aggregated)
+            result["status"] = "completed"
         else:
-            upserted = upsert_orders_asin_data(
-                rows=aggregated,
-                marketplace_code=marketplace_code,
-                report_date=report_date
-            )
-            result["asin_count"] = upserted
-            print(f"💾 Upserted {upserted} ASINs (of {len(aggregated)} aggregated)")
-
-        elapsed_ms = int((time.time() - start_time) * 1000)
-        result["status"] = "completed"
-        print(f"✅ {marketplace_code} orders completed in {elapsed_ms}ms")
-
-    except SPAPIError as e:
-        error_msg = str(e)
+            # Spooled to disk first; if Supabase stays down the rows are
+            # written by the next run instead of re-requesting the report
+            try:
+                upserted = get_spool("orders").write_through(
+                    "upsert_orders_asin_data",
+                    rows=aggregated,
+                    marketplace_code=marketplace_code,
+                    report_date=job["date"]
+                )
+            except SpoolPending as e:
+                result["status"] = "spooled"
+                result["error"] = e.error
+                print(f"📼 {marketplace_code}: {e}")
+            else:
+                result["asin_count"] = upserted
+                result["status"] = "completed"
+                print(f"💾 {marketplace_code} {job['date']}: upserted {upserted} ASINs (of {len(aggregated)} aggregated)")
+
+        if result["status"] == "completed":
+            elapsed_ms = int((time.time() - job["started"]) * 1000)
+            print(f"✅ {marketplace_code} {job['date']} orders completed in {elapsed_ms}ms")
+            print(f"⏱️  {timings.summary_line()}")
+
+        # Orders have no pull record; timings go to sp_pull_stage_timings only
+        if not dry_run:
+            record_pull_timings(timings)
+        return result
+
+    def failed(job: dict, stage: str, error: Exception) -> dict:
+        marketplace_code, result = job["marketplace"], job["result"]
+        error_msg = str(error)
         result["status"] = "failed"
         result["error"] = error_msg
-        logger.error(f"{marketplace_code} orders failed: {error_msg}")
-        print(f"❌ {marketplace_code} orders failed: {error_msg}")
+        logger.error(f"{marketplace_code} orders failed ({stage}): {error_msg}")
+        print(f"❌ {marketplace_code} {job['date']} orders failed: {error_msg}")
         alert_failure("orders", marketplace_code, error_msg, 0)
+        if not dry_run:
+            record_pull_timings(job["timings"])
+        return result
 
-    except Exception as e:
-        error_msg = str(e)
-        result["status"] = "failed"
-        result["error"] = error_msg
-        logger.error(f"{marketplace_code} orders failed: {error_msg}")
-        print(f"❌ {marketplace_code} orders failed: {error_msg}")
-        alert_failure("orders", marketplace_code, error_msg, 0)
+    pipeline = Pipeline("orders", [
+        Stage("report", fetch, workers=API_WORKERS),
+        Stage(
+            "parse", parse_orders_report_body, processes=True,
+            args=lambda job: (job["body"], job["compression"], job["date"], job["marketplace"]),
+            merge=parsed
+        ),
+        Stage("store", store, workers=DB_WORKERS),
+    ], timings_of=lambda job: job["timings"], on_error=failed)
 
-    return result
+    return pipeline.run(new_job(target) for target in targets)
 
 
 def pull_orders_region(
@@ -205,12 +238,8 @@ def pull_orders_region(
     """
     pull_start_time = time.time()
 
-    # Get access token
-    print("🔑 Getting access token...")
-    access_token = get_access_token(region=region)
-
-    # Create SPAPIClient
-    client = SPAPIClient(access_token, region=region)
+    # Create SPAPIClient (tokens come from the refreshing token provider)
+    client = SPAPIClient(region=region)
 
     # Determine marketplaces (priority: marketplaces_filter > marketplace_filter > region default)
     if marketplaces_filter:
@@ -220,7 +249,7 @@ def pull_orders_region(
     else:
         marketplaces = MARKETPLACES_BY_REGION.get(region.upper(), [])
 
-    results = []
+    targets = []
 
     for marketplace_code in marketplaces:
         if report_date:
@@ -245,26 +274,23 @@ def pull_orders_region(
                 dates_to_pull = [today, yesterday]
                 print(f"   📅 {marketplace_code}: today={today}, yesterday={yesterday}")
 
-        for pull_date in dates_to_pull:
-            result = pull_orders_for_marketplace(
-                marketplace_code=marketplace_code,
-                report_date=pull_date,
-                region=region,
-                client=client,
-                dry_run=dry_run
-            )
-            results.append(result)
+        targets.extend((marketplace_code, pull_date) for pull_date in dates_to_pull)
+
+    results = run_orders_pipeline(targets, region=region, client=client, dry_run=dry_run)
 
     # Summary
     duration = time.time() - pull_start_time
     total_asins = sum(r["asin_count"] for r in results)
     completed = [r for r in results if r["status"] == "completed"]
+    spooled = [r for r in results if r["status"] == "spooled"]
     failed = [r for r in results if r["status"] == "failed"]
 
     print("\n" + "=" * 60)
     print("📊 ORDERS PULL SUMMARY")
     print("=" * 60)
     print(f"✅ Completed: {len(completed)}")
+    if spooled:
+        print(f"📼 Spooled (not yet in Supabase): {len(spooled)}")
     print(f"❌ Failed: {len(failed)}")
     print(f"📦 Total ASINs: {total_asins}")
     print(f"⏱️  Duration: {duration:.1f}s")
@@ -332,7 +358,9 @@ def main():
         help="Pull and aggregate but don't upsert to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_orders_daily")
 
     # Parse date if provided
     report_date = None
@@ -366,6 +394,10 @@ def main():
         print("🏃 DRY RUN MODE")
     print()
 
+    # Write anything an earlier run spooled but couldn't store
+    if not args.dry_run:
+        drain_pending("orders")
+
     # Run the pull
     results = pull_orders_region(
         region=args.region,
@@ -381,7 +413,12 @@ def main():
     completed = [r for r in results if r["status"] == "completed"]
     failed = [r for r in results if r["status"] == "failed"]
 
-    if not completed and failed:
+    # Records still on disk (this run's or an earlier one's) aren't in Supabase yet
+    pending = 0 if args.dry_run else get_spool("orders").pending()
+    if pending:
+        print(f"\n❌ {pending} spooled record(s) not yet written to Supabase")
+        sys.exit(1)
+    elif not completed and failed:
         print("\n❌ All pulls failed")
         sys.exit(1)
     elif failed:
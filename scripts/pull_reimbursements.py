@@ -13,8 +13,13 @@ row to the correct marketplace using the currency-unit field:
   FE:  AUD→AU
   UAE: AED→UAE (separate seller account, own refresh token)
 
+Incremental: each region's latest approval date is kept in sp_pull_watermarks
+(migrations/012_financial_watermarks.sql). Without --start-date the report
+window starts WATERMARK_OVERLAP_DAYS before the watermark (60 days back on
+a region's first pull), so a weekly run only re-reads the last few days.
+
 Usage:
-    python pull_reimbursements.py                           # Last 60 days, all regions
+    python pull_reimbursements.py                           # Since the watermark
     python pull_reimbursements.py --start-date 2024-01-01   # Backfill from date
     python pull_reimbursements.py --marketplace USA         # Single marketplace
     python pull_reimbursements.py --dry-run                 # Test without DB writes
@@ -35,12 +40,12 @@ import sys
 import argparse
 import time
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
+from utils.api_client import SPAPIClient
 from utils.financial_reports import (
     pull_reimbursement_report,
     FINANCIAL_REPORT_TYPES
@@ -53,8 +58,11 @@ from utils.db import (
     create_financial_pull_record,
     update_financial_pull_status,
     upsert_reimbursements,
+    get_pull_watermark,
+    set_pull_watermark,
     MARKETPLACE_UUIDS,
 )
+from utils.profiling import add_profile_argument, start_profiling
 
 MARKETPLACES_BY_REGION = {
     "NA": ["USA", "CA", "MX"],
@@ -72,6 +80,11 @@ REGION_ANCHOR_MARKETPLACE = {
     "UAE": "UAE"
 }
 
+# Window start without --start-date: before the watermark (reimbursements can
+# show up a few days after their approval date), or back this far on a first pull
+WATERMARK_OVERLAP_DAYS = 7
+DEFAULT_LOOKBACK_DAYS = 60
+
 # Currency → marketplace code mapping for per-row resolution
 # Amazon's reimbursement report returns currency-unit which tells us
 # the actual marketplace the reimbursement belongs to
@@ -134,6 +147,25 @@ def resolve_marketplace_from_currency(currency: str, region: str) -> str:
     return REGION_ANCHOR_MARKETPLACE.get(region, "USA")
 
 
+def get_default_start_date(region: str) -> date:
+    """Start of the report window: the region's watermark minus the overlap."""
+    watermark = get_pull_watermark(region, FINANCIAL_REPORT_TYPES["REIMBURSEMENTS"])
+    if watermark is None:
+        return date.today() - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    return min(watermark - timedelta(days=WATERMARK_OVERLAP_DAYS), date.today())
+
+
+def latest_approval_date(db_rows: List[Dict], end_date: date) -> Optional[date]:
+    """Newest approval date among the rows (not past end_date), for the watermark."""
+    dates = [row["approval_date"][:10] for row in db_rows if row.get("approval_date")]
+    if not dates:
+        return None
+    try:
+        return min(date.fromisoformat(max(dates)), end_date)
+    except ValueError:
+        return None
+
+
 def transform_reimbursement_rows(
     rows: List[Dict],
     region: str,
@@ -208,7 +240,7 @@ def transform_reimbursement_rows(
 
 
 def pull_region_reimbursements(
-    access_token: str,
+    client: SPAPIClient,
     region: str,
     start_date: date,
     end_date: date,
@@ -222,7 +254,7 @@ def pull_region_reimbursements(
     marketplace_id is passed. So we only need one API call per region.
 
     Args:
-        access_token: Valid SP-API access token
+        client: SPAPIClient for the region (refreshing token, rate limits)
         region: Region code (NA, EU, FE, UAE)
         start_date: Start of date range
         end_date: End of date range
@@ -266,7 +298,7 @@ def pull_region_reimbursements(
     try:
         # Pull the report ONCE (create → poll → download)
         rows = pull_reimbursement_report(
-            access_token, anchor_mp, region, start_date, end_date
+            None, anchor_mp, region, start_date, end_date, client=client
         )
 
         print(f"  Downloaded: {len(rows)} raw rows from Amazon")
@@ -292,6 +324,11 @@ def pull_region_reimbursements(
         row_count = upsert_reimbursements(db_rows)
         processing_time = int((time.time() - start_time) * 1000)
 
+        # Advance the region's watermark once the rows are stored
+        watermark = latest_approval_date(db_rows, end_date)
+        if watermark:
+            watermark = set_pull_watermark(region, report_type, watermark)
+
         # Update tracking
         update_data_import(
             import_id, "completed",
@@ -305,11 +342,14 @@ def pull_region_reimbursements(
         )
 
         print(f"\n  ✓ Completed: {row_count} reimbursement records for {region} region")
+        if watermark:
+            print(f"  Watermark: {watermark}")
 
         return {
             "status": "completed",
             "region": region,
             "row_count": row_count,
+            "watermark": watermark.isoformat() if watermark else None,
             "processing_time_ms": processing_time
         }
 
@@ -336,7 +376,8 @@ def main():
     parser.add_argument(
         "--start-date",
         type=str,
-        help="Start date (YYYY-MM-DD). Default: 60 days ago."
+        help=f"Start date (YYYY-MM-DD). Default: {WATERMARK_OVERLAP_DAYS} days before the "
+             f"region's watermark ({DEFAULT_LOOKBACK_DAYS} days ago on a first pull)."
     )
     parser.add_argument(
         "--end-date",
@@ -362,7 +403,9 @@ def main():
         help="Pull data but don't write to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_reimbursements")
 
     region = args.region.upper()
 
@@ -370,12 +413,13 @@ def main():
     if args.start_date:
         start_date = date.fromisoformat(args.start_date)
     else:
-        start_date = date.today() - timedelta(days=60)
+        start_date = get_default_start_date(region)
 
     if args.end_date:
         end_date = date.fromisoformat(args.end_date)
     else:
         end_date = date.today()
+    start_date = min(start_date, end_date)
 
     # Validate marketplace if provided
     if args.marketplace:
@@ -399,14 +443,12 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("=" * 60)
 
-    # Get access token for this region
-    print("\nGetting access token...")
-    access_token = get_access_token(region=region)
-    print("✓ Access token obtained")
+    # Client for this region (refreshing token, retry and rate limiting)
+    client = SPAPIClient(region=region)
 
     # Pull ONCE for the entire region
     result = pull_region_reimbursements(
-        access_token,
+        client,
         region,
         start_date,
         end_date,
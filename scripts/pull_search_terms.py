@@ -32,9 +32,9 @@ from datetime import date, datetime
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token
 from scripts.utils.api_client import SPAPIClient, SPAPIError
 from scripts.utils.alerting import alert_failure, alert_partial, send_summary
+from scripts.utils.metrics import PullTimings
 from scripts.utils.db import (
     MARKETPLACE_UUIDS,
     get_sqp_keywords_for_matching,
@@ -42,6 +42,7 @@ from scripts.utils.db import (
     create_search_terms_pull_record,
     update_search_terms_pull_status,
     get_existing_search_terms_pull,
+    record_pull_timings,
 )
 from scripts.utils.search_terms_reports import (
     create_search_terms_report,
@@ -54,6 +55,7 @@ from scripts.utils.sqp_reports import (
     get_latest_available_month,
     poll_report_status,
 )
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -115,134 +117,140 @@ def pull_for_marketplace(
         "total_rows": 0,
         "error": None
     }
+    timings = PullTimings("search_terms", marketplace_code, period_start, region)
 
-    try:
-        # Step 1: Check existing pull
-        existing = get_existing_search_terms_pull(
-            marketplace_code, period_start, period_end, period_type
-        )
-        if existing and existing["status"] == "completed" and not force:
-            result["status"] = "skipped"
-            result["matched_terms"] = existing.get("matched_terms_count", 0)
-            result["total_rows"] = existing.get("total_rows", 0)
-            print(f"  Already completed ({result['total_rows']} rows). Use --force to re-pull.")
-            return result
-
-        # Step 2: Load SQP keywords for filtering
-        print(f"  Loading SQP keywords for matching...")
-        sqp_keywords = get_sqp_keywords_for_matching(
-            marketplace_code, period_start, period_end, period_type
-        )
-        result["sqp_keywords"] = len(sqp_keywords)
-
-        if not sqp_keywords:
-            result["status"] = "skipped"
-            print(f"  No SQP keywords found — skipping (nothing to match against)")
-            return result
-
-        if dry_run:
-            result["status"] = "dry_run"
-            print(f"  DRY RUN: Would pull Search Terms Report and filter against {len(sqp_keywords)} SQP keywords")
-            return result
-
-        # Step 3: Create pull tracking record
-        start_time = time.time()
-        pull_id = create_search_terms_pull_record(
-            marketplace_code, period_start, period_end, period_type, len(sqp_keywords)
-        )
-
-        # Step 4: Request the report from Amazon
-        print(f"  Requesting Search Terms Report from SP-API...")
-        report_id = create_search_terms_report(
-            client, marketplace_code, period_start, period_end, period_type, region
-        )
-
-        update_search_terms_pull_status(pull_id, report_id=report_id)
-
-        # Step 5: Poll until report is ready (up to 15 minutes — large report)
-        print(f"  Polling for report completion (max 15 min)...")
-        poll_result = poll_report_status(
-            client, report_id, region=region,
-            max_wait_seconds=900,  # 15 minutes
-            poll_interval=30       # Check every 30 seconds (large report, no rush)
-        )
-
-        report_document_id = poll_result["reportDocumentId"]
-        update_search_terms_pull_status(pull_id, report_document_id=report_document_id)
-        print(f"  Report ready (document: {report_document_id[:20]}...)")
-
-        # Step 6: Get download URL
-        download_info = get_report_download_info(client, report_document_id, region)
-        download_url = download_info["url"]
-        compression = download_info["compressionAlgorithm"]
-
-        # Step 7: Stream-parse, filter, and upsert
-        marketplace_id = MARKETPLACE_UUIDS[marketplace_code]
-
-        if use_fallback:
-            matched_terms, total_rows = download_and_filter_fallback(
-                download_url=download_url,
-                compression=compression,
-                sqp_keywords_set=sqp_keywords,
-                marketplace_id=marketplace_id,
-                period_start=period_start,
-                period_end=period_end,
-                period_type=period_type,
-                upsert_callback=upsert_search_terms_data,
-                batch_size=200
+    with timings.activate():
+        try:
+            # Step 1: Check existing pull
+            existing = get_existing_search_terms_pull(
+                marketplace_code, period_start, period_end, period_type
             )
-        else:
-            matched_terms, total_rows = stream_and_filter_search_terms(
-                download_url=download_url,
-                compression=compression,
-                sqp_keywords_set=sqp_keywords,
-                marketplace_id=marketplace_id,
-                period_start=period_start,
-                period_end=period_end,
-                period_type=period_type,
-                upsert_callback=upsert_search_terms_data,
-                batch_size=200
+            if existing and existing["status"] == "completed" and not force:
+                result["status"] = "skipped"
+                result["matched_terms"] = existing.get("matched_terms_count", 0)
+                result["total_rows"] = existing.get("total_rows", 0)
+                print(f"  Already completed ({result['total_rows']} rows). Use --force to re-pull.")
+                return result
+
+            # Step 2: Load SQP keywords for filtering
+            print(f"  Loading SQP keywords for matching...")
+            with timings.stage("load_keywords"):
+                sqp_keywords = get_sqp_keywords_for_matching(
+                    marketplace_code, period_start, period_end, period_type
+                )
+            result["sqp_keywords"] = len(sqp_keywords)
+
+            if not sqp_keywords:
+                result["status"] = "skipped"
+                print(f"  No SQP keywords found — skipping (nothing to match against)")
+                return result
+
+            if dry_run:
+                result["status"] = "dry_run"
+                print(f"  DRY RUN: Would pull Search Terms Report and filter against {len(sqp_keywords)} SQP keywords")
+                return result
+
+            # Step 3: Create pull tracking record
+            start_time = time.time()
+            pull_id = create_search_terms_pull_record(
+                marketplace_code, period_start, period_end, period_type, len(sqp_keywords)
             )
 
-        # Step 8: Update tracking with results
-        processing_time_ms = int((time.time() - start_time) * 1000)
+            # Step 4: Request the report from Amazon
+            print(f"  Requesting Search Terms Report from SP-API...")
+            report_id = create_search_terms_report(
+                client, marketplace_code, period_start, period_end, period_type, region
+            )
 
-        result["status"] = "completed"
-        result["matched_terms"] = matched_terms
-        result["total_rows"] = total_rows
+            update_search_terms_pull_status(pull_id, report_id=report_id)
 
-        update_search_terms_pull_status(
-            pull_id,
-            status="completed",
-            matched_terms_count=matched_terms,
-            total_rows=total_rows,
-            processing_time_ms=processing_time_ms
-        )
+            # Step 5: Poll until report is ready (up to 15 minutes — large report)
+            print(f"  Polling for report completion (max 15 min)...")
+            poll_result = poll_report_status(
+                client, report_id, region=region,
+                max_wait_seconds=900,  # 15 minutes
+                poll_interval=30       # Check every 30 seconds (large report, no rush)
+            )
 
-        match_rate = (matched_terms / len(sqp_keywords) * 100) if sqp_keywords else 0
-        print(f"  [OK] {marketplace_code}: {matched_terms} terms matched ({match_rate:.1f}% of SQP), {total_rows} rows in {processing_time_ms/1000:.1f}s")
+            report_document_id = poll_result["reportDocumentId"]
+            update_search_terms_pull_status(pull_id, report_document_id=report_document_id)
+            print(f"  Report ready (document: {report_document_id[:20]}...)")
+
+            # Step 6: Get download URL
+            download_info = get_report_download_info(client, report_document_id, region)
+            download_url = download_info["url"]
+            compression = download_info["compressionAlgorithm"]
+
+            # Step 7: Stream-parse, filter, and upsert
+            marketplace_id = MARKETPLACE_UUIDS[marketplace_code]
+
+            if use_fallback:
+                matched_terms, total_rows = download_and_filter_fallback(
+                    download_url=download_url,
+                    compression=compression,
+                    sqp_keywords_set=sqp_keywords,
+                    marketplace_id=marketplace_id,
+                    period_start=period_start,
+                    period_end=period_end,
+                    period_type=period_type,
+                    upsert_callback=upsert_search_terms_data,
+                    batch_size=200
+                )
+            else:
+                matched_terms, total_rows = stream_and_filter_search_terms(
+                    download_url=download_url,
+                    compression=compression,
+                    sqp_keywords_set=sqp_keywords,
+                    marketplace_id=marketplace_id,
+                    period_start=period_start,
+                    period_end=period_end,
+                    period_type=period_type,
+                    upsert_callback=upsert_search_terms_data,
+                    batch_size=200
+                )
 
-    except Exception as e:
-        error_msg = str(e)
-        result["status"] = "failed"
-        result["error"] = error_msg
-        logger.error(f"{marketplace_code} Search Terms failed: {error_msg}")
-        print(f"  FAILED: {error_msg}")
+            # Step 8: Update tracking with results
+            processing_time_ms = int((time.time() - start_time) * 1000)
 
-        # Update tracking if we have a pull_id
-        try:
-            if 'pull_id' in locals():
-                processing_time_ms = int((time.time() - start_time) * 1000)
-                update_search_terms_pull_status(
-                    pull_id,
-                    status="failed",
-                    error_message=error_msg[:1000],
-                    processing_time_ms=processing_time_ms
-                )
-        except Exception:
-            pass
+            result["status"] = "completed"
+            result["matched_terms"] = matched_terms
+            result["total_rows"] = total_rows
 
-        alert_failure("search_terms_pull", marketplace_code, error_msg, 0)
+            update_search_terms_pull_status(
+                pull_id,
+                status="completed",
+                matched_terms_count=matched_terms,
+                total_rows=total_rows,
+                processing_time_ms=processing_time_ms
+            )
+            record_pull_timings(timings, "sp_search_terms_pulls", pull_id)
+
+            match_rate = (matched_terms / len(sqp_keywords) * 100) if sqp_keywords else 0
+            print(f"  [OK] {marketplace_code}: {matched_terms} terms matched ({match_rate:.1f}% of SQP), {total_rows} rows in {processing_time_ms/1000:.1f}s")
+            print(f"  ⏱️  {timings.summary_line()}")
+
+        except Exception as e:
+            error_msg = str(e)
+            result["status"] = "failed"
+            result["error"] = error_msg
+            logger.error(f"{marketplace_code} Search Terms failed: {error_msg}")
+            print(f"  FAILED: {error_msg}")
+
+            # Update tracking if we have a pull_id
+            try:
+                if 'pull_id' in locals():
+                    processing_time_ms = int((time.time() - start_time) * 1000)
+                    update_search_terms_pull_status(
+                        pull_id,
+                        status="failed",
+                        error_message=error_msg[:1000],
+                        processing_time_ms=processing_time_ms
+                    )
+                    record_pull_timings(timings, "sp_search_terms_pulls", pull_id)
+            except Exception:
+                pass
+
+            alert_failure("search_terms_pull", marketplace_code, error_msg, 0)
 
     return result
 
@@ -284,7 +292,9 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Show what would be pulled without pulling")
     parser.add_argument("--fallback", action="store_true", help="Use memory-based download (debugging only)")
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_search_terms")
 
     # Determine period
     if args.period_start and args.period_end:
@@ -307,11 +317,9 @@ def main():
     print(f"Force: {args.force} | Dry-run: {args.dry_run} | Fallback: {args.fallback}")
     print(f"{'='*60}")
 
-    # Get access token and create client
+    # Create client (tokens come from the refreshing token provider)
     if not args.dry_run:
-        print("Getting access token...")
-        access_token = get_access_token(region=args.region)
-        client = SPAPIClient(access_token, region=args.region)
+        client = SPAPIClient(region=args.region)
     else:
         client = None
 
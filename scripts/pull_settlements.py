@@ -15,6 +15,21 @@ Each settlement report contains per-order transaction-level fee breakdowns:
 
 This is the PRIMARY data source for accurate CM2 calculation.
 
+Reports already in the database are skipped without being downloaded: the
+listed reportDocumentIds are checked against the processed-settlement registry
+(sp_processed_settlements, one RPC per batch of IDs). For documents it doesn't
+know, the settlement ID comes from a local reportDocumentId index
+(utils/settlement_index.py) or from a Range request for the first few KB of
+the document (financial_reports.peek_settlement_id).
+
+New reports go through a bounded pipeline (run_settlement_pipeline, also
+used by backfill_settlements.py): several documents download at once within
+the getReportDocument quota into memory-budgeted buffers, and each report is
+parsed SP_SETTLEMENT_CHUNK_ROWS rows at a time, each chunk upserted on a
+shared DB writer pool while the next one is parsed. Each stored settlement also refreshes its rows of
+the per-SKU monthly fee rollup (sp_settlement_sku_fees_monthly) that feeds
+the SP Fees sheet.
+
 Usage:
     python pull_settlements.py                          # New reports since last pull
     python pull_settlements.py --since 2026-01-01       # Reports since date
@@ -27,39 +42,49 @@ Environment Variables Required:
     SP_REFRESH_TOKEN_NA   - North America refresh token
     SUPABASE_URL          - Supabase project URL
     SUPABASE_SERVICE_KEY  - Supabase service role key
+
+Optional Environment Variables:
+    SP_SETTLEMENT_INDEX_PATH - reportDocumentId -> settlement_id index file
+    SP_SETTLEMENT_CHUNK_ROWS - Transactions parsed / upserted per chunk (default 500)
+    SP_PIPELINE_*            - Pipeline workers / queue size (see utils/pipeline.py)
 """
 
 import os
 import sys
 import argparse
 import time
+import itertools
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
 from utils.financial_reports import (
     list_settlement_reports,
-    download_settlement_report,
-    parse_settlement_rows,
+    fetch_settlement_report_body,
+    iter_settlement_chunks,
+    peek_settlement_id,
     FINANCIAL_REPORT_TYPES
 )
-from utils.inventory_reports import MARKETPLACE_IDS
+from utils.inventory_reports import MARKETPLACE_IDS, get_report_document
+from utils.settlement_index import SettlementIndex
 from utils.db import (
     create_data_import,
     update_data_import,
     create_financial_pull_record,
     update_financial_pull_status,
-    get_processed_settlement_ids,
+    find_processed_settlements,
     upsert_settlement_transactions,
     upsert_settlement_summary,
+    refresh_settlement_fee_rollup,
+    record_pull_timings,
     MARKETPLACE_UUIDS,
 )
-
-# Rate limit between report downloads (seconds)
-DOWNLOAD_DELAY = 10  # Increased from 5s - was getting 429s with 11 reports
+from utils.api_client import SPAPIClient
+from utils.metrics import PullTimings
+from utils.pipeline import Pipeline, Stage, Done, WriterPool, API_WORKERS, DB_WORKERS
+from utils.profiling import add_profile_argument, start_profiling
 
 
 def get_default_since_date() -> str:
@@ -72,8 +97,296 @@ def get_default_since_date() -> str:
     return since.strftime("%Y-%m-%dT00:00:00Z")
 
 
+def load_processed_settlements(reports: List[Dict[str, Any]], index: SettlementIndex) -> set:
+    """
+    Settlement IDs among these reports that are already stored.
+
+    One registry lookup for every listed reportDocumentId plus the settlement
+    IDs the local index already knows for them. Registered documents are added
+    to the index, so the pipeline skips them without a peek.
+    """
+    document_ids = [r["reportDocumentId"] for r in reports if r.get("reportDocumentId")]
+    known_ids = [index.get(d) for d in document_ids]
+    rows = find_processed_settlements(
+        settlement_ids=[s for s in known_ids if s],
+        report_document_ids=document_ids
+    )
+    for row in rows:
+        if row.get("report_document_id"):
+            index.put(row["report_document_id"], row["settlement_id"])
+    return {row["settlement_id"] for row in rows}
+
+
+def run_settlement_pipeline(
+    reports: List[Dict[str, Any]],
+    region: str,
+    client: SPAPIClient,
+    processed_set: set,
+    index: SettlementIndex,
+    dry_run: bool = False,
+    deadline: float = None,
+    writer_pool: WriterPool = None
+) -> List[Dict[str, Any]]:
+    """
+    Download, parse and store settlement reports with bounded concurrency.
+
+    Stages (utils/pipeline.py):
+    - document: API_WORKERS threads find the settlement ID (index, else a
+      Range peek) and finish reports that are already stored (processed_set,
+      else one registry lookup for a peeked ID); new ones are downloaded. getReportDocument goes through the client's rate limiter
+      (burst 15, then 1/min) instead of fixed sleeps between reports.
+    - store: DB_WORKERS threads parse each report in chunks of
+      SP_SETTLEMENT_CHUNK_ROWS rows (iter_settlement_chunks) and hand the
+      chunks to the shared DB writer pool, then write the summary, the
+      per-SKU fee rollup and statuses. No report's full transaction list is
+      built at once.
+
+    Args:
+        processed_set: Settlement IDs known to be stored, from load_processed_settlements()
+            (added to as reports are stored); not checked on dry runs
+        deadline: time.time() after which no more reports are started
+        writer_pool: Shared DB writers (default: a pool for this run)
+
+    Returns:
+        One result per report started, in order: report_id, settlement_id,
+        status (processed / dry_run / skipped / empty / failed), transactions,
+        peeked, error
+    """
+    report_type = FINANCIAL_REPORT_TYPES["SETTLEMENT"]
+    fallback_marketplace_id = MARKETPLACE_UUIDS.get("USA", "")
+    mp_labels = {v: k for k, v in MARKETPLACE_UUIDS.items()}
+
+    def already_processed(settlement_id: Optional[str]) -> bool:
+        if not settlement_id:
+            return False
+        if settlement_id in processed_set:
+            return True
+        # Not among the listed documents' registry matches (e.g. stored
+        # before report_document_id was tracked): one primary key lookup
+        if dry_run or not find_processed_settlements(settlement_ids=[settlement_id]):
+            return False
+        processed_set.add(settlement_id)
+        return True
+
+    def new_job(i: int, report: Dict[str, Any]) -> dict:
+        report_id = report.get("reportId", "")
+        return {
+            "label": f"[{i + 1}/{len(reports)}]",
+            "report_id": report_id,
+            "document_id": report.get("reportDocumentId", ""),
+            "timings": PullTimings("settlements", "USA", date.today(), region),
+            "started": time.time(),
+            "import_id": None,
+            "pull_id": None,
+            "result": {
+                "report_id": report_id,
+                "settlement_id": None,
+                "status": "pending",
+                "transactions": 0,
+                "peeked": False,
+                "error": None
+            },
+        }
+
+    def fetch(job: dict):
+        label, document_id, result = job["label"], job["document_id"], job["result"]
+        if not document_id:
+            print(f"  {label} ⚠️  {job['report_id']}: no reportDocumentId — skipping")
+            result["status"] = "empty"
+            return Done(result)
+
+        # Settlement ID before deciding to download: index, then a Range peek
+        settlement_id = index.get(document_id)
+        document = None
+        if settlement_id is None and not dry_run:
+            with job["timings"].stage("peek"):
+                document = get_report_document(None, document_id, region, client)
+                settlement_id = peek_settlement_id(None, document_id, region, document=document)
+            result["peeked"] = True
+            index.put(document_id, settlement_id)
+
+        if already_processed(settlement_id):
+            print(f"  {label} ⏭️  {settlement_id}: already processed — skipping (not downloaded)")
+            result["settlement_id"] = settlement_id
+            result["status"] = "skipped"
+            return Done(result)
+
+        # Download (reusing the document URL fetched for the peek) into a spooled buffer
+        job["body"], job["compression"] = fetch_settlement_report_body(
+            document_id, region, client, document=document
+        )
+        print(f"  {label} 📥 {job['report_id']}: downloaded {job['body'].tell():,} bytes")
+        return job
+
+    def store(job: dict) -> dict:
+        try:
+            return store_chunks(job)
+        finally:
+            job["body"].close()
+            job["body"] = None
+
+    def store_chunks(job: dict) -> dict:
+        label, result, timings = job["label"], job["result"], job["timings"]
+        chunks = iter_settlement_chunks(
+            job["body"], job["compression"], fallback_marketplace_id, MARKETPLACE_UUIDS
+        )
+        first = next(chunks, None)
+        if first is None:
+            print(f"  {label} ⚠️  {job['report_id']}: empty report — skipping")
+            result["status"] = "empty"
+            return result
+
+        transactions, summary = first
+        settlement_id = transactions[0]["settlement_id"]
+        index.put(job["document_id"], settlement_id)
+        result["settlement_id"] = settlement_id
+
+        # Already processed (the peek couldn't tell)
+        if already_processed(settlement_id):
+            print(f"  {label} ⏭️  {settlement_id}: already processed — skipping")
+            result["status"] = "skipped"
+            return result
+
+        import_id = pull_id = None
+        if not dry_run:
+            # Tracking records (use "USA" as marketplace since report spans region)
+            job["import_id"] = import_id = create_data_import(
+                "USA",  # tracking record marketplace (report listed via USA)
+                date.today(),
+                import_type="sp_api_settlement"
+            )
+            job["pull_id"] = pull_id = create_financial_pull_record(
+                marketplace_code="USA",
+                report_type=report_type,
+                pull_date=date.today(),
+                import_id=import_id,
+                settlement_id=settlement_id,
+                report_id=job["report_id"],
+                report_document_id=job["document_id"]
+            )
+
+        # Chunks are parsed on this thread while the previous one is upserted
+        # on the writer pool; rows repeated across chunks are sent once
+        mp_counts = {}
+        seen = set()
+        parsed_rows = 0
+
+        def unique_chunks():
+            nonlocal parsed_rows
+            for chunk, _ in itertools.chain([first], chunks):
+                parsed_rows += len(chunk)
+                rows = []
+                for tx in chunk:
+                    key = (tx["marketplace_id"], tx["row_hash"])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    tx["import_id"] = import_id
+                    mp_counts[tx["marketplace_id"]] = mp_counts.get(tx["marketplace_id"], 0) + 1
+                    rows.append(tx)
+                if rows:
+                    yield rows
+
+        if dry_run:
+            tx_count = sum(len(rows) for rows in unique_chunks())
+        else:
+            chunk_pipeline = Pipeline(f"settlement_{settlement_id}_chunks", [
+                Stage("store", upsert_settlement_transactions, executor=writers),
+            ], timings_of=lambda rows: timings)
+            tx_count = sum(chunk_pipeline.run(unique_chunks()))
+
+        breakdown = ", ".join(
+            f"{mp_labels.get(mp_id, mp_id)}: {count}"
+            for mp_id, count in sorted(mp_counts.items(), key=lambda x: -x[1])
+        )
+        summary["transaction_count"] = parsed_rows
+        period = (f", {summary.get('settlement_start_date', '?')} to "
+                  f"{summary.get('settlement_end_date', '?')}, total "
+                  f"{summary.get('total_amount', '?')} {summary.get('currency_code', '?')}")
+
+        if dry_run:
+            print(f"  {label} [DRY RUN] {settlement_id}: would upsert {tx_count} transactions ({breakdown}){period}")
+            result["status"] = "dry_run"
+            result["transactions"] = tx_count
+            return result
+
+        summary["import_id"] = import_id
+        upsert_settlement_summary(summary)
+        rollup_rows = refresh_settlement_fee_rollup(settlement_id)
+
+        processing_time = int((time.time() - job["started"]) * 1000)
+        update_financial_pull_status(
+            pull_id, "completed",
+            row_count=tx_count,
+            processing_time_ms=processing_time
+        )
+        update_data_import(
+            import_id, "completed",
+            row_count=tx_count,
+            processing_time_ms=processing_time
+        )
+        record_pull_timings(timings, "sp_financial_pulls", pull_id)
+
+        print(f"  {label} ✅ {settlement_id}: {tx_count} transactions ({breakdown}){period}, "
+              f"{rollup_rows} fee rollup rows")
+        print(f"  {label} ⏱️  {timings.summary_line()}")
+        processed_set.add(settlement_id)
+        result["status"] = "processed"
+        result["transactions"] = tx_count
+        return result
+
+    def failed(job: dict, stage: str, error: Exception) -> dict:
+        result = job["result"]
+        error_msg = str(error)
+        print(f"  {job['label']} ✗ {job['report_id']} ({stage}): {error_msg}")
+        result["status"] = "failed"
+        result["error"] = error_msg
+
+        if not dry_run:
+            try:
+                if job["pull_id"]:
+                    update_financial_pull_status(job["pull_id"], "failed", error_message=error_msg)
+                    record_pull_timings(job["timings"], "sp_financial_pulls", job["pull_id"])
+            except Exception:
+                pass
+            try:
+                if job["import_id"]:
+                    update_data_import(job["import_id"], "failed", error_message=error_msg)
+            except Exception:
+                pass
+        return result
+
+    writers = writer_pool or WriterPool()
+    # store runs on its own threads: its chunk upserts are what goes to the writer pool
+    pipeline = Pipeline(f"settlements_{region.lower()}", [
+        Stage("document", fetch, workers=API_WORKERS),
+        Stage("store", store, workers=DB_WORKERS),
+    ], timings_of=lambda job: job["timings"], on_error=failed)
+
+    # Past the deadline no new reports are started; in-flight ones finish
+    jobs = (
+        new_job(i, report) for i, report in enumerate(reports)
+        if deadline is None or time.time() < deadline
+    )
+    try:
+        return pipeline.run(jobs)
+    finally:
+        if writer_pool is None:
+            writers.shutdown()
+
+
+def count_settlement_results(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Totals over run_settlement_pipeline() results."""
+    return {
+        "reports_processed": sum(1 for r in results if r["status"] in ("processed", "dry_run")),
+        "reports_skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "reports_peeked": sum(1 for r in results if r["peeked"]),
+        "total_transactions": sum(r["transactions"] for r in results),
+        "errors": sum(1 for r in results if r["status"] == "failed"),
+    }
+
+
 def pull_settlement_reports(
-    access_token: str,
     since_date: str,
     region: str = "NA",
     dry_run: bool = False,
@@ -87,11 +400,10 @@ def pull_settlement_reports(
     regardless of marketplace filter. Each report contains transactions for
     multiple marketplaces (USA, CA, MX). This function:
     1. Lists reports once (using any NA marketplace)
-    2. Downloads each report once
+    2. Downloads each new report once, several at a time (run_settlement_pipeline)
     3. Attributes each row to the correct marketplace using marketplace-name field
 
     Args:
-        access_token: Valid SP-API access token
         since_date: ISO date string to list reports from
         region: API region
         dry_run: If True, don't write to database
@@ -102,17 +414,18 @@ def pull_settlement_reports(
         Dict with pull statistics
     """
     start_time = time.time()
-    report_type = FINANCIAL_REPORT_TYPES["SETTLEMENT"]
 
     print(f"\n{'='*60}")
     print(f"Settlement Reports — NA Region")
     print(f"Since: {since_date}")
     print(f"{'='*60}")
 
+    client = SPAPIClient(region=region)
+
     # Step 1: List available settlement reports (any NA marketplace returns all)
     try:
         reports = list_settlement_reports(
-            access_token, list_marketplace, region, since_date, max_reports
+            None, list_marketplace, region, since_date, max_reports, client=client
         )
     except Exception as e:
         print(f"  ✗ Error listing reports: {e}")
@@ -133,180 +446,31 @@ def pull_settlement_reports(
             "total_transactions": 0
         }
 
-    # Step 2: Check which settlement IDs we've already processed (globally)
+    # reportDocumentId -> settlement_id seen on earlier runs
+    index = SettlementIndex()
+
+    # Step 2: Check which of the listed settlements we've already processed (globally)
     if not dry_run:
-        processed_ids = get_processed_settlement_ids()
-        processed_set = set(processed_ids)
-        print(f"  Already processed: {len(processed_set)} settlement reports")
+        processed_set = load_processed_settlements(reports, index)
+        print(f"  Already processed: {len(processed_set)} of {len(reports)} listed settlement reports")
     else:
         processed_set = set()
 
-    # Step 3: Process each report
-    reports_processed = 0
-    reports_skipped = 0
-    total_transactions = 0
-    errors = []
-
-    for i, report in enumerate(reports):
-        report_id = report.get("reportId", "")
-        report_doc_id = report.get("reportDocumentId", "")
-        created_time = report.get("createdTime", "")
-
-        print(f"\n  Report {i+1}/{len(reports)}: {report_id}")
-        print(f"    Created: {created_time}")
-        print(f"    Document: {report_doc_id}")
-
-        if not report_doc_id:
-            print(f"    ⚠️  No reportDocumentId — skipping")
-            continue
-
-        # Download and peek at settlement ID before deciding to skip
-        try:
-            # Rate limit between downloads
-            if i > 0:
-                print(f"    Waiting {DOWNLOAD_DELAY}s (rate limit)...")
-                time.sleep(DOWNLOAD_DELAY)
-
-            # Download report
-            rows = download_settlement_report(access_token, report_doc_id, region)
-            print(f"    Downloaded: {len(rows)} rows")
-
-            if not rows:
-                print(f"    ⚠️  Empty report — skipping")
-                continue
-
-            # Get settlement ID from first row
-            settlement_id = (rows[0].get("settlement-id") or "").strip()
-            if not settlement_id:
-                print(f"    ⚠️  No settlement ID in data — skipping")
-                continue
-
-            print(f"    Settlement ID: {settlement_id}")
-
-            # Check if already processed
-            if settlement_id in processed_set:
-                print(f"    ⏭️  Already processed — skipping")
-                reports_skipped += 1
-                continue
-
-            if dry_run:
-                # Parse with per-row marketplace attribution
-                transactions, summary = parse_settlement_rows(
-                    rows, MARKETPLACE_UUIDS.get("USA", ""),
-                    marketplace_uuids=MARKETPLACE_UUIDS
-                )
-                # Count by marketplace
-                mp_counts = {}
-                for tx in transactions:
-                    mp_id = tx["marketplace_id"]
-                    mp_counts[mp_id] = mp_counts.get(mp_id, 0) + 1
-                mp_labels = {v: k for k, v in MARKETPLACE_UUIDS.items()}
-                mp_summary = ", ".join(
-                    f"{mp_labels.get(mp_id, mp_id)}: {count}"
-                    for mp_id, count in sorted(mp_counts.items(), key=lambda x: -x[1])
-                )
-                print(f"    [DRY RUN] Would upsert {len(transactions)} transactions ({mp_summary})")
-                if summary:
-                    print(f"    [DRY RUN] Settlement period: "
-                          f"{summary.get('settlement_start_date', '?')} to "
-                          f"{summary.get('settlement_end_date', '?')}")
-                    print(f"    [DRY RUN] Total amount: "
-                          f"{summary.get('total_amount', '?')} "
-                          f"{summary.get('currency_code', '?')}")
-                total_transactions += len(transactions)
-                reports_processed += 1
-                continue
-
-            # Create tracking records (use "NA" as marketplace since report spans region)
-            import_id = create_data_import(
-                "USA",  # tracking record marketplace (report listed via USA)
-                date.today(),
-                import_type="sp_api_settlement"
-            )
-
-            pull_id = create_financial_pull_record(
-                marketplace_code="USA",
-                report_type=report_type,
-                pull_date=date.today(),
-                import_id=import_id,
-                settlement_id=settlement_id,
-                report_id=report_id,
-                report_document_id=report_doc_id
-            )
-
-            # Parse rows with per-row marketplace attribution
-            transactions, summary = parse_settlement_rows(
-                rows, MARKETPLACE_UUIDS.get("USA", ""),
-                import_id=import_id,
-                marketplace_uuids=MARKETPLACE_UUIDS
-            )
-
-            # Log marketplace breakdown
-            mp_counts = {}
-            for tx in transactions:
-                mp_id = tx["marketplace_id"]
-                mp_counts[mp_id] = mp_counts.get(mp_id, 0) + 1
-            mp_labels = {v: k for k, v in MARKETPLACE_UUIDS.items()}
-            for mp_id, count in sorted(mp_counts.items(), key=lambda x: -x[1]):
-                print(f"    → {mp_labels.get(mp_id, mp_id)}: {count} transactions")
-
-            # Upsert transactions (with correct per-row marketplace_id)
-            tx_count = upsert_settlement_transactions(transactions)
-            print(f"    ✅ Upserted {tx_count} transactions")
-
-            # Upsert summary per marketplace
-            # Summary uses the settlement's currency to determine marketplace
-            if summary:
-                upsert_settlement_summary(summary)
-                print(f"    ✅ Settlement summary saved"
-                      f" ({summary.get('settlement_start_date', '?')} to "
-                      f"{summary.get('settlement_end_date', '?')})")
-
-            # Update tracking
-            processing_time = int((time.time() - start_time) * 1000)
-            update_financial_pull_status(
-                pull_id, "completed",
-                row_count=tx_count,
-                processing_time_ms=processing_time
-            )
-            update_data_import(
-                import_id, "completed",
-                row_count=tx_count,
-                processing_time_ms=processing_time
-            )
-
-            total_transactions += tx_count
-            reports_processed += 1
-            processed_set.add(settlement_id)
-
-        except Exception as e:
-            error_msg = str(e)
-            print(f"    ✗ Error: {error_msg}")
-            errors.append({"report_id": report_id, "error": error_msg})
-
-            if not dry_run:
-                try:
-                    if pull_id:
-                        update_financial_pull_status(pull_id, "failed", error_message=error_msg)
-                except Exception:
-                    pass
-                try:
-                    if import_id:
-                        update_data_import(import_id, "failed", error_message=error_msg)
-                except Exception:
-                    pass
+    # Step 3: Download, parse and store new reports concurrently
+    results = run_settlement_pipeline(
+        reports, region, client, processed_set, index, dry_run=dry_run
+    )
+    index.save()
+    counts = count_settlement_results(results)
 
     # Summary
     processing_time = int((time.time() - start_time) * 1000)
 
     result = {
-        "status": "completed" if not errors else "partial",
+        "status": "completed" if not counts["errors"] else "partial",
         "marketplace": "NA",
         "reports_found": len(reports),
-        "reports_processed": reports_processed,
-        "reports_skipped": reports_skipped,
-        "total_transactions": total_transactions,
-        "errors": len(errors),
+        **counts,
         "processing_time_ms": processing_time
     }
 
@@ -350,7 +514,9 @@ def main():
         help="Maximum reports to process (default: 100)"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_settlements")
 
     region = args.region.upper()
 
@@ -376,14 +542,8 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("=" * 60)
 
-    # Get access token
-    print("\nGetting access token...")
-    access_token = get_access_token(region=region)
-    print("✓ Access token obtained")
-
     # Process all settlement reports (single run for entire region)
     result = pull_settlement_reports(
-        access_token,
         since_date,
         region=region,
         dry_run=args.dry_run,
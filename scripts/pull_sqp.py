@@ -10,6 +10,8 @@ Features:
 - Batch-level resume (tracks which batches completed via JSONB)
 - Rate-limit-aware (shares createReport budget with daily pulls)
 - Per-ASIN error tracking (suppresses consistently failing ASINs after 3 failures)
+- Batches pipelined: report requests, parsing (worker processes) and upserts
+  overlap (SP_PIPELINE_*, see utils/pipeline.py)
 
 Usage:
     python pull_sqp.py                                     # Latest week, SQP + SCP
@@ -29,15 +31,17 @@ import argparse
 import time
 import json
 import logging
+import threading
 from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token
 from scripts.utils.api_client import SPAPIClient, SPAPIError
+from scripts.utils.async_client import get_sp_api_client
 from scripts.utils.alerting import alert_failure, alert_partial, send_summary
+from scripts.utils.metrics import PullTimings
 from scripts.utils.db import (
     MARKETPLACE_UUIDS,
     upsert_sqp_data,
@@ -47,14 +51,20 @@ from scripts.utils.db import (
     get_existing_sqp_pull,
     record_asin_error,
     get_active_asins_for_sqp,
+    record_pull_timings,
 )
 from scripts.utils.sqp_reports import (
     batch_asins,
     get_latest_available_week,
     get_latest_available_month,
-    pull_sqp_batch,
-    pull_scp_batch,
+    fetch_sqp_report_body,
+    fetch_scp_report_body,
+    read_report_body,
+    parse_sqp_report_body,
+    parse_scp_report_body,
 )
+from scripts.utils.pipeline import Pipeline, Stage, API_WORKERS
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Configure logging
 logging.basicConfig(
@@ -106,90 +116,93 @@ def pull_for_marketplace(
 
     marketplace_id = MARKETPLACE_UUIDS[marketplace_code]
     start_time = time.time()
-
-    try:
-        # Check for existing pull
-        existing = get_existing_sqp_pull(marketplace_code, report_type, period_start, period_end, period_type)
-        if existing and not force:
-            if existing["status"] == "completed":
-                print(f"  Skipping {marketplace_code} {report_type} {period_start} (already completed, {existing['total_rows']} rows)")
+    timings = PullTimings(report_type.lower(), marketplace_code, period_start, region)
+
+    with timings.activate():
+        try:
+            # Check for existing pull
+            existing = get_existing_sqp_pull(marketplace_code, report_type, period_start, period_end, period_type)
+            if existing and not force:
+                if existing["status"] == "completed":
+                    print(f"  Skipping {marketplace_code} {report_type} {period_start} (already completed, {existing['total_rows']} rows)")
+                    result["status"] = "skipped"
+                    result["total_rows"] = existing.get("total_rows", 0)
+                    return result
+                elif existing["status"] in ("processing", "partial") and resume:
+                    print(f"  Resuming {marketplace_code} {report_type} {period_start} ({existing['completed_batches']}/{existing['total_batches']} batches)")
+
+            # Get active ASINs
+            asins = get_active_asins_for_sqp(marketplace_code)
+            if not asins:
+                print(f"  No active ASINs found for {marketplace_code}, skipping")
                 result["status"] = "skipped"
-                result["total_rows"] = existing.get("total_rows", 0)
                 return result
-            elif existing["status"] in ("processing", "partial") and resume:
-                print(f"  Resuming {marketplace_code} {report_type} {period_start} ({existing['completed_batches']}/{existing['total_batches']} batches)")
-
-        # Get active ASINs
-        asins = get_active_asins_for_sqp(marketplace_code)
-        if not asins:
-            print(f"  No active ASINs found for {marketplace_code}, skipping")
-            result["status"] = "skipped"
-            return result
-
-        # Batch ASINs
-        batches = batch_asins(asins)
-        result["total_batches"] = len(batches)
-
-        print(f"  {marketplace_code} {report_type}: {len(asins)} ASINs in {len(batches)} batches ({period_type} {period_start})")
-
-        if dry_run:
-            result["status"] = "dry_run"
-            return result
-
-        # Create/update pull tracking record
-        pull_id = create_sqp_pull_record(
-            marketplace_code=marketplace_code,
-            report_type=report_type,
-            period_start=period_start,
-            period_end=period_end,
-            period_type=period_type,
-            total_batches=len(batches),
-            total_asins=len(asins)
-        )
-
-        # Get existing batch status for resume (but NOT when forcing re-pull)
-        existing_batch_status = {}
-        if existing and resume and not force and existing.get("batch_status"):
-            existing_batch_status = existing["batch_status"]
-
-        total_rows_upserted = 0
-        total_queries = 0
-        batch_status = dict(existing_batch_status)
-
-        for batch_idx, batch in enumerate(batches):
-            batch_key = str(batch_idx)
-
-            # Skip completed batches on resume
-            if batch_status.get(batch_key) == "completed":
-                result["completed_batches"] += 1
-                continue
-
-            try:
-                print(f"    Batch {batch_idx + 1}/{len(batches)} ({len(batch)} ASINs)...", end=" ", flush=True)
 
+            # Batch ASINs
+            batches = batch_asins(asins)
+            result["total_batches"] = len(batches)
+
+            print(f"  {marketplace_code} {report_type}: {len(asins)} ASINs in {len(batches)} batches ({period_type} {period_start})")
+
+            if dry_run:
+                result["status"] = "dry_run"
+                return result
+
+            # Create/update pull tracking record
+            pull_id = create_sqp_pull_record(
+                marketplace_code=marketplace_code,
+                report_type=report_type,
+                period_start=period_start,
+                period_end=period_end,
+                period_type=period_type,
+                total_batches=len(batches),
+                total_asins=len(asins)
+            )
+
+            # Get existing batch status for resume (but NOT when forcing re-pull)
+            existing_batch_status = {}
+            if existing and resume and not force and existing.get("batch_status"):
+                existing_batch_status = existing["batch_status"]
+
+            # Batches are pipelined: report requests for the next batches run
+            # while earlier ones are parsed (worker processes) and upserted.
+            # The store stage has one worker, so batch_status updates stay in order.
+            progress = {"rows": 0, "queries": 0}
+            batch_status = dict(existing_batch_status)
+            status_lock = threading.Lock()
+
+            pending = []
+            for batch_idx, batch in enumerate(batches):
+                # Skip completed batches on resume
+                if batch_status.get(str(batch_idx)) == "completed":
+                    result["completed_batches"] += 1
+                else:
+                    pending.append({"index": batch_idx, "asins": batch})
+
+            def fetch(job: dict) -> dict:
+                print(f"    Batch {job['index'] + 1}/{len(batches)} ({len(job['asins'])} ASINs) requested")
+                fetch_body = fetch_sqp_report_body if report_type == "SQP" else fetch_scp_report_body
+                job["body"], job["compression"] = fetch_body(
+                    client=client,
+                    marketplace_code=marketplace_code,
+                    asins=job["asins"],
+                    period_start=period_start,
+                    period_end=period_end,
+                    period_type=period_type,
+                    region=region
+                )
+                return job
+
+            def parsed(job: dict, output) -> dict:
+                job["body"] = None
                 if report_type == "SQP":
-                    rows, query_count = pull_sqp_batch(
-                        client=client,
-                        marketplace_code=marketplace_code,
-                        asins=batch,
-                        period_start=period_start,
-                        period_end=period_end,
-                        period_type=period_type,
-                        region=region,
-                        marketplace_id=marketplace_id
-                    )
-                    total_queries += query_count
-                else:  # SCP
-                    rows = pull_scp_batch(
-                        client=client,
-                        marketplace_code=marketplace_code,
-                        asins=batch,
-                        period_start=period_start,
-                        period_end=period_end,
-                        period_type=period_type,
-                        region=region,
-                        marketplace_id=marketplace_id
-                    )
+                    job["rows"], job["query_count"] = output
+                else:
+                    job["rows"], job["query_count"] = output, 0
+                return job
+
+            def store(job: dict) -> int:
+                rows = job["rows"]
 
                 # Upsert immediately per-batch (prevents data loss on later failure)
                 if rows:
@@ -197,91 +210,106 @@ def pull_for_marketplace(
                         upsert_sqp_data(rows)
                     else:
                         upsert_scp_data(rows)
-                    total_rows_upserted += len(rows)
-
-                batch_status[batch_key] = "completed"
-                result["completed_batches"] += 1
-                print(f"{len(rows)} rows (upserted)")
-
-                # Update tracking after each batch (for resume)
-                update_sqp_pull_status(
-                    pull_id,
-                    batch_status=batch_status,
-                    completed_batches=result["completed_batches"],
-                    total_rows=total_rows_upserted
-                )
-
-            except RuntimeError as e:
-                # Report FATAL/CANCELLED - record but continue
-                error_msg = str(e)
-                batch_status[batch_key] = "failed"
-                result["failed_batches"] += 1
-                print(f"FAILED: {error_msg}")
-
-                # Track which ASINs failed
-                for asin in batch:
-                    record_asin_error(marketplace_code, asin, "REPORT_FATAL", error_msg)
-
-                update_sqp_pull_status(
-                    pull_id,
-                    batch_status=batch_status,
-                    failed_batches=result["failed_batches"],
-                    error_count=result["failed_batches"]
-                )
-
-            except SPAPIError as e:
-                error_msg = str(e)
-                batch_status[batch_key] = "failed"
-                result["failed_batches"] += 1
-                print(f"API ERROR: {error_msg}")
-
-                for asin in batch:
-                    record_asin_error(marketplace_code, asin, "API_ERROR", error_msg)
-
-                update_sqp_pull_status(
-                    pull_id,
-                    batch_status=batch_status,
-                    failed_batches=result["failed_batches"],
-                    error_message=error_msg,
-                    error_count=result["failed_batches"]
-                )
 
-        # Determine final status
-        processing_time_ms = int((time.time() - start_time) * 1000)
-
-        if result["failed_batches"] == 0:
-            final_status = "completed"
-        elif result["completed_batches"] > 0:
-            final_status = "partial"
-        else:
-            final_status = "failed"
-
-        result["status"] = final_status
-        result["total_rows"] = total_rows_upserted
-        result["total_queries"] = total_queries
-
-        # Update pull record with final status
-        update_sqp_pull_status(
-            pull_id,
-            status=final_status,
-            batch_status=batch_status,
-            completed_batches=result["completed_batches"],
-            failed_batches=result["failed_batches"],
-            total_rows=total_rows_upserted,
-            total_queries=total_queries,
-            processing_time_ms=processing_time_ms
-        )
-
-        status_emoji = {"completed": "OK", "partial": "PARTIAL", "failed": "FAILED"}.get(final_status, "?")
-        print(f"  [{status_emoji}] {marketplace_code} {report_type}: {total_rows_upserted} rows, {result['completed_batches']}/{len(batches)} batches in {processing_time_ms/1000:.1f}s")
-
-    except Exception as e:
-        error_msg = str(e)
-        result["status"] = "failed"
-        result["error"] = error_msg
-        logger.error(f"{marketplace_code} {report_type} failed: {error_msg}")
-        print(f"  FAILED: {error_msg}")
-        alert_failure("sqp_pull", marketplace_code, error_msg, 0)
+                with status_lock:
+                    progress["rows"] += len(rows)
+                    progress["queries"] += job["query_count"]
+                    batch_status[str(job["index"])] = "completed"
+                    result["completed_batches"] += 1
+                    print(f"    Batch {job['index'] + 1}/{len(batches)}: {len(rows)} rows (upserted)")
+
+                    # Update tracking after each batch (for resume)
+                    update_sqp_pull_status(
+                        pull_id,
+                        batch_status=batch_status,
+                        completed_batches=result["completed_batches"],
+                        total_rows=progress["rows"]
+                    )
+                return len(rows)
+
+            def batch_failed(job: dict, stage: str, error: Exception) -> int:
+                if isinstance(error, RuntimeError):
+                    # Report FATAL/CANCELLED - record but continue
+                    error_type, label, extra = "REPORT_FATAL", "FAILED", {}
+                elif isinstance(error, SPAPIError):
+                    error_type, label, extra = "API_ERROR", "API ERROR", {"error_message": str(error)}
+                else:
+                    # Anything else fails the whole marketplace (stops the pipeline)
+                    raise error
+
+                error_msg = str(error)
+                with status_lock:
+                    batch_status[str(job["index"])] = "failed"
+                    result["failed_batches"] += 1
+                    print(f"    Batch {job['index'] + 1}/{len(batches)} {label}: {error_msg}")
+
+                    # Track which ASINs failed
+                    for asin in job["asins"]:
+                        record_asin_error(marketplace_code, asin, error_type, error_msg)
+
+                    update_sqp_pull_status(
+                        pull_id,
+                        batch_status=batch_status,
+                        failed_batches=result["failed_batches"],
+                        error_count=result["failed_batches"],
+                        **extra
+                    )
+                return 0
+
+            parse_body = parse_sqp_report_body if report_type == "SQP" else parse_scp_report_body
+            Pipeline(report_type.lower(), [
+                Stage("report", fetch, workers=API_WORKERS),
+                Stage(
+                    "parse", parse_body, processes=True,
+                    args=lambda job: (read_report_body(job["body"]), job["compression"], marketplace_id, period_start, period_end, period_type),
+                    merge=parsed
+                ),
+                Stage("store", store),
+            ], timings_of=lambda job: timings, on_error=batch_failed).run(pending)
+
+            total_rows_upserted = progress["rows"]
+            total_queries = progress["queries"]
+
+            # Determine final status
+            processing_time_ms = int((time.time() - start_time) * 1000)
+
+            if result["failed_batches"] == 0:
+                final_status = "completed"
+            elif result["completed_batches"] > 0:
+                final_status = "partial"
+            else:
+                final_status = "failed"
+
+            result["status"] = final_status
+            result["total_rows"] = total_rows_upserted
+            result["total_queries"] = total_queries
+
+            # Update pull record with final status
+            update_sqp_pull_status(
+                pull_id,
+                status=final_status,
+                batch_status=batch_status,
+                completed_batches=result["completed_batches"],
+                failed_batches=result["failed_batches"],
+                total_rows=total_rows_upserted,
+                total_queries=total_queries,
+                processing_time_ms=processing_time_ms
+            )
+            record_pull_timings(timings, "sp_sqp_pulls", pull_id)
+
+            status_emoji = {"completed": "OK", "partial": "PARTIAL", "failed": "FAILED"}.get(final_status, "?")
+            print(f"  [{status_emoji}] {marketplace_code} {report_type}: {total_rows_upserted} rows, {result['completed_batches']}/{len(batches)} batches in {processing_time_ms/1000:.1f}s")
+            print(f"  ⏱️  {timings.summary_line()}")
+
+        except Exception as e:
+            error_msg = str(e)
+            result["status"] = "failed"
+            result["error"] = error_msg
+            logger.error(f"{marketplace_code} {report_type} failed: {error_msg}")
+            print(f"  FAILED: {error_msg}")
+            alert_failure("sqp_pull", marketplace_code, error_msg, 0)
+            if 'pull_id' in locals():
+                record_pull_timings(timings, "sp_sqp_pulls", pull_id)
 
     return result
 
@@ -331,7 +359,9 @@ def main():
     parser.add_argument("--force", action="store_true", help="Force re-pull even if data exists")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be pulled without pulling")
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_sqp")
     resume = args.resume and not args.no_resume
 
     # Determine period
@@ -362,11 +392,9 @@ def main():
     print(f"Resume: {resume} | Force: {args.force} | Dry-run: {args.dry_run}")
     print(f"{'='*60}")
 
-    # Get access token and create client
+    # Create client (tokens come from the refreshing token provider)
     if not args.dry_run:
-        print("Getting access token...")
-        access_token = get_access_token(region=args.region)
-        client = SPAPIClient(access_token, region=args.region)
+        client = get_sp_api_client(region=args.region)
     else:
         client = None
 
@@ -29,15 +29,17 @@ from typing import Dict, List, Any
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.auth import get_access_token
 from utils.inventory_reports import pull_storage_fee_report, MARKETPLACE_IDS
 from utils.db import (
     get_supabase_client,
     create_data_import,
     update_data_import,
+    InventoryPullStatusBatch,
     MARKETPLACE_UUIDS,
     AMAZON_MARKETPLACE_IDS
 )
+from utils.api_client import SPAPIClient
+from utils.profiling import add_profile_argument, start_profiling
 
 # Default marketplaces to pull
 DEFAULT_MARKETPLACES = ["USA", "CA", "MX"]
@@ -186,10 +188,18 @@ def pull_marketplace_storage_fees(
     marketplace_code: str,
     month: date,
     region: str = "NA",
-    dry_run: bool = False
+    dry_run: bool = False,
+    client: SPAPIClient = None,
+    record: Dict[str, Any] = None,
+    statuses: InventoryPullStatusBatch = None
 ) -> Dict[str, Any]:
     """
     Pull storage fees for a single marketplace and month.
+
+    Args:
+        client: Shared SPAPIClient (retry, rate limiting); access_token may then be None
+        record: Tracking record already created by create_inventory_pull_records_batch
+        statuses: Batch that the final status is added to instead of being written directly
     """
     start_time = time.time()
     report_type = "GET_FBA_STORAGE_FEE_CHARGES_DATA"
@@ -202,7 +212,9 @@ def pull_marketplace_storage_fees(
     import_id = None
     pull_id = None
 
-    if not dry_run:
+    if not dry_run and record is not None:
+        import_id, pull_id = record["import_id"], record["pull_id"]
+    elif not dry_run:
         import_id = create_data_import(
             marketplace_code,
             month,
@@ -212,7 +224,7 @@ def pull_marketplace_storage_fees(
 
     try:
         # Pull the report
-        rows = pull_storage_fee_report(access_token, marketplace_code, month, region)
+        rows = pull_storage_fee_report(access_token, marketplace_code, month, region, client=client)
 
         if dry_run:
             print(f"\n[DRY RUN] Would upsert {len(rows)} storage fee records")
@@ -234,8 +246,11 @@ def pull_marketplace_storage_fees(
         processing_time = int((time.time() - start_time) * 1000)
 
         # Update tracking
-        update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
-        update_inventory_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+        if statuses is not None and record is not None:
+            statuses.add(record, "completed", row_count=row_count, processing_time_ms=processing_time)
+        else:
+            update_data_import(import_id, "completed", row_count=row_count, processing_time_ms=processing_time)
+            update_inventory_pull_status(pull_id, "completed", row_count=row_count, processing_time_ms=processing_time)
 
         print(f"\n✓ Completed: {row_count} storage fee records for {marketplace_code}")
 
@@ -251,10 +266,13 @@ def pull_marketplace_storage_fees(
         error_msg = str(e)
         print(f"\n✗ Error for {marketplace_code}: {error_msg}")
 
-        if not dry_run and import_id:
-            update_data_import(import_id, "failed", error_message=error_msg)
-        if not dry_run and pull_id:
-            update_inventory_pull_status(pull_id, "failed", error_message=error_msg)
+        if not dry_run and statuses is not None and record is not None:
+            statuses.add(record, "failed", error_message=error_msg)
+        else:
+            if not dry_run and import_id:
+                update_data_import(import_id, "failed", error_message=error_msg)
+            if not dry_run and pull_id:
+                update_inventory_pull_status(pull_id, "failed", error_message=error_msg)
 
         return {
             "status": "failed",
@@ -289,7 +307,9 @@ def main():
         help="Pull data but don't write to database"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "pull_storage_fees")
 
     region = args.region.upper()
 
@@ -328,10 +348,8 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print("="*60)
 
-    # Get access token
-    print("\nGetting access token...")
-    access_token = get_access_token(region=region)
-    print("✓ Access token obtained")
+    # Shared client: refreshing tokens, retry and rate limiting
+    client = SPAPIClient(region=region)
 
     # Process each marketplace
     results = []
@@ -341,11 +359,12 @@ def main():
             time.sleep(65)
 
         result = pull_marketplace_storage_fees(
-            access_token,
+            None,
             marketplace,
             month,
             region=region,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            client=client
         )
         results.append(result)
 
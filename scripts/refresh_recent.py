@@ -9,34 +9,47 @@ Usage:
     python refresh_recent.py                    # Refresh last 14 days (default)
     python refresh_recent.py --days 7           # Refresh last 7 days
     python refresh_recent.py --marketplace USA  # Single marketplace
+    python refresh_recent.py --workers 8        # More concurrent report requests
 
 Recommended: Run daily to keep data accurate.
+
+All days and marketplaces are refreshed concurrently through one SPAPIClient
+(retry, rate limiting, token refresh), so a refresh is paced by the Reports
+API quota rather than fixed sleeps. Tracking records are created and
+completed in bulk.
+
+Rows whose content hasn't changed since the last pull are not rewritten
+(row_hash change detection, see utils/change_detection.py); the summary
+shows how many ASIN rows were new, changed or unchanged.
 """
 
 import os
 import sys
 import argparse
 import time
+import threading
 from datetime import date, timedelta
 from typing import List
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils.auth import get_access_token
-from scripts.utils.reports import pull_single_day_report, MARKETPLACE_IDS
+from scripts.utils.reports import fetch_single_day_report_body, parse_report_body
 from scripts.utils.db import (
-    create_data_import,
-    update_data_import,
-    create_pull_record,
-    update_pull_status,
-    upsert_asin_data,
+    create_pull_records_batch,
+    PullStatusBatch,
+    upsert_asin_data_changes,
     upsert_totals
 )
+from scripts.utils.api_client import SPAPIClient
+from scripts.utils.async_client import get_sp_api_client
+from scripts.utils.pipeline import Pipeline, Stage, DB_WORKERS
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 # Configuration
 DEFAULT_REFRESH_DAYS = 14  # How many days back to refresh
-RATE_LIMIT_SECONDS = 65    # Wait between report requests
+# Reports in flight at once; the client's rate limiter paces createReport
+REPORT_WORKERS = int(os.environ.get("SP_REFRESH_REPORT_WORKERS", "6"))
 
 # North America marketplaces
 NA_MARKETPLACES = ["USA", "CA", "MX"]
@@ -49,99 +62,29 @@ MARKETPLACES_BY_REGION = {
 }
 
 
-def refresh_single_day(
-    marketplace_code: str,
-    report_date: date,
-    region: str = "NA",
-    access_token: str = None
-) -> dict:
-    """
-    Refresh data for a single marketplace and date (force overwrite).
-    """
-    result = {
-        "marketplace": marketplace_code,
-        "date": report_date.isoformat(),
-        "status": "pending",
-        "asin_count": 0,
-        "error": None
-    }
-
-    start_time = time.time()
-
-    try:
-        # Get fresh access token if not provided
-        if not access_token:
-            access_token = get_access_token(region=region)
-
-        # Create tracking records
-        import_id = create_data_import(marketplace_code, report_date)
-        pull_id = create_pull_record(marketplace_code, report_date, import_id=import_id)
-
-        # Update pull status
-        update_pull_status(pull_id, "processing")
-
-        # Pull the report
-        report_data = pull_single_day_report(
-            access_token=access_token,
-            marketplace_code=marketplace_code,
-            report_date=report_date,
-            region=region
-        )
-
-        # Store ASIN data (upsert will overwrite existing)
-        asin_count = upsert_asin_data(report_data, marketplace_code, report_date, import_id)
-
-        # Store totals
-        upsert_totals(report_data, marketplace_code, report_date, import_id)
-
-        # Calculate processing time
-        processing_time_ms = int((time.time() - start_time) * 1000)
-
-        # Update tracking records
-        update_pull_status(
-            pull_id,
-            "completed",
-            asin_count=asin_count,
-            processing_time_ms=processing_time_ms
-        )
-        update_data_import(
-            import_id,
-            "completed",
-            row_count=asin_count,
-            processing_time_ms=processing_time_ms
-        )
-
-        result["status"] = "completed"
-        result["asin_count"] = asin_count
-
-    except Exception as e:
-        error_msg = str(e)
-        result["status"] = "failed"
-        result["error"] = error_msg
-
-        try:
-            if 'pull_id' in locals():
-                update_pull_status(pull_id, "failed", error_message=error_msg)
-            if 'import_id' in locals():
-                update_data_import(import_id, "failed", error_message=error_msg)
-        except:
-            pass
-
-    return result
-
-
 def refresh_recent_data(
     marketplaces: List[str],
     days: int = DEFAULT_REFRESH_DAYS,
-    region: str = "NA"
+    region: str = "NA",
+    workers: int = REPORT_WORKERS,
+    client: SPAPIClient = None
 ) -> dict:
     """
     Refresh the last N days of data for all specified marketplaces.
 
+    Every (marketplace, date) is a pipeline item: report workers share one
+    SPAPIClient, so its rate limiter decides when the next createReport may
+    go out while other workers poll and download; parsing runs in a process
+    pool and the upserts on DB worker threads. Tracking records are created
+    for all targets up front in one request and their final statuses are
+    written in batches.
+
     Args:
         marketplaces: List of marketplace codes
         days: Number of days back to refresh
         region: API region
+        workers: Concurrent report create/poll/download workers
+        client: SPAPIClient (default: one for the region, token refreshed as needed)
 
     Returns:
         Summary statistics
@@ -155,66 +98,135 @@ def refresh_recent_data(
     print("=" * 60)
     print(f"📅 Refreshing: {start_date} to {end_date} ({days} days)")
     print(f"🌎 Marketplaces: {', '.join(marketplaces)}")
-    print(f"📦 Total requests: {days * len(marketplaces)}")
+    print(f"📦 Total requests: {days * len(marketplaces)} ({workers} concurrent)")
+
+    # Newest dates first - most likely to have changes
+    targets = [
+        (marketplace_code, end_date - timedelta(days=offset))
+        for offset in range(days)
+        for marketplace_code in marketplaces
+    ]
+
+    # One client for the whole refresh: retry, rate limiting and token refresh
+    if client is None:
+        client = get_sp_api_client(region=region)
+
+    print("\n🗂️  Creating tracking records...")
+    records = create_pull_records_batch(targets)
+    statuses = PullStatusBatch()
+    started = time.time()
+    done = [0]
+    done_lock = threading.Lock()
+
+    def progress() -> str:
+        with done_lock:
+            done[0] += 1
+            return f"[{done[0] / len(targets) * 100:.1f}%]"
+
+    def new_job(target) -> dict:
+        marketplace_code, report_date = target
+        return {
+            "marketplace": marketplace_code,
+            "date": report_date,
+            "record": records[target],
+            "started": time.time(),
+            "result": {
+                "marketplace": marketplace_code,
+                "date": report_date.isoformat(),
+                "status": "pending",
+                "asin_count": 0,
+                "row_changes": None,
+                "error": None
+            },
+        }
+
+    def fetch(job: dict) -> dict:
+        job["body"], job["compression"] = fetch_single_day_report_body(
+            marketplace_code=job["marketplace"],
+            report_date=job["date"],
+            region=region,
+            client=client
+        )
+        return job
+
+    def parsed(job: dict, report_data: dict) -> dict:
+        job["body"] = None
+        job["report_data"] = report_data
+        return job
+
+    def store(job: dict) -> dict:
+        marketplace_code, report_date, result = job["marketplace"], job["date"], job["result"]
+        import_id = job["record"]["import_id"]
+        report_data = job.pop("report_data")
+
+        # Store ASIN data (only rows that changed since the last pull are rewritten)
+        row_changes = upsert_asin_data_changes(report_data, marketplace_code, report_date, import_id)
+        asin_count = row_changes.pop("total")
+
+        # Store totals
+        upsert_totals(report_data, marketplace_code, report_date, import_id)
 
-    # Get access token
-    print("\n🔑 Getting access token...")
-    access_token = get_access_token(region=region)
-    token_time = time.time()
+        processing_time_ms = int((time.time() - job["started"]) * 1000)
+        statuses.add(
+            job["record"], "completed", asin_count=asin_count,
+            processing_time_ms=processing_time_ms, row_changes=row_changes
+        )
+
+        result["status"] = "completed"
+        result["asin_count"] = asin_count
+        result["row_changes"] = row_changes
+        print(f"✅ {progress()} {marketplace_code} {report_date}: {asin_count} ASINs "
+              f"({row_changes['changed']} changed, {row_changes['new']} new, {row_changes['unchanged']} unchanged)")
+        return result
+
+    def failed(job: dict, stage: str, error: Exception) -> dict:
+        result = job["result"]
+        result["status"] = "failed"
+        result["error"] = str(error)
+        statuses.add(job["record"], "failed", error_message=result["error"])
+        print(f"❌ {progress()} {job['marketplace']} {job['date']} ({stage}): {result['error'][:100]}")
+        return result
+
+    pipeline = Pipeline(f"refresh_{region.lower()}", [
+        Stage("report", fetch, workers=workers),
+        Stage(
+            "parse", parse_report_body, processes=True,
+            args=lambda job: (job["body"], job["compression"]),
+            merge=parsed
+        ),
+        Stage("store", store, workers=DB_WORKERS),
+    ], on_error=failed)
+
+    try:
+        results = pipeline.run(new_job(target) for target in targets)
+    finally:
+        statuses.flush()
 
     # Statistics
     stats = {
         "completed": 0,
         "failed": 0,
         "total_asins": 0,
+        "rows_new": 0,
+        "rows_changed": 0,
+        "rows_unchanged": 0,
         "errors": []
     }
-
-    request_count = 0
-    total_requests = days * len(marketplaces)
-
-    # Process each date (newest first - most likely to have changes)
-    current_date = end_date
-    while current_date >= start_date:
-        for marketplace_code in marketplaces:
-            request_count += 1
-            progress = request_count / total_requests * 100
-
-            print(f"\n[{progress:.1f}%] Refreshing {marketplace_code} {current_date}")
-
-            # Refresh token every 30 minutes
-            if time.time() - token_time > 1800:
-                print("🔑 Refreshing access token...")
-                access_token = get_access_token(region=region)
-                token_time = time.time()
-
-            # Pull data (force overwrite)
-            result = refresh_single_day(
-                marketplace_code=marketplace_code,
-                report_date=current_date,
-                region=region,
-                access_token=access_token
-            )
-
-            if result["status"] == "completed":
-                stats["completed"] += 1
-                stats["total_asins"] += result["asin_count"]
-                print(f"✅ Refreshed: {result['asin_count']} ASINs")
-            else:
-                stats["failed"] += 1
-                stats["errors"].append({
-                    "marketplace": marketplace_code,
-                    "date": current_date.isoformat(),
-                    "error": result["error"]
-                })
-                print(f"❌ Failed: {result['error'][:100]}")
-
-            # Rate limiting (except for last request)
-            if request_count < total_requests:
-                print(f"⏳ Waiting {RATE_LIMIT_SECONDS}s...")
-                time.sleep(RATE_LIMIT_SECONDS)
-
-        current_date -= timedelta(days=1)
+    for result in results:
+        if result["status"] == "completed":
+            stats["completed"] += 1
+            stats["total_asins"] += result["asin_count"]
+            for key in ("new", "changed", "unchanged"):
+                stats[f"rows_{key}"] += result["row_changes"][key]
+        else:
+            stats["failed"] += 1
+            stats["errors"].append({
+                "marketplace": result["marketplace"],
+                "date": result["date"],
+                "error": result["error"]
+            })
+
+    client_stats = client.get_stats()
 
     # Summary
     print("\n" + "=" * 60)
@@ -223,6 +235,10 @@ def refresh_recent_data(
     print(f"✅ Completed: {stats['completed']}")
     print(f"❌ Failed: {stats['failed']}")
     print(f"📦 Total ASINs: {stats['total_asins']}")
+    print(f"♻️  Rows: {stats['rows_changed']} changed, {stats['rows_new']} new, "
+          f"{stats['rows_unchanged']} unchanged (not rewritten)")
+    print(f"⏱️  {time.time() - started:.0f}s, {client_stats['requests']} API requests, "
+          f"{client_stats['retries']} retries, {client_stats['rate_limit_waits']} rate limit waits")
 
     return stats
 
@@ -249,8 +265,16 @@ def main():
         choices=["NA", "EU", "FE", "UAE"],
         help="Region to refresh. Default: NA"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=REPORT_WORKERS,
+        help=f"Concurrent report requests. Default: {REPORT_WORKERS}"
+    )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "refresh_recent")
 
     region = args.region.upper()
 
@@ -264,7 +288,8 @@ def main():
     stats = refresh_recent_data(
         marketplaces=marketplaces,
         days=args.days,
-        region=region
+        region=region,
+        workers=args.workers
     )
 
     # Exit with error code only if majority of requests failed
@@ -10,6 +10,7 @@ Usage:
     python refresh_views.py --view weekly      # Refresh only weekly
     python refresh_views.py --view monthly     # Refresh only monthly
     python refresh_views.py --view rolling     # Refresh only rolling
+    python refresh_views.py --view sheet_pivot # Rebuild only the Code.gs pivot feed
     python refresh_views.py --full             # Force full refresh of all data
 
 Environment Variables Required:
@@ -36,6 +37,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.utils.db import get_supabase_client
+from scripts.utils.profiling import add_profile_argument, start_profiling
 
 
 # View configurations
@@ -51,6 +53,12 @@ VIEWS = {
     "rolling": {
         "mat_view": "sp_rolling_asin_metrics_mat",
         "description": "Rolling 7/14/30/60 day metrics"
+    },
+    # Not a materialized view: rebuilt by an RPC from the weekly/monthly views,
+    # so it must stay after them in this dict (see migrations/004_sheet_pivot_feed.sql)
+    "sheet_pivot": {
+        "function": "refresh_sheet_pivot_feed",
+        "description": "Sheet-ready ASIN x period pivot feed (Code.gs)"
     }
 }
 
@@ -116,6 +124,40 @@ def refresh_view(view_name: str, concurrent: bool = True) -> dict:
         }
 
 
+def refresh_feed(function_name: str) -> dict:
+    """
+    Rebuild a derived feed by calling its refresh RPC.
+
+    Args:
+        function_name: Name of the Postgres refresh function
+
+    Returns:
+        Dict with status, timing and the row count returned by the function
+    """
+    client = get_supabase_client()
+    start_time = time.time()
+
+    try:
+        result = client.rpc(function_name, {}).execute()
+        elapsed_ms = int((time.time() - start_time) * 1000)
+
+        return {
+            "view": function_name,
+            "status": "success",
+            "elapsed_ms": elapsed_ms,
+            "row_count": result.data
+        }
+
+    except Exception as e:
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        return {
+            "view": function_name,
+            "status": "failed",
+            "elapsed_ms": elapsed_ms,
+            "error": str(e)
+        }
+
+
 def refresh_all_views(views_to_refresh: list = None) -> dict:
     """
     Refresh all or specified materialized views.
@@ -144,17 +186,20 @@ def refresh_all_views(views_to_refresh: list = None) -> dict:
             continue
 
         view_config = VIEWS[view_key]
-        mat_view = view_config["mat_view"]
         description = view_config["description"]
 
         print(f"\n🔄 Refreshing {view_key}: {description}")
-        print(f"   Materialized view: {mat_view}")
-
-        result = refresh_view(mat_view)
+        if "function" in view_config:
+            print(f"   Refresh function: {view_config['function']}()")
+            result = refresh_feed(view_config["function"])
+        else:
+            print(f"   Materialized view: {view_config['mat_view']}")
+            result = refresh_view(view_config["mat_view"])
         results.append(result)
 
         if result["status"] == "success":
-            print(f"   ✅ Completed in {result['elapsed_ms']}ms")
+            rows_str = f" ({result['row_count']} rows)" if result.get("row_count") is not None else ""
+            print(f"   ✅ Completed in {result['elapsed_ms']}ms{rows_str}")
         else:
             print(f"   ❌ Failed: {result.get('error', 'Unknown error')[:100]}")
 
@@ -195,7 +240,9 @@ def main():
         help="Show what would be refreshed without actually refreshing"
     )
 
+    add_profile_argument(parser)
     args = parser.parse_args()
+    start_profiling(args.profile, "refresh_views")
 
     # Determine which views to refresh
     if args.view:
@@ -207,7 +254,8 @@ def main():
         print("\n🏃 DRY RUN - Would refresh:")
         for view_key in views_to_refresh:
             if view_key in VIEWS:
-                print(f"   - {view_key}: {VIEWS[view_key]['mat_view']}")
+                target = VIEWS[view_key].get("mat_view") or f"{VIEWS[view_key]['function']}()"
+                print(f"   - {view_key}: {target}")
         print("\nNote: Full refresh takes ~1-5 seconds for current data size.")
         print("Historical data (e.g., Dec 2025) is included but doesn't change.")
         return
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+
+Generates synthetic Sales & Traffic, SQP/SCP, Search Terms, orders,
+settlement and inventory reports, times each pipeline stage on them, and
+records rows/sec and peak RSS per git commit so regressions show up between
+commits. See scripts/benchmarks/ for the stages.
+
+Usage:
+    python scripts/run_benchmarks.py                                   # all non-DB stages, 1000 ASINs
+    python scripts/run_benchmarks.py --asins 5000 --days 7 --marketplaces 3
+    python scripts/run_benchmarks.py --stages parse_settlement_rows aggregate_orders_by_asin
+    python scripts/run_benchmarks.py --db                              # + upserts (local Supabase only)
+    python scripts/run_benchmarks.py --compare-only                    # re-print last comparison
+    python scripts/run_benchmarks.py --list
+
+DB stages write benchmark rows (dated 2000-01-xx) through SUPABASE_URL /
+SUPABASE_SERVICE_KEY. Point them at a local stack (`supabase start`);
+non-local URLs are refused unless --allow-remote-db is given.
+
+Exit code is 1 when --fail-on-regression is set and any stage regressed
+(rows/sec down or stage memory up by more than --threshold).
+"""
+
+import os
+import sys
+import argparse
+from urllib.parse import urlsplit
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.benchmarks import (
+    BenchmarkScale, STAGES, run_benchmarks,
+    DEFAULT_RESULTS_PATH, build_record, save_result, load_results,
+    find_baseline, compare, format_comparison,
+)
+from scripts.benchmarks.results import DEFAULT_THRESHOLD
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "host.docker.internal"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SP-API pipeline stages on synthetic reports")
+    parser.add_argument("--asins", type=int, default=1000, help="ASINs per report (default: 1000)")
+    parser.add_argument("--days", type=int, default=1, help="Reports per marketplace (default: 1)")
+    parser.add_argument("--marketplaces", type=int, default=1, help="Marketplaces, USA first (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), help="Stages to run (default: all non-DB)")
+    parser.add_argument("--db", action="store_true", help="Include DB upsert stages")
+    parser.add_argument("--allow-remote-db", action="store_true", help="Allow DB stages against a non-local SUPABASE_URL")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage, best kept (default: 3)")
+    parser.add_argument("--no-isolate", action="store_true", help="Run stages in this process (faster, RSS less accurate)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH, help=f"Results file (default: {DEFAULT_RESULTS_PATH})")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the results file")
+    parser.add_argument("--baseline", help="Commit to compare against (default: latest other commit)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Regression threshold as a fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any stage regressed")
+    parser.add_argument("--compare-only", action="store_true", help="Compare the latest stored run, don't run")
+    parser.add_argument("--list", action="store_true", help="List stages and exit")
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name, stage in STAGES.items():
+            print(f"{name:<36}{'[db] ' if stage.needs_db else ''}{stage.description}")
+        return
+
+    history = load_results(args.results)
+
+    if args.compare_only:
+        if not history:
+            print(f"No results in {args.results}")
+            sys.exit(1)
+        record = history.pop()
+    else:
+        stage_names = args.stages or [name for name, stage in STAGES.items() if args.db or not stage.needs_db]
+
+        if any(STAGES[name].needs_db for name in stage_names):
+            host = urlsplit(os.environ.get("SUPABASE_URL", "")).hostname
+            if not host:
+                print("DB stages need SUPABASE_URL / SUPABASE_SERVICE_KEY (local Supabase stack)")
+                sys.exit(1)
+            if host not in LOCAL_HOSTS and not args.allow_remote_db:
+                print(f"Refusing to write benchmark rows to {host}; use a local stack or --allow-remote-db")
+                sys.exit(1)
+
+        scale = BenchmarkScale(asins=args.asins, days=args.days, marketplaces=args.marketplaces, seed=args.seed)
+        print(f"Benchmarking {len(stage_names)} stage(s) at {scale}, best of {args.repeat}")
+        results = run_benchmarks(stage_names, scale, repeat=args.repeat, isolate=not args.no_isolate)
+
+        record = build_record(scale.to_dict(), results, args.repeat, isolated=not args.no_isolate)
+        if not args.no_save:
+            save_result(record, args.results)
+            print(f"Saved to {args.results} (commit {record['commit']}{', dirty' if record['dirty'] else ''})")
+
+    baseline = find_baseline(history, record, args.baseline)
+    if baseline is None:
+        print("No earlier run at this scale to compare against")
+        return
+
+    rows = compare(record, baseline, args.threshold)
+    print()
+    print(format_comparison(rows, record, baseline))
+
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
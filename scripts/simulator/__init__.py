@@ -0,0 +1,5 @@
+# Local SP-API simulator for offline load and performance testing
+# See server.py for behaviour and scripts/sp_api_simulator.py for the CLI
+
+from .server import SPAPISimulator, SimulatorConfig, DEFAULT_RATE_LIMITS
+from .documents import render_document, to_tsv
@@ -0,0 +1,566 @@
+"""
+Synthetic SP-API Report Documents
+Deterministic generators for every report type the pull scripts parse.
+
+Each generator takes a row count and a random.Random, and returns the same
+structure the real report has after decompression:
+- JSON reports (Sales & Traffic, SQP, SCP, Search Terms) → dict
+- Flat-file reports (orders, settlement, inventory, ...) → list of row dicts,
+  serialised to TSV with to_tsv()
+
+Field names match what the parsers in scripts/utils read, so documents
+round-trip through download_report(), parse_sqp_response(),
+aggregate_orders_by_asin(), parse_settlement_rows(), etc.
+"""
+
+import io
+import csv
+import gzip
+import json
+import random
+import string
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Callable
+
+MARKETPLACE_CURRENCY = {
+    "ATVPDKIKX0DER": ("USD", "Amazon.com"),
+    "A2EUQ1WTGCTBG2": ("CAD", "Amazon.ca"),
+    "A1AM78C64UM0Y8": ("MXN", "Amazon.com.mx"),
+    "A1F83G8C2ARO7P": ("GBP", "Amazon.co.uk"),
+    "A1PA6795UKMFR9": ("EUR", "Amazon.de"),
+    "A13V1IB3VIYZZH": ("EUR", "Amazon.fr"),
+    "APJ6JRA9NG5V4": ("EUR", "Amazon.it"),
+    "A1RKKUPIHCS9HS": ("EUR", "Amazon.es"),
+    "A2VIGQ35RCS4UG": ("AED", "Amazon.ae"),
+    "A39IBJ37TRP1C6": ("AUD", "Amazon.com.au"),
+    "A1VC38T7YXB528": ("JPY", "Amazon.co.jp"),
+}
+
+_WORDS = (
+    "chalk", "markers", "liquid", "paint", "pens", "board", "kids", "art", "set",
+    "neon", "window", "glass", "erasable", "white", "fine", "tip", "bold", "pastel",
+    "metallic", "reversible", "wet", "wipe", "blackboard", "sign", "menu", "car",
+)
+
+
+def _asin(rng: random.Random) -> str:
+    return "B0" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=8))
+
+
+def _asins(n: int, rng: random.Random) -> List[str]:
+    return [_asin(rng) for _ in range(n)]
+
+
+def _money(amount: float, currency: str) -> Dict[str, Any]:
+    return {"amount": round(amount, 2), "currencyCode": currency}
+
+
+def _query(rng: random.Random) -> str:
+    return " ".join(rng.sample(_WORDS, rng.randint(1, 4)))
+
+
+def _currency(marketplace_id: str) -> str:
+    return MARKETPLACE_CURRENCY.get(marketplace_id, ("USD", "Amazon.com"))[0]
+
+
+# =============================================================================
+# JSON reports
+# =============================================================================
+
+def sales_traffic_report(
+    n_asins: int,
+    rng: random.Random,
+    report_date: Optional[date] = None,
+    marketplace_id: str = "ATVPDKIKX0DER"
+) -> Dict[str, Any]:
+    """GET_SALES_AND_TRAFFIC_REPORT: salesAndTrafficByAsin + salesAndTrafficByDate."""
+    currency = _currency(marketplace_id)
+    report_date = report_date or date.today() - timedelta(days=1)
+    parents = _asins(max(1, n_asins // 4), rng)
+
+    by_asin = []
+    total_units = total_sales = total_items = total_sessions = total_views = 0
+    for asin in _asins(n_asins, rng):
+        units = rng.randint(0, 60)
+        price = rng.uniform(5, 40)
+        sessions = units * rng.randint(3, 12) + rng.randint(0, 50)
+        views = sessions + rng.randint(0, sessions + 1)
+        items = max(0, units - rng.randint(0, 3))
+        by_asin.append({
+            "parentAsin": rng.choice(parents),
+            "childAsin": asin,
+            "salesByAsin": {
+                "unitsOrdered": units,
+                "unitsOrderedB2B": rng.randint(0, units // 10 + 1),
+                "orderedProductSales": _money(units * price, currency),
+                "orderedProductSalesB2B": _money(rng.uniform(0, 20), currency),
+                "totalOrderItems": items,
+                "totalOrderItemsB2B": 0,
+            },
+            "trafficByAsin": {
+                "browserSessions": sessions // 2,
+                "mobileAppSessions": sessions - sessions // 2,
+                "sessions": sessions,
+                "sessionsB2B": rng.randint(0, 5),
+                "browserPageViews": views // 2,
+                "mobileAppPageViews": views - views // 2,
+                "pageViews": views,
+                "pageViewsB2B": rng.randint(0, 5),
+                "buyBoxPercentage": round(rng.uniform(80, 100), 2),
+                "buyBoxPercentageB2B": round(rng.uniform(80, 100), 2),
+                "unitSessionPercentage": round(100 * units / sessions, 2) if sessions else 0.0,
+                "unitSessionPercentageB2B": 0.0,
+            },
+        })
+        total_units += units
+        total_sales += units * price
+        total_items += items
+        total_sessions += sessions
+        total_views += views
+
+    return {
+        "reportSpecification": {
+            "reportType": "GET_SALES_AND_TRAFFIC_REPORT",
+            "dataStartTime": report_date.isoformat(),
+            "dataEndTime": report_date.isoformat(),
+            "marketplaceIds": [marketplace_id],
+        },
+        "salesAndTrafficByDate": [{
+            "date": report_date.isoformat(),
+            "salesByDate": {
+                "orderedProductSales": _money(total_sales, currency),
+                "orderedProductSalesB2B": _money(0, currency),
+                "unitsOrdered": total_units,
+                "unitsOrderedB2B": 0,
+                "totalOrderItems": total_items,
+                "totalOrderItemsB2B": 0,
+            },
+            "trafficByDate": {
+                "sessions": total_sessions,
+                "sessionsB2B": 0,
+                "pageViews": total_views,
+                "pageViewsB2B": 0,
+            },
+        }],
+        "salesAndTrafficByAsin": by_asin,
+    }
+
+
+def sqp_report(n_rows: int, rng: random.Random, marketplace_id: str = "ATVPDKIKX0DER") -> Dict[str, Any]:
+    """GET_BRAND_ANALYTICS_SEARCH_QUERY_PERFORMANCE_REPORT: one item per ASIN x query."""
+    currency = _currency(marketplace_id)
+    asins = _asins(max(1, n_rows // 20), rng)
+    items = []
+    for _ in range(n_rows):
+        impressions = rng.randint(1000, 500000)
+        clicks = rng.randint(10, impressions // 10)
+        carts = rng.randint(0, clicks // 3 + 1)
+        purchases = rng.randint(0, carts + 1)
+        items.append({
+            "asin": rng.choice(asins),
+            "searchQueryData": {
+                "searchQuery": _query(rng),
+                "searchQueryScore": rng.randint(1, 1000),
+                "searchQueryVolume": rng.randint(100, 1000000),
+            },
+            "impressionData": {
+                "totalQueryImpressionCount": impressions,
+                "asinImpressionCount": impressions // rng.randint(2, 50),
+                "asinImpressionShare": round(rng.random(), 4),
+            },
+            "clickData": {
+                "totalClickCount": clicks,
+                "totalClickRate": round(clicks / impressions, 4),
+                "asinClickCount": clicks // rng.randint(2, 20),
+                "asinClickShare": round(rng.random(), 4),
+                "totalMedianClickPrice": _money(rng.uniform(5, 30), currency),
+                "asinMedianClickPrice": _money(rng.uniform(5, 30), currency),
+                "totalSameDayShippingClickCount": rng.randint(0, clicks // 4 + 1),
+                "totalOneDayShippingClickCount": rng.randint(0, clicks // 4 + 1),
+                "totalTwoDayShippingClickCount": rng.randint(0, clicks // 4 + 1),
+            },
+            "cartAddData": {
+                "totalCartAddCount": carts,
+                "totalCartAddRate": round(carts / impressions, 4),
+                "asinCartAddCount": carts // rng.randint(1, 10),
+                "asinCartAddShare": round(rng.random(), 4),
+                "totalMedianCartAddPrice": _money(rng.uniform(5, 30), currency),
+                "asinMedianCartAddPrice": _money(rng.uniform(5, 30), currency),
+                "totalSameDayShippingCartAddCount": rng.randint(0, carts // 4 + 1),
+                "totalOneDayShippingCartAddCount": rng.randint(0, carts // 4 + 1),
+                "totalTwoDayShippingCartAddCount": rng.randint(0, carts // 4 + 1),
+            },
+            "purchaseData": {
+                "totalPurchaseCount": purchases,
+                "totalPurchaseRate": round(purchases / impressions, 4),
+                "asinPurchaseCount": purchases // rng.randint(1, 10),
+                "asinPurchaseShare": round(rng.random(), 4),
+                "totalMedianPurchasePrice": _money(rng.uniform(5, 30), currency),
+                "asinMedianPurchasePrice": _money(rng.uniform(5, 30), currency),
+                "totalSameDayShippingPurchaseCount": rng.randint(0, purchases // 4 + 1),
+                "totalOneDayShippingPurchaseCount": rng.randint(0, purchases // 4 + 1),
+                "totalTwoDayShippingPurchaseCount": rng.randint(0, purchases // 4 + 1),
+            },
+        })
+    return {"dataByAsin": items}
+
+
+def scp_report(n_asins: int, rng: random.Random, marketplace_id: str = "ATVPDKIKX0DER") -> Dict[str, Any]:
+    """GET_BRAND_ANALYTICS_SEARCH_CATALOG_PERFORMANCE_REPORT: one item per ASIN."""
+    currency = _currency(marketplace_id)
+    items = []
+    for asin in _asins(n_asins, rng):
+        impressions = rng.randint(1000, 500000)
+        clicks = rng.randint(10, impressions // 10)
+        carts = rng.randint(0, clicks // 3 + 1)
+        purchases = rng.randint(0, carts + 1)
+        items.append({
+            "asin": asin,
+            "impressionData": {
+                "impressionCount": impressions,
+                "impressionMedianPrice": _money(rng.uniform(5, 30), currency),
+            },
+            "clickData": {
+                "clickCount": clicks,
+                "clickRate": round(clicks / impressions, 4),
+                "clickedMedianPrice": _money(rng.uniform(5, 30), currency),
+                "sameDayShippingClickCount": rng.randint(0, clicks // 4 + 1),
+                "oneDayShippingClickCount": rng.randint(0, clicks // 4 + 1),
+                "twoDayShippingClickCount": rng.randint(0, clicks // 4 + 1),
+            },
+            "cartAddData": {
+                "cartAddCount": carts,
+                "cartAddRate": round(carts / impressions, 4),
+                "cartAddMedianPrice": _money(rng.uniform(5, 30), currency),
+                "sameDayShippingCartAddCount": rng.randint(0, carts // 4 + 1),
+                "oneDayShippingCartAddCount": rng.randint(0, carts // 4 + 1),
+                "twoDayShippingCartAddCount": rng.randint(0, carts // 4 + 1),
+            },
+            "purchaseData": {
+                "purchaseCount": purchases,
+                "purchaseRate": round(purchases / impressions, 4),
+                "purchaseMedianPrice": _money(rng.uniform(5, 30), currency),
+                "sameDayShippingPurchaseCount": rng.randint(0, purchases // 4 + 1),
+                "oneDayShippingPurchaseCount": rng.randint(0, purchases // 4 + 1),
+                "twoDayShippingPurchaseCount": rng.randint(0, purchases // 4 + 1),
+            },
+            "searchTrafficSales": _money(purchases * rng.uniform(5, 30), currency),
+            "conversionRate": round(purchases / clicks, 4) if clicks else 0.0,
+        })
+    return {"dataByAsin": items}
+
+
+def search_terms_report(n_rows: int, rng: random.Random, marketplace_id: str = "ATVPDKIKX0DER") -> Dict[str, Any]:
+    """GET_BRAND_ANALYTICS_SEARCH_TERMS_REPORT: up to 3 clicked ASINs per search term."""
+    items = []
+    rank = 0
+    while len(items) < n_rows:
+        rank += 1
+        term = f"{_query(rng)} {rank}"
+        for click_rank in range(1, min(3, n_rows - len(items)) + 1):
+            items.append({
+                "departmentName": "Amazon.com",
+                "searchTerm": term,
+                "searchFrequencyRank": rank,
+                "clickedAsin": _asin(rng),
+                "clickedItemName": term.title(),
+                "clickShareRank": click_rank,
+                "clickShare": round(rng.uniform(0.01, 0.4), 4),
+                "conversionShare": round(rng.uniform(0.0, 0.4), 4),
+            })
+    return {
+        "reportSpecification": {
+            "reportType": "GET_BRAND_ANALYTICS_SEARCH_TERMS_REPORT",
+            "marketplaceIds": [marketplace_id],
+        },
+        "dataByDepartmentAndSearchTerm": items,
+    }
+
+
+# =============================================================================
+# Flat-file (TSV) reports
+# =============================================================================
+
+def orders_rows(
+    n_rows: int,
+    rng: random.Random,
+    report_date: Optional[date] = None,
+    marketplace_id: str = "ATVPDKIKX0DER"
+) -> List[Dict[str, str]]:
+    """GET_FLAT_FILE_ALL_ORDERS_DATA_BY_ORDER_DATE_GENERAL line items."""
+    currency, channel = MARKETPLACE_CURRENCY.get(marketplace_id, ("USD", "Amazon.com"))
+    report_date = report_date or date.today()
+    asins = _asins(max(1, n_rows // 10), rng)
+    rows = []
+    order_id = None
+    for i in range(n_rows):
+        if order_id is None or rng.random() < 0.7:
+            order_id = f"{rng.randint(100, 999)}-{rng.randint(1000000, 9999999)}-{rng.randint(1000000, 9999999)}"
+        quantity = rng.choice((1, 1, 1, 2, 3))
+        purchase = datetime.combine(report_date, datetime.min.time()) + timedelta(seconds=rng.randint(0, 86399))
+        rows.append({
+            "amazon-order-id": order_id,
+            "merchant-order-id": "",
+            "purchase-date": purchase.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "last-updated-date": purchase.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "order-status": rng.choices(("Shipped", "Pending", "Cancelled"), (80, 17, 3))[0],
+            "fulfillment-channel": "Amazon",
+            "sales-channel": channel,
+            "sku": f"SKU-{i % 500:04d}",
+            "asin": rng.choice(asins),
+            "item-status": "Shipped",
+            "quantity": str(quantity),
+            "currency": currency,
+            "item-price": f"{quantity * rng.uniform(5, 40):.2f}",
+            "item-tax": f"{rng.uniform(0, 3):.2f}",
+            "shipping-price": "0.00",
+            "ship-country": "US",
+        })
+    return rows
+
+
+def settlement_rows(
+    n_rows: int,
+    rng: random.Random,
+    settlement_id: Optional[str] = None,
+    marketplace_id: str = "ATVPDKIKX0DER",
+    european_dates: bool = False
+) -> List[Dict[str, str]]:
+    """
+    GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2 rows.
+
+    The first row is the settlement summary (total-amount set, no transaction
+    fields), like the real report. european_dates uses DD.MM.YYYY as EU
+    marketplaces do.
+    """
+    currency, channel = MARKETPLACE_CURRENCY.get(marketplace_id, ("USD", "Amazon.com"))
+    settlement_id = settlement_id or str(rng.randint(10 ** 10, 10 ** 11 - 1))
+    end = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 300))
+    start = end - timedelta(days=14)
+    fmt = "%d.%m.%Y %H:%M:%S UTC" if european_dates else "%Y-%m-%d %H:%M:%S UTC"
+
+    def ts(dt: datetime) -> str:
+        return dt.strftime(fmt)
+
+    blank = {
+        "settlement-id": settlement_id, "settlement-start-date": "", "settlement-end-date": "",
+        "deposit-date": "", "total-amount": "", "currency": "", "transaction-type": "",
+        "order-id": "", "merchant-order-id": "", "adjustment-id": "", "shipment-id": "",
+        "marketplace-name": "", "amount-type": "", "amount-description": "", "amount": "",
+        "fulfillment-id": "", "posted-date": "", "posted-date-time": "", "order-item-code": "",
+        "merchant-order-item-id": "", "merchant-adjustment-item-id": "", "sku": "",
+        "quantity-purchased": "", "promotion-id": "",
+    }
+
+    rows = [dict(
+        blank,
+        **{
+            "settlement-start-date": ts(start),
+            "settlement-end-date": ts(end),
+            "deposit-date": ts(end + timedelta(days=2)),
+            "total-amount": f"{rng.uniform(1000, 50000):.2f}",
+            "currency": currency,
+        }
+    )]
+
+    charge_types = (
+        ("Order", "ItemPrice", "Principal", 1),
+        ("Order", "ItemPrice", "Tax", 1),
+        ("Order", "ItemFees", "FBAPerUnitFulfillmentFee", -1),
+        ("Order", "ItemFees", "Commission", -1),
+        ("Refund", "ItemPrice", "Principal", -1),
+        ("Refund", "ItemFees", "Commission", 1),
+        ("other-transaction", "other-transaction", "Storage Fee", -1),
+    )
+    for i in range(n_rows - 1):
+        tx_type, amount_type, description, sign = rng.choice(charge_types)
+        posted = start + timedelta(seconds=rng.randint(0, 14 * 86400))
+        rows.append(dict(
+            blank,
+            **{
+                "currency": currency,
+                "transaction-type": tx_type,
+                "order-id": f"{rng.randint(100, 999)}-{rng.randint(1000000, 9999999)}-{rng.randint(1000000, 9999999)}",
+                "shipment-id": "D" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=8)),
+                "marketplace-name": channel,
+                "amount-type": amount_type,
+                "amount-description": description,
+                "amount": f"{sign * rng.uniform(0.5, 40):.2f}",
+                "fulfillment-id": "AFN",
+                "posted-date": posted.strftime("%d.%m.%Y" if european_dates else "%Y-%m-%d"),
+                "posted-date-time": ts(posted),
+                "order-item-code": str(rng.randint(10 ** 13, 10 ** 14 - 1)),
+                "sku": f"SKU-{i % 500:04d}",
+                "quantity-purchased": str(rng.choice((1, 1, 2))) if tx_type == "Order" else "",
+            }
+        ))
+    return rows
+
+
+def inventory_rows(n_rows: int, rng: random.Random) -> List[Dict[str, str]]:
+    """GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA / GET_FBA_MYI_ALL_INVENTORY_DATA rows."""
+    rows = []
+    for i in range(n_rows):
+        local = rng.randint(0, 2000)
+        remote = rng.randint(0, 200)
+        rows.append({
+            "sku": f"SKU-{i:05d}",
+            "fnsku": "X00" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=7)),
+            "asin": _asin(rng),
+            "product-name": " ".join(rng.sample(_WORDS, 5)).title(),
+            "condition": "New",
+            "your-price": f"{rng.uniform(5, 40):.2f}",
+            "mfn-listing-exists": "No",
+            "mfn-fulfillable-quantity": "",
+            "afn-listing-exists": "Yes",
+            "afn-warehouse-quantity": str(local + remote),
+            "afn-fulfillable-quantity": str(local + remote),
+            "afn-fulfillable-quantity-local": str(local),
+            "afn-fulfillable-quantity-remote": str(remote),
+            "afn-unsellable-quantity": str(rng.randint(0, 10)),
+            "afn-reserved-quantity": str(rng.randint(0, 100)),
+            "afn-total-quantity": str(local + remote + rng.randint(0, 100)),
+            "per-unit-volume": f"{rng.uniform(0.01, 0.5):.3f}",
+            "afn-inbound-working-quantity": str(rng.randint(0, 50)),
+            "afn-inbound-shipped-quantity": str(rng.randint(0, 500)),
+            "afn-inbound-receiving-quantity": str(rng.randint(0, 100)),
+        })
+    return rows
+
+
+def generic_rows(n_rows: int, rng: random.Random) -> List[Dict[str, str]]:
+    """Minimal SKU-level rows for flat-file reports without a dedicated generator."""
+    return [
+        {
+            "sku": f"SKU-{i:05d}",
+            "fnsku": "X00" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=7)),
+            "asin": _asin(rng),
+            "product-name": " ".join(rng.sample(_WORDS, 4)).title(),
+            "quantity": str(rng.randint(0, 500)),
+            "amount": f"{rng.uniform(0, 50):.2f}",
+            "currency": "USD",
+        }
+        for i in range(n_rows)
+    ]
+
+
+def to_tsv(rows: List[Dict[str, str]]) -> str:
+    """Serialise rows to tab-separated text with a header line."""
+    if not rows:
+        return ""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0].keys()), delimiter="\t", lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+# =============================================================================
+# FBA Inventory / AWD API payload items
+# =============================================================================
+
+def inventory_summaries(n_items: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """FBA Inventory API getInventorySummaries items (details=true)."""
+    items = []
+    for i in range(n_items):
+        reserved = rng.randint(0, 100)
+        unfulfillable = rng.randint(0, 10)
+        fulfillable = rng.randint(0, 2000)
+        items.append({
+            "asin": _asin(rng),
+            "fnSku": "X00" + "".join(rng.choices(string.ascii_uppercase + string.digits, k=7)),
+            "sellerSku": f"SKU-{i:05d}",
+            "condition": "NewItem",
+            "productName": " ".join(rng.sample(_WORDS, 5)).title(),
+            "lastUpdatedTime": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "totalQuantity": fulfillable + reserved + unfulfillable,
+            "inventoryDetails": {
+                "fulfillableQuantity": fulfillable,
+                "inboundWorkingQuantity": rng.randint(0, 50),
+                "inboundShippedQuantity": rng.randint(0, 500),
+                "inboundReceivingQuantity": rng.randint(0, 100),
+                "reservedQuantity": {
+                    "totalReservedQuantity": reserved,
+                    "pendingCustomerOrderQuantity": reserved // 2,
+                    "pendingTransshipmentQuantity": reserved // 4,
+                    "fcProcessingQuantity": reserved - reserved // 2 - reserved // 4,
+                },
+                "unfulfillableQuantity": {
+                    "totalUnfulfillableQuantity": unfulfillable,
+                    "customerDamagedQuantity": unfulfillable,
+                    "warehouseDamagedQuantity": 0,
+                    "distributorDamagedQuantity": 0,
+                    "carrierDamagedQuantity": 0,
+                    "defectiveQuantity": 0,
+                    "expiredQuantity": 0,
+                },
+                "researchingQuantity": {
+                    "totalResearchingQuantity": 0,
+                    "researchingQuantityBreakdown": [],
+                },
+            },
+        })
+    return items
+
+
+def awd_inventory(n_items: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """AWD API listInventory items (details=SHOW)."""
+    items = []
+    for i in range(n_items):
+        available = rng.randint(0, 5000)
+        reserved = rng.randint(0, 500)
+        items.append({
+            "sku": f"SKU-{i:05d}",
+            "totalOnhandQuantity": available + reserved,
+            "totalInboundQuantity": rng.randint(0, 2000),
+            "inventoryDetails": {
+                "availableDistributableQuantity": available,
+                "reservedDistributableQuantity": reserved,
+            },
+        })
+    return items
+
+
+# =============================================================================
+# Report type → document bytes
+# =============================================================================
+
+def _json_bytes(data: Dict[str, Any]) -> bytes:
+    return json.dumps(data).encode("utf-8")
+
+
+def _tsv_bytes(rows: List[Dict[str, str]]) -> bytes:
+    return to_tsv(rows).encode("utf-8")
+
+
+REPORT_GENERATORS: Dict[str, Callable[[int, random.Random, str], bytes]] = {
+    "GET_SALES_AND_TRAFFIC_REPORT": lambda n, rng, mp: _json_bytes(sales_traffic_report(n, rng, marketplace_id=mp)),
+    "GET_BRAND_ANALYTICS_SEARCH_QUERY_PERFORMANCE_REPORT": lambda n, rng, mp: _json_bytes(sqp_report(n, rng, mp)),
+    "GET_BRAND_ANALYTICS_SEARCH_CATALOG_PERFORMANCE_REPORT": lambda n, rng, mp: _json_bytes(scp_report(n, rng, mp)),
+    "GET_BRAND_ANALYTICS_SEARCH_TERMS_REPORT": lambda n, rng, mp: _json_bytes(search_terms_report(n, rng, mp)),
+    "GET_FLAT_FILE_ALL_ORDERS_DATA_BY_ORDER_DATE_GENERAL": lambda n, rng, mp: _tsv_bytes(orders_rows(n, rng, marketplace_id=mp)),
+    "GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2": lambda n, rng, mp: _tsv_bytes(settlement_rows(n, rng, marketplace_id=mp)),
+    "GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA": lambda n, rng, mp: _tsv_bytes(inventory_rows(n, rng)),
+    "GET_FBA_MYI_ALL_INVENTORY_DATA": lambda n, rng, mp: _tsv_bytes(inventory_rows(n, rng)),
+}
+
+
+def render_document(
+    report_type: str,
+    n_rows: int,
+    seed: int = 0,
+    marketplace_id: str = "ATVPDKIKX0DER",
+    compress: bool = True
+) -> bytes:
+    """
+    Build a report document as served from S3.
+
+    Unknown report types get generic SKU-level TSV rows.
+    """
+    rng = random.Random(seed)
+    generator = REPORT_GENERATORS.get(report_type)
+    if generator is None:
+        content = _tsv_bytes(generic_rows(n_rows, rng))
+    else:
+        content = generator(n_rows, rng, marketplace_id)
+    return gzip.compress(content, compresslevel=6) if compress else content
@@ -0,0 +1,633 @@
+"""
+SP-API Simulator Server
+Local HTTPS stand-in for the Reports, FBA Inventory, AWD and LWA endpoints.
+
+Behaviour mirrors what the pull scripts see from Amazon:
+- Token-bucket rate limits + burst per operation, 429 QuotaExceeded when empty,
+  x-amzn-RateLimit-Limit on every throttled-operation response
+- Reports go IN_QUEUE → IN_PROGRESS → DONE (or FATAL) over configurable delays
+- Report documents are synthetic gzip files served from a fake S3 path
+  (/s3/<documentId>) on the same server
+- Random 429 / 5xx injection on top of the quota
+- LWA token endpoint (/auth/o2/token) issuing short-lived fake tokens
+
+It serves HTTPS because every module builds URLs as https://{endpoint}/...;
+a self-signed certificate is generated with openssl and written into a CA
+bundle (certifi + the cert) so requests/httpx trust it while still trusting
+real hosts like Supabase.
+
+Usage:
+    with SPAPISimulator(SimulatorConfig(rows_per_report=5000)) as sim:
+        sim.apply()            # point ENDPOINTS / LWA_TOKEN_URL of loaded modules here
+        ... run pulls ...
+
+    # Or for subprocesses
+    env = {**os.environ, **sim.env()}
+"""
+
+import os
+import ssl
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple, List
+from urllib.parse import urlsplit, parse_qs
+
+from .documents import render_document, inventory_summaries, awd_inventory
+
+# Operation → (requests per second, burst). Amazon's published defaults.
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "createReport": (0.0167, 15),
+    "getReport": (2.0, 15),
+    "getReports": (0.0222, 10),
+    "getReportDocument": (0.0167, 15),
+    "getInventorySummaries": (2.0, 2),
+    "listInventory": (2.0, 2),
+    "lwaToken": (0.0, 0),       # 0 = unlimited
+    "s3": (0.0, 0),
+}
+
+# Modules in scripts/utils with an ENDPOINTS table
+ENDPOINT_MODULES = (
+    "reports", "sqp_reports", "orders_reports", "search_terms_reports",
+    "inventory_reports", "awd_api", "fba_inventory_api",
+)
+
+
+class SimulatorConfig:
+    """
+    Simulator knobs. All times are seconds.
+
+    Args:
+        rate_limits: Per-operation (rate, burst) overrides merged into DEFAULT_RATE_LIMITS
+        rate_scale: Multiply every rate (e.g. 100 to make createReport 1.67/s for fast tests)
+        queue_seconds: Time a new report spends IN_QUEUE
+        processing_seconds: Time a report spends IN_PROGRESS
+        fatal_rate: Fraction of reports that end FATAL
+        throttle_rate: Fraction of requests answered 429 regardless of quota
+        error_rate: Fraction of requests answered 500/503
+        rows_per_report: Rows in each synthetic document
+        report_rows: Per-reportType row count overrides
+        inventory_items: Items returned by getInventorySummaries / AWD listInventory
+        settlement_reports: Settlement reports pre-listed by getReports
+        token_ttl: expires_in of issued LWA tokens
+        seed: Random seed for documents and fault injection
+    """
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        rate_scale: float = 1.0,
+        queue_seconds: float = 1.0,
+        processing_seconds: float = 2.0,
+        fatal_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        rows_per_report: int = 1000,
+        report_rows: Optional[Dict[str, int]] = None,
+        inventory_items: int = 500,
+        settlement_reports: int = 4,
+        token_ttl: int = 3600,
+        seed: int = 0
+    ):
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(rate_limits or {})
+        self.rate_scale = rate_scale
+        self.queue_seconds = queue_seconds
+        self.processing_seconds = processing_seconds
+        self.fatal_rate = fatal_rate
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.rows_per_report = rows_per_report
+        self.report_rows = report_rows or {}
+        self.inventory_items = inventory_items
+        self.settlement_reports = settlement_reports
+        self.token_ttl = token_ttl
+        self.seed = seed
+
+    @classmethod
+    def from_file(cls, path: str, **overrides) -> "SimulatorConfig":
+        """Load from a JSON file; keyword overrides win."""
+        with open(path) as f:
+            data = json.load(f)
+        if "rate_limits" in data:
+            data["rate_limits"] = {k: tuple(v) for k, v in data["rate_limits"].items()}
+        data.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**data)
+
+
+class TokenBucket:
+    """Amazon's usage-plan model: `rate` tokens/sec refill, up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _State:
+    """Reports, documents and counters shared by all handler threads."""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.buckets = {
+            op: TokenBucket(rate * config.rate_scale, burst)
+            for op, (rate, burst) in config.rate_limits.items()
+            if rate > 0
+        }
+        self.reports: Dict[str, Dict[str, Any]] = {}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.document_cache: Dict[str, bytes] = {}
+        self.next_id = 50000000000
+        self.stats: Dict[str, int] = {}
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def new_id(self) -> int:
+        with self.lock:
+            self.next_id += 1
+            return self.next_id
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < probability
+
+    def create_report(self, report_type: str, marketplace_ids: List[str], status: Optional[str] = None) -> str:
+        report_id = str(self.new_id())
+        fatal = self.roll(self.config.fatal_rate)
+        document_id = f"amzn1.spdoc.1.4.na.sim{report_id}"
+        report = {
+            "reportId": report_id,
+            "reportType": report_type,
+            "marketplaceIds": marketplace_ids,
+            "created": time.time(),
+            "fatal": fatal,
+            "reportDocumentId": document_id,
+            "forced_status": status,
+        }
+        with self.lock:
+            self.reports[report_id] = report
+            self.documents[document_id] = {
+                "reportType": report_type,
+                "marketplaceId": (marketplace_ids or ["ATVPDKIKX0DER"])[0],
+                "seed": int(report_id),
+                "fatal": fatal,
+            }
+        return report_id
+
+    def report_view(self, report: Dict[str, Any]) -> Dict[str, Any]:
+        age = time.time() - report["created"]
+        if report["forced_status"]:
+            status = report["forced_status"]
+        elif age < self.config.queue_seconds:
+            status = "IN_QUEUE"
+        elif age < self.config.queue_seconds + self.config.processing_seconds:
+            status = "IN_PROGRESS"
+        else:
+            status = "FATAL" if report["fatal"] else "DONE"
+
+        created = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(report["created"]))
+        view = {
+            "reportId": report["reportId"],
+            "reportType": report["reportType"],
+            "marketplaceIds": report["marketplaceIds"],
+            "processingStatus": status,
+            "createdTime": created,
+        }
+        if status in ("DONE", "FATAL"):
+            view["processingEndTime"] = created
+            view["reportDocumentId"] = report["reportDocumentId"]
+        return view
+
+    def document_bytes(self, document_id: str) -> Optional[bytes]:
+        with self.lock:
+            cached = self.document_cache.get(document_id)
+            meta = self.documents.get(document_id)
+        if cached is not None or meta is None:
+            return cached
+        if meta["fatal"]:
+            content = render_document("FATAL", 1, seed=meta["seed"])
+        else:
+            rows = self.config.report_rows.get(meta["reportType"], self.config.rows_per_report)
+            content = render_document(meta["reportType"], rows, seed=meta["seed"], marketplace_id=meta["marketplaceId"])
+        with self.lock:
+            self.document_cache[document_id] = content
+        return content
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SPAPISimulator/1.0"
+
+    @property
+    def state(self) -> _State:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write("[simulator] " + format % args + "\n")
+
+    # ------------------------------------------------------------------
+    # Responses
+    # ------------------------------------------------------------------
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-amzn-RequestId", f"sim-{self.state.new_id()}")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, data: Any, headers: Dict[str, str] = None):
+        self._send(status, json.dumps(data).encode("utf-8"), headers=headers)
+
+    def _error(self, status: int, code: str, message: str, headers: Dict[str, str] = None):
+        self.state.count(f"http_{status}")
+        self._json(status, {"errors": [{"code": code, "message": message}]}, headers=headers)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _route(self, method: str, path: str) -> Tuple[Optional[str], List[str]]:
+        parts = [p for p in path.split("/") if p]
+        if method == "POST" and parts == ["auth", "o2", "token"]:
+            return "lwaToken", []
+        if method == "GET" and len(parts) == 2 and parts[0] == "s3":
+            return "s3", [parts[1]]
+        if parts[:2] == ["reports", "2021-06-30"]:
+            rest = parts[2:]
+            if method == "POST" and rest == ["reports"]:
+                return "createReport", []
+            if method == "GET" and rest == ["reports"]:
+                return "getReports", []
+            if method == "GET" and len(rest) == 2 and rest[0] == "reports":
+                return "getReport", [rest[1]]
+            if method == "GET" and len(rest) == 2 and rest[0] == "documents":
+                return "getReportDocument", [rest[1]]
+        if method == "GET" and parts == ["fba", "inventory", "v1", "summaries"]:
+            return "getInventorySummaries", []
+        if method == "GET" and len(parts) == 3 and parts[0] == "awd" and parts[2] == "inventory":
+            return "listInventory", []
+        return None, []
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        operation, args = self._route(method, url.path)
+        body = self._read_body() if method == "POST" else b""
+
+        if operation is None:
+            self._error(404, "NotFound", f"No route for {method} {url.path}")
+            return
+
+        self.state.count(operation)
+        config = self.state.config
+
+        if operation not in ("lwaToken", "s3") and not self.headers.get("x-amz-access-token"):
+            self._error(403, "Unauthorized", "Access to requested resource is denied.")
+            return
+
+        rate_headers = {}
+        bucket = self.state.buckets.get(operation)
+        if bucket is not None:
+            rate_headers["x-amzn-RateLimit-Limit"] = f"{bucket.rate:g}"
+            if not bucket.take() or self.state.roll(config.throttle_rate):
+                self._error(429, "QuotaExceeded", "You exceeded your quota for the requested resource.", rate_headers)
+                return
+
+        if operation != "lwaToken" and self.state.roll(config.error_rate):
+            status = self.state.rng.choice((500, 503))
+            self._error(status, "InternalFailure", "Simulated server error.", rate_headers)
+            return
+
+        handler = getattr(self, f"_op_{operation}")
+        handler(args, params, body, rate_headers)
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    def _op_lwaToken(self, args, params, body, headers):
+        form = {k: v[-1] for k, v in parse_qs(body.decode("utf-8")).items()}
+        if form.get("grant_type") != "refresh_token" or not form.get("refresh_token"):
+            self._json(400, {"error": "invalid_request", "error_description": "refresh_token required"})
+            return
+        self._json(200, {
+            "access_token": f"Atza|sim-{self.state.new_id()}",
+            "refresh_token": form["refresh_token"],
+            "token_type": "bearer",
+            "expires_in": self.state.config.token_ttl,
+        })
+
+    def _op_createReport(self, args, params, body, headers):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            self._error(400, "InvalidInput", "Body is not valid JSON.", headers)
+            return
+        report_type = payload.get("reportType")
+        if not report_type or not payload.get("marketplaceIds"):
+            self._error(400, "InvalidInput", "reportType and marketplaceIds are required.", headers)
+            return
+        report_id = self.state.create_report(report_type, payload["marketplaceIds"])
+        self._json(202, {"reportId": report_id}, headers)
+
+    def _op_getReport(self, args, params, body, headers):
+        report = self.state.reports.get(args[0])
+        if report is None:
+            self._error(404, "NotFound", f"Report {args[0]} not found.", headers)
+            return
+        self._json(200, self.state.report_view(report), headers)
+
+    def _op_getReports(self, args, params, body, headers):
+        state = self.state
+        report_types = set((params.get("reportTypes") or "").split(",")) - {""}
+
+        # Settlement reports are generated by Amazon, not requested: seed them on first list
+        if "GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2" in report_types:
+            with state.lock:
+                seeded = any(r["reportType"] == "GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2" for r in state.reports.values())
+            if not seeded:
+                marketplace_ids = (params.get("marketplaceIds") or "ATVPDKIKX0DER").split(",")
+                for _ in range(state.config.settlement_reports):
+                    state.create_report("GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2", marketplace_ids, status="DONE")
+
+        with state.lock:
+            reports = sorted(state.reports.values(), key=lambda r: r["created"], reverse=True)
+        views = [state.report_view(r) for r in reports if not report_types or r["reportType"] in report_types]
+        statuses = set((params.get("processingStatuses") or "").split(",")) - {""}
+        if statuses:
+            views = [v for v in views if v["processingStatus"] in statuses]
+
+        page_size = int(params.get("pageSize") or 10)
+        offset = int(params.get("nextToken") or 0)
+        page = views[offset:offset + page_size]
+        result = {"reports": page}
+        if offset + page_size < len(views):
+            result["nextToken"] = str(offset + page_size)
+        self._json(200, result, headers)
+
+    def _op_getReportDocument(self, args, params, body, headers):
+        document_id = args[0]
+        if document_id not in self.state.documents:
+            self._error(404, "NotFound", f"Document {document_id} not found.", headers)
+            return
+        host = self.headers.get("Host") or self.server.host
+        self._json(200, {
+            "reportDocumentId": document_id,
+            "url": f"https://{host}/s3/{document_id}?X-Amz-Algorithm=AWS4-HMAC-SHA256&X-Amz-Signature=simulated",
+            "compressionAlgorithm": "GZIP",
+        }, headers)
+
+    def _op_s3(self, args, params, body, headers):
+        content = self.state.document_bytes(args[0])
+        if content is None:
+            self._send(404, b"<Error><Code>NoSuchKey</Code></Error>", content_type="application/xml")
+            return
+        self.state.count("s3_bytes")
+        self._send(200, content, content_type="application/octet-stream")
+
+    def _op_getInventorySummaries(self, args, params, body, headers):
+        items = self.server.inventory_items
+        offset = int(params.get("nextToken") or 0)
+        page_size = 50
+        page = items[offset:offset + page_size]
+        result = {"payload": {"granularity": {"granularityType": "Marketplace"}, "inventorySummaries": page}}
+        if offset + page_size < len(items):
+            result["pagination"] = {"nextToken": str(offset + page_size)}
+        self._json(200, result, headers)
+
+    def _op_listInventory(self, args, params, body, headers):
+        items = self.server.awd_items
+        offset = int(params.get("nextToken") or 0)
+        page_size = min(int(params.get("maxResults") or 200), 200)
+        page = items[offset:offset + page_size]
+        result = {"inventory": page}
+        if offset + page_size < len(items):
+            result["nextToken"] = str(offset + page_size)
+        self._json(200, result, headers)
+
+
+class SPAPISimulator:
+    """
+    Runs the simulator on a background thread.
+
+    Args:
+        config: SimulatorConfig (defaults if omitted)
+        host: Bind address
+        port: Bind port (0 = pick a free one)
+        certfile/keyfile: Use this certificate instead of generating one
+        verbose: Log every request to stderr
+    """
+
+    def __init__(
+        self,
+        config: Optional[SimulatorConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+        verbose: bool = False
+    ):
+        self.config = config or SimulatorConfig()
+        self.host = host
+        self.port = port
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.verbose = verbose
+        self.ca_bundle: Optional[str] = None
+        self._workdir: Optional[str] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._saved: Dict[Tuple[str, str], Any] = {}
+
+    @property
+    def endpoint(self) -> str:
+        """host:port to put in ENDPOINTS tables."""
+        return f"{self.host}:{self.port}"
+
+    @property
+    def lwa_token_url(self) -> str:
+        return f"https://{self.endpoint}/auth/o2/token"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Request counts per operation and per error status."""
+        return dict(self._server.state.stats) if self._server else {}
+
+    def _generate_certificate(self):
+        if shutil.which("openssl") is None:
+            raise RuntimeError("openssl not found; pass certfile/keyfile to SPAPISimulator")
+        self.certfile = os.path.join(self._workdir, "simulator-cert.pem")
+        self.keyfile = os.path.join(self._workdir, "simulator-key.pem")
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                "-keyout", self.keyfile, "-out", self.certfile, "-days", "2",
+                "-subj", "/CN=localhost",
+                "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    def _write_ca_bundle(self):
+        """certifi's bundle + our certificate, so real HTTPS hosts still verify."""
+        self.ca_bundle = os.path.join(self._workdir, "ca-bundle.pem")
+        with open(self.ca_bundle, "w") as out:
+            try:
+                import certifi
+                with open(certifi.where()) as f:
+                    out.write(f.read())
+                out.write("\n")
+            except ImportError:
+                pass
+            with open(self.certfile) as f:
+                out.write(f.read())
+
+    def start(self) -> "SPAPISimulator":
+        self._workdir = tempfile.mkdtemp(prefix="sp-api-simulator-")
+        if not (self.certfile and self.keyfile):
+            self._generate_certificate()
+        self._write_ca_bundle()
+
+        server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        server.daemon_threads = True
+        server.state = _State(self.config)
+        server.verbose = self.verbose
+        server.host = self.endpoint
+        rng = random.Random(self.config.seed)
+        server.inventory_items = inventory_summaries(self.config.inventory_items, rng)
+        server.awd_items = awd_inventory(self.config.inventory_items, rng)
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.certfile, self.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+
+        self.port = server.server_address[1]
+        server.host = self.endpoint
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name="sp-api-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.restore()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def __enter__(self) -> "SPAPISimulator":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def seed_report(self, report_type: str, marketplace_ids: List[str], status: str = "DONE") -> Dict[str, Any]:
+        """
+        Register a report directly, skipping createReport's quota and delays.
+
+        The document is rendered immediately so the first download doesn't pay
+        for generating it. Returns the getReport view (with reportDocumentId).
+        """
+        state = self._server.state
+        report_id = state.create_report(report_type, marketplace_ids, status=status)
+        report = state.reports[report_id]
+        state.document_bytes(report["reportDocumentId"])
+        return state.report_view(report)
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point a fresh process at the simulator."""
+        return {
+            "SP_API_ENDPOINT_OVERRIDE": self.endpoint,
+            "SP_LWA_TOKEN_URL": self.lwa_token_url,
+            "REQUESTS_CA_BUNDLE": self.ca_bundle,
+            "SSL_CERT_FILE": self.ca_bundle,
+            "SP_TOKEN_CACHE_DISABLED": "true",
+        }
+
+    def apply(self):
+        """
+        Point already-imported modules at the simulator (in-process use).
+
+        Rewrites every region in each scripts/utils ENDPOINTS table, the LWA
+        token URL, and the CA bundle env vars. restore() (or stop()) undoes it.
+        """
+        for name, value in self.env().items():
+            self._saved.setdefault(("env", name), os.environ.get(name))
+            os.environ[name] = value
+
+        for module_name, module in list(sys.modules.items()):
+            if module is None or not module_name.endswith(("utils.auth",) + tuple(f"utils.{m}" for m in ENDPOINT_MODULES)):
+                continue
+            endpoints = getattr(module, "ENDPOINTS", None)
+            if isinstance(endpoints, dict):
+                self._saved.setdefault((module_name, "ENDPOINTS"), dict(endpoints))
+                for region in endpoints:
+                    endpoints[region] = self.endpoint
+            if hasattr(module, "LWA_TOKEN_URL"):
+                self._saved.setdefault((module_name, "LWA_TOKEN_URL"), module.LWA_TOKEN_URL)
+                module.LWA_TOKEN_URL = self.lwa_token_url
+
+    def restore(self):
+        """Undo apply()."""
+        for (scope, name), value in self._saved.items():
+            if scope == "env":
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+                continue
+            module = sys.modules.get(scope)
+            if module is None:
+                continue
+            if name == "ENDPOINTS":
+                module.ENDPOINTS.clear()
+                module.ENDPOINTS.update(value)
+            else:
+                setattr(module, name, value)
+        self._saved = {}
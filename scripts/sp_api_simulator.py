@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Local SP-API Simulator
+
+Runs an HTTPS stand-in for the Reports, FBA Inventory, AWD and LWA endpoints
+so pull scripts can be load- and performance-tested without Amazon
+credentials. See scripts/simulator/server.py for behaviour.
+
+Usage:
+    python scripts/sp_api_simulator.py                        # Amazon's default rate limits
+    python scripts/sp_api_simulator.py --rate-scale 60        # createReport at 1/sec instead of 1/min
+    python scripts/sp_api_simulator.py --rows 50000 --error-rate 0.02 --throttle-rate 0.05
+    python scripts/sp_api_simulator.py --config sim.json      # per-operation limits, report sizes, ...
+
+Then, in another shell, export the printed variables and run any pull script
+(Supabase variables still point wherever you normally point them):
+    export SP_API_ENDPOINT_OVERRIDE=127.0.0.1:8443 SP_LWA_TOKEN_URL=... REQUESTS_CA_BUNDLE=...
+    python scripts/pull_daily_sales.py --region NA
+
+Config file (JSON, all keys optional):
+    {
+      "rate_limits": {"createReport": [0.0167, 15], "getReport": [2.0, 15]},
+      "queue_seconds": 1, "processing_seconds": 5, "fatal_rate": 0.01,
+      "rows_per_report": 1000,
+      "report_rows": {"GET_BRAND_ANALYTICS_SEARCH_TERMS_REPORT": 200000}
+    }
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.simulator import SPAPISimulator, SimulatorConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SP-API simulator")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8443, help="Port (default: 8443, 0 = any free port)")
+    parser.add_argument("--config", help="JSON config file (see module docstring)")
+    parser.add_argument("--rate-scale", type=float, help="Multiply every rate limit (default: 1)")
+    parser.add_argument("--queue-seconds", type=float, help="Time reports spend IN_QUEUE (default: 1)")
+    parser.add_argument("--processing-seconds", type=float, help="Time reports spend IN_PROGRESS (default: 2)")
+    parser.add_argument("--fatal-rate", type=float, help="Fraction of reports ending FATAL")
+    parser.add_argument("--throttle-rate", type=float, help="Fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, help="Fraction of requests answered 500/503")
+    parser.add_argument("--rows", type=int, dest="rows_per_report", help="Rows per report document (default: 1000)")
+    parser.add_argument("--inventory-items", type=int, help="FBA/AWD inventory items (default: 500)")
+    parser.add_argument("--seed", type=int, help="Random seed (default: 0)")
+    parser.add_argument("--certfile", help="TLS certificate (default: generate a self-signed one)")
+    parser.add_argument("--keyfile", help="TLS private key")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+    args = parser.parse_args()
+
+    overrides = {
+        "rate_scale": args.rate_scale,
+        "queue_seconds": args.queue_seconds,
+        "processing_seconds": args.processing_seconds,
+        "fatal_rate": args.fatal_rate,
+        "throttle_rate": args.throttle_rate,
+        "error_rate": args.error_rate,
+        "rows_per_report": args.rows_per_report,
+        "inventory_items": args.inventory_items,
+        "seed": args.seed,
+    }
+    if args.config:
+        config = SimulatorConfig.from_file(args.config, **overrides)
+    else:
+        config = SimulatorConfig(**{k: v for k, v in overrides.items() if v is not None})
+
+    simulator = SPAPISimulator(
+        config,
+        host=args.host,
+        port=args.port,
+        certfile=args.certfile,
+        keyfile=args.keyfile,
+        verbose=args.verbose
+    )
+    simulator.start()
+
+    print(f"SP-API simulator listening on https://{simulator.endpoint}")
+    print("Point scripts at it with:")
+    for name, value in simulator.env().items():
+        print(f"  export {name}={value}")
+    print("Ctrl+C to stop.", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\nRequest counts:")
+        print(json.dumps(simulator.stats, indent=2, sort_keys=True))
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,4 @@
 
 from .auth import get_access_token, refresh_access_token
 from .reports import create_report, poll_report_status, download_report
-from .db import get_supabase_client, upsert_asin_data, upsert_totals, create_pull_record, update_pull_status
+from .db import get_supabase_client, upsert_asin_data, upsert_asin_data_changes, upsert_totals, create_pull_record, update_pull_status
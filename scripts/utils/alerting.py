@@ -15,6 +15,8 @@ import requests
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 
+from .metrics import get_metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -244,17 +246,25 @@ class AlertManager:
         pull_date: str,
         results: List[Dict],
         total_rows: int = 0,
-        duration_seconds: float = 0
+        duration_seconds: float = 0,
+        metrics: Optional[Dict[str, Any]] = None
     ):
         """
         Send end-of-pull summary.
 
+        Request metrics (latency, throttling, downloads) are attached from the
+        run's MetricsRegistry, and exported to SP_API_METRICS_DIR if set.
+
         Args:
             pull_type: Type of pull
             pull_date: Date pulled
             results: List of marketplace results
             total_rows: Total rows processed
             duration_seconds: Total processing time
+            metrics: Metrics summary to attach (default: get_metrics().summary())
+
+        Returns:
+            Summary payload dict (counts + metrics)
         """
         # Count statuses
         completed = [r for r in results if r.get("status") == "completed"]
@@ -267,11 +277,43 @@ class AlertManager:
         timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
         duration_str = f"{duration_seconds:.1f}s" if duration_seconds else "N/A"
 
+        registry = get_metrics()
+        if metrics is None:
+            metrics = registry.summary()
+
+        metrics_dir = os.environ.get("SP_API_METRICS_DIR")
+        if metrics_dir:
+            try:
+                json_path, _ = registry.export(metrics_dir, prefix=pull_type)
+                logger.info(f"Metrics written to {json_path}")
+            except OSError as e:
+                logger.warning(f"Failed to export metrics: {e}")
+
+        metrics_str = (
+            f"{metrics.get('requests', 0)} requests, "
+            f"{metrics.get('throttled_429', 0)} throttled, "
+            f"rate-limit sleep {metrics.get('rate_limit_sleep_seconds', 0)}s, "
+            f"backoff {metrics.get('backoff_sleep_seconds', 0)}s, "
+            f"{metrics.get('download_bytes', 0) / 1_000_000:.1f} MB downloaded"
+        )
+
         # Console logging
         logger.info(
             f"PULL SUMMARY: {pull_type} for {pull_date} - {status_text} - "
             f"{len(completed)}/{len(results)} marketplaces, {total_rows} rows, {duration_str}"
         )
+        logger.info(f"API METRICS: {metrics_str}")
+
+        summary = {
+            "pull_type": pull_type,
+            "pull_date": pull_date,
+            "status": "success" if all_success else "partial",
+            "completed": len(completed),
+            "failed": len(failed),
+            "total_rows": total_rows,
+            "duration_seconds": duration_seconds,
+            "metrics": metrics
+        }
 
         # Only send Slack summary if there were failures or explicitly requested
         if not all_success:
@@ -319,6 +361,15 @@ class AlertManager:
                                         "text": f"Duration: {duration_str} | Time: {timestamp}"
                                     }
                                 ]
+                            },
+                            {
+                                "type": "context",
+                                "elements": [
+                                    {
+                                        "type": "mrkdwn",
+                                        "text": f"API: {metrics_str}"
+                                    }
+                                ]
                             }
                         ]
                     }
@@ -327,6 +378,8 @@ class AlertManager:
 
             self._send_slack(slack_payload)
 
+        return summary
+
     def alert_rate_limit(self, api_type: str, wait_time: float, attempt: int):
         """
         Log rate limit event (not sent to Slack to avoid spam).
@@ -371,6 +424,6 @@ def alert_partial(pull_type: str, pull_date: str, completed: List[str], failed:
     get_alert_manager().alert_partial_completion(pull_type, pull_date, completed, failed, errors)
 
 
-def send_summary(pull_type: str, pull_date: str, results: List[Dict], total_rows: int = 0, duration_seconds: float = 0):
+def send_summary(pull_type: str, pull_date: str, results: List[Dict], total_rows: int = 0, duration_seconds: float = 0, metrics: Dict[str, Any] = None):
     """Send summary alert."""
-    get_alert_manager().send_summary(pull_type, pull_date, results, total_rows, duration_seconds)
+    return get_alert_manager().send_summary(pull_type, pull_date, results, total_rows, duration_seconds, metrics)
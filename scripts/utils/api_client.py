@@ -7,6 +7,7 @@ Features:
 - Rate limit header parsing (x-amzn-RateLimit-*)
 - Transient error detection (429, 500, 502, 503, 504)
 - Retry-After header support
+- Latency / throttle / download metrics (see metrics.py)
 - Configurable via environment variables
 """
 
@@ -14,14 +15,34 @@ import os
 import time
 import random
 import logging
+import threading
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 from datetime import datetime
 
+from .metrics import MetricsRegistry, get_metrics
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+# =============================================================================
+# Endpoint Override
+# =============================================================================
+
+def apply_endpoint_override(endpoints: Dict[str, str]) -> Dict[str, str]:
+    """
+    Point every region of a module's ENDPOINTS map at SP_API_ENDPOINT_OVERRIDE
+    when it is set (e.g. a local SP-API simulator, scripts/sp_api_simulator.py).
+
+    Updates the dict in place and returns it.
+    """
+    override = os.environ.get("SP_API_ENDPOINT_OVERRIDE")
+    if override:
+        endpoints.update({region: override for region in endpoints})
+    return endpoints
+
+
 # =============================================================================
 # Custom Exceptions
 # =============================================================================
@@ -59,47 +80,76 @@ class RateLimitHandler:
 
     SP-API Rate Limits (from Amazon docs):
     - Reports API: 0.0167 req/sec (1 per minute) for createReport
-    - Reports API: 2 req/sec for getReport, getReportDocument
+    - Reports API: 2 req/sec for getReport
+    - Reports API: 0.0167 req/sec, burst 15 for getReportDocument
     - FBA Inventory API: 2 req/sec burst
     - AWD API: Similar to inventory
 
     Headers parsed:
     - x-amzn-RateLimit-Limit: Max requests per second
+
+    API types with a burst (DEFAULT_BURSTS) may send that many requests
+    back to back before falling to the sustained rate (token bucket kept as
+    a virtual schedule: last_request_time may run ahead of now).
+
+    Thread-safe: pipeline stages share one client, and each waiting thread
+    reserves its own slot so concurrent requests stay spaced out.
     """
 
     # Default rate limits by API type (requests per second)
     DEFAULT_LIMITS = {
         "reports_create": 0.0167,  # 1 per minute
         "reports_get": 2.0,
+        "reports_document": 0.0167,  # getReportDocument: 1 per minute...
         "inventory": 2.0,
         "awd": 2.0,
         "auth": 1.0,
         "default": 1.0
     }
 
+    # Requests allowed back to back before the rate applies
+    DEFAULT_BURSTS = {
+        "reports_document": 15,  # ...after a burst of 15
+    }
+
     def __init__(self):
         self.last_request_time: Dict[str, float] = {}
         self.current_limits: Dict[str, float] = {}
+        self._lock = threading.Lock()
 
     def get_min_interval(self, api_type: str) -> float:
         """Get minimum interval between requests for this API type."""
         limit = self.current_limits.get(api_type) or self.DEFAULT_LIMITS.get(api_type, 1.0)
         return 1.0 / limit if limit > 0 else 1.0
 
-    def wait_if_needed(self, api_type: str):
-        """Block until safe to make next request."""
-        min_interval = self.get_min_interval(api_type)
-        last_time = self.last_request_time.get(api_type, 0)
-
-        elapsed = time.time() - last_time
-        if elapsed < min_interval:
-            wait_time = min_interval - elapsed
+    def reserve(self, api_type: str) -> float:
+        """
+        Reserve the next request slot for api_type without waiting.
+        Returns seconds until the slot (0 if it is free now).
+        """
+        with self._lock:
+            min_interval = self.get_min_interval(api_type)
+            burst = self.DEFAULT_BURSTS.get(api_type, 1)
+            now = time.time()
+            due = self.last_request_time.get(api_type, 0) + min_interval
+            slot = max(now, due - (burst - 1) * min_interval)
+            # Reserve the slot before sleeping so the next caller queues behind it
+            self.last_request_time[api_type] = max(now, due) if burst > 1 else slot
+        return slot - now
+
+    def wait_if_needed(self, api_type: str) -> float:
+        """Block until safe to make next request. Returns seconds waited."""
+        wait_time = self.reserve(api_type)
+        if wait_time > 0:
             logger.debug(f"Rate limiting: waiting {wait_time:.2f}s for {api_type}")
             time.sleep(wait_time)
+            return wait_time
+        return 0.0
 
     def record_request(self, api_type: str):
         """Record that a request was made."""
-        self.last_request_time[api_type] = time.time()
+        with self._lock:
+            self.last_request_time[api_type] = max(time.time(), self.last_request_time.get(api_type, 0))
 
     def update_from_response(self, api_type: str, response: requests.Response):
         """Update limits based on response headers."""
@@ -199,10 +249,14 @@ class SPAPIClient:
     Centralized SP-API HTTP client with retry, rate limiting, and logging.
 
     Usage:
-        client = SPAPIClient(access_token, region="NA")
+        client = SPAPIClient(region="NA")  # token from the shared TokenProvider
+        client = SPAPIClient(access_token, region="NA")  # fixed token
         response = client.get(url, api_type="inventory")
         response = client.post(url, json=payload, api_type="reports_create")
 
+    Without an access_token, every attempt (retries included) asks the token
+    provider for a token, so long-running jobs never send an expired one.
+
     Configuration via environment variables:
         SP_API_MAX_RETRIES: Max retry attempts (default: 5)
         SP_API_BASE_DELAY: Initial backoff delay in seconds (default: 1.0)
@@ -212,15 +266,23 @@ class SPAPIClient:
 
     def __init__(
         self,
-        access_token: str,
+        access_token: str = None,
         region: str = "NA",
         max_retries: int = None,
         base_delay: float = None,
         max_delay: float = None,
-        timeout: int = None
+        timeout: int = None,
+        token_provider: Callable[[], str] = None,
+        metrics: MetricsRegistry = None
     ):
         self.access_token = access_token
         self.region = region
+        self.metrics = metrics or get_metrics()
+
+        if token_provider is None and access_token is None:
+            from .auth import get_token_provider
+            token_provider = get_token_provider(region)
+        self.token_provider = token_provider
 
         # Load from env vars with defaults
         self.max_retries = max_retries or int(os.environ.get("SP_API_MAX_RETRIES", 5))
@@ -250,7 +312,10 @@ class SPAPIClient:
     def _add_auth_header(self, headers: dict) -> dict:
         """Add access token to headers if not present."""
         if "x-amz-access-token" not in headers:
-            headers["x-amz-access-token"] = self.access_token
+            if self.token_provider is not None:
+                headers["x-amz-access-token"] = self.token_provider()
+            else:
+                headers["x-amz-access-token"] = self.access_token
         return headers
 
     def request(
@@ -275,9 +340,9 @@ class SPAPIClient:
         Raises:
             SPAPIError: After max retries exhausted or fatal error
         """
-        # Ensure headers dict exists
-        kwargs.setdefault("headers", {})
-        kwargs["headers"] = self._add_auth_header(kwargs["headers"])
+        # Auth header is added per attempt (below): a request that keeps
+        # backing off can outlive the token it started with
+        headers = kwargs.pop("headers", None) or {}
 
         # Set timeout
         kwargs.setdefault("timeout", self.timeout)
@@ -288,13 +353,20 @@ class SPAPIClient:
 
         while True:
             # Rate limiting
-            self.rate_limiter.wait_if_needed(api_type)
+            self.metrics.record_rate_limit_sleep(api_type, self.rate_limiter.wait_if_needed(api_type))
+            kwargs["headers"] = self._add_auth_header(dict(headers))
 
             try:
                 self.stats["requests"] += 1
                 logger.debug(f"Request {method} {url} (attempt {attempt + 1})")
 
-                response = self.session.request(method, url, **kwargs)
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except Exception as e:
+                    self.metrics.record_request(api_type, url, type(e).__name__, time.perf_counter() - started)
+                    raise
+                self.metrics.record_request(api_type, url, response.status_code, time.perf_counter() - started)
 
                 # Record request time and update rate limits
                 self.rate_limiter.record_request(api_type)
@@ -319,6 +391,7 @@ class SPAPIClient:
                         f"Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
                     )
                     time.sleep(delay)
+                    self.metrics.record_backoff_sleep(api_type, delay)
                     attempt += 1
                     last_response = response
                     continue
@@ -360,6 +433,7 @@ class SPAPIClient:
                         f"Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
                     )
                     time.sleep(delay)
+                    self.metrics.record_backoff_sleep(api_type, delay)
                     attempt += 1
                     last_exception = e
                     continue
@@ -378,6 +452,38 @@ class SPAPIClient:
         """Make a POST request."""
         return self.request("POST", url, api_type=api_type, **kwargs)
 
+    def download(self, url: str, **kwargs) -> requests.Response:
+        """
+        Download a pre-signed report document (S3 URL - no SP-API auth header).
+
+        Raises requests.HTTPError on failure. Bytes and time are recorded
+        in the metrics registry.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        response.raise_for_status()
+        self.metrics.record_download(url, len(response.content), time.perf_counter() - started)
+        return response
+
+    def download_to(self, url: str, fileobj, chunk_size: int = 1024 * 1024, **kwargs) -> int:
+        """
+        Stream a pre-signed report document into fileobj instead of memory.
+
+        Raises requests.HTTPError on failure. Returns bytes written (also
+        recorded in the metrics registry).
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        nbytes = 0
+        with self.session.get(url, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size):
+                fileobj.write(chunk)
+                nbytes += len(chunk)
+        self.metrics.record_download(url, nbytes, time.perf_counter() - started)
+        return nbytes
+
     def get_stats(self) -> dict:
         """Get request statistics."""
         return self.stats.copy()
@@ -0,0 +1,517 @@
+"""
+SP-API Async Client Module
+Async HTTP transport with the same retry and rate-limit semantics as SPAPIClient.
+
+SPAPIClient blocks the calling thread in time.sleep() for every rate-limit
+wait and retry backoff. AsyncSPAPIClient awaits instead, so many reports can
+be created, polled and downloaded concurrently from one event loop.
+
+Features:
+- Same RetryStrategy / RateLimitHandler rules as SPAPIClient (burst
+  included), with a token fetched from the TokenProvider on every attempt
+- One pooled httpx.AsyncClient per origin (regional endpoint, S3 host)
+- HTTP/2 when the h2 package is installed
+- SyncSPAPIClient facade with SPAPIClient's get/post/request/download
+  interface, so the client= call sites in reports.py, sqp_reports.py,
+  fba_inventory_api.py etc. run on the async transport unchanged
+- get_sp_api_client(): the facade when httpx is installed, else SPAPIClient
+
+Requires httpx (pip install "httpx[http2]"). Without it this module still
+imports, but constructing an async client raises ImportError.
+
+Configuration via environment variables (on top of SPAPIClient's):
+    SP_API_ASYNC: Set to "false" to make get_sp_api_client() return SPAPIClient
+    SP_API_HTTP2: Set to "false" to force HTTP/1.1 (default: true)
+    SP_API_MAX_CONNECTIONS: Max connections per origin pool (default: 10)
+
+Usage:
+    async with AsyncSPAPIClient(region="NA") as client:
+        responses = await asyncio.gather(*(client.get(u, api_type="reports_get") for u in urls))
+
+    client = get_sp_api_client(region="NA")
+    response = client.get(url, api_type="inventory")
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import importlib.util
+from typing import Optional, Dict, Callable
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .api_client import (
+    SPAPIClient,
+    RateLimitHandler,
+    RetryStrategy,
+    SPAPIRateLimitError,
+    SPAPITransientError,
+    SPAPIFatalError,
+)
+from .metrics import MetricsRegistry, PullTimings, get_metrics, current_timings, attributed_to
+
+logger = logging.getLogger(__name__)
+
+
+def _require_httpx():
+    if httpx is None:
+        raise ImportError(
+            "httpx is required for the async SP-API transport. "
+            "Install with: pip install \"httpx[http2]\""
+        )
+
+
+# =============================================================================
+# Async Rate Limiting
+# =============================================================================
+
+class AsyncRateLimitHandler(RateLimitHandler):
+    """
+    RateLimitHandler that awaits its slot instead of sleeping the thread.
+
+    Slots come from RateLimitHandler.reserve(), so spacing and bursts
+    (DEFAULT_BURSTS) match SPAPIClient exactly however many coroutines are
+    in flight.
+    """
+
+    async def acquire(self, api_type: str) -> float:
+        """Wait for this api_type's next slot. Returns seconds waited."""
+        wait_time = self.reserve(api_type)
+        if wait_time > 0:
+            logger.debug(f"Rate limiting: waiting {wait_time:.2f}s for {api_type}")
+            await asyncio.sleep(wait_time)
+            return wait_time
+        return 0.0
+
+
+class AsyncRetryStrategy(RetryStrategy):
+    """RetryStrategy with httpx's transport errors as the transient exceptions."""
+
+    TRANSIENT_EXCEPTIONS = (httpx.TransportError,) if httpx is not None else ()
+
+
+# =============================================================================
+# Async SP-API Client
+# =============================================================================
+
+class AsyncSPAPIClient:
+    """
+    Async SP-API HTTP client with retry, rate limiting, and pooled connections.
+
+    Connections are pooled per origin, so NA/EU/FE endpoints and the S3 hosts
+    serving report documents each keep their own warm pool. Responses are
+    httpx.Response objects (.json(), .content, .text, .headers, .status_code).
+
+    Errors are raised exactly as SPAPIClient raises them:
+    SPAPIRateLimitError, SPAPITransientError, SPAPIFatalError.
+    """
+
+    def __init__(
+        self,
+        access_token: str = None,
+        region: str = "NA",
+        max_retries: int = None,
+        base_delay: float = None,
+        max_delay: float = None,
+        timeout: int = None,
+        token_provider: Callable[[], str] = None,
+        http2: bool = None,
+        max_connections: int = None,
+        metrics: MetricsRegistry = None
+    ):
+        _require_httpx()
+
+        self.access_token = access_token
+        self.region = region
+        self.metrics = metrics or get_metrics()
+
+        if token_provider is None and access_token is None:
+            from .auth import get_token_provider
+            token_provider = get_token_provider(region)
+        self.token_provider = token_provider
+
+        # Load from env vars with defaults (same as SPAPIClient)
+        self.max_retries = max_retries or int(os.environ.get("SP_API_MAX_RETRIES", 5))
+        self.base_delay = base_delay or float(os.environ.get("SP_API_BASE_DELAY", 1.0))
+        self.max_delay = max_delay or float(os.environ.get("SP_API_MAX_DELAY", 60.0))
+        self.timeout = timeout or int(os.environ.get("SP_API_TIMEOUT", 30))
+        self.max_connections = max_connections or int(os.environ.get("SP_API_MAX_CONNECTIONS", 10))
+
+        if http2 is None:
+            http2 = os.environ.get("SP_API_HTTP2", "true").lower() != "false"
+        # httpx raises at client construction if HTTP/2 is requested without h2
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        # Initialize helpers
+        self.rate_limiter = AsyncRateLimitHandler()
+        self.retry_strategy = AsyncRetryStrategy(
+            max_retries=self.max_retries,
+            base_delay=self.base_delay,
+            max_delay=self.max_delay
+        )
+
+        # One pool per origin ("https://sellingpartnerapi-na.amazon.com", ...)
+        self._pools: Dict[str, "httpx.AsyncClient"] = {}
+
+        # Statistics
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limit_waits": 0,
+            "errors": 0
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        return False
+
+    def _pool_for(self, url: str) -> "httpx.AsyncClient":
+        """Get (or create) the connection pool for the URL's origin."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        pool = self._pools.get(origin)
+        if pool is None:
+            pool = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            self._pools[origin] = pool
+        return pool
+
+    async def aclose(self):
+        """Close all connection pools."""
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            await pool.aclose()
+
+    async def _add_auth_header(self, headers: dict) -> dict:
+        """Add access token to headers if not present."""
+        if "x-amz-access-token" not in headers:
+            if self.token_provider is not None:
+                # A refresh takes the store lock and calls LWA; keep it off the loop
+                headers["x-amz-access-token"] = await asyncio.to_thread(self.token_provider)
+            else:
+                headers["x-amz-access-token"] = self.access_token
+        return headers
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        api_type: str = "default",
+        **kwargs
+    ) -> "httpx.Response":
+        """
+        Make an HTTP request with retry and rate limiting.
+
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            url: Full URL
+            api_type: API type for rate limit handling
+            **kwargs: Passed to httpx (json, params, headers, timeout, etc.)
+
+        Returns:
+            Response object
+
+        Raises:
+            SPAPIError: After max retries exhausted or fatal error
+        """
+        # Auth header is added per attempt (below): a request that keeps
+        # backing off can outlive the token it started with
+        headers = kwargs.pop("headers", None) or {}
+        kwargs.setdefault("timeout", self.timeout)
+
+        pool = self._pool_for(url)
+        attempt = 0
+
+        while True:
+            # Rate limiting
+            self.metrics.record_rate_limit_sleep(api_type, await self.rate_limiter.acquire(api_type))
+            # Copy so a caller's shared headers dict isn't mutated across coroutines
+            kwargs["headers"] = await self._add_auth_header(dict(headers))
+
+            try:
+                self.stats["requests"] += 1
+                logger.debug(f"Request {method} {url} (attempt {attempt + 1})")
+
+                started = time.perf_counter()
+                try:
+                    response = await pool.request(method, url, **kwargs)
+                except Exception as e:
+                    self.metrics.record_request(api_type, url, type(e).__name__, time.perf_counter() - started)
+                    raise
+                self.metrics.record_request(api_type, url, response.status_code, time.perf_counter() - started)
+
+                # Record request time and update rate limits
+                self.rate_limiter.record_request(api_type)
+                self.rate_limiter.update_from_response(api_type, response)
+
+                # Success
+                if response.status_code < 400:
+                    return response
+
+                # Check if we should retry
+                if self.retry_strategy.should_retry(None, response, attempt):
+                    delay = self.retry_strategy.get_delay(attempt, response)
+                    self.stats["retries"] += 1
+
+                    status_msg = f"HTTP {response.status_code}"
+                    if response.status_code == 429:
+                        self.stats["rate_limit_waits"] += 1
+                        status_msg = "Rate limited (429)"
+
+                    logger.warning(
+                        f"{status_msg} on {method} {url}. "
+                        f"Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    self.metrics.record_backoff_sleep(api_type, delay)
+                    attempt += 1
+                    continue
+
+                # Non-retryable error
+                self.stats["errors"] += 1
+                error_body = None
+                try:
+                    error_body = response.json()
+                except ValueError:
+                    pass
+
+                if response.status_code == 429:
+                    raise SPAPIRateLimitError(
+                        f"Rate limit exceeded after {self.max_retries} retries",
+                        status_code=response.status_code,
+                        response_body=error_body
+                    )
+                elif response.status_code >= 500:
+                    raise SPAPITransientError(
+                        f"Server error: HTTP {response.status_code}",
+                        status_code=response.status_code,
+                        response_body=error_body
+                    )
+                else:
+                    raise SPAPIFatalError(
+                        f"Request failed: HTTP {response.status_code}",
+                        status_code=response.status_code,
+                        response_body=error_body
+                    )
+
+            except self.retry_strategy.TRANSIENT_EXCEPTIONS as e:
+                if self.retry_strategy.should_retry(e, None, attempt):
+                    delay = self.retry_strategy.get_delay(attempt)
+                    self.stats["retries"] += 1
+
+                    logger.warning(
+                        f"Connection error on {method} {url}: {type(e).__name__}. "
+                        f"Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    self.metrics.record_backoff_sleep(api_type, delay)
+                    attempt += 1
+                    continue
+
+                # Max retries exhausted
+                self.stats["errors"] += 1
+                raise SPAPITransientError(
+                    f"Connection failed after {self.max_retries} retries: {str(e)}"
+                )
+
+    async def get(self, url: str, api_type: str = "default", **kwargs) -> "httpx.Response":
+        """Make a GET request."""
+        return await self.request("GET", url, api_type=api_type, **kwargs)
+
+    async def post(self, url: str, api_type: str = "default", **kwargs) -> "httpx.Response":
+        """Make a POST request."""
+        return await self.request("POST", url, api_type=api_type, **kwargs)
+
+    async def download(self, url: str, **kwargs) -> "httpx.Response":
+        """
+        Download a pre-signed report document (S3 URL - no SP-API auth header).
+
+        Raises httpx.HTTPStatusError on failure. Bytes and time are recorded
+        in the metrics registry.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        response = await self._pool_for(url).get(url, **kwargs)
+        response.raise_for_status()
+        self.metrics.record_download(url, len(response.content), time.perf_counter() - started)
+        return response
+
+    async def download_to(self, url: str, fileobj, chunk_size: int = 1024 * 1024, **kwargs) -> int:
+        """
+        Stream a pre-signed report document into fileobj instead of memory.
+
+        Raises httpx.HTTPStatusError on failure. Returns bytes written (also
+        recorded in the metrics registry).
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        nbytes = 0
+        async with self._pool_for(url).stream("GET", url, **kwargs) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(chunk_size):
+                fileobj.write(chunk)
+                nbytes += len(chunk)
+        self.metrics.record_download(url, nbytes, time.perf_counter() - started)
+        return nbytes
+
+    def get_stats(self) -> dict:
+        """Get request statistics."""
+        return self.stats.copy()
+
+    def reset_stats(self):
+        """Reset request statistics."""
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limit_waits": 0,
+            "errors": 0
+        }
+
+
+# =============================================================================
+# Sync Facade
+# =============================================================================
+
+async def _attributed(coro, timings: PullTimings):
+    """Await coro with timings as the active PullTimings on the loop thread."""
+    with attributed_to(timings):
+        return await coro
+
+
+class SyncSPAPIClient:
+    """
+    Blocking facade over AsyncSPAPIClient with SPAPIClient's interface.
+
+    Runs a private event loop on a daemon thread and submits every request to
+    it, so any number of threads can share one set of connection pools and
+    one rate limiter. Drop-in for SPAPIClient at existing call sites:
+
+        client = SyncSPAPIClient(region="NA")
+        report_id = create_report(client=client, ...)
+
+    New concurrent code can reach the underlying client via .async_client
+    and schedule coroutines on the same loop with .submit().
+    """
+
+    def __init__(self, access_token: str = None, region: str = "NA", **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name=f"sp-api-async-{region}",
+            daemon=True
+        )
+        self._thread.start()
+        try:
+            self.async_client = AsyncSPAPIClient(access_token=access_token, region=region, **kwargs)
+        except Exception:
+            self._stop_loop()
+            raise
+
+    @property
+    def region(self) -> str:
+        return self.async_client.region
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.async_client.access_token
+
+    @property
+    def token_provider(self):
+        return self.async_client.token_provider
+
+    @property
+    def timeout(self) -> int:
+        return self.async_client.timeout
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self.async_client.metrics
+
+    @property
+    def rate_limiter(self) -> AsyncRateLimitHandler:
+        return self.async_client.rate_limiter
+
+    @property
+    def stats(self) -> dict:
+        return self.async_client.stats
+
+    def submit(self, coro):
+        """Schedule a coroutine on the client's loop. Returns a concurrent.futures.Future."""
+        timings = current_timings()
+        if timings is not None:
+            # The loop thread doesn't share our context; carry the pull's timings over
+            coro = _attributed(coro, timings)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def request(self, method: str, url: str, api_type: str = "default", **kwargs) -> "httpx.Response":
+        """Make an HTTP request with retry and rate limiting (blocking)."""
+        return self.submit(self.async_client.request(method, url, api_type=api_type, **kwargs)).result()
+
+    def get(self, url: str, api_type: str = "default", **kwargs) -> "httpx.Response":
+        """Make a GET request."""
+        return self.request("GET", url, api_type=api_type, **kwargs)
+
+    def post(self, url: str, api_type: str = "default", **kwargs) -> "httpx.Response":
+        """Make a POST request."""
+        return self.request("POST", url, api_type=api_type, **kwargs)
+
+    def download(self, url: str, **kwargs) -> "httpx.Response":
+        """Download a pre-signed report document (blocking)."""
+        return self.submit(self.async_client.download(url, **kwargs)).result()
+
+    def download_to(self, url: str, fileobj, chunk_size: int = 1024 * 1024, **kwargs) -> int:
+        """Stream a pre-signed report document into fileobj (blocking)."""
+        return self.submit(self.async_client.download_to(url, fileobj, chunk_size, **kwargs)).result()
+
+    def get_stats(self) -> dict:
+        """Get request statistics."""
+        return self.async_client.get_stats()
+
+    def reset_stats(self):
+        """Reset request statistics."""
+        self.async_client.reset_stats()
+
+    def close(self):
+        """Close connection pools and stop the event loop."""
+        if self._loop.is_closed():
+            return
+        self.submit(self.async_client.aclose()).result()
+        self._stop_loop()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def get_sp_api_client(access_token: str = None, region: str = "NA", **kwargs):
+    """
+    SP-API client for a pull: SyncSPAPIClient when httpx is installed,
+    otherwise (or with SP_API_ASYNC=false) the requests-based SPAPIClient.
+    Both take the same arguments and expose the same get/post/download calls.
+    """
+    if httpx is None or os.environ.get("SP_API_ASYNC", "true").lower() == "false":
+        return SPAPIClient(access_token=access_token, region=region, **kwargs)
+    return SyncSPAPIClient(access_token=access_token, region=region, **kwargs)
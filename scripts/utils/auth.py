@@ -1,20 +1,305 @@
 """
 SP-API Authentication Module
 Handles OAuth 2.0 token refresh via Login With Amazon (LWA)
+
+Tokens are shared across processes through a small file store guarded by an
+exclusive file lock, so concurrent scripts and consecutive GitHub Actions
+steps on the same runner reuse one LWA token per region instead of each
+doing their own round-trip. TokenProvider can also refresh ahead of expiry
+on a background thread for long-running jobs.
+
+Configuration via environment variables:
+    SP_TOKEN_CACHE_PATH: Token store file (default: <tmpdir>/sp-api-lwa-tokens.json)
+    SP_TOKEN_CACHE_DISABLED: Set to "true" to keep tokens in memory only
 """
 
 import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
 import requests
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import Optional, Dict
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows — the store still works, just without cross-process locking
+    fcntl = None
+
+from .metrics import get_metrics
 
-# LWA Token endpoint
-LWA_TOKEN_URL = "https://api.amazon.com/auth/o2/token"
+logger = logging.getLogger(__name__)
+
+# LWA Token endpoint (SP_LWA_TOKEN_URL points it at a local simulator)
+LWA_TOKEN_URL = os.environ.get("SP_LWA_TOKEN_URL", "https://api.amazon.com/auth/o2/token")
+
+# Refresh this long before expiry (LWA tokens live 3600s)
+TOKEN_REFRESH_MARGIN_SECONDS = 300
 
 # Per-region cache for access tokens
 # Each region gets its own cached token to avoid cross-region conflicts
 _token_cache = {}  # {"NA": {"access_token": ..., "expires_at": ...}, "EU": {...}, "FE": {...}, "UAE": {...}}
 
+# TokenProvider singletons per region / explicit credentials (see get_token_provider)
+_providers: Dict[str, "TokenProvider"] = {}
+_providers_lock = threading.Lock()
+
+
+# =============================================================================
+# Persistent Token Store
+# =============================================================================
+
+class TokenStore:
+    """
+    JSON file of access tokens shared by all processes on the machine.
+
+    Entries are keyed by region + a hash of the refresh token, so different
+    credentials never share a token. Every read-modify-write happens under an
+    exclusive flock on a sidecar .lock file; writes go through a temp file and
+    os.replace() so readers never see a partial file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get(
+            "SP_TOKEN_CACHE_PATH",
+            os.path.join(tempfile.gettempdir(), "sp-api-lwa-tokens.json")
+        )
+        self.lock_path = self.path + ".lock"
+        self._thread_lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+
+    def __enter__(self):
+        """Acquire the exclusive lock (re-entrant within a process)."""
+        self._thread_lock.acquire()
+        if self._lock_depth == 0 and fcntl is not None:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            self._lock_file = open(self.lock_path, "a")
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        self._lock_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._lock_depth -= 1
+        if self._lock_depth == 0 and self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        self._thread_lock.release()
+        return False
+
+    def _read_all(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[dict]:
+        """Read one entry: {"access_token": ..., "expires_at": <epoch seconds>}."""
+        with self:
+            return self._read_all().get(key)
+
+    def put(self, key: str, access_token: str, expires_at: float):
+        """Write one entry, dropping any entries that have already expired."""
+        with self:
+            data = self._read_all()
+            now = time.time()
+            data = {k: v for k, v in data.items() if v.get("expires_at", 0) > now}
+            data[key] = {"access_token": access_token, "expires_at": expires_at}
+
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".sp-api-tokens-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f)
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+
+# =============================================================================
+# Token Provider
+# =============================================================================
+
+class TokenProvider:
+    """
+    Supplies a valid access token for one region.
+
+    Lookup order: in-memory copy → shared TokenStore → LWA refresh. The LWA
+    call is made while holding the store lock, so when several processes
+    start at once only the first one refreshes and the rest pick its token
+    up from the store.
+
+    Usage:
+        provider = get_token_provider("NA")
+        token = provider.get_token()      # or provider()
+        provider.start_background_refresh()  # long-running jobs
+        client = SPAPIClient(token_provider=provider, region="NA")
+    """
+
+    def __init__(
+        self,
+        region: str = "NA",
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+        store: Optional[TokenStore] = None,
+        refresh_margin: int = TOKEN_REFRESH_MARGIN_SECONDS
+    ):
+        self.region = region.upper()
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.refresh_margin = refresh_margin
+
+        if store is None and os.environ.get("SP_TOKEN_CACHE_DISABLED", "").lower() != "true":
+            store = TokenStore()
+        self.store = store
+
+        self._access_token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def store_key(self) -> str:
+        """Region + short hash of the refresh token."""
+        refresh_token = self.refresh_token or get_refresh_token_for_region(self.region)
+        digest = hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()[:16]
+        return f"{self.region}:{digest}"
+
+    @property
+    def expires_at(self) -> float:
+        """Epoch seconds when the current token expires (0 if none)."""
+        return self._expires_at
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return time.time() < expires_at - self.refresh_margin
+
+    def _set(self, access_token: str, expires_at: float):
+        self._access_token = access_token
+        self._expires_at = expires_at
+        _token_cache[self.region] = {
+            "access_token": access_token,
+            "expires_at": datetime.fromtimestamp(expires_at)
+        }
+
+    def get_token(self) -> str:
+        """Return a token valid for at least refresh_margin seconds."""
+        started = time.perf_counter()
+        with self._lock:
+            if self._access_token and self._is_fresh(self._expires_at):
+                return self._access_token
+            access_token = self._refresh(force=False)
+        # Cache misses only: lock wait + shared store + LWA round-trip
+        get_metrics().record_stage("token_fetch", time.perf_counter() - started)
+        return access_token
+
+    __call__ = get_token
+
+    def force_refresh(self) -> str:
+        """Get a new token from LWA even if the cached one is still valid."""
+        started = time.perf_counter()
+        with self._lock:
+            access_token = self._refresh(force=True)
+        get_metrics().record_stage("token_fetch", time.perf_counter() - started)
+        return access_token
+
+    def _refresh(self, force: bool) -> str:
+        """Refresh under the store lock. Caller holds self._lock."""
+        if self.store is None:
+            access_token, expires_in = _request_lwa_token(
+                self.client_id, self.client_secret, self.refresh_token, self.region
+            )
+            self._set(access_token, time.time() + expires_in)
+            return access_token
+
+        key = self.store_key
+        with self.store:
+            # Another process may have refreshed while we waited for the lock
+            if not force:
+                entry = self.store.get(key)
+                if entry and self._is_fresh(entry.get("expires_at", 0)):
+                    self._set(entry["access_token"], entry["expires_at"])
+                    logger.debug(f"Using shared access token for {self.region}")
+                    return self._access_token
+
+            access_token, expires_in = _request_lwa_token(
+                self.client_id, self.client_secret, self.refresh_token, self.region
+            )
+            expires_at = time.time() + expires_in
+            self.store.put(key, access_token, expires_at)
+
+        self._set(access_token, expires_at)
+        return access_token
+
+    def start_background_refresh(self):
+        """Refresh the token refresh_margin seconds before it expires, on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._background_loop,
+            name=f"lwa-token-refresh-{self.region}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop_background_refresh(self):
+        """Stop the background refresh thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _background_loop(self):
+        while not self._stop_event.is_set():
+            wait = self._expires_at - self.refresh_margin - time.time()
+            if wait > 0 and self._stop_event.wait(timeout=wait):
+                return
+            try:
+                with self._lock:
+                    # force=False: picks up a token another process already refreshed
+                    self._refresh(force=False)
+            except Exception as e:
+                logger.warning(f"Background token refresh for {self.region} failed: {e}")
+                if self._stop_event.wait(timeout=30):
+                    return
+
+
+def get_token_provider(
+    region: str = "NA",
+    client_id: Optional[str] = None,
+    client_secret: Optional[str] = None,
+    refresh_token: Optional[str] = None
+) -> TokenProvider:
+    """
+    Get the shared TokenProvider for a region.
+
+    Providers built from environment credentials are cached per region;
+    explicit credentials are cached per region + client_id + refresh token
+    hash, so repeated calls reuse one provider (and its in-memory token).
+    """
+    region = region.upper()
+    key = region
+    if client_id or client_secret or refresh_token:
+        digest = hashlib.sha256((refresh_token or "").encode("utf-8")).hexdigest()[:16]
+        key = f"{region}:{client_id or ''}:{digest}"
+
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = TokenProvider(region, client_id, client_secret, refresh_token)
+        return _providers[key]
+
 
 def get_access_token(
     client_id: Optional[str] = None,
@@ -25,8 +310,9 @@ def get_access_token(
     """
     Get a valid access token, refreshing if necessary.
 
-    Uses cached token if still valid, otherwise refreshes.
-    Tokens are cached per-region to support concurrent NA/EU/FE usage.
+    Uses the in-memory token, then the shared on-disk token store, and only
+    then refreshes via LWA. Tokens are cached per-region to support
+    concurrent NA/EU/FE usage.
 
     Args:
         client_id: LWA Client ID (defaults to SP_LWA_CLIENT_ID env var)
@@ -41,20 +327,7 @@ def get_access_token(
         ValueError: If credentials are missing
         requests.HTTPError: If token refresh fails
     """
-    region = region.upper()
-
-    # Check if we have a valid cached token for this region
-    if region in _token_cache:
-        cache = _token_cache[region]
-        if cache.get("access_token") and cache.get("expires_at"):
-            if datetime.now() < cache["expires_at"] - timedelta(minutes=5):
-                return cache["access_token"]
-
-    # Need to refresh — use region-specific refresh token if not explicitly provided
-    if not refresh_token:
-        refresh_token = get_refresh_token_for_region(region)
-
-    return refresh_access_token(client_id, client_secret, refresh_token, region)
+    return get_token_provider(region, client_id, client_secret, refresh_token).get_token()
 
 
 def refresh_access_token(
@@ -64,7 +337,9 @@ def refresh_access_token(
     region: str = "NA"
 ) -> str:
     """
-    Refresh the access token using LWA OAuth 2.0.
+    Refresh the access token using LWA OAuth 2.0, ignoring any cached token.
+
+    The new token is written to the shared token store.
 
     Args:
         client_id: LWA Client ID (defaults to SP_LWA_CLIENT_ID env var)
@@ -75,6 +350,25 @@ def refresh_access_token(
     Returns:
         New access token string
 
+    Raises:
+        ValueError: If credentials are missing
+        requests.HTTPError: If token refresh fails
+    """
+    return get_token_provider(region, client_id, client_secret, refresh_token).force_refresh()
+
+
+def _request_lwa_token(
+    client_id: Optional[str] = None,
+    client_secret: Optional[str] = None,
+    refresh_token: Optional[str] = None,
+    region: str = "NA"
+) -> tuple:
+    """
+    Call the LWA token endpoint.
+
+    Returns:
+        Tuple of (access_token, expires_in_seconds)
+
     Raises:
         ValueError: If credentials are missing
         requests.HTTPError: If token refresh fails
@@ -109,24 +403,19 @@ def refresh_access_token(
         },
         headers={
             "Content-Type": "application/x-www-form-urlencoded"
-        }
+        },
+        timeout=30
     )
 
     response.raise_for_status()
     data = response.json()
 
-    # Cache the new token for this region
     access_token = data["access_token"]
     expires_in = data.get("expires_in", 3600)  # Default 1 hour
 
-    _token_cache[region] = {
-        "access_token": access_token,
-        "expires_at": datetime.now() + timedelta(seconds=expires_in)
-    }
-
     print(f"✓ Access token refreshed for {region}, expires in {expires_in} seconds")
 
-    return access_token
+    return access_token, expires_in
 
 
 def get_refresh_token_for_region(region: str) -> str:
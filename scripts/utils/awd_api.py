@@ -22,6 +22,8 @@ import requests
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from .api_client import apply_endpoint_override
+
 # Import the new API client (optional import for backward compatibility)
 try:
     from utils.api_client import SPAPIClient
@@ -38,6 +40,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"   # UAE uses EU endpoint, different token
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # AWD API version
 AWD_API_VERSION = "2024-05-09"
 
@@ -0,0 +1,108 @@
+"""
+Change Detection Module
+Skips upserts of rows whose content hasn't changed since the last pull.
+
+refresh_recent.py and the daily pulls re-pull days that are already stored,
+and Amazon's numbers for most ASINs don't move between pulls. Rewriting an
+identical row still costs a new row version, WAL and index updates. Each
+stored row carries a row_hash of its content fields; before upserting, the
+stored hashes for the same slice (e.g. one date + marketplace) are fetched
+in one paginated select and only new or changed rows are written.
+
+Usage:
+    stored = fetch_stored_hashes("sp_daily_asin_data", "child_asin",
+                                 {"date": "2026-02-01", "marketplace_id": mp_id})
+    changes = split_changes(rows, "child_asin", ASIN_HASH_FIELDS, stored)
+    upsert(changes.to_write)
+    changes.counts()    # {"new": 3, "changed": 12, "unchanged": 480}
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from .metrics import get_metrics
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = 1000
+
+
+def compute_row_hash(row: Dict[str, Any], fields: Sequence[str]) -> str:
+    """
+    MD5 of a row's content fields (tracking columns such as import_id are
+    left out so a re-pull of the same numbers hashes the same).
+    """
+    values = [row.get(field) for field in fields]
+    # default=str: dates/Decimals; separators fixed so the hash is stable
+    payload = json.dumps(values, default=str, separators=(",", ":"))
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def fetch_stored_hashes(
+    table: str,
+    key_column: str,
+    filters: Dict[str, Any],
+    client=None
+) -> Dict[str, Optional[str]]:
+    """
+    Stored row_hash per key for one slice of a table (e.g. a date + marketplace).
+
+    Rows stored before row_hash existed (or by a writer that doesn't set it)
+    map to None and are treated as changed.
+    """
+    if client is None:
+        from .db import get_supabase_client
+        client = get_supabase_client()
+
+    stored: Dict[str, Optional[str]] = {}
+    with get_metrics().timed("db_hash_lookup"):
+        start = 0
+        while True:
+            query = client.table(table).select(f"{key_column},row_hash")
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            page = query.order(key_column).range(start, start + PAGE_SIZE - 1).execute().data or []
+            for row in page:
+                stored[row[key_column]] = row.get("row_hash")
+            if len(page) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+    return stored
+
+
+class ChangeSet:
+    """Fresh rows split against stored hashes."""
+
+    def __init__(self):
+        self.new: List[Dict[str, Any]] = []
+        self.changed: List[Dict[str, Any]] = []
+        self.unchanged = 0
+
+    @property
+    def to_write(self) -> List[Dict[str, Any]]:
+        return self.new + self.changed
+
+    def counts(self) -> Dict[str, int]:
+        return {"new": len(self.new), "changed": len(self.changed), "unchanged": self.unchanged}
+
+
+def split_changes(
+    rows: List[Dict[str, Any]],
+    key_column: str,
+    fields: Sequence[str],
+    stored: Dict[str, Optional[str]]
+) -> ChangeSet:
+    """
+    Set row["row_hash"] on every row and sort it into new / changed / unchanged.
+    """
+    changes = ChangeSet()
+    for row in rows:
+        row["row_hash"] = compute_row_hash(row, fields)
+        key = row[key_column]
+        if key not in stored:
+            changes.new.append(row)
+        elif stored[key] != row["row_hash"]:
+            changes.changed.append(row)
+        else:
+            changes.unchanged += 1
+    return changes
@@ -4,10 +4,16 @@ Handles all database operations for SP-API data
 """
 
 import os
-from typing import Dict, List, Optional, Any
+import time
+import threading
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import date, datetime
 from supabase import create_client, Client
 
+from .metrics import get_metrics, timed_stage
+from .spool import spool_sink
+from .change_detection import fetch_stored_hashes, split_changes
+
 # Supabase client singleton
 _supabase_client: Optional[Client] = None
 
@@ -66,6 +72,12 @@ def get_supabase_client() -> Client:
     return _supabase_client
 
 
+def _execute_chunk(query):
+    """Execute one upsert batch, recorded as a db_upsert_chunk stage."""
+    with get_metrics().timed("db_upsert_chunk"):
+        return query.execute()
+
+
 def create_data_import(
     marketplace_code: str,
     report_date: date,
@@ -158,9 +170,10 @@ def update_pull_status(
     report_document_id: Optional[str] = None,
     asin_count: Optional[int] = None,
     error_message: Optional[str] = None,
-    processing_time_ms: Optional[int] = None
+    processing_time_ms: Optional[int] = None,
+    row_changes: Optional[Dict[str, int]] = None
 ):
-    """Update an sp_api_pulls record."""
+    """Update an sp_api_pulls record (row_changes: new/changed/unchanged counts)."""
     client = get_supabase_client()
 
     update_data = {"status": status}
@@ -174,12 +187,389 @@ def update_pull_status(
         update_data["error_message"] = error_message
     if processing_time_ms is not None:
         update_data["processing_time_ms"] = processing_time_ms
+    if row_changes:
+        update_data["rows_new"] = row_changes.get("new")
+        update_data["rows_changed"] = row_changes.get("changed")
+        update_data["rows_unchanged"] = row_changes.get("unchanged")
     if status in ["completed", "failed"]:
         update_data["completed_at"] = datetime.utcnow().isoformat()
 
     client.table("sp_api_pulls").update(update_data).eq("id", pull_id).execute()
 
 
+def create_pull_records_batch(
+    targets: List[Tuple[str, date]],
+    import_type: str = "sp_api_sales_traffic"
+) -> Dict[Tuple[str, date], Dict[str, Any]]:
+    """
+    Create data_imports + sp_api_pulls records for many (marketplace, date)
+    targets in two requests instead of two per target. Pulls start as
+    'processing'; finish them with a PullStatusBatch.
+
+    Returns:
+        (marketplace_code, report_date) -> tracking record dict (import_id,
+        pull_id, marketplace_code, report_date, started_at)
+    """
+    if not targets:
+        return {}
+    client = get_supabase_client()
+    started_at = datetime.utcnow().isoformat()
+
+    imports = client.table("data_imports").insert([
+        {
+            "marketplace_id": MARKETPLACE_UUIDS[code],
+            "import_type": import_type,
+            "period_start_date": day.isoformat(),
+            "period_end_date": day.isoformat(),
+            "period_type": "daily",
+            "status": "processing"
+        }
+        for code, day in targets
+    ]).execute().data
+    # Inserted rows come back in request order
+    import_ids = [row["id"] for row in imports]
+
+    pulls = client.table("sp_api_pulls").upsert([
+        {
+            "pull_date": day.isoformat(),
+            "marketplace_id": MARKETPLACE_UUIDS[code],
+            "amazon_marketplace_id": AMAZON_MARKETPLACE_IDS[code],
+            "report_id": None,
+            "status": "processing",
+            "import_id": import_id,
+            "started_at": started_at,
+            "completed_at": None,
+            "error_message": None,
+            "asin_count": None
+        }
+        for (code, day), import_id in zip(targets, import_ids)
+    ], on_conflict="pull_date,marketplace_id").execute().data
+    pull_ids = {(row["pull_date"], row["marketplace_id"]): row["id"] for row in pulls}
+
+    return {
+        (code, day): {
+            "marketplace_code": code,
+            "report_date": day,
+            "import_id": import_id,
+            "pull_id": pull_ids[(day.isoformat(), MARKETPLACE_UUIDS[code])],
+            "started_at": started_at,
+            "import_type": import_type
+        }
+        for (code, day), import_id in zip(targets, import_ids)
+    }
+
+
+class PullStatusBatch:
+    """
+    Buffers final statuses for records from create_pull_records_batch() and
+    writes them as one sp_api_pulls upsert + one data_imports upsert per
+    flush_every records (thread-safe; call flush() at the end).
+
+    A failed write puts its entries back in the queue. add() never raises
+    for a write (it runs inside pipeline stages, where an error would mark
+    an already-stored day as failed): the entries are retried with the next
+    batch, and flush() raises if they still can't be written.
+
+    Usage:
+        batch = PullStatusBatch()
+        batch.add(record, "completed", asin_count=512, processing_time_ms=8000)
+        batch.add(record, "failed", error_message="...")
+        batch.flush()
+    """
+
+    def __init__(self, flush_every: int = 20):
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        record: Dict[str, Any],
+        status: str,
+        asin_count: Optional[int] = None,
+        error_message: Optional[str] = None,
+        processing_time_ms: Optional[int] = None,
+        row_changes: Optional[Dict[str, int]] = None
+    ):
+        entry = {
+            "record": record,
+            "status": status,
+            "asin_count": asin_count,
+            "error_message": error_message,
+            "processing_time_ms": processing_time_ms,
+            "row_changes": row_changes or {},
+            "completed_at": datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._pending.append(entry)
+            # Every flush_every entries (requeued ones included, so a failing
+            # write is retried once per batch, not on every add)
+            if len(self._pending) % self.flush_every:
+                return
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"  ⚠️  Could not write pull statuses (kept for the next flush): {str(e)[:200]}")
+
+    def flush(self):
+        with self._lock:
+            entries = self._take()
+        try:
+            self._write(entries)
+        except Exception:
+            with self._lock:
+                self._pending[:0] = entries
+            raise
+
+    def _take(self) -> List[Dict[str, Any]]:
+        """Empty the queue; the latest entry per record (a requeued one may have been superseded)."""
+        latest = {}
+        for entry in self._pending:
+            latest[entry["record"]["import_id"]] = entry
+        self._pending = []
+        return list(latest.values())
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        client = get_supabase_client()
+
+        # Bulk upserts need every row to carry the same (and all NOT NULL) columns
+        pulls = []
+        imports = []
+        for entry in entries:
+            record = entry["record"]
+            code, day = record["marketplace_code"], record["report_date"].isoformat()
+            changes = entry["row_changes"]
+            pulls.append({
+                "pull_date": day,
+                "marketplace_id": MARKETPLACE_UUIDS[code],
+                "amazon_marketplace_id": AMAZON_MARKETPLACE_IDS[code],
+                "import_id": record["import_id"],
+                "status": entry["status"],
+                "started_at": record["started_at"],
+                "completed_at": entry["completed_at"],
+                "error_message": entry["error_message"],
+                "asin_count": entry["asin_count"],
+                "processing_time_ms": entry["processing_time_ms"],
+                "rows_new": changes.get("new"),
+                "rows_changed": changes.get("changed"),
+                "rows_unchanged": changes.get("unchanged")
+            })
+            imports.append({
+                "id": record["import_id"],
+                "marketplace_id": MARKETPLACE_UUIDS[code],
+                "import_type": record["import_type"],
+                "period_start_date": day,
+                "period_end_date": day,
+                "period_type": "daily",
+                "status": entry["status"],
+                "row_count": entry["asin_count"],
+                "error_message": entry["error_message"],
+                "processing_time_ms": entry["processing_time_ms"],
+                "completed_at": entry["completed_at"]
+            })
+
+        client.table("sp_api_pulls").upsert(pulls, on_conflict="pull_date,marketplace_id").execute()
+        client.table("data_imports").upsert(imports, on_conflict="id").execute()
+
+
+def create_inventory_pull_records_batch(
+    targets: List[Tuple[str, str, date, str]]
+) -> List[Dict[str, Any]]:
+    """
+    Create data_imports + sp_inventory_pulls records for many inventory pulls
+    in two requests. Finish them with an InventoryPullStatusBatch.
+
+    Args:
+        targets: (marketplace_code, report_type, pull_date, import_type) tuples
+
+    Returns:
+        Tracking record dicts in target order (marketplace_code, report_type,
+        report_date, import_id, pull_id, started_at, import_type)
+    """
+    if not targets:
+        return []
+    client = get_supabase_client()
+    started_at = datetime.utcnow().isoformat()
+
+    imports = client.table("data_imports").insert([
+        {
+            "marketplace_id": MARKETPLACE_UUIDS[code],
+            "import_type": import_type,
+            "period_start_date": day.isoformat(),
+            "period_end_date": day.isoformat(),
+            "period_type": "daily",
+            "status": "processing"
+        }
+        for code, _, day, import_type in targets
+    ]).execute().data
+    # Inserted rows come back in request order
+    import_ids = [row["id"] for row in imports]
+
+    pulls = client.table("sp_inventory_pulls").upsert([
+        {
+            "pull_date": day.isoformat(),
+            "marketplace_id": MARKETPLACE_UUIDS[code],
+            "report_type": report_type,
+            "status": "pending",
+            "import_id": import_id,
+            "started_at": started_at,
+            "completed_at": None,
+            "error_message": None,
+            "row_count": None
+        }
+        for (code, report_type, day, _), import_id in zip(targets, import_ids)
+    ], on_conflict="pull_date,marketplace_id,report_type").execute().data
+    pull_ids = {(row["pull_date"], row["marketplace_id"], row["report_type"]): row["id"] for row in pulls}
+
+    return [
+        {
+            "marketplace_code": code,
+            "report_type": report_type,
+            "report_date": day,
+            "import_id": import_id,
+            "pull_id": pull_ids[(day.isoformat(), MARKETPLACE_UUIDS[code], report_type)],
+            "started_at": started_at,
+            "import_type": import_type
+        }
+        for (code, report_type, day, import_type), import_id in zip(targets, import_ids)
+    ]
+
+
+class InventoryPullStatusBatch(PullStatusBatch):
+    """
+    PullStatusBatch for records from create_inventory_pull_records_batch():
+    final statuses go to sp_inventory_pulls (keyed by report type) instead
+    of sp_api_pulls.
+
+    Usage:
+        batch = InventoryPullStatusBatch()
+        batch.add(record, "completed", row_count=1200, processing_time_ms=8000)
+        batch.flush()
+    """
+
+    def add(
+        self,
+        record: Dict[str, Any],
+        status: str,
+        row_count: Optional[int] = None,
+        error_message: Optional[str] = None,
+        processing_time_ms: Optional[int] = None
+    ):
+        super().add(record, status, asin_count=row_count, error_message=error_message,
+                    processing_time_ms=processing_time_ms)
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        client = get_supabase_client()
+
+        pulls = []
+        imports = []
+        for entry in entries:
+            record = entry["record"]
+            code, day = record["marketplace_code"], record["report_date"].isoformat()
+            pulls.append({
+                "pull_date": day,
+                "marketplace_id": MARKETPLACE_UUIDS[code],
+                "report_type": record["report_type"],
+                "import_id": record["import_id"],
+                "status": entry["status"],
+                "started_at": record["started_at"],
+                "completed_at": entry["completed_at"],
+                "error_message": entry["error_message"],
+                "row_count": entry["asin_count"],
+                "processing_time_ms": entry["processing_time_ms"]
+            })
+            imports.append({
+                "id": record["import_id"],
+                "marketplace_id": MARKETPLACE_UUIDS[code],
+                "import_type": record["import_type"],
+                "period_start_date": day,
+                "period_end_date": day,
+                "period_type": "daily",
+                "status": entry["status"],
+                "row_count": entry["asin_count"],
+                "error_message": entry["error_message"],
+                "processing_time_ms": entry["processing_time_ms"],
+                "completed_at": entry["completed_at"]
+            })
+
+        client.table("sp_inventory_pulls").upsert(pulls, on_conflict="pull_date,marketplace_id,report_type").execute()
+        client.table("data_imports").upsert(imports, on_conflict="id").execute()
+
+
+def record_pull_timings(
+    timings,
+    pull_table: Optional[str] = None,
+    pull_id: Optional[str] = None
+) -> bool:
+    """
+    Persist a PullTimings (metrics.py): the breakdown goes into
+    <pull_table>.stage_timings for pull_id, and one row per stage into
+    sp_pull_stage_timings.
+
+    Never raises — a failed write only loses the timings, not the pull.
+
+    Args:
+        timings: PullTimings for the pull
+        pull_table: Pull record table (e.g. 'sp_api_pulls'), None if the pull has none
+        pull_id: Pull record ID in pull_table
+
+    Returns:
+        True if both writes succeeded
+    """
+    timings.finish()
+    breakdown = timings.to_dict()
+    pull_date = timings.pull_date
+    if isinstance(pull_date, (date, datetime)):
+        pull_date = pull_date.isoformat()[:10]
+
+    rows = [
+        {
+            "pull_type": timings.pull_type,
+            "pull_table": pull_table,
+            "pull_id": pull_id,
+            "marketplace_id": MARKETPLACE_UUIDS.get(timings.marketplace_code),
+            "marketplace_code": timings.marketplace_code,
+            "region": timings.region,
+            "pull_date": pull_date,
+            "pull_started_at": breakdown["started_at"],
+            "pull_total_seconds": breakdown["total_seconds"],
+            "stage": stage,
+            "seconds": entry["seconds"],
+            "call_count": entry["count"],
+            "bytes": entry.get("bytes"),
+            "peak_rss_mb": entry.get("peak_rss_mb"),
+        }
+        for stage, entry in breakdown["stages"].items()
+    ]
+
+    try:
+        client = get_supabase_client()
+        if pull_table and pull_id:
+            client.table(pull_table).update({"stage_timings": breakdown}).eq("id", pull_id).execute()
+        if rows:
+            client.table("sp_pull_stage_timings").insert(rows).execute()
+        return True
+    except Exception as e:
+        print(f"  ⚠️  Could not record stage timings: {str(e)[:200]}")
+        return False
+
+
+# sp_daily_asin_data columns covered by row_hash (everything but tracking)
+ASIN_HASH_FIELDS = [
+    "date", "marketplace_id", "parent_asin", "child_asin",
+    "units_ordered", "units_ordered_b2b", "ordered_product_sales", "ordered_product_sales_b2b",
+    "currency_code", "total_order_items", "total_order_items_b2b",
+    "sessions", "sessions_b2b", "page_views", "page_views_b2b",
+    "browser_sessions", "mobile_app_sessions", "browser_page_views", "mobile_app_page_views",
+    "buy_box_percentage", "buy_box_percentage_b2b", "unit_session_percentage", "unit_session_percentage_b2b",
+    "data_source"
+]
+
+
 def upsert_asin_data(
     report_data: Dict[str, Any],
     marketplace_code: str,
@@ -187,7 +577,7 @@ def upsert_asin_data(
     import_id: str
 ) -> int:
     """
-    Upsert ASIN-level sales and traffic data.
+    Upsert ASIN-level sales and traffic data (unchanged rows are skipped).
 
     Args:
         report_data: Parsed report data from SP-API
@@ -196,14 +586,42 @@ def upsert_asin_data(
         import_id: The data_imports ID for tracking
 
     Returns:
-        Number of rows upserted
+        Number of ASINs in the report (written or already up to date)
+    """
+    return upsert_asin_data_changes(report_data, marketplace_code, report_date, import_id)["total"]
+
+
+@timed_stage("db_upsert")
+def upsert_asin_data_changes(
+    report_data: Dict[str, Any],
+    marketplace_code: str,
+    report_date: date,
+    import_id: str,
+    skip_unchanged: bool = True
+) -> Dict[str, int]:
+    """
+    Upsert ASIN-level sales and traffic data, writing only new or changed rows.
+
+    Each row gets a row_hash of its content; the stored hashes for the
+    date/marketplace are fetched in bulk first (change_detection.py) and rows
+    whose hash matches are not rewritten (they keep their old import_id).
+
+    Args:
+        report_data: Parsed report data from SP-API
+        marketplace_code: Marketplace code (e.g., 'USA')
+        report_date: The date of the data
+        import_id: The data_imports ID for tracking
+        skip_unchanged: False rewrites every row (still storing hashes)
+
+    Returns:
+        Dict with total, new, changed and unchanged row counts
     """
     client = get_supabase_client()
     marketplace_id = MARKETPLACE_UUIDS[marketplace_code]
 
     asin_data = report_data.get("salesAndTrafficByAsin", [])
     if not asin_data:
-        return 0
+        return {"total": 0, "new": 0, "changed": 0, "unchanged": 0}
 
     # Determine currency from first record
     currency_code = None
@@ -263,16 +681,32 @@ def upsert_asin_data(
         seen[key] = row
     unique_rows = list(seen.values())
 
+    # Compare against what's stored: only new/changed rows are written
+    stored = {}
+    if skip_unchanged:
+        stored = fetch_stored_hashes(
+            "sp_daily_asin_data", "child_asin",
+            {"date": report_date.isoformat(), "marketplace_id": marketplace_id},
+            client=client
+        )
+    changes = split_changes(unique_rows, "child_asin", ASIN_HASH_FIELDS, stored)
+    rows_to_write = changes.to_write
+
     # Batch upsert (Supabase handles ON CONFLICT)
-    if unique_rows:
-        client.table("sp_daily_asin_data").upsert(
-            unique_rows,
+    if rows_to_write:
+        _execute_chunk(client.table("sp_daily_asin_data").upsert(
+            rows_to_write,
             on_conflict="date,marketplace_id,child_asin"
-        ).execute()
+        ))
 
-    return len(unique_rows)
+    counts = changes.counts()
+    if skip_unchanged and counts["unchanged"]:
+        print(f"  ♻️  {marketplace_code} {report_date}: {counts['unchanged']} unchanged, "
+              f"{counts['changed']} changed, {counts['new']} new ASIN rows")
+    return {"total": len(unique_rows), **counts}
 
 
+@timed_stage("db_upsert")
 def upsert_totals(
     report_data: Dict[str, Any],
     marketplace_code: str,
@@ -331,14 +765,52 @@ def upsert_totals(
         "import_id": import_id
     }
 
-    client.table("sp_daily_totals").upsert(
+    _execute_chunk(client.table("sp_daily_totals").upsert(
         row,
         on_conflict="date,marketplace_id"
-    ).execute()
+    ))
 
     return True
 
 
+@spool_sink()
+def store_sales_traffic_report(
+    report_data: Dict[str, Any],
+    marketplace_code: str,
+    report_date: date,
+    import_id: str,
+    pull_id: str,
+    started_at: float
+) -> int:
+    """
+    Write a downloaded Sales & Traffic report and complete its tracking
+    records. Spool sink for pull_daily_sales.py (spooled before writing, so a
+    Supabase outage doesn't cost the report).
+
+    Args:
+        report_data: Raw report JSON
+        marketplace_code: Marketplace code (e.g., 'USA')
+        report_date: Date of the data
+        import_id: data_imports ID
+        pull_id: sp_api_pulls ID
+        started_at: time.time() when the pull started (for processing_time_ms)
+
+    Returns:
+        Number of ASINs upserted
+    """
+    changes = upsert_asin_data_changes(report_data, marketplace_code, report_date, import_id)
+    asin_count = changes.pop("total")
+    upsert_totals(report_data, marketplace_code, report_date, import_id)
+
+    processing_time_ms = int((time.time() - started_at) * 1000)
+    update_pull_status(
+        pull_id, "completed", asin_count=asin_count,
+        processing_time_ms=processing_time_ms, row_changes=changes
+    )
+    update_data_import(import_id, "completed", row_count=asin_count, processing_time_ms=processing_time_ms)
+    return asin_count
+
+
 def get_existing_pull(marketplace_code: str, report_date: date) -> Optional[Dict]:
     """
     Check if a pull already exists for this marketplace/date.
@@ -363,6 +835,8 @@ def get_existing_pull(marketplace_code: str, report_date: date) -> Optional[Dict
 # Orders Data Functions (near-real-time orders report)
 # =============================================================================
 
+@spool_sink()
+@timed_stage("db_upsert")
 def upsert_orders_asin_data(
     rows: List[Dict],
     marketplace_code: str,
@@ -421,7 +895,9 @@ def upsert_orders_asin_data(
             "ordered_product_sales": row.get("ordered_product_sales", 0),
             "total_order_items": row.get("total_order_items", 0),
             "currency_code": row.get("currency_code", "USD"),
-            "data_source": "orders"
+            "data_source": "orders",
+            # Orders-only rows aren't hashed; a later S&T pull always rewrites them
+            "row_hash": None
         })
 
     if skipped > 0:
@@ -465,10 +941,10 @@ def upsert_orders_asin_data(
         chunk = filtered_rows[i:i + chunk_size]
         chunk_num = i // chunk_size + 1
         try:
-            client.table("sp_daily_asin_data").upsert(
+            _execute_chunk(client.table("sp_daily_asin_data").upsert(
                 chunk,
                 on_conflict="date,marketplace_id,child_asin"
-            ).execute()
+            ))
             total += len(chunk)
             if num_chunks > 1:
                 print(f"    [upsert chunk {chunk_num}/{num_chunks}: {len(chunk)} rows OK]", flush=True)
@@ -598,6 +1074,7 @@ def update_pull_checkpoint(
 # SQP/SCP Functions (Search Query Performance / Search Catalog Performance)
 # =============================================================================
 
+@timed_stage("db_upsert")
 def upsert_sqp_data(rows: List[Dict], chunk_size: int = 200) -> int:
     """
     Batch upsert SQP data rows into sp_sqp_data.
@@ -623,10 +1100,10 @@ def upsert_sqp_data(rows: List[Dict], chunk_size: int = 200) -> int:
         chunk = rows[i:i + chunk_size]
         chunk_num = i // chunk_size + 1
         try:
-            client.table("sp_sqp_data").upsert(
+            _execute_chunk(client.table("sp_sqp_data").upsert(
                 chunk,
                 on_conflict="marketplace_id,child_asin,search_query,period_start,period_end,period_type"
-            ).execute()
+            ))
             total += len(chunk)
             if num_chunks > 1:
                 print(f"    [upsert chunk {chunk_num}/{num_chunks}: {len(chunk)} rows OK]", flush=True)
@@ -637,6 +1114,7 @@ def upsert_sqp_data(rows: List[Dict], chunk_size: int = 200) -> int:
     return total
 
 
+@timed_stage("db_upsert")
 def upsert_scp_data(rows: List[Dict], chunk_size: int = 200) -> int:
     """
     Batch upsert SCP data rows into sp_scp_data.
@@ -662,10 +1140,10 @@ def upsert_scp_data(rows: List[Dict], chunk_size: int = 200) -> int:
         chunk = rows[i:i + chunk_size]
         chunk_num = i // chunk_size + 1
         try:
-            client.table("sp_scp_data").upsert(
+            _execute_chunk(client.table("sp_scp_data").upsert(
                 chunk,
                 on_conflict="marketplace_id,child_asin,period_start,period_end,period_type"
-            ).execute()
+            ))
             total += len(chunk)
             if num_chunks > 1:
                 print(f"    [upsert chunk {chunk_num}/{num_chunks}: {len(chunk)} rows OK]", flush=True)
@@ -975,33 +1453,47 @@ def update_financial_pull_status(
     client.table("sp_financial_pulls").update(update_data).eq("id", pull_id).execute()
 
 
-def get_processed_settlement_ids(marketplace_code: str = None) -> List[str]:
+def find_processed_settlements(
+    settlement_ids: List[str] = None,
+    report_document_ids: List[str] = None,
+    chunk_size: int = 500
+) -> List[Dict]:
     """
-    Get list of settlement IDs already processed.
+    Which of these settlements are already stored.
 
     Settlement IDs are globally unique — the same settlement report
     contains transactions for all marketplaces in the region.
     So we check if a settlement has been processed at all, regardless
     of which marketplace triggered the pull.
 
+    Looks the IDs up in sp_processed_settlements (migrations/010_settlement_registry.sql)
+    with find_processed_settlements(): one indexed lookup per chunk of IDs,
+    instead of reading every completed pull.
+
     Args:
-        marketplace_code: Deprecated / ignored. Kept for backward compat.
+        settlement_ids: Settlement IDs to check
+        report_document_ids: Amazon report document IDs to check
+        chunk_size: IDs per RPC call
 
     Returns:
-        List of settlement_id strings
+        List of {settlement_id, report_document_id} for the matches
+        (report_document_id may be None for settlements stored before it was tracked)
     """
     client = get_supabase_client()
+    settlement_ids = [s for s in dict.fromkeys(settlement_ids or []) if s]
+    report_document_ids = [d for d in dict.fromkeys(report_document_ids or []) if d]
 
-    result = client.table("sp_financial_pulls") \
-        .select("settlement_id") \
-        .eq("report_type", "GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2") \
-        .eq("status", "completed") \
-        .not_.is_("settlement_id", "null") \
-        .execute()
+    found = {}
+    for ids, key in ((settlement_ids, "p_settlement_ids"), (report_document_ids, "p_report_document_ids")):
+        for i in range(0, len(ids), chunk_size):
+            result = client.rpc("find_processed_settlements", {key: ids[i:i + chunk_size]}).execute()
+            for row in result.data or []:
+                found[row["settlement_id"]] = row
 
-    return list(set(r["settlement_id"] for r in result.data))
+    return list(found.values())
 
 
+@timed_stage("db_upsert")
 def upsert_settlement_transactions(
     transactions: List[Dict],
     chunk_size: int = 500
@@ -1039,15 +1531,16 @@ def upsert_settlement_transactions(
 
     for i in range(0, len(unique_transactions), chunk_size):
         chunk = unique_transactions[i:i + chunk_size]
-        client.table("sp_settlement_transactions").upsert(
+        _execute_chunk(client.table("sp_settlement_transactions").upsert(
             chunk,
             on_conflict="marketplace_id,settlement_id,row_hash"
-        ).execute()
+        ))
         total += len(chunk)
 
     return total
 
 
+@timed_stage("db_upsert")
 def upsert_settlement_summary(summary: Dict) -> bool:
     """
     Upsert a settlement summary record.
@@ -1065,14 +1558,35 @@ def upsert_settlement_summary(summary: Dict) -> bool:
 
     client = get_supabase_client()
 
-    client.table("sp_settlement_summaries").upsert(
+    _execute_chunk(client.table("sp_settlement_summaries").upsert(
         summary,
         on_conflict="marketplace_id,settlement_id"
-    ).execute()
+    ))
 
     return True
 
 
+@timed_stage("db_upsert")
+def refresh_settlement_fee_rollup(settlement_id: str = None) -> int:
+    """
+    Rebuild a settlement's per-SKU monthly fee rollup from its stored transactions.
+
+    Calls refresh_settlement_fee_rollup() (migrations/011_settlement_fee_rollups.sql),
+    which replaces that settlement's rows in sp_settlement_sku_fees_monthly,
+    so calling it again for the same settlement doesn't double-count.
+
+    Args:
+        settlement_id: Settlement to roll up (None = rebuild every settlement)
+
+    Returns:
+        Number of rollup rows written
+    """
+    client = get_supabase_client()
+    result = client.rpc("refresh_settlement_fee_rollup", {"p_settlement_id": settlement_id}).execute()
+    return result.data or 0
+
+
+@timed_stage("db_upsert")
 def upsert_reimbursements(
     rows: List[Dict],
     chunk_size: int = 500
@@ -1111,46 +1625,148 @@ def upsert_reimbursements(
 
     for i in range(0, len(unique_rows), chunk_size):
         chunk = unique_rows[i:i + chunk_size]
-        client.table("sp_reimbursements").upsert(
+        _execute_chunk(client.table("sp_reimbursements").upsert(
             chunk,
             on_conflict="marketplace_id,reimbursement_id,sku"
-        ).execute()
+        ))
         total += len(chunk)
 
     return total
 
 
+# sp_fba_fee_estimates columns covered by row_hash (everything but tracking)
+FEE_ESTIMATE_HASH_FIELDS = [
+    "marketplace_id", "sku", "asin", "fnsku", "product_name",
+    "your_price", "sales_price", "product_size_tier", "currency_code",
+    "estimated_fee_total", "estimated_referral_fee_per_unit", "estimated_variable_closing_fee",
+    "estimated_pick_pack_fee_per_unit", "estimated_weight_handling_fee_per_unit",
+    "longest_side", "median_side", "shortest_side", "length_and_girth", "unit_of_dimension",
+    "item_package_weight", "unit_of_weight"
+]
+
+# Columns copied into sp_fba_fee_history for each changed estimate
+FEE_HISTORY_FIELDS = [
+    "marketplace_id", "sku", "asin", "product_size_tier", "currency_code", "your_price",
+    "estimated_fee_total", "estimated_referral_fee_per_unit", "estimated_variable_closing_fee",
+    "estimated_pick_pack_fee_per_unit", "estimated_weight_handling_fee_per_unit",
+    "item_package_weight", "unit_of_weight", "row_hash", "import_id"
+]
+
+
 def upsert_fba_fee_estimates(
     rows: List[Dict],
     chunk_size: int = 500
 ) -> int:
     """
-    Batch upsert FBA fee estimate rows.
+    Batch upsert FBA fee estimate rows (unchanged SKUs are skipped).
 
-    Uses (marketplace_id, sku) for dedup — always latest estimate.
+    Args:
+        rows: List of fee estimate dicts (one marketplace)
+        chunk_size: Number of rows per upsert batch
+
+    Returns:
+        Number of SKUs in the report (written or already up to date)
+    """
+    return upsert_fba_fee_estimate_changes(rows, chunk_size)["total"]
+
+
+@timed_stage("db_upsert")
+def upsert_fba_fee_estimate_changes(
+    rows: List[Dict],
+    chunk_size: int = 500,
+    skip_unchanged: bool = True
+) -> Dict[str, int]:
+    """
+    Upsert FBA fee estimates, writing only SKUs whose estimate changed.
+
+    Uses (marketplace_id, sku) for dedup — always latest estimate. Each row
+    gets a row_hash of its estimate fields; the stored hashes for the
+    marketplace are fetched in bulk first (change_detection.py) and matching
+    SKUs are not rewritten (they keep their old pull_date and import_id).
+    New and changed estimates are also appended to sp_fba_fee_history
+    (migrations/012_financial_watermarks.sql), keyed on their pull_date.
 
     Args:
-        rows: List of fee estimate dicts
+        rows: List of fee estimate dicts (one marketplace)
         chunk_size: Number of rows per upsert batch
+        skip_unchanged: False rewrites every row (history still gets only changes)
 
     Returns:
-        Total number of rows upserted
+        Dict with total, new, changed and unchanged SKU counts
     """
     if not rows:
-        return 0
+        return {"total": 0, "new": 0, "changed": 0, "unchanged": 0}
 
     client = get_supabase_client()
-    total = 0
-
-    for i in range(0, len(rows), chunk_size):
-        chunk = rows[i:i + chunk_size]
-        client.table("sp_fba_fee_estimates").upsert(
+    marketplace_id = rows[0]["marketplace_id"]
+
+    # Stored hashes are read either way: they decide what goes into the history
+    stored = fetch_stored_hashes(
+        "sp_fba_fee_estimates", "sku",
+        {"marketplace_id": marketplace_id},
+        client=client
+    )
+    changes = split_changes(rows, "sku", FEE_ESTIMATE_HASH_FIELDS, stored)
+    rows_to_write = changes.to_write if skip_unchanged else rows
+
+    for i in range(0, len(rows_to_write), chunk_size):
+        chunk = rows_to_write[i:i + chunk_size]
+        _execute_chunk(client.table("sp_fba_fee_estimates").upsert(
             chunk,
             on_conflict="marketplace_id,sku"
-        ).execute()
-        total += len(chunk)
+        ))
 
-    return total
+    history = [
+        dict({field: row.get(field) for field in FEE_HISTORY_FIELDS}, valid_from=row["pull_date"])
+        for row in changes.to_write
+    ]
+    for i in range(0, len(history), chunk_size):
+        _execute_chunk(client.table("sp_fba_fee_history").upsert(
+            history[i:i + chunk_size],
+            on_conflict="marketplace_id,sku,valid_from"
+        ))
+
+    return {"total": len(rows), **changes.counts()}
+
+
+def get_pull_watermark(region: str, report_type: str) -> Optional[date]:
+    """
+    Latest data date stored for a region and report type (sp_pull_watermarks).
+
+    Returns:
+        The watermark date, or None if the region has never been pulled
+    """
+    client = get_supabase_client()
+    result = client.table("sp_pull_watermarks") \
+        .select("watermark_date") \
+        .eq("region", region) \
+        .eq("report_type", report_type) \
+        .limit(1) \
+        .execute()
+    if not result.data:
+        return None
+    return date.fromisoformat(result.data[0]["watermark_date"])
+
+
+def set_pull_watermark(region: str, report_type: str, watermark_date: date) -> date:
+    """
+    Advance a region's watermark (never moves it backwards).
+
+    Returns:
+        The stored watermark date
+    """
+    current = get_pull_watermark(region, report_type)
+    if current and current >= watermark_date:
+        return current
+
+    client = get_supabase_client()
+    client.table("sp_pull_watermarks").upsert({
+        "region": region,
+        "report_type": report_type,
+        "watermark_date": watermark_date.isoformat(),
+        "updated_at": datetime.utcnow().isoformat()
+    }, on_conflict="region,report_type").execute()
+    return watermark_date
 
 
 # =============================================================================
@@ -1231,6 +1847,7 @@ def get_sqp_keywords_for_matching(
     return keywords
 
 
+@timed_stage("db_upsert")
 def upsert_search_terms_data(rows: List[Dict], chunk_size: int = 200) -> int:
     """
     Batch upsert Search Terms Report data rows into sp_search_terms_data.
@@ -1255,10 +1872,10 @@ def upsert_search_terms_data(rows: List[Dict], chunk_size: int = 200) -> int:
         chunk = rows[i:i + chunk_size]
         chunk_num = i // chunk_size + 1
         try:
-            client.table("sp_search_terms_data").upsert(
+            _execute_chunk(client.table("sp_search_terms_data").upsert(
                 chunk,
                 on_conflict="marketplace_id,search_term,period_start,period_type,clicked_asin"
-            ).execute()
+            ))
             total += len(chunk)
             if num_chunks > 1:
                 print(f"    [upsert chunk {chunk_num}/{num_chunks}: {len(chunk)} rows OK]", flush=True)
@@ -7,14 +7,20 @@ which has known issues with FATAL status errors.
 
 Updated to use SPAPIClient for automatic retry and rate limiting.
 
+Pages can be consumed as they arrive (iter_inventory_summary_pages /
+iter_fba_inventory_batches), so a caller can write one batch while the next
+page is fetched instead of holding the whole catalog in memory.
+
 API Reference: https://developer-docs.amazon.com/sp-api/docs/fba-inventory-api
 """
 
 import logging
 import requests
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime
 
+from .api_client import apply_endpoint_override
+
 # Import the new API client (optional import for backward compatibility)
 try:
     from utils.api_client import SPAPIClient
@@ -23,6 +29,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Transformed records per batch yielded by iter_fba_inventory_batches (one DB upsert chunk)
+INVENTORY_BATCH_ROWS = 500
+
 # Regional endpoints
 ENDPOINTS = {
     "NA": "sellingpartnerapi-na.amazon.com",
@@ -31,6 +40,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"   # UAE uses EU endpoint, different token
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # Amazon Marketplace IDs
 MARKETPLACE_IDS = {
     "USA": {"id": "ATVPDKIKX0DER", "region": "NA"},
@@ -113,14 +124,17 @@ def get_inventory_summaries(
     return response.json()
 
 
-def get_all_inventory_summaries(
+def iter_inventory_summary_pages(
     access_token: str = None,
     marketplace_code: str = None,
     region: str = "NA",
     client: "SPAPIClient" = None
-) -> List[Dict[str, Any]]:
+) -> Iterator[List[Dict[str, Any]]]:
     """
-    Get all inventory summaries for a marketplace, handling pagination.
+    Yield each page of inventory summaries for a marketplace as it arrives.
+
+    The next page is only requested when the caller asks for it, so a
+    consumer that writes each page bounds memory to about one page.
 
     Args:
         access_token: Valid SP-API access token (deprecated, use client instead)
@@ -128,16 +142,16 @@ def get_all_inventory_summaries(
         region: API region
         client: SPAPIClient instance (preferred - handles retry and rate limiting)
 
-    Returns:
-        List of inventory summary dictionaries
+    Yields:
+        Lists of inventory summary dictionaries, one per API page
     """
-    all_summaries = []
     next_token = None
     page = 1
+    total = 0
 
     while True:
         logger.debug(f"Fetching inventory page {page}")
-        print(f"  Fetching inventory page {page}...")
+        print(f"  Fetching {marketplace_code} inventory page {page}...")
 
         result = get_inventory_summaries(
             access_token=access_token,
@@ -150,7 +164,8 @@ def get_all_inventory_summaries(
 
         payload = result.get("payload", {})
         summaries = payload.get("inventorySummaries", [])
-        all_summaries.extend(summaries)
+        total += len(summaries)
+        yield summaries
 
         # Check for next page - nextToken is inside the top-level "pagination" object
         # Per Amazon docs: operation is done only when "pagination" is NOT in the response
@@ -163,8 +178,36 @@ def get_all_inventory_summaries(
 
         page += 1
 
-    logger.info(f"Retrieved {len(all_summaries)} inventory summaries")
-    print(f"✓ Retrieved {len(all_summaries)} inventory summaries")
+    logger.info(f"Retrieved {total} inventory summaries")
+    print(f"✓ Retrieved {total} {marketplace_code} inventory summaries ({page} pages)")
+
+
+def get_all_inventory_summaries(
+    access_token: str = None,
+    marketplace_code: str = None,
+    region: str = "NA",
+    client: "SPAPIClient" = None
+) -> List[Dict[str, Any]]:
+    """
+    Get all inventory summaries for a marketplace, handling pagination.
+
+    Args:
+        access_token: Valid SP-API access token (deprecated, use client instead)
+        marketplace_code: Marketplace code
+        region: API region
+        client: SPAPIClient instance (preferred - handles retry and rate limiting)
+
+    Returns:
+        List of inventory summary dictionaries
+    """
+    all_summaries = []
+    for summaries in iter_inventory_summary_pages(
+        access_token=access_token,
+        marketplace_code=marketplace_code,
+        region=region,
+        client=client
+    ):
+        all_summaries.extend(summaries)
     return all_summaries
 
 
@@ -247,6 +290,36 @@ def transform_inventory_summary(summary: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def iter_fba_inventory_batches(
+    access_token: str = None,
+    marketplace_code: str = None,
+    region: str = "NA",
+    client: "SPAPIClient" = None,
+    batch_rows: int = INVENTORY_BATCH_ROWS
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield transformed inventory records in batches of about batch_rows as
+    pages arrive (records without a SKU are skipped). Raw summaries are
+    dropped once their page is transformed.
+    """
+    batch = []
+    for summaries in iter_inventory_summary_pages(
+        access_token=access_token,
+        marketplace_code=marketplace_code,
+        region=region,
+        client=client
+    ):
+        for summary in summaries:
+            record = transform_inventory_summary(summary)
+            if record["sku"]:  # Skip records without SKU
+                batch.append(record)
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def pull_fba_inventory(
     access_token: str = None,
     marketplace_code: str = None,
@@ -265,19 +338,12 @@ def pull_fba_inventory(
     Returns:
         List of transformed inventory records ready for DB insertion
     """
-    # Get all summaries
-    summaries = get_all_inventory_summaries(
+    records = []
+    for batch in iter_fba_inventory_batches(
         access_token=access_token,
         marketplace_code=marketplace_code,
         region=region,
         client=client
-    )
-
-    # Transform to DB format
-    records = []
-    for summary in summaries:
-        record = transform_inventory_summary(summary)
-        if record["sku"]:  # Skip records without SKU
-            records.append(record)
-
+    ):
+        records.extend(batch)
     return records
@@ -6,22 +6,45 @@ Settlement reports are auto-generated by Amazon every ~2 weeks.
 We LIST existing reports and DOWNLOAD them (not create-poll-download).
 
 FBA fee estimates and reimbursements use the standard create-poll-download pattern.
+
+peek_settlement_id() reads a settlement report's ID from the first few KB of
+the document (HTTP Range request, gzip prefix decompressed), so reports that
+are already stored can be skipped without downloading them.
+
+fetch_settlement_report_body() streams a settlement document into a
+memory-budgeted buffer and iter_settlement_chunks() parses it a fixed
+number of rows at a time, so the settlement pipeline
+(pull_settlements.run_settlement_pipeline) can download several documents
+at once and upsert each one chunk by chunk.
+
+Settlement parsing is columnar (parse_settlement_columns): the TSV is read
+into columns, dates / amounts / marketplaces are converted once per
+distinct value and row hashes are computed in one pass.
+
+Environment:
+- SP_SETTLEMENT_CHUNK_ROWS: rows per parsed / upserted settlement chunk (default 500)
 """
 
 import os
 import gzip
 import csv
-import io
 import time
+import zlib
 import hashlib
+import contextlib
+import gc
+import operator
 import requests
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Tuple
 from datetime import date, datetime, timedelta
 
 from utils.inventory_reports import (
     ENDPOINTS, MARKETPLACE_IDS, get_endpoint,
-    poll_report_status, download_report
+    poll_report_status, download_report, get_report_document, iter_tsv_lines, _post,
+    DOWNLOAD_CHUNK_SIZE
 )
+from .memory import get_memory_budget
+from .metrics import get_metrics, timed_stage
 
 
 import re
@@ -35,6 +58,10 @@ def _safe_get(row: dict, key: str, default: str = "") -> str:
     return str(val).strip()
 
 
+_EU_DATETIME = re.compile(r'^(\d{2})\.(\d{2})\.(\d{4})\s+(\d{2}:\d{2}:\d{2})')
+_EU_DATE = re.compile(r'^(\d{2})\.(\d{2})\.(\d{4})$')
+
+
 def _normalize_date(val: str) -> Optional[str]:
     """
     Normalize date strings from settlement reports to ISO format.
@@ -49,23 +76,60 @@ def _normalize_date(val: str) -> Optional[str]:
     if not val:
         return None
 
-    # Match DD.MM.YYYY HH:MM:SS (with optional timezone)
-    match = re.match(r'^(\d{2})\.(\d{2})\.(\d{4})\s+(\d{2}:\d{2}:\d{2})', val)
-    if match:
-        day, month, year, time_part = match.groups()
-        return f"{year}-{month}-{day} {time_part}"
+    # Only DD.MM.YYYY values have a "." third
+    if val[2:3] == ".":
+        # Match DD.MM.YYYY HH:MM:SS (with optional timezone)
+        match = _EU_DATETIME.match(val)
+        if match:
+            day, month, year, time_part = match.groups()
+            return f"{year}-{month}-{day} {time_part}"
 
-    # Match DD.MM.YYYY (date only)
-    match = re.match(r'^(\d{2})\.(\d{2})\.(\d{4})$', val)
-    if match:
-        day, month, year = match.groups()
-        return f"{year}-{month}-{day}"
+        # Match DD.MM.YYYY (date only)
+        match = _EU_DATE.match(val)
+        if match:
+            day, month, year = match.groups()
+            return f"{year}-{month}-{day}"
 
     # Already ISO-compatible — strip timezone suffix if present
     val = val.replace(" UTC", "").replace(" PST", "").replace(" PDT", "")
     return val
 
 
+# Bytes of a settlement document read by peek_settlement_id() (header + first row
+# are well under 1 KB); doubled up to the max if a row doesn't fit
+SETTLEMENT_PEEK_BYTES = 8 * 1024
+SETTLEMENT_PEEK_MAX_BYTES = 256 * 1024
+
+# Fields hashed into row_hash, in order (changing them changes every hash)
+SETTLEMENT_HASH_FIELDS = (
+    "settlement-id", "transaction-type", "order-id", "sku", "amount-type",
+    "amount-description", "amount", "posted-date-time", "order-item-code",
+    "adjustment-id", "promotion-id",
+)
+
+# Settlement report columns read by parse_settlement_rows()
+SETTLEMENT_COLUMNS = (
+    "settlement-id", "settlement-start-date", "settlement-end-date", "deposit-date",
+    "total-amount", "currency", "transaction-type", "order-id", "merchant-order-id",
+    "adjustment-id", "shipment-id", "marketplace-name", "amount-type",
+    "amount-description", "amount", "fulfillment-id", "posted-date",
+    "posted-date-time", "order-item-code", "merchant-order-item-id",
+    "merchant-adjustment-item-id", "sku", "quantity-purchased", "promotion-id",
+)
+
+# sp_settlement_transactions row keys, in the order _parse_settlement_columns() builds them
+SETTLEMENT_TRANSACTION_KEYS = (
+    "marketplace_id", "settlement_id", "settlement_start_date", "settlement_end_date",
+    "deposit_date", "transaction_type", "order_id", "merchant_order_id", "adjustment_id",
+    "shipment_id", "marketplace_name", "sku", "quantity_purchased", "amount_type",
+    "amount_description", "amount", "currency_code", "fulfillment_id", "posted_date",
+    "posted_date_time", "order_item_code", "merchant_order_item_id",
+    "merchant_adjustment_item_id", "promotion_id", "row_hash", "import_id",
+)
+
+# Settlement rows parsed and upserted at a time by the settlement pipeline
+SETTLEMENT_CHUNK_ROWS = int(os.environ.get("SP_SETTLEMENT_CHUNK_ROWS", "500"))
+
 # Financial report types
 FINANCIAL_REPORT_TYPES = {
     "SETTLEMENT": "GET_V2_SETTLEMENT_REPORT_DATA_FLAT_FILE_V2",
@@ -112,7 +176,8 @@ def list_settlement_reports(
     marketplace_code: str,
     region: str = "NA",
     created_since: str = None,
-    max_results: int = 100
+    max_results: int = 100,
+    client=None
 ) -> List[Dict]:
     """
     List available settlement reports for a marketplace.
@@ -126,6 +191,8 @@ def list_settlement_reports(
         region: API region
         created_since: ISO date string to filter (e.g., '2024-01-01T00:00:00Z')
         max_results: Maximum reports to return (max 100)
+        client: Shared SPAPIClient (refreshing token, rate limits);
+            access_token may then be None
 
     Returns:
         List of report metadata dicts with reportId, reportDocumentId, etc.
@@ -156,12 +223,15 @@ def list_settlement_reports(
         if next_token:
             params["nextToken"] = next_token
 
-        response = requests.get(
-            url,
-            params=params,
-            headers={"x-amz-access-token": access_token}
-        )
-        response.raise_for_status()
+        if client is not None:
+            response = client.get(url, params=params, api_type="reports_get")
+        else:
+            response = requests.get(
+                url,
+                params=params,
+                headers={"x-amz-access-token": access_token}
+            )
+            response.raise_for_status()
         data = response.json()
 
         reports = data.get("reports", [])
@@ -171,8 +241,9 @@ def list_settlement_reports(
         if not next_token or len(all_reports) >= max_results:
             break
 
-        # Rate limit for getReports
-        time.sleep(1)
+        # Rate limit for getReports (the client spaces its own requests)
+        if client is None:
+            time.sleep(1)
 
     # Filter to only DONE reports
     done_reports = [r for r in all_reports if r.get("processingStatus") == "DONE"]
@@ -185,7 +256,8 @@ def list_settlement_reports(
 def download_settlement_report(
     access_token: str,
     report_document_id: str,
-    region: str = "NA"
+    region: str = "NA",
+    document: Dict[str, Any] = None
 ) -> List[Dict[str, Any]]:
     """
     Download and parse a settlement report (TSV format).
@@ -194,11 +266,168 @@ def download_settlement_report(
     - First row(s) may contain settlement-level header info
     - Subsequent rows are individual transactions
 
+    Args:
+        document: getReportDocument response already fetched (e.g. for
+            peek_settlement_id), so the document URL isn't requested twice
+
     Returns:
         List of dictionaries, one per row
     """
     # Reuse the generic download_report function from inventory_reports
-    return download_report(access_token, report_document_id, region)
+    return download_report(access_token, report_document_id, region, document=document)
+
+
+def fetch_settlement_report_body(
+    report_document_id: str,
+    region: str = "NA",
+    client=None,
+    access_token: str = None,
+    document: Dict[str, Any] = None
+) -> Tuple[Any, Optional[str]]:
+    """
+    Download a settlement report document as delivered (still compressed).
+
+    The document is streamed into a memory-budgeted buffer
+    (get_memory_budget().spool_file()), which moves to a temp file once it
+    outgrows its share of SP_MEMORY_BUDGET_MB.
+
+    Args:
+        document: getReportDocument response already fetched (e.g. for
+            peek_settlement_id) - its URL is valid for ~5 minutes
+
+    Returns:
+        (body file, compressionAlgorithm or None) for iter_settlement_chunks();
+        the caller closes the file
+    """
+    document = document or get_report_document(access_token, report_document_id, region, client)
+    download_url = document["url"]
+    budget = get_memory_budget()
+    body = budget.spool_file("settlement report download")
+    try:
+        with budget.track("download"):
+            if client is not None:
+                client.download_to(download_url, body, chunk_size=DOWNLOAD_CHUNK_SIZE)
+            else:
+                started = time.perf_counter()
+                nbytes = 0
+                with requests.get(download_url, stream=True) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        body.write(chunk)
+                        nbytes += len(chunk)
+                get_metrics().record_download(download_url, nbytes, time.perf_counter() - started)
+    except Exception:
+        body.close()
+        raise
+    return body, document.get("compressionAlgorithm")
+
+
+def iter_settlement_chunks(
+    body,
+    compression: Optional[str],
+    marketplace_id: str,
+    marketplace_uuids: Dict[str, str] = None,
+    chunk_rows: int = None
+) -> Iterator[tuple]:
+    """
+    Parse a downloaded settlement report chunk_rows rows at a time.
+
+    Only one chunk of columns and transactions is held at once, so a large
+    report is stored in fixed-size upserts instead of one list of every
+    row. import_id is left unset (the tracking record is created after the
+    first chunk is parsed).
+
+    Args:
+        body: File from fetch_settlement_report_body()
+        chunk_rows: Rows per chunk (default SETTLEMENT_CHUNK_ROWS)
+
+    Yields:
+        (transactions_list, summary_dict) per chunk with transactions, as
+        from parse_settlement_columns(); summary describes the chunk's first
+        row and counts only its transactions
+    """
+    for columns in iter_settlement_columns(body, compression, chunk_rows or SETTLEMENT_CHUNK_ROWS):
+        transactions, summary = parse_settlement_columns(
+            columns, marketplace_id, marketplace_uuids=marketplace_uuids
+        )
+        if transactions:
+            yield transactions, summary
+
+
+def _peek_document(url: str, compression: Optional[str], nbytes: int) -> Tuple[bytes, bool]:
+    """
+    First nbytes of a report document, decompressed as far as they go.
+
+    Returns:
+        (data, whole document was read)
+    """
+    started = time.perf_counter()
+    data = b""
+    # S3 answers 206 with just the range; if a server ignores Range, stop reading after nbytes
+    with requests.get(url, headers={"Range": f"bytes=0-{nbytes - 1}"}, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(nbytes):
+            data += chunk
+            if len(data) >= nbytes:
+                break
+    get_metrics().record_download(url, len(data), time.perf_counter() - started)
+
+    complete = len(data) < nbytes
+    if compression == "GZIP":
+        # A gzip prefix decompresses up to where it was cut off
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data[:nbytes])
+    return data, complete
+
+
+def peek_settlement_id(
+    access_token: str,
+    report_document_id: str,
+    region: str = "NA",
+    document: Dict[str, Any] = None,
+    peek_bytes: int = SETTLEMENT_PEEK_BYTES,
+    client=None
+) -> Optional[str]:
+    """
+    Read a settlement report's settlement-id without downloading the report.
+
+    Fetches the first peek_bytes of the document with an HTTP Range request
+    (doubling up to SETTLEMENT_PEEK_MAX_BYTES if the header and first row
+    don't fit) and parses the header + first row. Every row of a settlement
+    report carries the settlement-id; the first one is the summary row.
+
+    Args:
+        document: getReportDocument response, if already fetched
+        client: SPAPIClient for the getReportDocument request (rate limited)
+
+    Returns:
+        The settlement ID, or None if it couldn't be read (empty report,
+        unexpected layout) - download the report in full then
+    """
+    document = document or get_report_document(access_token, report_document_id, region, client)
+    compression = document.get("compressionAlgorithm")
+
+    while True:
+        data, complete = _peek_document(document["url"], compression, peek_bytes)
+        # Only complete lines: the header and at least one data row
+        lines = data.split(b"\n")
+        if not complete:
+            lines = lines[:-1]
+        if len([line for line in lines if line.strip()]) >= 2:
+            break
+        if complete or peek_bytes >= SETTLEMENT_PEEK_MAX_BYTES:
+            return None
+        peek_bytes *= 2
+
+    def decode(line: bytes) -> str:
+        try:
+            return line.decode("utf-8")
+        except UnicodeDecodeError:
+            return line.decode("cp1252")
+
+    lines = [line for line in lines if line.strip()][:2]
+    rows = csv.DictReader((decode(line).rstrip("\r") for line in lines), delimiter="\t")
+    first = next(rows, None) or {}
+    return _safe_get(first, "settlement-id") or None
 
 
 def compute_settlement_row_hash(row: Dict[str, str]) -> str:
@@ -206,23 +435,123 @@ def compute_settlement_row_hash(row: Dict[str, str]) -> str:
     Compute an MD5 hash for a settlement transaction row for dedup.
 
     Since Amazon doesn't provide a row-level unique ID, we hash
-    key fields to create one.
-    """
-    hash_fields = [
-        row.get("settlement-id", "") or "",
-        row.get("transaction-type", "") or "",
-        row.get("order-id", "") or "",
-        row.get("sku", "") or "",
-        row.get("amount-type", "") or "",
-        row.get("amount-description", "") or "",
-        row.get("amount", "") or "",
-        row.get("posted-date-time", "") or "",
-        row.get("order-item-code", "") or "",
-        row.get("adjustment-id", "") or "",
-        row.get("promotion-id", "") or "",
-    ]
-    hash_string = "|".join(hash_fields)
-    return hashlib.md5(hash_string.encode()).hexdigest()
+    key fields (SETTLEMENT_HASH_FIELDS) to create one.
+    """
+    return settlement_row_hashes({field: [row.get(field, "") or ""] for field in SETTLEMENT_HASH_FIELDS})[0]
+
+
+def settlement_row_hashes(columns: Dict[str, List[str]]) -> List[str]:
+    """
+    row_hash for every row of a columnar settlement report at once.
+
+    MD5 of the raw (unstripped) SETTLEMENT_HASH_FIELDS joined with "|".
+    row_hash is part of sp_settlement_transactions' conflict key, so the
+    digest can't change without rehashing the stored rows.
+
+    Args:
+        columns: Column name -> raw values (read_settlement_columns())
+    """
+    n_rows = _column_length(columns)
+    blank = [""] * n_rows
+    fields = [columns.get(field) or blank for field in SETTLEMENT_HASH_FIELDS]
+    md5 = hashlib.md5
+    return [md5(key.encode()).hexdigest() for key in map("|".join, zip(*fields))]
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector while a report is parsed.
+
+    Parsing allocates hundreds of thousands of acyclic lists / tuples / dicts;
+    each allocation burst would otherwise trigger collections that rescan
+    the whole growing heap.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _column_length(columns: Dict[str, List[str]]) -> int:
+    return max((len(values) for values in columns.values()), default=0)
+
+
+def _settlement_reader(body, compression: Optional[str]):
+    reader = csv.reader(iter_tsv_lines(body, compression), delimiter="\t")
+    return reader, next(reader, None)
+
+
+def _records_to_columns(header: List[str], records: List[List[str]]) -> Dict[str, List[str]]:
+    if not records:
+        return {name: [] for name in header}
+    return {name: list(values) for name, values in zip(header, zip(*records))}
+
+
+def read_settlement_columns(body, compression: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Read a downloaded settlement TSV into columns of raw strings.
+
+    Short rows are padded with "" (as csv.DictReader leaves them missing);
+    blank lines are dropped.
+
+    Returns:
+        Column name -> one value per row
+    """
+    reader, header = _settlement_reader(body, compression)
+    if not header:
+        return {}
+    width = len(header)
+    padding = [""] * width
+    with _gc_paused():
+        records = [row if len(row) == width else (row + padding)[:width] for row in reader if row]
+        return _records_to_columns(header, records)
+
+
+def iter_settlement_columns(
+    body,
+    compression: Optional[str] = None,
+    chunk_rows: int = None
+) -> Iterator[Dict[str, List[str]]]:
+    """read_settlement_columns() for chunk_rows rows at a time (default SETTLEMENT_CHUNK_ROWS)."""
+    chunk_rows = chunk_rows or SETTLEMENT_CHUNK_ROWS
+    reader, header = _settlement_reader(body, compression)
+    if not header:
+        return
+    width = len(header)
+    padding = [""] * width
+    records = []
+    for row in reader:
+        if not row:
+            continue
+        records.append(row if len(row) == width else (row + padding)[:width])
+        if len(records) >= chunk_rows:
+            yield _records_to_columns(header, records)
+            records = []
+    if records:
+        yield _records_to_columns(header, records)
+
+
+def settlement_columns_from_rows(rows: Iterable[Dict[str, str]]) -> Dict[str, List[str]]:
+    """Columns (as read_settlement_columns()) from rows already parsed into dicts."""
+    pick = operator.itemgetter(*SETTLEMENT_COLUMNS)
+    records = []
+    for row in rows:
+        try:
+            records.append(pick(row))
+        except KeyError:
+            records.append(tuple(row.get(name) for name in SETTLEMENT_COLUMNS))
+    if not records:
+        return {name: [] for name in SETTLEMENT_COLUMNS}
+    columns = {}
+    for name, values in zip(SETTLEMENT_COLUMNS, zip(*records)):
+        values = list(values)
+        # Missing / None values read as "" (as _safe_get and the row hash treat them)
+        columns[name] = [value or "" for value in values] if None in values else values
+    return columns
 
 
 def _resolve_marketplace_id(
@@ -255,6 +584,163 @@ def _resolve_marketplace_id(
     return fallback_marketplace_id
 
 
+def _to_float(val: str) -> Optional[float]:
+    val = val.strip()
+    if not val:
+        return None
+    try:
+        return float(val)
+    except ValueError:
+        return None
+
+
+def _to_int(val: str) -> Optional[int]:
+    val = val.strip()
+    if not val:
+        return None
+    try:
+        return int(val)
+    except ValueError:
+        return None
+
+
+def _map_distinct(values: List[str], func: Callable[[str], Any]) -> List[Any]:
+    """func over a column, called once per distinct value (dates, amounts repeat heavily)."""
+    memo = {value: func(value) for value in set(values)}
+    return [memo[value] for value in values]
+
+
+def _parse_settlement_columns(
+    columns: Dict[str, List[str]],
+    marketplace_id: str,
+    import_id: str = None,
+    marketplace_uuids: Dict[str, str] = None,
+    filter_marketplace_code: str = None
+) -> tuple:
+    n_rows = _column_length(columns)
+    blank = [""] * n_rows
+
+    def raw(name: str) -> List[str]:
+        return columns.get(name) or blank
+
+    # Rows kept: a settlement-id, and the requested marketplace if filtering
+    keep = [i for i, value in enumerate(raw("settlement-id")) if value.strip()]
+
+    if marketplace_uuids:
+        pairs = list(zip(raw("marketplace-name"), raw("currency")))
+        marketplace_ids = _map_distinct(pairs, lambda pair: _resolve_marketplace_id(
+            {"marketplace-name": pair[0], "currency": pair[1]}, marketplace_uuids, marketplace_id
+        ))
+    else:
+        marketplace_ids = [marketplace_id] * n_rows
+
+    if filter_marketplace_code and marketplace_uuids:
+        target_mp_id = marketplace_uuids.get(filter_marketplace_code)
+        if target_mp_id:
+            matching = [i for i in keep if marketplace_ids[i] == target_mp_id]
+            skipped_other_marketplace = len(keep) - len(matching)
+            keep = matching
+            if skipped_other_marketplace > 0:
+                print(f"    Skipped {skipped_other_marketplace} rows belonging to other marketplaces")
+
+    if len(keep) < n_rows:
+        columns = {name: [values[i] for i in keep] for name, values in columns.items() if values}
+        marketplace_ids = [marketplace_ids[i] for i in keep]
+        n_rows = len(keep)
+        blank = [""] * n_rows
+    if not n_rows:
+        return [], None
+
+    def text(name: str) -> List[Optional[str]]:
+        return [value.strip() or None for value in raw(name)]
+
+    def dates(name: str) -> List[Optional[str]]:
+        return _map_distinct(raw(name), lambda value: _normalize_date(value.strip()))
+
+    settlement_ids = [value.strip() for value in raw("settlement-id")]
+    settlement_start_dates = dates("settlement-start-date")
+    settlement_end_dates = dates("settlement-end-date")
+    deposit_dates = dates("deposit-date")
+    currency_codes = text("currency")
+
+    transactions = [
+        dict(zip(SETTLEMENT_TRANSACTION_KEYS, values))
+        for values in zip(
+            marketplace_ids,
+            settlement_ids,
+            settlement_start_dates,
+            settlement_end_dates,
+            deposit_dates,
+            text("transaction-type"),
+            text("order-id"),
+            text("merchant-order-id"),
+            text("adjustment-id"),
+            text("shipment-id"),
+            text("marketplace-name"),
+            text("sku"),
+            _map_distinct(raw("quantity-purchased"), _to_int),
+            text("amount-type"),
+            text("amount-description"),
+            _map_distinct(raw("amount"), _to_float),
+            currency_codes,
+            text("fulfillment-id"),
+            dates("posted-date"),
+            dates("posted-date-time"),
+            text("order-item-code"),
+            text("merchant-order-item-id"),
+            text("merchant-adjustment-item-id"),
+            text("promotion-id"),
+            settlement_row_hashes(columns),
+            [import_id] * n_rows,
+        )
+    ]
+
+    # Summary from the first row (the settlement summary row)
+    summary = {
+        "marketplace_id": marketplace_ids[0],
+        "settlement_id": settlement_ids[0],
+        "settlement_start_date": settlement_start_dates[0],
+        "settlement_end_date": settlement_end_dates[0],
+        "deposit_date": deposit_dates[0],
+        "total_amount": _to_float(raw("total-amount")[0]),
+        "currency_code": currency_codes[0],
+        "transaction_count": len(transactions),
+        "import_id": import_id,
+    }
+
+    return transactions, summary
+
+
+@timed_stage("parse")
+def parse_settlement_columns(
+    columns: Dict[str, List[str]],
+    marketplace_id: str,
+    import_id: str = None,
+    marketplace_uuids: Dict[str, str] = None,
+    filter_marketplace_code: str = None
+) -> tuple:
+    """
+    Parse a columnar settlement report (read_settlement_columns()) into
+    transactions and summary.
+
+    Same output as parse_settlement_rows(), computed a column at a time:
+    dates, amounts and marketplaces are converted once per distinct value
+    and row hashes in one pass (settlement_row_hashes()).
+
+    Args:
+        columns: Column name -> raw values
+        (others as parse_settlement_rows())
+
+    Returns:
+        (transactions_list, summary_dict)
+    """
+    with _gc_paused():
+        return _parse_settlement_columns(
+            columns, marketplace_id, import_id, marketplace_uuids, filter_marketplace_code
+        )
+
+
+@timed_stage("parse")
 def parse_settlement_rows(
     rows: List[Dict[str, str]],
     marketplace_id: str,
@@ -272,6 +758,8 @@ def parse_settlement_rows(
     marketplace filter, so a single report may contain transactions for
     USA, CA, and MX.
 
+    Rows are turned into columns and parsed by parse_settlement_columns().
+
     Args:
         rows: Raw TSV rows from download_report()
         marketplace_id: Fallback Supabase marketplace UUID
@@ -285,115 +773,11 @@ def parse_settlement_rows(
     Returns:
         (transactions_list, summary_dict)
     """
-    transactions = []
-    summary = None
-    skipped_other_marketplace = 0
-
-    for row in rows:
-        settlement_id = _safe_get(row, "settlement-id")
-        if not settlement_id:
-            continue
-
-        # Determine marketplace_id per-row
-        if marketplace_uuids:
-            row_marketplace_id = _resolve_marketplace_id(
-                row, marketplace_uuids, marketplace_id
-            )
-        else:
-            row_marketplace_id = marketplace_id
-
-        # Filter by marketplace if requested
-        if filter_marketplace_code and marketplace_uuids:
-            target_mp_id = marketplace_uuids.get(filter_marketplace_code)
-            if target_mp_id and row_marketplace_id != target_mp_id:
-                skipped_other_marketplace += 1
-                continue
-
-        # Parse amount
-        amount_str = _safe_get(row, "amount")
-        amount = None
-        if amount_str:
-            try:
-                amount = float(amount_str)
-            except (ValueError, TypeError):
-                pass
-
-        # Parse quantity
-        qty_str = _safe_get(row, "quantity-purchased")
-        quantity = None
-        if qty_str:
-            try:
-                quantity = int(qty_str)
-            except (ValueError, TypeError):
-                pass
-
-        # Parse posted-date-time (normalize European date format)
-        posted_dt = _normalize_date(_safe_get(row, "posted-date-time"))
-
-        # Compute row hash for dedup
-        row_hash = compute_settlement_row_hash(row)
-
-        transaction = {
-            "marketplace_id": row_marketplace_id,
-            "settlement_id": settlement_id,
-            "settlement_start_date": _normalize_date(_safe_get(row, "settlement-start-date")),
-            "settlement_end_date": _normalize_date(_safe_get(row, "settlement-end-date")),
-            "deposit_date": _normalize_date(_safe_get(row, "deposit-date")),
-            "transaction_type": _safe_get(row, "transaction-type") or None,
-            "order_id": _safe_get(row, "order-id") or None,
-            "merchant_order_id": _safe_get(row, "merchant-order-id") or None,
-            "adjustment_id": _safe_get(row, "adjustment-id") or None,
-            "shipment_id": _safe_get(row, "shipment-id") or None,
-            "marketplace_name": _safe_get(row, "marketplace-name") or None,
-            "sku": _safe_get(row, "sku") or None,
-            "quantity_purchased": quantity,
-            "amount_type": _safe_get(row, "amount-type") or None,
-            "amount_description": _safe_get(row, "amount-description") or None,
-            "amount": amount,
-            "currency_code": _safe_get(row, "currency") or None,
-            "fulfillment_id": _safe_get(row, "fulfillment-id") or None,
-            "posted_date": _normalize_date(_safe_get(row, "posted-date")),
-            "posted_date_time": posted_dt,
-            "order_item_code": _safe_get(row, "order-item-code") or None,
-            "merchant_order_item_id": _safe_get(row, "merchant-order-item-id") or None,
-            "merchant_adjustment_item_id": _safe_get(row, "merchant-adjustment-item-id") or None,
-            "promotion_id": _safe_get(row, "promotion-id") or None,
-            "row_hash": row_hash,
-            "import_id": import_id,
-        }
-
-        transactions.append(transaction)
-
-        # Build summary from first row of this settlement
-        if summary is None and settlement_id:
-            total_amount_str = _safe_get(row, "total-amount")
-            total_amount = None
-            if total_amount_str:
-                try:
-                    total_amount = float(total_amount_str)
-                except (ValueError, TypeError):
-                    pass
-
-            summary = {
-                "marketplace_id": row_marketplace_id,
-                "settlement_id": settlement_id,
-                "settlement_start_date": _normalize_date(_safe_get(row, "settlement-start-date")),
-                "settlement_end_date": _normalize_date(_safe_get(row, "settlement-end-date")),
-                "deposit_date": _normalize_date(_safe_get(row, "deposit-date")),
-                "total_amount": total_amount,
-                "currency_code": _safe_get(row, "currency") or None,
-                "transaction_count": 0,  # Will be updated
-                "import_id": import_id,
-            }
-
-    if skipped_other_marketplace > 0:
-        print(f"    Skipped {skipped_other_marketplace} rows belonging to other marketplaces")
-
-    # Update transaction count in summary
-    if summary:
-        summary["transaction_count"] = len(transactions)
-
-    return transactions, summary
+    with _gc_paused():
+        return _parse_settlement_columns(
+            settlement_columns_from_rows(rows), marketplace_id, import_id,
+            marketplace_uuids, filter_marketplace_code
+        )
 
 
 # =============================================================================
@@ -405,7 +789,8 @@ def create_reimbursement_report(
     marketplace_code: str,
     region: str = "NA",
     start_date: date = None,
-    end_date: date = None
+    end_date: date = None,
+    client=None
 ) -> str:
     """
     Create a reimbursement report request.
@@ -416,6 +801,7 @@ def create_reimbursement_report(
         region: API region
         start_date: Start of date range (default: 60 days ago)
         end_date: End of date range (default: today)
+        client: Shared SPAPIClient; access_token may then be None
 
     Returns:
         Report ID string
@@ -441,17 +827,7 @@ def create_reimbursement_report(
         "dataEndTime": end_date.strftime("%Y-%m-%dT23:59:59Z")
     }
 
-    response = requests.post(
-        url,
-        json=payload,
-        headers={
-            "x-amz-access-token": access_token,
-            "Content-Type": "application/json"
-        }
-    )
-
-    response.raise_for_status()
-    data = response.json()
+    data = _post(url, payload, access_token, client).json()
     report_id = data["reportId"]
 
     print(f"✓ Created reimbursement report {report_id} for {marketplace_code} ({start_date} to {end_date})")
@@ -464,18 +840,19 @@ def pull_reimbursement_report(
     marketplace_code: str,
     region: str = "NA",
     start_date: date = None,
-    end_date: date = None
+    end_date: date = None,
+    client=None
 ) -> List[Dict[str, Any]]:
     """
     High-level: create, poll, and download a reimbursement report.
     """
     report_id = create_reimbursement_report(
-        access_token, marketplace_code, region, start_date, end_date
+        access_token, marketplace_code, region, start_date, end_date, client=client
     )
 
-    result = poll_report_status(access_token, report_id, region)
+    result = poll_report_status(access_token, report_id, region, client=client)
 
-    rows = download_report(access_token, result["reportDocumentId"], region)
+    rows = download_report(access_token, result["reportDocumentId"], region, client=client)
 
     return rows
 
@@ -487,7 +864,8 @@ def pull_reimbursement_report(
 def create_fba_fee_report(
     access_token: str,
     marketplace_code: str,
-    region: str = "NA"
+    region: str = "NA",
+    client=None
 ) -> str:
     """
     Create an FBA fee estimates report.
@@ -521,17 +899,7 @@ def create_fba_fee_report(
         "dataEndTime": end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
     }
 
-    response = requests.post(
-        url,
-        json=payload,
-        headers={
-            "x-amz-access-token": access_token,
-            "Content-Type": "application/json"
-        }
-    )
-
-    response.raise_for_status()
-    data = response.json()
+    data = _post(url, payload, access_token, client).json()
     report_id = data["reportId"]
 
     print(f"✓ Created FBA fee estimates report {report_id} for {marketplace_code}")
@@ -542,15 +910,16 @@ def create_fba_fee_report(
 def pull_fba_fee_report(
     access_token: str,
     marketplace_code: str,
-    region: str = "NA"
+    region: str = "NA",
+    client=None
 ) -> List[Dict[str, Any]]:
     """
     High-level: create, poll, and download FBA fee estimates report.
     """
-    report_id = create_fba_fee_report(access_token, marketplace_code, region)
+    report_id = create_fba_fee_report(access_token, marketplace_code, region, client=client)
 
-    result = poll_report_status(access_token, report_id, region)
+    result = poll_report_status(access_token, report_id, region, client=client)
 
-    rows = download_report(access_token, result["reportDocumentId"], region)
+    rows = download_report(access_token, result["reportDocumentId"], region, client=client)
 
     return rows
@@ -1,17 +1,24 @@
 """
 SP-API Inventory Reports Module
 Handles FBA inventory, inventory age, and storage fee reports
+
+Every request function takes an optional SPAPIClient: with one, requests go
+through its retry, rate limiting and pooled session (shared by the
+concurrent tasks in pull_inventory_all.py); without one, plain requests with
+the access token are used as before.
 """
 
-import os
 import gzip
 import csv
-import io
 import time
 import requests
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from datetime import date, datetime
 
+from .api_client import SPAPIClient, apply_endpoint_override
+from .metrics import get_metrics, timed_stage
+from .memory import RowSpool, get_memory_budget
+
 # Regional endpoints
 ENDPOINTS = {
     "NA": "sellingpartnerapi-na.amazon.com",
@@ -20,6 +27,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"   # UAE uses EU endpoint, different token
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # Amazon Marketplace IDs
 MARKETPLACE_IDS = {
     "USA": {"id": "ATVPDKIKX0DER", "region": "NA"},
@@ -44,18 +53,51 @@ REPORT_TYPES = {
     "STORAGE_FEES": "GET_FBA_STORAGE_FEE_CHARGES_DATA"
 }
 
+# Report documents are streamed in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def get_endpoint(region: str) -> str:
     """Get the API endpoint for a region."""
     return ENDPOINTS.get(region.upper(), ENDPOINTS["NA"])
 
 
+def _post(url: str, payload: Dict[str, Any], access_token: str, client: "SPAPIClient" = None):
+    """createReport through the shared client if given, else a plain request."""
+    if client is not None:
+        return client.post(url, json=payload, headers={"Content-Type": "application/json"},
+                           api_type="reports_create")
+    response = requests.post(
+        url,
+        json=payload,
+        headers={
+            "x-amz-access-token": access_token,
+            "Content-Type": "application/json"
+        }
+    )
+    response.raise_for_status()
+    return response
+
+
+def _get(url: str, access_token: str, client: "SPAPIClient" = None, api_type: str = "reports_get"):
+    """getReport / getReportDocument through the shared client if given."""
+    if client is not None:
+        return client.get(url, api_type=api_type)
+    response = requests.get(
+        url,
+        headers={"x-amz-access-token": access_token}
+    )
+    response.raise_for_status()
+    return response
+
+
 def create_inventory_report(
     access_token: str,
     marketplace_code: str,
     report_type: str,
     region: str = "NA",
-    report_options: Dict[str, str] = None
+    report_options: Dict[str, str] = None,
+    client: "SPAPIClient" = None
 ) -> str:
     """
     Create an inventory report request.
@@ -69,6 +111,8 @@ def create_inventory_report(
         report_type: One of REPORT_TYPES keys
         region: API region ('NA', 'EU', 'FE')
         report_options: Optional report options dictionary
+        client: Shared SPAPIClient (retry, rate limiting, pooled connections);
+            access_token may then be None
 
     Returns:
         Report ID string
@@ -93,16 +137,7 @@ def create_inventory_report(
     if report_options:
         payload["reportOptions"] = report_options
 
-    response = requests.post(
-        url,
-        json=payload,
-        headers={
-            "x-amz-access-token": access_token,
-            "Content-Type": "application/json"
-        }
-    )
-
-    response.raise_for_status()
+    response = _post(url, payload, access_token, client)
     data = response.json()
     report_id = data["reportId"]
 
@@ -115,7 +150,8 @@ def create_storage_fee_report(
     access_token: str,
     marketplace_code: str,
     month: date,
-    region: str = "NA"
+    region: str = "NA",
+    client: "SPAPIClient" = None
 ) -> str:
     """
     Create a storage fee report for a specific month.
@@ -125,6 +161,7 @@ def create_storage_fee_report(
         marketplace_code: Marketplace code
         month: First day of the month to get fees for
         region: API region
+        client: Shared SPAPIClient; access_token may then be None
 
     Returns:
         Report ID string
@@ -153,16 +190,7 @@ def create_storage_fee_report(
         "dataEndTime": end_date.strftime("%Y-%m-%dT00:00:00Z")
     }
 
-    response = requests.post(
-        url,
-        json=payload,
-        headers={
-            "x-amz-access-token": access_token,
-            "Content-Type": "application/json"
-        }
-    )
-
-    response.raise_for_status()
+    response = _post(url, payload, access_token, client)
     data = response.json()
     report_id = data["reportId"]
 
@@ -171,12 +199,14 @@ def create_storage_fee_report(
     return report_id
 
 
+@timed_stage("queue_wait")
 def poll_report_status(
     access_token: str,
     report_id: str,
     region: str = "NA",
     max_wait_seconds: int = 300,
-    poll_interval: int = 10
+    poll_interval: int = 10,
+    client: "SPAPIClient" = None
 ) -> Dict[str, Any]:
     """
     Poll for report completion and return the report document ID.
@@ -187,11 +217,7 @@ def poll_report_status(
     start_time = time.time()
 
     while True:
-        response = requests.get(
-            url,
-            headers={"x-amz-access-token": access_token}
-        )
-        response.raise_for_status()
+        response = _get(url, access_token, client)
         data = response.json()
 
         status = data.get("processingStatus")
@@ -217,51 +243,92 @@ def poll_report_status(
         time.sleep(poll_interval)
 
 
+def iter_tsv_lines(body, compression: Optional[str] = None) -> Iterator[str]:
+    """
+    Decoded lines of a downloaded report file (gzip decompressed as a stream).
+
+    Amazon reports may use different encodings - each line is decoded as
+    UTF-8 first, then CP1252 (Windows-1252).
+    """
+    body.seek(0)
+    raw = gzip.GzipFile(fileobj=body, mode="rb") if compression == "GZIP" else body
+    for line in raw:
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            # CP1252 is commonly used by Amazon for reports with special characters
+            yield line.decode("cp1252")
+
+
+def iter_tsv_rows(body, compression: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Stream rows out of a downloaded TSV report file without loading it whole."""
+    yield from csv.DictReader(iter_tsv_lines(body, compression), delimiter='\t')
+
+
+def get_report_document(
+    access_token: str,
+    report_document_id: str,
+    region: str = "NA",
+    client: "SPAPIClient" = None
+) -> Dict[str, Any]:
+    """
+    getReportDocument: the pre-signed download URL (valid ~5 minutes) and
+    compressionAlgorithm of a report document.
+    """
+    endpoint = get_endpoint(region)
+    url = f"https://{endpoint}/reports/2021-06-30/documents/{report_document_id}"
+    # Own rate limit: 1/min after a burst of 15, unlike getReport's 2/sec
+    return _get(url, access_token, client, api_type="reports_document").json()
+
+
 def download_report(
     access_token: str,
     report_document_id: str,
-    region: str = "NA"
-) -> List[Dict[str, Any]]:
+    region: str = "NA",
+    client: "SPAPIClient" = None,
+    document: Dict[str, Any] = None
+) -> RowSpool:
     """
     Download and parse an inventory report (TSV format).
 
+    The document is streamed into a memory-budgeted buffer and parsed line
+    by line; rows spill to disk if the run goes over SP_MEMORY_BUDGET_MB.
+
+    Args:
+        document: getReportDocument response already fetched for this
+            document (skips fetching it again)
+
     Returns:
-        List of dictionaries, one per row
+        RowSpool (list-like: len, iteration, rows[0]) of row dictionaries
     """
-    endpoint = get_endpoint(region)
-
     # Step 1: Get the pre-signed download URL
-    url = f"https://{endpoint}/reports/2021-06-30/documents/{report_document_id}"
-
-    response = requests.get(
-        url,
-        headers={"x-amz-access-token": access_token}
-    )
-    response.raise_for_status()
-    doc_info = response.json()
+    doc_info = document or get_report_document(access_token, report_document_id, region, client)
 
     download_url = doc_info["url"]
     compression = doc_info.get("compressionAlgorithm")
-
-    # Step 2: Download the actual report
-    report_response = requests.get(download_url)
-    report_response.raise_for_status()
-
-    # Step 3: Decompress if needed
-    content = report_response.content
-    if compression == "GZIP":
-        content = gzip.decompress(content)
-
-    # Step 4: Parse TSV (inventory reports are tab-separated)
-    # Amazon reports may use different encodings - try UTF-8 first, then CP1252 (Windows-1252)
+    budget = get_memory_budget()
+
+    # Step 2: Stream the report into a spooled buffer
+    body = budget.spool_file("report download")
+    with budget.track("download"):
+        if client is not None:
+            client.download_to(download_url, body, chunk_size=DOWNLOAD_CHUNK_SIZE)
+        else:
+            started = time.perf_counter()
+            nbytes = 0
+            with requests.get(download_url, stream=True) as report_response:
+                report_response.raise_for_status()
+                for chunk in report_response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    body.write(chunk)
+                    nbytes += len(chunk)
+            get_metrics().record_download(download_url, nbytes, time.perf_counter() - started)
+
+    # Step 3: Decompress + parse TSV (inventory reports are tab-separated)
     try:
-        text = content.decode("utf-8")
-    except UnicodeDecodeError:
-        # CP1252 is commonly used by Amazon for reports with special characters
-        text = content.decode("cp1252")
-
-    reader = csv.DictReader(io.StringIO(text), delimiter='\t')
-    rows = list(reader)
+        with get_metrics().timed("parse"):
+            rows = RowSpool("report rows", iter_tsv_rows(body, compression), budget=budget)
+    finally:
+        body.close()
 
     print(f"✓ Downloaded report with {len(rows)} rows")
 
@@ -272,7 +339,8 @@ def pull_inventory_report(
     access_token: str,
     marketplace_code: str,
     report_type: str,
-    region: str = "NA"
+    region: str = "NA",
+    client: "SPAPIClient" = None
 ) -> List[Dict[str, Any]]:
     """
     High-level function to create, poll, and download an inventory report.
@@ -282,18 +350,19 @@ def pull_inventory_report(
         marketplace_code: Marketplace code
         report_type: One of REPORT_TYPES keys
         region: API region
+        client: Shared SPAPIClient; access_token may then be None
 
     Returns:
         List of row dictionaries
     """
     # Create report
-    report_id = create_inventory_report(access_token, marketplace_code, report_type, region)
+    report_id = create_inventory_report(access_token, marketplace_code, report_type, region, client=client)
 
     # Poll until complete
-    result = poll_report_status(access_token, report_id, region)
+    result = poll_report_status(access_token, report_id, region, client=client)
 
     # Download and parse
-    rows = download_report(access_token, result["reportDocumentId"], region)
+    rows = download_report(access_token, result["reportDocumentId"], region, client=client)
 
     return rows
 
@@ -302,19 +371,20 @@ def pull_storage_fee_report(
     access_token: str,
     marketplace_code: str,
     month: date,
-    region: str = "NA"
+    region: str = "NA",
+    client: "SPAPIClient" = None
 ) -> List[Dict[str, Any]]:
     """
     High-level function to pull storage fee report for a month.
     """
     # Create report
-    report_id = create_storage_fee_report(access_token, marketplace_code, month, region)
+    report_id = create_storage_fee_report(access_token, marketplace_code, month, region, client=client)
 
     # Poll until complete
-    result = poll_report_status(access_token, report_id, region)
+    result = poll_report_status(access_token, report_id, region, client=client)
 
     # Download and parse
-    rows = download_report(access_token, result["reportDocumentId"], region)
+    rows = download_report(access_token, result["reportDocumentId"], region, client=client)
 
     return rows
 
@@ -322,7 +392,8 @@ def pull_storage_fee_report(
 def pull_fba_inventory_report(
     access_token: str,
     marketplace_code: str,
-    region: str = "NA"
+    region: str = "NA",
+    client: "SPAPIClient" = None
 ) -> List[Dict[str, Any]]:
     """
     Pull GET_FBA_MYI_UNSUPPRESSED_INVENTORY_DATA report for a marketplace.
@@ -338,7 +409,7 @@ def pull_fba_inventory_report(
     Returns:
         List of row dicts keyed by report TSV column headers
     """
-    return pull_inventory_report(access_token, marketplace_code, "FBA_INVENTORY", region)
+    return pull_inventory_report(access_token, marketplace_code, "FBA_INVENTORY", region, client=client)
 
 
 def parse_fba_inventory_report_row(row: Dict[str, str]) -> Dict[str, Any]:
@@ -0,0 +1,108 @@
+"""
+Inventory Storage Module
+Where FBA inventory pulls are written and read (see migrations/008_inventory_ranges.sql).
+
+- daily: one sp_fba_inventory row per SKU per day (the original layout)
+- ranges: sp_fba_inventory_ranges only - a row is written only when a SKU's
+  quantities change, as a validity range; sp_fba_inventory_snapshots
+  reconstructs any pulled day
+- both: write both (while migrating / comparing)
+
+InventoryRangeWriter applies one marketplace's pull through the
+apply_fba_inventory_day() RPC batch by batch, so it works with the streamed
+API path, and closes the ranges of SKUs that were missing from the pull once
+the marketplace has completed.
+
+Environment:
+- SP_INVENTORY_STORAGE: daily, ranges or both (default: daily)
+"""
+
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+from .metrics import get_metrics
+
+INVENTORY_STORAGE = os.environ.get("SP_INVENTORY_STORAGE", "daily").lower()
+if INVENTORY_STORAGE not in ("daily", "ranges", "both"):
+    raise ValueError(f"SP_INVENTORY_STORAGE must be daily, ranges or both, not {INVENTORY_STORAGE!r}")
+
+# Rows per apply_fba_inventory_day() call
+RANGE_BATCH_ROWS = 500
+
+
+def writes_daily_rows() -> bool:
+    return INVENTORY_STORAGE in ("daily", "both")
+
+
+def writes_ranges() -> bool:
+    return INVENTORY_STORAGE in ("ranges", "both")
+
+
+def inventory_source_table() -> str:
+    """Table/view to read daily inventory snapshots from (same columns either way)."""
+    return "sp_fba_inventory_snapshots" if INVENTORY_STORAGE == "ranges" else "sp_fba_inventory"
+
+
+class InventoryRangeWriter:
+    """
+    Writes one marketplace's inventory for one day as ranges.
+
+    Usage:
+        ranges = InventoryRangeWriter(marketplace_id, date.today())
+        ranges.write(rows)      # any number of batches
+        ranges.finish()         # only after the whole marketplace was pulled
+        ranges.counts           # {"new": .., "changed": .., "unchanged": .., "stale": .., "closed": ..}
+    """
+
+    def __init__(self, marketplace_id: str, day: date, client=None):
+        self.marketplace_id = marketplace_id
+        self.day = day
+        self._client = client
+        self._skus: Set[str] = set()
+        self.counts: Dict[str, int] = {"new": 0, "changed": 0, "unchanged": 0, "stale": 0, "closed": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .db import get_supabase_client
+            self._client = get_supabase_client()
+        return self._client
+
+    def write(self, rows: List[Dict[str, Any]], import_id: Optional[str] = None) -> int:
+        """Apply a batch of transformed inventory rows; returns rows sent."""
+        sent = 0
+        for start in range(0, len(rows), RANGE_BATCH_ROWS):
+            batch = []
+            for row in rows[start:start + RANGE_BATCH_ROWS]:
+                if not row.get("sku"):
+                    continue
+                self._skus.add(row["sku"])
+                batch.append({**row, "import_id": import_id} if import_id else row)
+            if not batch:
+                continue
+            with get_metrics().timed("db_upsert_chunk"):
+                result = self.client.rpc("apply_fba_inventory_day", {
+                    "p_marketplace_id": self.marketplace_id,
+                    "p_date": self.day.isoformat(),
+                    "p_rows": batch
+                }).execute()
+            for key, value in (result.data or {}).items():
+                self.counts[key] = self.counts.get(key, 0) + (value or 0)
+            sent += len(batch)
+        return sent
+
+    def finish(self) -> Dict[str, int]:
+        """Close ranges of SKUs that weren't in this day's pull and record the day as pulled."""
+        result = self.client.rpc("close_missing_fba_inventory", {
+            "p_marketplace_id": self.marketplace_id,
+            "p_date": self.day.isoformat(),
+            "p_skus": sorted(self._skus)
+        }).execute()
+        self.counts["closed"] = result.data or 0
+        return self.counts
+
+    def summary_line(self) -> str:
+        c = self.counts
+        return (f"ranges: {c['changed']} changed, {c['new']} new, {c['unchanged']} unchanged"
+                f"{', %d stale' % c['stale'] if c['stale'] else ''}, {c['closed']} closed")
@@ -0,0 +1,372 @@
+"""
+Memory Budget Module
+Keeps large report processing inside the runner's RAM.
+
+GitHub Actions runners have a few GB of RAM, and a settlement or inventory
+report held as raw bytes + decoded text + parsed rows + transformed rows
+can take several times its size. get_memory_budget() returns the
+process-wide MemoryBudget, which:
+
+- Samples RSS in the background and records the peak RSS of every metrics
+  stage (download, parse, db_upsert, ...) into the MetricsRegistry and the
+  active PullTimings, so stage_timings shows what each stage needs.
+- Hands out spool_file() buffers for report bodies: in memory while there
+  is headroom, rolled over to a temp file once the budget would be crossed.
+- Backs RowSpool, a list-like row buffer that starts pickling rows to a temp
+  file once RSS is over budget, so parsed reports can be streamed through
+  instead of held.
+
+Environment:
+- SP_MEMORY_BUDGET_MB: RSS budget (default: 75% of system RAM, 4096 if
+  unknown; 0 disables spilling, peaks are still tracked)
+- SP_MEMORY_SAMPLE_MS: RSS sampling interval (default: 200)
+- SP_SPOOL_DIR: directory for spill files (default: system temp dir)
+"""
+
+import os
+import sys
+import atexit
+import pickle
+import resource
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+
+from .metrics import get_metrics
+
+SAMPLE_INTERVAL = int(os.environ.get("SP_MEMORY_SAMPLE_MS", "200")) / 1000
+SPOOL_DIR = os.environ.get("SP_SPOOL_DIR") or None
+
+# Rows per pickled batch in a RowSpool spill file (also how often RSS is checked)
+SPOOL_BATCH_ROWS = 5000
+
+# Report body buffers may use at most this share of the remaining headroom;
+# the rest is left for decompressing and parsing them
+BODY_HEADROOM_SHARE = 0.5
+
+_MB = 1024 * 1024
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux /proc), falling back to the high-water mark."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / _MB
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Process RSS high-water mark."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / _MB if sys.platform == "darwin" else peak / 1024
+
+
+def _default_budget_mb() -> float:
+    configured = os.environ.get("SP_MEMORY_BUDGET_MB")
+    if configured:
+        return float(configured)
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / 1024 * 0.75
+    except (OSError, ValueError, IndexError):
+        pass
+    return 4096.0
+
+
+class MemoryBudget:
+    """
+    RSS budget for one run, with per-stage peak tracking.
+
+    Usage:
+        budget = get_memory_budget()
+        if budget.over_budget():
+            ... take the spill-to-disk path ...
+        body = budget.spool_file("settlement report")
+        rows = RowSpool("settlement rows")
+    """
+
+    def __init__(self, limit_mb: Optional[float] = None, interval: float = SAMPLE_INTERVAL):
+        self.limit_mb = _default_budget_mb() if limit_mb is None else limit_mb
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.peak_mb = 0.0
+        # stage -> peak RSS (MB) seen while it was running
+        self.stage_peaks: Dict[str, float] = {}
+        # stage -> number of blocks currently open (across threads)
+        self._open: Dict[str, int] = {}
+        # what -> number of spills to disk
+        self.spills: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit_mb > 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> "MemoryBudget":
+        if self._thread is None:
+            get_metrics().add_stage_listener(self._on_stage)
+            self._thread = threading.Thread(target=self._run, name="sp-memory", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        get_metrics().remove_stage_listener(self._on_stage)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> float:
+        """Take an RSS reading and credit it to every open stage."""
+        rss = current_rss_mb()
+        with self._lock:
+            self.peak_mb = max(self.peak_mb, rss)
+            for stage in self._open:
+                if rss > self.stage_peaks.get(stage, 0.0):
+                    self.stage_peaks[stage] = rss
+        return rss
+
+    def _on_stage(self, event: str, stage: str):
+        if event == "enter":
+            with self._lock:
+                self._open[stage] = self._open.get(stage, 0) + 1
+            self.sample()
+            return
+
+        self.sample()
+        with self._lock:
+            depth = self._open.get(stage, 0) - 1
+            if depth > 0:
+                self._open[stage] = depth
+                return
+            self._open.pop(stage, None)
+            peak = self.stage_peaks.get(stage)
+        if peak is not None:
+            get_metrics().record_memory_peak(stage, peak)
+
+    @contextmanager
+    def track(self, stage: str):
+        """
+        Track peak RSS of a block as stage without timing it (for stages whose
+        time is recorded elsewhere, e.g. download via record_download()).
+        """
+        self._on_stage("enter", stage)
+        try:
+            yield
+        finally:
+            self._on_stage("exit", stage)
+
+    # ------------------------------------------------------------------
+    # Budget checks
+    # ------------------------------------------------------------------
+
+    def headroom_bytes(self) -> int:
+        """Bytes left before the budget is crossed (0 when over)."""
+        if not self.enabled:
+            return sys.maxsize
+        return max(0, int((self.limit_mb - current_rss_mb()) * _MB))
+
+    def over_budget(self, extra_bytes: int = 0) -> bool:
+        """True when RSS (plus extra_bytes about to be allocated) exceeds the budget."""
+        if not self.enabled:
+            return False
+        return current_rss_mb() + extra_bytes / _MB > self.limit_mb
+
+    def note_spill(self, what: str):
+        with self._lock:
+            first = what not in self.spills
+            self.spills[what] = self.spills.get(what, 0) + 1
+        if first:
+            print(f"💾 Memory budget {self.limit_mb:.0f} MB reached (RSS {current_rss_mb():.0f} MB) "
+                  f"- spilling {what} to disk")
+
+    def spool_file(self, what: str = "report body") -> "BudgetSpooledFile":
+        """
+        Binary buffer for a report body: kept in memory up to a share of the
+        remaining headroom, then rolled over to a temp file.
+        """
+        if not self.enabled:
+            max_size = 0  # never roll over
+        else:
+            max_size = max(1, int(self.headroom_bytes() * BODY_HEADROOM_SHARE))
+        return BudgetSpooledFile(self, what, max_size)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_mb": round(self.limit_mb),
+                "peak_rss_mb": round(max(self.peak_mb, peak_rss_mb()), 1),
+                "spills": dict(self.spills),
+                "stage_peak_rss_mb": {
+                    stage: round(mb, 1)
+                    for stage, mb in sorted(self.stage_peaks.items(), key=lambda kv: -kv[1])
+                },
+            }
+
+    def summary_line(self) -> str:
+        summary = self.summary()
+        stages = ", ".join(f"{stage} {mb:.0f} MB" for stage, mb in list(summary["stage_peak_rss_mb"].items())[:5])
+        spills = sum(summary["spills"].values())
+        line = f"Peak RSS {summary['peak_rss_mb']:.0f} MB (budget {summary['budget_mb']} MB)"
+        if stages:
+            line += f" - {stages}"
+        if spills:
+            line += f"; {spills} spill(s) to disk"
+        return line
+
+
+class BudgetSpooledFile(tempfile.SpooledTemporaryFile):
+    """SpooledTemporaryFile that reports its rollover to disk as a budget spill."""
+
+    def __init__(self, budget: MemoryBudget, what: str, max_size: int):
+        super().__init__(max_size=max_size, mode="w+b", dir=SPOOL_DIR)
+        self._budget = budget
+        self._what = what
+
+    def rollover(self):
+        if not self._rolled:
+            self._budget.note_spill(self._what)
+        super().rollover()
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class RowSpool:
+    """
+    List-like row buffer that moves rows to disk once RSS is over budget.
+
+    Rows are kept in memory until the budget is crossed; from then on each
+    batch of SPOOL_BATCH_ROWS is pickled to a temp file. Iteration yields
+    rows in insertion order (spilled rows first, then the in-memory tail).
+    len(), truthiness and rows[0] are cheap; other indexing re-reads the
+    spill file, so treat a spilled RowSpool as a stream.
+
+    Usage:
+        rows = RowSpool("settlement rows")
+        rows.extend(iter_tsv_rows(body))
+        for row in rows: ...
+        rows.close()        # drops the temp file (also done on GC)
+    """
+
+    def __init__(self, what: str = "rows", rows: Iterable[Dict[str, Any]] = (), budget: Optional[MemoryBudget] = None):
+        self.what = what
+        self._budget = budget or get_memory_budget()
+        self._memory: List[Any] = []
+        self._head: Optional[Any] = None
+        self._count = 0
+        self._spilled = 0
+        self._path: Optional[str] = None
+        self._file = None
+        self._finalizer = None
+        self.extend(rows)
+
+    @property
+    def spilled(self) -> int:
+        """Rows currently on disk."""
+        return self._spilled
+
+    def append(self, row: Any):
+        if self._count == 0:
+            self._head = row
+        self._memory.append(row)
+        self._count += 1
+        if len(self._memory) % SPOOL_BATCH_ROWS == 0 and self._budget.over_budget():
+            self._spill()
+
+    def extend(self, rows: Iterable[Any]):
+        for row in rows:
+            self.append(row)
+
+    def _spill(self):
+        if self._file is None:
+            fd, self._path = tempfile.mkstemp(prefix="sp-rows-", suffix=".pickle", dir=SPOOL_DIR)
+            self._file = os.fdopen(fd, "wb")
+            self._finalizer = weakref.finalize(self, _remove_quietly, self._path)
+            self._budget.note_spill(self.what)
+        for start in range(0, len(self._memory), SPOOL_BATCH_ROWS):
+            pickle.dump(self._memory[start:start + SPOOL_BATCH_ROWS], self._file, pickle.HIGHEST_PROTOCOL)
+        self._spilled += len(self._memory)
+        self._memory = []
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._file is not None:
+            self._file.flush()
+            with open(self._path, "rb") as f:
+                while True:
+                    try:
+                        batch = pickle.load(f)
+                    except EOFError:
+                        break
+                    yield from batch
+        yield from list(self._memory)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            return list(islice(self, start, stop, step))
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("RowSpool index out of range")
+        if index == 0:
+            return self._head
+        if index >= self._spilled:
+            return self._memory[index - self._spilled]
+        return next(islice(self, index, None))
+
+    def close(self):
+        """Drop all rows and delete the spill file."""
+        self._memory = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+# Singleton instance for the run
+_budget: Optional[MemoryBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_memory_budget() -> MemoryBudget:
+    """Get the process-wide MemoryBudget (started on first use; peaks printed at exit)."""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = MemoryBudget().start()
+                atexit.register(lambda: print(f"🧠 {_budget.summary_line()}"))
+    return _budget
@@ -0,0 +1,650 @@
+"""
+Metrics Module
+Per-run request latency, throttle and download metrics for SP-API pulls.
+
+SPAPIClient records into the process-wide registry returned by
+get_metrics(), so every client created during a run feeds one set of
+numbers:
+
+- Latency histograms per api_type + endpoint (IDs in paths collapsed)
+- Seconds slept in rate limiting (wait_if_needed) vs retry backoff
+- 429 counts per api_type
+- Bytes and seconds spent downloading report documents
+- Stage timings for anything else (e.g. Supabase upserts) via timed()
+- Peak RSS per stage, recorded by the memory budget (memory.py)
+- Queue depth / backpressure per pipeline stage (pipeline.py)
+
+Per-pull stage timings: wrap one marketplace/report pull in
+PullTimings(...).activate() and everything recorded in that block (by the
+client, auth, poll loops, parsers and db upserts) is also attributed to that
+pull. db.record_pull_timings() persists it next to the pull record and into
+sp_pull_stage_timings. Standard stage names:
+
+    token_fetch      LWA round-trip (cache misses only)
+    create_report    createReport requests
+    queue_wait       createReport → DONE (poll_report_status wall time)
+    poll             getReport requests (count = poll count)
+    get_document     getReportDocument requests
+    download         report document bytes + seconds
+    parse            decompress + parse / transform
+    db_upsert        upsert calls (seconds), db_upsert_chunk: per chunk
+    rate_limit_wait  seconds waiting for a rate-limit slot
+    retry_backoff    seconds sleeping before retries
+    pipeline_wait    seconds queued between pipeline stages (pipeline.py)
+
+Export at the end of a run:
+    metrics = get_metrics()
+    print(metrics.to_json())
+    metrics.to_openmetrics()          # Prometheus text format
+    metrics.export("metrics/", "sales_traffic")
+
+send_summary() in alerting.py attaches summary() to its payload and, when
+SP_API_METRICS_DIR is set, writes the JSON and OpenMetrics files there.
+"""
+
+import os
+import re
+import json
+import time
+import bisect
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+from urllib.parse import urlsplit
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Path segments that are IDs: numeric report IDs, amzn1.* document IDs, long tokens
+_ID_SEGMENT = re.compile(r"^(\d+|amzn1\..+|[A-Za-z0-9_-]*\d[A-Za-z0-9_-]{15,})$")
+
+
+def normalize_endpoint(url: str) -> str:
+    """
+    Collapse a request URL to a low-cardinality endpoint label.
+
+    SP-API URLs keep host + path with IDs replaced by {id}; any other host
+    (pre-signed S3 report documents) is labelled by host only.
+    """
+    parts = urlsplit(url)
+    if not parts.netloc.startswith("sellingpartnerapi") and not parts.path.startswith(("/reports/", "/fba/", "/awd/")):
+        return parts.netloc or url
+    segments = [
+        "{id}" if _ID_SEGMENT.match(segment) else segment
+        for segment in parts.path.split("/")
+    ]
+    return parts.netloc + "/".join(segments)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Fixed-bucket histogram with count/sum/min/max."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile: upper bound of the bucket holding it (max for +Inf)."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "min": round(self.min, 4) if self.min is not None else None,
+            "max": round(self.max, 4) if self.max is not None else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {
+                **{str(b): n for b, n in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1]
+            }
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of run metrics.
+
+    All record_* methods are cheap (a lock and a few adds) and safe to call
+    from worker threads and event loops alike.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Callables (event, stage) notified on "enter" / "exit" of timed() blocks
+        self._stage_listeners: List[Any] = []
+        self.reset()
+
+    def reset(self):
+        """Drop everything recorded so far."""
+        with self._lock:
+            self.started_at = datetime.utcnow()
+            # (api_type, endpoint) -> Histogram
+            self.latency: Dict[Tuple[str, str], Histogram] = {}
+            # (api_type, endpoint, status) -> count
+            self.responses: Dict[Tuple[str, str, str], int] = {}
+            self.rate_limit_sleep: Dict[str, float] = {}
+            self.backoff_sleep: Dict[str, float] = {}
+            self.throttled: Dict[str, int] = {}
+            self.download_bytes: Dict[str, int] = {}
+            self.download_seconds: Dict[str, float] = {}
+            # stage name -> Histogram
+            self.stages: Dict[str, Histogram] = {}
+            # stage name -> peak RSS (MB) while it ran
+            self.memory_peaks: Dict[str, float] = {}
+            # (pipeline, stage) -> input queue stats (see record_queue)
+            self.queues: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record_request(self, api_type: str, url: str, status, seconds: float):
+        """One HTTP attempt. status is the HTTP code, or an exception name."""
+        endpoint = normalize_endpoint(url)
+        with self._lock:
+            key = (api_type, endpoint)
+            hist = self.latency.get(key)
+            if hist is None:
+                hist = self.latency[key] = Histogram()
+            hist.observe(seconds)
+            status_key = (api_type, endpoint, str(status))
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+            if status == 429:
+                self.throttled[api_type] = self.throttled.get(api_type, 0) + 1
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.record_request(api_type, endpoint, seconds)
+
+    def record_rate_limit_sleep(self, api_type: str, seconds: float):
+        """Time spent waiting for a rate-limit slot (wait_if_needed)."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.rate_limit_sleep[api_type] = self.rate_limit_sleep.get(api_type, 0.0) + seconds
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.add("rate_limit_wait", seconds)
+
+    def record_backoff_sleep(self, api_type: str, seconds: float):
+        """Time spent sleeping before a retry."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.backoff_sleep[api_type] = self.backoff_sleep.get(api_type, 0.0) + seconds
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.add("retry_backoff", seconds)
+
+    def record_download(self, url: str, nbytes: int, seconds: float):
+        """A report document download (bytes on the wire, before decompression)."""
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            self.download_bytes[host] = self.download_bytes.get(host, 0) + nbytes
+            self.download_seconds[host] = self.download_seconds.get(host, 0.0) + seconds
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.add("download", seconds, nbytes=nbytes)
+
+    def record_stage(self, stage: str, seconds: float):
+        """A timed non-HTTP stage, e.g. "db_upsert"."""
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.add(stage, seconds)
+
+    def record_memory_peak(self, stage: str, rss_mb: float):
+        """Peak process RSS seen while stage ran (kept as the max across calls)."""
+        with self._lock:
+            if rss_mb > self.memory_peaks.get(stage, 0.0):
+                self.memory_peaks[stage] = rss_mb
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.set_peak_rss(stage, rss_mb)
+
+    def record_queue(
+        self,
+        pipeline: str,
+        stage: str,
+        depth: Optional[int] = None,
+        capacity: int = 0,
+        blocked_seconds: float = 0.0,
+        idle_seconds: float = 0.0
+    ):
+        """
+        One observation of a pipeline stage's input queue.
+
+        depth: items waiting after a put; blocked_seconds: time the upstream
+        stage waited because the queue was full (backpressure - this stage is
+        the bottleneck); idle_seconds: time this stage's workers waited for
+        input (starved - something upstream is).
+        """
+        with self._lock:
+            entry = self.queues.get((pipeline, stage))
+            if entry is None:
+                entry = self.queues[(pipeline, stage)] = {
+                    "capacity": capacity, "max_depth": 0, "depth_sum": 0, "samples": 0,
+                    "blocked_seconds": 0.0, "idle_seconds": 0.0,
+                }
+            if depth is not None:
+                entry["max_depth"] = max(entry["max_depth"], depth)
+                entry["depth_sum"] += depth
+                entry["samples"] += 1
+            entry["blocked_seconds"] += blocked_seconds
+            entry["idle_seconds"] += idle_seconds
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Context manager form of record_stage()."""
+        self._notify_stage("enter", stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - start)
+            self._notify_stage("exit", stage)
+
+    def add_stage_listener(self, listener):
+        """
+        Call listener("enter" | "exit", stage) around every timed() block, on
+        the thread running the block (used by profiling.py to label samples).
+        """
+        with self._lock:
+            self._stage_listeners.append(listener)
+
+    def remove_stage_listener(self, listener):
+        with self._lock:
+            if listener in self._stage_listeners:
+                self._stage_listeners.remove(listener)
+
+    def _notify_stage(self, event: str, stage: str):
+        for listener in self._stage_listeners:
+            try:
+                listener(event, stage)
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def summary(self) -> dict:
+        """Headline numbers for alerts and logs."""
+        with self._lock:
+            requests_total = sum(h.count for h in self.latency.values())
+            request_seconds = sum(h.sum for h in self.latency.values())
+            return {
+                "requests": requests_total,
+                "request_seconds": round(request_seconds, 1),
+                "throttled_429": sum(self.throttled.values()),
+                "rate_limit_sleep_seconds": round(sum(self.rate_limit_sleep.values()), 1),
+                "backoff_sleep_seconds": round(sum(self.backoff_sleep.values()), 1),
+                "download_bytes": sum(self.download_bytes.values()),
+                "download_seconds": round(sum(self.download_seconds.values()), 1),
+                "stage_seconds": {name: round(h.sum, 1) for name, h in self.stages.items()},
+                "stage_peak_rss_mb": {name: round(mb, 1) for name, mb in self.memory_peaks.items()},
+                "queue_blocked_seconds": {
+                    f"{pipeline}/{stage}": round(entry["blocked_seconds"], 1)
+                    for (pipeline, stage), entry in self.queues.items()
+                },
+            }
+
+    def to_dict(self) -> dict:
+        """Full snapshot, JSON-serialisable."""
+        summary = self.summary()
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat() + "Z",
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "summary": summary,
+                "latency": [
+                    {"api_type": api_type, "endpoint": endpoint, **hist.to_dict()}
+                    for (api_type, endpoint), hist in sorted(self.latency.items())
+                ],
+                "responses": [
+                    {"api_type": api_type, "endpoint": endpoint, "status": status, "count": n}
+                    for (api_type, endpoint, status), n in sorted(self.responses.items())
+                ],
+                "rate_limit_sleep_seconds": {k: round(v, 3) for k, v in self.rate_limit_sleep.items()},
+                "backoff_sleep_seconds": {k: round(v, 3) for k, v in self.backoff_sleep.items()},
+                "throttled_429": dict(self.throttled),
+                "download_bytes": dict(self.download_bytes),
+                "download_seconds": {k: round(v, 3) for k, v in self.download_seconds.items()},
+                "stages": {name: hist.to_dict() for name, hist in sorted(self.stages.items())},
+                "queues": [
+                    {
+                        "pipeline": pipeline,
+                        "stage": stage,
+                        "capacity": int(entry["capacity"]),
+                        "max_depth": int(entry["max_depth"]),
+                        "avg_depth": round(entry["depth_sum"] / entry["samples"], 2) if entry["samples"] else 0,
+                        "blocked_seconds": round(entry["blocked_seconds"], 3),
+                        "idle_seconds": round(entry["idle_seconds"], 3),
+                    }
+                    for (pipeline, stage), entry in sorted(self.queues.items())
+                ],
+            }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_openmetrics(self) -> str:
+        """OpenMetrics / Prometheus text exposition."""
+        lines: List[str] = []
+
+        def labels(**kv) -> str:
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in kv.items()) + "}"
+
+        def histogram(name: str, help_text: str, series: List[Tuple[dict, Histogram]]):
+            lines.append(f"# TYPE {name} histogram")
+            lines.append(f"# HELP {name} {help_text}")
+            for label_kv, hist in series:
+                cumulative = 0
+                for bound, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{labels(**label_kv, le=bound)} {cumulative}")
+                lines.append(f"{name}_bucket{labels(**label_kv, le='+Inf')} {hist.count}")
+                lines.append(f"{name}_count{labels(**label_kv)} {hist.count}")
+                lines.append(f"{name}_sum{labels(**label_kv)} {hist.sum:.6f}")
+
+        def counter(name: str, help_text: str, series: List[Tuple[dict, float]]):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"# HELP {name} {help_text}")
+            for label_kv, value in series:
+                lines.append(f"{name}_total{labels(**label_kv)} {value}")
+
+        def gauge(name: str, help_text: str, series: List[Tuple[dict, float]]):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"# HELP {name} {help_text}")
+            for label_kv, value in series:
+                lines.append(f"{name}{labels(**label_kv)} {value}")
+
+        with self._lock:
+            histogram(
+                "sp_api_request_duration_seconds", "SP-API request latency per attempt.",
+                [({"api_type": a, "endpoint": e}, h) for (a, e), h in sorted(self.latency.items())]
+            )
+            counter(
+                "sp_api_responses", "Responses by status (HTTP code or exception).",
+                [({"api_type": a, "endpoint": e, "status": s}, n)
+                 for (a, e, s), n in sorted(self.responses.items())]
+            )
+            counter(
+                "sp_api_throttled", "429 responses.",
+                [({"api_type": a}, n) for a, n in sorted(self.throttled.items())]
+            )
+            counter(
+                "sp_api_rate_limit_sleep_seconds", "Seconds waiting for a rate-limit slot.",
+                [({"api_type": a}, round(v, 6)) for a, v in sorted(self.rate_limit_sleep.items())]
+            )
+            counter(
+                "sp_api_backoff_sleep_seconds", "Seconds sleeping before retries.",
+                [({"api_type": a}, round(v, 6)) for a, v in sorted(self.backoff_sleep.items())]
+            )
+            counter(
+                "sp_api_download_bytes", "Report document bytes downloaded.",
+                [({"host": h}, n) for h, n in sorted(self.download_bytes.items())]
+            )
+            counter(
+                "sp_api_download_seconds", "Seconds spent downloading report documents.",
+                [({"host": h}, round(v, 6)) for h, v in sorted(self.download_seconds.items())]
+            )
+            histogram(
+                "sp_api_stage_duration_seconds", "Non-HTTP stage durations.",
+                [({"stage": s}, h) for s, h in sorted(self.stages.items())]
+            )
+            gauge(
+                "sp_api_stage_peak_rss_megabytes", "Peak process RSS while the stage ran.",
+                [({"stage": s}, round(mb, 1)) for s, mb in sorted(self.memory_peaks.items())]
+            )
+            gauge(
+                "sp_api_pipeline_queue_max_depth", "Most items waiting in a pipeline stage's input queue.",
+                [({"pipeline": p, "stage": s}, int(e["max_depth"])) for (p, s), e in sorted(self.queues.items())]
+            )
+            counter(
+                "sp_api_pipeline_blocked_seconds", "Seconds upstream waited on a full stage queue (backpressure).",
+                [({"pipeline": p, "stage": s}, round(e["blocked_seconds"], 6)) for (p, s), e in sorted(self.queues.items())]
+            )
+            counter(
+                "sp_api_pipeline_idle_seconds", "Seconds stage workers waited for input.",
+                [({"pipeline": p, "stage": s}, round(e["idle_seconds"], 6)) for (p, s), e in sorted(self.queues.items())]
+            )
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str, prefix: str = "sp_api") -> Tuple[str, str]:
+        """Write <prefix>-<timestamp>.json and .prom into directory. Returns both paths."""
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        base = os.path.join(directory, f"{prefix}-{stamp}")
+        with open(base + ".json", "w") as f:
+            f.write(self.to_json())
+        with open(base + ".prom", "w") as f:
+            f.write(self.to_openmetrics())
+        return base + ".json", base + ".prom"
+
+
+# =============================================================================
+# Per-pull stage timings
+# =============================================================================
+
+# PullTimings receiving records in the current context (see PullTimings.activate)
+_active_timings: contextvars.ContextVar[Optional["PullTimings"]] = contextvars.ContextVar(
+    "sp_api_pull_timings", default=None
+)
+
+
+class PullTimings:
+    """
+    Structured stage timings for one pull (one marketplace + date/period).
+
+    Stages accumulate seconds, call count and (for downloads) bytes. Nested
+    stages overlap by design: queue_wait contains the poll requests made
+    while waiting, db_upsert contains its db_upsert_chunk calls.
+
+    Usage:
+        timings = PullTimings("sales_traffic", "USA", report_date, region="NA")
+        with timings.activate():
+            ... create / poll / download / parse / upsert ...
+        record_pull_timings(timings, "sp_api_pulls", pull_id)   # db.py
+
+    Records made on thread pool workers don't see the active context;
+    wrap the worker in activate() as well.
+    """
+
+    def __init__(
+        self,
+        pull_type: str,
+        marketplace_code: Optional[str] = None,
+        pull_date=None,
+        region: Optional[str] = None
+    ):
+        self.pull_type = pull_type
+        self.marketplace_code = marketplace_code
+        self.pull_date = pull_date
+        self.region = region
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._lock = threading.Lock()
+        # stage -> {"seconds", "count", "bytes"}
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, stage: str, seconds: float, count: int = 1, nbytes: int = 0):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {"seconds": 0.0, "count": 0, "bytes": 0}
+            entry["seconds"] += seconds
+            entry["count"] += count
+            entry["bytes"] += nbytes
+
+    def set_peak_rss(self, stage: str, rss_mb: float):
+        """Peak RSS (MB) seen during stage in this pull (max across calls)."""
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {"seconds": 0.0, "count": 0, "bytes": 0}
+            entry["peak_rss_mb"] = max(entry.get("peak_rss_mb", 0.0), rss_mb)
+
+    def record_request(self, api_type: str, endpoint: str, seconds: float):
+        """Attribute one SP-API attempt to create_report / poll / get_document / api_type."""
+        if api_type == "reports_create":
+            stage = "create_report"
+        elif api_type == "reports_get":
+            stage = "get_document" if "/documents/" in endpoint else "poll"
+        elif api_type == "reports_document":
+            stage = "get_document"
+        else:
+            stage = api_type
+        self.add(stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as a stage of this pull only (not the run registry)."""
+        metrics = get_metrics()
+        metrics._notify_stage("enter", name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            metrics._notify_stage("exit", name)
+
+    @contextmanager
+    def activate(self):
+        """Attribute everything recorded in this block (this thread/task) to this pull."""
+        try:
+            with attributed_to(self):
+                yield self
+        finally:
+            self.finish()
+
+    def finish(self):
+        """Freeze total_seconds (idempotent)."""
+        if self._elapsed is None:
+            self._elapsed = time.perf_counter() - self._started
+            self.finished_at = datetime.utcnow()
+
+    @property
+    def total_seconds(self) -> float:
+        return self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+
+    @property
+    def poll_count(self) -> int:
+        return int(self.stages.get("poll", {}).get("count", 0))
+
+    def bottleneck(self) -> Optional[str]:
+        """Slowest top-level stage (excludes stages nested inside others)."""
+        candidates = {
+            name: entry["seconds"] for name, entry in self.stages.items()
+            if name not in ("poll", "db_upsert_chunk")
+        }
+        return max(candidates, key=candidates.get) if candidates else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON for the pull record's stage_timings column."""
+        with self._lock:
+            stages = {
+                name: {
+                    "seconds": round(entry["seconds"], 3),
+                    "count": int(entry["count"]),
+                    **({"bytes": int(entry["bytes"])} if entry["bytes"] else {}),
+                    **({"peak_rss_mb": round(entry["peak_rss_mb"], 1)} if "peak_rss_mb" in entry else {}),
+                }
+                for name, entry in sorted(self.stages.items())
+            }
+        return {
+            "pull_type": self.pull_type,
+            "marketplace": self.marketplace_code,
+            "started_at": self.started_at.isoformat() + "Z",
+            "total_seconds": round(self.total_seconds, 3),
+            "poll_count": self.poll_count,
+            "bottleneck": self.bottleneck(),
+            "stages": stages,
+        }
+
+    def summary_line(self) -> str:
+        """Compact one-liner for logs, slowest stages first."""
+        with self._lock:
+            parts = sorted(self.stages.items(), key=lambda kv: -kv[1]["seconds"])
+        return ", ".join(f"{name} {entry['seconds']:.1f}s" for name, entry in parts[:5])
+
+
+def current_timings() -> Optional[PullTimings]:
+    """PullTimings active in this context, if any."""
+    return _active_timings.get()
+
+
+@contextmanager
+def attributed_to(timings: Optional[PullTimings]):
+    """
+    Make timings the active PullTimings for this block without finishing it.
+
+    For carrying a pull's attribution into worker threads / event loops,
+    which don't inherit the caller's context.
+    """
+    token = _active_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _active_timings.reset(token)
+
+
+def timed_stage(stage: str):
+    """Decorator: record every call of the function as stage in the run registry (and active pull)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Singleton instance for the run
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide MetricsRegistry."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
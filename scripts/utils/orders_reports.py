@@ -30,9 +30,12 @@ import logging
 import time
 from collections import defaultdict
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from zoneinfo import ZoneInfo
 
+from .api_client import apply_endpoint_override
+from .metrics import timed_stage
+
 logger = logging.getLogger(__name__)
 
 # Regional endpoints
@@ -43,6 +46,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"   # UAE uses EU endpoint, different token
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # Amazon Marketplace IDs
 MARKETPLACE_IDS = {
     "USA": {"id": "ATVPDKIKX0DER", "region": "NA"},
@@ -182,6 +187,7 @@ def create_orders_report(
     return report_id
 
 
+@timed_stage("queue_wait")
 def poll_report_status(
     report_id: str,
     region: str = "NA",
@@ -240,17 +246,17 @@ def poll_report_status(
         time.sleep(poll_interval)
 
 
-def download_orders_report(
+def download_orders_report_body(
     report_document_id: str,
     region: str = "NA",
     client=None,
     access_token: str = None
-) -> List[Dict[str, str]]:
+) -> Tuple[bytes, Optional[str]]:
     """
-    Download and parse orders report (TSV format).
+    Download an orders report document as delivered (still compressed).
 
     Returns:
-        List of row dictionaries (one per order line item)
+        (body bytes, compressionAlgorithm or None) for parse_orders_report_body()
     """
     import requests as req_lib
 
@@ -272,22 +278,24 @@ def download_orders_report(
 
     # Download the report file
     if client is not None:
-        report_response = client.session.get(download_url, timeout=client.timeout)
-        report_response.raise_for_status()
+        report_response = client.download(download_url)
     else:
         report_response = req_lib.get(download_url)
         report_response.raise_for_status()
 
-    # Decompress if needed
-    content = report_response.content
+    return report_response.content, compression
+
+
+@timed_stage("parse")
+def parse_orders_tsv(body: bytes, compression: Optional[str] = None) -> List[Dict[str, str]]:
+    """Decompress (if needed) and parse an orders report TSV into row dicts."""
     if compression == "GZIP":
-        content = gzip.decompress(content)
+        body = gzip.decompress(body)
 
-    # Parse TSV
     try:
-        text = content.decode("utf-8")
+        text = body.decode("utf-8")
     except UnicodeDecodeError:
-        text = content.decode("cp1252")
+        text = body.decode("cp1252")
 
     reader = csv.DictReader(io.StringIO(text), delimiter='\t')
     rows = list(reader)
@@ -297,6 +305,25 @@ def download_orders_report(
     return rows
 
 
+def download_orders_report(
+    report_document_id: str,
+    region: str = "NA",
+    client=None,
+    access_token: str = None
+) -> List[Dict[str, str]]:
+    """
+    Download and parse orders report (TSV format).
+
+    Returns:
+        List of row dictionaries (one per order line item)
+    """
+    body, compression = download_orders_report_body(
+        report_document_id, region=region, client=client, access_token=access_token
+    )
+    return parse_orders_tsv(body, compression)
+
+
+@timed_stage("parse")
 def aggregate_orders_by_asin(
     rows: List[Dict[str, str]],
     report_date: date = None,
@@ -405,27 +432,19 @@ def aggregate_orders_by_asin(
     return result
 
 
-def pull_orders_report(
+def fetch_orders_report_body(
     marketplace_code: str,
     report_date: date,
     region: str = "NA",
     client=None,
     access_token: str = None
-) -> List[Dict[str, Any]]:
+) -> Tuple[bytes, Optional[str]]:
     """
-    High-level function to create, poll, download, and aggregate an orders report.
-
-    Args:
-        marketplace_code: Marketplace code (e.g., 'USA')
-        report_date: Date to pull orders for
-        region: API region
-        client: SPAPIClient instance (preferred)
-        access_token: Direct access token (fallback)
+    Create, poll, and download an orders report without parsing it.
 
     Returns:
-        List of aggregated ASIN dicts ready for upsert
+        (body bytes, compressionAlgorithm or None) for parse_orders_report_body()
     """
-    # Create report
     report_id = create_orders_report(
         marketplace_code=marketplace_code,
         report_date=report_date,
@@ -434,7 +453,6 @@ def pull_orders_report(
         access_token=access_token
     )
 
-    # Poll until complete
     result = poll_report_status(
         report_id=report_id,
         region=region,
@@ -442,15 +460,57 @@ def pull_orders_report(
         access_token=access_token
     )
 
-    # Download and parse TSV
-    raw_rows = download_orders_report(
+    return download_orders_report_body(
         report_document_id=result["reportDocumentId"],
         region=region,
         client=client,
         access_token=access_token
     )
 
-    # Aggregate by ASIN (filtered by marketplace sales-channel)
-    aggregated = aggregate_orders_by_asin(raw_rows, report_date, marketplace_code)
 
-    return aggregated
+def parse_orders_report_body(
+    body: bytes,
+    compression: Optional[str],
+    report_date: date = None,
+    marketplace_code: str = None
+) -> List[Dict[str, Any]]:
+    """
+    Parse an orders report document and aggregate it by ASIN.
+
+    Module-level and takes only picklable arguments, so it can run in a
+    pipeline's process pool.
+    """
+    raw_rows = parse_orders_tsv(body, compression)
+    return aggregate_orders_by_asin(raw_rows, report_date, marketplace_code)
+
+
+def pull_orders_report(
+    marketplace_code: str,
+    report_date: date,
+    region: str = "NA",
+    client=None,
+    access_token: str = None
+) -> List[Dict[str, Any]]:
+    """
+    High-level function to create, poll, download, and aggregate an orders report.
+
+    Args:
+        marketplace_code: Marketplace code (e.g., 'USA')
+        report_date: Date to pull orders for
+        region: API region
+        client: SPAPIClient instance (preferred)
+        access_token: Direct access token (fallback)
+
+    Returns:
+        List of aggregated ASIN dicts ready for upsert
+    """
+    body, compression = fetch_orders_report_body(
+        marketplace_code=marketplace_code,
+        report_date=report_date,
+        region=region,
+        client=client,
+        access_token=access_token
+    )
+
+    # Parse TSV and aggregate by ASIN (filtered by marketplace sales-channel)
+    return parse_orders_report_body(body, compression, report_date, marketplace_code)
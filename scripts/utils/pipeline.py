@@ -0,0 +1,357 @@
+"""
+Pipeline Module
+Bounded producer/consumer pipeline for the pull scripts.
+
+A pull used to run create → poll → download → parse → upsert strictly in
+sequence, one marketplace (or SQP batch) at a time, so the API sat idle
+while Supabase was written and vice versa. A Pipeline connects stages with
+bounded queues and runs every stage at once:
+
+- Each Stage has `workers` threads taking items from its input queue.
+  Network-bound stages (create/poll/download) and DB stages run their
+  function on those threads.
+- processes=True stages are CPU-bound (decompress + parse): the function
+  runs in a process pool shared by the pipeline and the stage threads only
+  ship arguments and wait. They get one thread per pool process by default,
+  so the pool runs up to SP_PIPELINE_PROCESSES items at once. The function and its arguments must be
+  picklable (module-level functions, bytes / dicts / dates). The stage is
+  timed under its name in this process; with SP_PIPELINE_PROCESSES=0 the
+  function runs on the stage threads and records its own stages.
+- Queues hold at most queue_size items, so a slow stage blocks the one
+  feeding it (backpressure) instead of piling downloaded reports up in RAM.
+- Stages given a shared WriterPool (executor=...) run their function on the
+  pool's threads instead, so several pipelines (e.g. one per region, see
+  region_runner.py) share one bounded set of Supabase writers.
+
+Items keep their input order in the results. A stage can return Done(value)
+to finish an item early (e.g. already pulled); an exception goes to
+on_error(value, stage, exc), whose return value becomes the item's result.
+
+Every stage's input queue is observed into MetricsRegistry.record_queue():
+max/avg depth, seconds the upstream stage was blocked on it (this stage is
+the bottleneck) and seconds its workers sat idle. run() prints one line per
+pipeline (🚰 ...), and time an item spent queued is added to its
+PullTimings as pipeline_wait.
+
+Usage:
+    pipeline = Pipeline("orders", [
+        Stage("report", fetch_report, workers=3),
+        Stage("parse", parse_orders_report_body, processes=True,
+              args=lambda job: (job["body"], job["compression"]),
+              merge=lambda job, rows: {**job, "rows": rows}),
+        Stage("store", store_rows, workers=2),
+    ], timings_of=lambda job: job["timings"], on_error=record_failure)
+    results = pipeline.run(jobs)
+
+Environment:
+- SP_PIPELINE_QUEUE_SIZE: items between stages (default: 2)
+- SP_PIPELINE_API_WORKERS: threads for report create/poll/download stages (default: 3)
+- SP_PIPELINE_DB_WORKERS: threads for upsert stages (default: 2)
+- SP_PIPELINE_PROCESSES: process pool size for CPU stages (default: CPU
+  count, at most 4; 0 runs them on the stage threads instead)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .metrics import get_metrics, attributed_to
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.environ.get("SP_PIPELINE_QUEUE_SIZE", "2"))
+API_WORKERS = int(os.environ.get("SP_PIPELINE_API_WORKERS", "3"))
+DB_WORKERS = int(os.environ.get("SP_PIPELINE_DB_WORKERS", "2"))
+PROCESSES = int(os.environ.get("SP_PIPELINE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+# End-of-input marker, one per worker thread
+_STOP = object()
+
+
+class Done:
+    """Returned by a stage to skip the remaining stages; value is the item's result."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class Stage:
+    """
+    One pipeline stage.
+
+    Thread stages call func(value) and pass its return value on (on the
+    executor's threads when one is given). Process stages call
+    func(*args(value)) in the process pool and pass merge(value, output) on
+    (defaults: args=(value,), merge=output).
+
+    workers defaults to 1 for thread stages and PROCESSES for process stages
+    (each stage thread waits on one pool job).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        workers: Optional[int] = None,
+        processes: bool = False,
+        args: Optional[Callable[[Any], tuple]] = None,
+        merge: Optional[Callable[[Any, Any], Any]] = None,
+        executor: Optional["WriterPool"] = None
+    ):
+        self.name = name
+        self.func = func
+        if workers is None:
+            workers = PROCESSES if processes else 1
+        self.workers = max(1, workers)
+        self.processes = processes
+        self.executor = executor
+        self.args = args or (lambda value: (value,))
+        self.merge = merge or (lambda value, output: output)
+
+
+class WriterPool:
+    """
+    Bounded thread pool shared by the DB stages of several pipelines.
+
+    call() blocks the calling stage thread until a writer is free and the
+    function has run; the caller's context (its PullTimings) goes along.
+    Time spent waiting for a free writer is recorded as the "db_writer"
+    pipeline's blocked time.
+
+    Usage:
+        writers = WriterPool()
+        Stage("store", store, workers=DB_WORKERS, executor=writers)
+        ...
+        writers.shutdown()
+    """
+
+    def __init__(self, size: int = DB_WORKERS, name: str = "db_writer"):
+        self.size = max(1, size)
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f"sp-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def call(self, func: Callable[[Any], Any], value: Any) -> Any:
+        submitted = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+            depth = max(0, self._pending - self.size)
+
+        def run():
+            get_metrics().record_queue(
+                self.name, "writers", depth, self.size,
+                blocked_seconds=time.perf_counter() - submitted
+            )
+            return func(value)
+
+        try:
+            return self._executor.submit(contextvars.copy_context().run, run).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+class _Job:
+    __slots__ = ("index", "value", "timings", "queued_at")
+
+    def __init__(self, index: int, value: Any, timings):
+        self.index = index
+        self.value = value
+        self.timings = timings
+        self.queued_at = 0.0
+
+
+class Pipeline:
+    """
+    Stages connected by bounded queues.
+
+    Args:
+        name: Label for metrics and logs (e.g. "orders")
+        stages: Stages in order
+        queue_size: Capacity of each stage's input queue
+        timings_of: value -> PullTimings to attribute the item's work to
+        on_error: (value, stage name, exception) -> result for a failed item.
+            Without it (or if it raises) the pipeline stops taking new items
+            and run() raises the first error once in-flight items finish.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stages: List[Stage],
+        queue_size: int = QUEUE_SIZE,
+        timings_of: Optional[Callable[[Any], Any]] = None,
+        on_error: Optional[Callable[[Any, str, BaseException], Any]] = None
+    ):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.name = name
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.timings_of = timings_of
+        self.on_error = on_error
+
+        self._lock = threading.Lock()
+        self._results: Dict[int, Any] = {}
+        self._error: Optional[BaseException] = None
+        self._cancelled = threading.Event()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # stage name -> [max depth, blocked seconds, idle seconds] for this run
+        self._stats: Dict[str, List[float]] = {}
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """Push items through every stage; returns their results in input order."""
+        self._results = {}
+        self._error = None
+        self._cancelled.clear()
+        self._stats = {stage.name: [0, 0.0, 0.0] for stage in self.stages}
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        if PROCESSES > 0 and any(stage.processes for stage in self.stages):
+            # spawn: forking a process that is running threads can copy held locks
+            self._pool = ProcessPoolExecutor(max_workers=PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+
+        threads: List[List[threading.Thread]] = []
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            workers = [
+                threading.Thread(
+                    target=self._work, args=(i, queues[i], outbox),
+                    name=f"{self.name}-{stage.name}-{n}", daemon=True
+                )
+                for n in range(stage.workers)
+            ]
+            for thread in workers:
+                thread.start()
+            threads.append(workers)
+
+        count = 0
+        try:
+            for count, item in enumerate(items, 1):
+                if self._cancelled.is_set():
+                    break
+                timings = self.timings_of(item) if self.timings_of else None
+                self._put(queues[0], _Job(count - 1, item, timings), self.stages[0].name)
+        finally:
+            # Shut stages down in order: a stage stops once everything upstream has
+            for i, stage in enumerate(self.stages):
+                for _ in range(stage.workers):
+                    queues[i].put(_STOP)
+                for thread in threads[i]:
+                    thread.join()
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+        print(f"🚰 {self.summary_line()}")
+        if self._error is not None:
+            raise self._error
+        return [self._results.get(index) for index in range(count)]
+
+    def _work(self, i: int, inbox: queue.Queue, outbox: Optional[queue.Queue]):
+        stage = self.stages[i]
+        while True:
+            waited = time.perf_counter()
+            job = inbox.get()
+            idle = time.perf_counter() - waited
+            if job is _STOP:
+                return
+            self._observe(stage.name, idle_seconds=idle)
+            if job.timings is not None:
+                job.timings.add("pipeline_wait", time.perf_counter() - job.queued_at)
+            if self._cancelled.is_set():
+                continue
+
+            try:
+                with attributed_to(job.timings):
+                    value = self._call(stage, job.value)
+            except Exception as e:
+                value = self._fail(job, stage, e)
+                if value is _STOP:
+                    continue
+
+            if isinstance(value, Done) or outbox is None:
+                with self._lock:
+                    self._results[job.index] = value.value if isinstance(value, Done) else value
+                continue
+            job.value = value
+            self._put(outbox, job, self.stages[i + 1].name)
+
+    def _call(self, stage: Stage, value: Any) -> Any:
+        if not stage.processes:
+            if stage.executor is not None:
+                return stage.executor.call(stage.func, value)
+            return stage.func(value)
+        args = stage.args(value)
+        if self._pool is None:
+            output = stage.func(*args)
+        else:
+            # Stages timed inside the pool process aren't seen by this process's metrics
+            with get_metrics().timed(stage.name):
+                output = self._pool.submit(stage.func, *args).result()
+        return stage.merge(value, output)
+
+    def _fail(self, job: _Job, stage: Stage, error: Exception) -> Any:
+        if self.on_error is not None:
+            try:
+                with attributed_to(job.timings):
+                    return Done(self.on_error(job.value, stage.name, error))
+            except Exception as e:
+                error = e
+        logger.error(f"Pipeline {self.name} stopped at {stage.name}: {error}")
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._cancelled.set()
+        return _STOP
+
+    # ------------------------------------------------------------------
+    # Queue metrics
+    # ------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, job: _Job, stage_name: str):
+        job.queued_at = time.perf_counter()
+        try:
+            q.put_nowait(job)
+            blocked = 0.0
+        except queue.Full:
+            q.put(job)
+            blocked = time.perf_counter() - job.queued_at
+        self._observe(stage_name, depth=q.qsize(), blocked_seconds=blocked)
+
+    def _observe(self, stage_name: str, depth: Optional[int] = None, blocked_seconds: float = 0.0, idle_seconds: float = 0.0):
+        with self._lock:
+            stats = self._stats[stage_name]
+            if depth is not None:
+                stats[0] = max(stats[0], depth)
+            stats[1] += blocked_seconds
+            stats[2] += idle_seconds
+        get_metrics().record_queue(
+            self.name, stage_name, depth, self.queue_size,
+            blocked_seconds=blocked_seconds, idle_seconds=idle_seconds
+        )
+
+    def summary_line(self) -> str:
+        """Per stage: workers, most items queued, time upstream was blocked on it."""
+        parts = []
+        for stage in self.stages:
+            depth, blocked, idle = self._stats.get(stage.name, (0, 0.0, 0.0))
+            kind = f"{PROCESSES}p" if stage.processes and PROCESSES > 0 else f"{stage.workers}t"
+            parts.append(f"{stage.name}[{kind}] queue ≤{int(depth)}/{self.queue_size} blocked {blocked:.1f}s idle {idle:.1f}s")
+        return f"{self.name} pipeline: " + ", ".join(parts)
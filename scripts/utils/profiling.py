@@ -0,0 +1,304 @@
+"""
+Profiling Module
+Built-in profiling mode for the pull / backfill scripts (--profile).
+
+While enabled:
+- A sampling profiler (background thread, sys._current_frames) records the
+  wall-clock stack of every thread every SP_PROFILE_INTERVAL_MS. Each sample
+  is labelled with the thread name and the innermost metrics stage running
+  on that thread (parse, db_upsert, queue_wait, ...), so one flamegraph shows
+  where each stage spends its time.
+- tracemalloc traces allocations. Every top-level stage is bracketed with
+  snapshots and the net allocations per source line are summed per stage,
+  along with the stage's peak traced memory.
+
+On exit it writes to <DIR>/<script>-<UTC timestamp>/:
+- stacks.folded     "frame;frame;... count" lines for flamegraph.pl,
+                    speedscope or inferno
+- allocations.txt   per-stage top allocations + whole-run top allocations
+- profile.json      samples per stage, per-stage allocation peaks, metrics summary
+
+Usage (entry scripts):
+    parser = argparse.ArgumentParser(...)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    start_profiling(args.profile, "pull_search_terms")
+
+    python scripts/pull_search_terms.py --profile               # ./profiles
+    python scripts/backfill_settlements.py --profile /tmp/prof
+
+Environment:
+- SP_PROFILE_DIR: default output directory (default: profiles)
+- SP_PROFILE_INTERVAL_MS: sampling interval (default: 10)
+- SP_PROFILE_TRACE_FRAMES: tracemalloc frames per allocation (default: 1;
+  allocations are reported against the line that made them)
+- SP_PROFILE_STAGE_SNAPSHOTS: allocation snapshots per stage name before
+  only peaks are tracked (default: 20; snapshots are slow on big heaps)
+
+Profiling slows the run (tracemalloc roughly doubles allocation cost) and
+only covers this process; worker processes are not sampled.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from .metrics import get_metrics
+
+DEFAULT_PROFILE_DIR = os.environ.get("SP_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = int(os.environ.get("SP_PROFILE_INTERVAL_MS", "10")) / 1000
+TRACE_FRAMES = int(os.environ.get("SP_PROFILE_TRACE_FRAMES", "1"))
+STAGE_SNAPSHOTS = int(os.environ.get("SP_PROFILE_STAGE_SNAPSHOTS", "20"))
+
+# Allocation lines kept per stage / reported
+TOP_ALLOCATIONS = 25
+
+NO_STAGE = "-"
+
+# The profiler's own bookkeeping stays out of the allocation report
+_OWN_ALLOCATIONS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, threading.__file__),
+)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_OWN_ALLOCATIONS)
+
+
+def _frame_label(code) -> str:
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(";", ":")
+
+
+class Profiler:
+    """
+    Sampling profiler + per-stage tracemalloc report for one script run.
+
+    Usage:
+        profiler = Profiler("pull_sqp").start()
+        ...
+        profiler.stop()      # writes the artifacts, returns their directory
+    """
+
+    def __init__(self, name: str, output_dir: str = DEFAULT_PROFILE_DIR, interval: float = SAMPLE_INTERVAL):
+        self.name = name
+        self.output_dir = output_dir
+        self.interval = interval
+        self.started_at: Optional[datetime] = None
+        self._started = 0.0
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        # Sampling
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.stage_samples: Counter = Counter()
+        # thread ident -> stage names entered on that thread (innermost last)
+        self._stage_stacks: Dict[int, List[str]] = {}
+
+        # Allocations: stage -> {"calls", "peak_bytes", "net_bytes", "lines": {(file, line): [size, count]}}
+        self.stage_allocations: Dict[str, Dict[str, Any]] = {}
+        # thread ident -> (stage, snapshot or None, traced bytes at enter)
+        self._open_stage: Dict[int, tuple] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> "Profiler":
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        get_metrics().add_stage_listener(self._on_stage)
+        self._thread = threading.Thread(target=self._run, name="sp-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write the artifacts (idempotent). Returns the output directory."""
+        if self._stopped:
+            return None
+        self._stopped = True
+        self._elapsed = time.perf_counter() - self._started
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        get_metrics().remove_stage_listener(self._on_stage)
+
+        final = _snapshot() if tracemalloc.is_tracing() else None
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        tracemalloc.stop()
+
+        try:
+            return self._write(final, peak)
+        except OSError as e:
+            print(f"⚠️  Could not write profile: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    stack.reverse()
+                    stages = self._stage_stacks.get(ident)
+                    stage = stages[-1] if stages else NO_STAGE
+                    self.stage_samples[stage] += 1
+                    self.stacks[";".join([names.get(ident, str(ident)), f"[{stage}]"] + stack)] += 1
+
+    # ------------------------------------------------------------------
+    # Stage hooks (called on the thread running the stage)
+    # ------------------------------------------------------------------
+
+    def _on_stage(self, event: str, stage: str):
+        ident = threading.get_ident()
+        with self._lock:
+            stages = self._stage_stacks.setdefault(ident, [])
+            if event == "enter":
+                stages.append(stage)
+                top_level = len(stages) == 1
+            else:
+                if stage in stages:
+                    del stages[len(stages) - 1 - stages[::-1].index(stage)]
+                top_level = not stages
+            if not stages:
+                self._stage_stacks.pop(ident, None)
+
+        # Allocation snapshots bracket top-level stages only; nested ones
+        # (db_upsert_chunk inside db_upsert) are covered by their parent.
+        if not top_level or not tracemalloc.is_tracing():
+            return
+        if event == "enter":
+            entry = self.stage_allocations.get(stage)
+            snapshot = None
+            if entry is None or entry["calls"] < STAGE_SNAPSHOTS:
+                snapshot = _snapshot()
+            tracemalloc.reset_peak()
+            self._open_stage[ident] = (stage, snapshot, tracemalloc.get_traced_memory()[0])
+        else:
+            opened = self._open_stage.pop(ident, None)
+            if opened is None or opened[0] != stage:
+                return
+            _, before, traced_before = opened
+            traced, peak = tracemalloc.get_traced_memory()
+            after = _snapshot() if before is not None else None
+            with self._lock:
+                entry = self.stage_allocations.setdefault(
+                    stage, {"calls": 0, "peak_bytes": 0, "net_bytes": 0, "lines": {}}
+                )
+                entry["calls"] += 1
+                entry["peak_bytes"] = max(entry["peak_bytes"], peak - traced_before)
+                entry["net_bytes"] += traced - traced_before
+                if after is not None:
+                    lines = entry["lines"]
+                    for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS * 2]:
+                        frame = stat.traceback[0]
+                        totals = lines.setdefault((frame.filename, frame.lineno), [0, 0])
+                        totals[0] += stat.size_diff
+                        totals[1] += stat.count_diff
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def _write(self, final, peak: int) -> str:
+        stamp = self.started_at.strftime("%Y%m%dT%H%M%SZ")
+        directory = os.path.join(self.output_dir, f"{self.name}-{stamp}")
+        os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+            stage_samples = dict(self.stage_samples.most_common())
+            allocations = {name: dict(entry) for name, entry in self.stage_allocations.items()}
+
+        with open(os.path.join(directory, "stacks.folded"), "w") as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
+
+        with open(os.path.join(directory, "allocations.txt"), "w") as f:
+            f.write(f"{self.name}: {self._elapsed:.1f}s, traced peak {peak / 1048576:.1f} MB\n")
+            for stage, entry in sorted(allocations.items(), key=lambda kv: -kv[1]["peak_bytes"]):
+                f.write(
+                    f"\n== {stage}: {entry['calls']} call(s), peak {entry['peak_bytes'] / 1048576:.1f} MB, "
+                    f"net {entry['net_bytes'] / 1048576:+.1f} MB\n"
+                )
+                top = sorted(entry["lines"].items(), key=lambda kv: -kv[1][0])[:TOP_ALLOCATIONS]
+                for (filename, lineno), (size, count) in top:
+                    if size > 0:
+                        f.write(f"{size / 1024:>12,.1f} KiB {count:>+10,} blocks  {filename}:{lineno}\n")
+            if final is not None:
+                f.write("\n== live at exit (top lines)\n")
+                for stat in final.statistics("lineno")[:TOP_ALLOCATIONS]:
+                    frame = stat.traceback[0]
+                    f.write(f"{stat.size / 1024:>12,.1f} KiB {stat.count:>+10,} blocks  {frame.filename}:{frame.lineno}\n")
+
+        summary = {
+            "script": self.name,
+            "started_at": self.started_at.isoformat() + "Z",
+            "seconds": round(self._elapsed, 3),
+            "interval_ms": round(self.interval * 1000, 1),
+            "samples": self.samples,
+            "stage_samples": stage_samples,
+            "traced_peak_mb": round(peak / 1048576, 1),
+            "stage_allocations": {
+                name: {
+                    "calls": entry["calls"],
+                    "peak_mb": round(entry["peak_bytes"] / 1048576, 2),
+                    "net_mb": round(entry["net_bytes"] / 1048576, 2),
+                }
+                for name, entry in allocations.items()
+            },
+            "metrics": get_metrics().summary(),
+        }
+        with open(os.path.join(directory, "profile.json"), "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+
+        print(f"🔬 Profile written to {directory} ({self.samples} samples, traced peak {peak / 1048576:.1f} MB)")
+        return directory
+
+
+def add_profile_argument(parser):
+    """Add the shared --profile [DIR] option to an entry script's parser."""
+    parser.add_argument(
+        "--profile", nargs="?", const=DEFAULT_PROFILE_DIR, default=None, metavar="DIR",
+        help=f"Profile the run (sampled stacks + per-stage allocations) into DIR (default: {DEFAULT_PROFILE_DIR})"
+    )
+
+
+def start_profiling(directory: Optional[str], name: str) -> Optional[Profiler]:
+    """
+    Start profiling when directory is set (args.profile); artifacts are
+    written at interpreter exit, including sys.exit() and failed runs.
+    """
+    if not directory:
+        return None
+    profiler = Profiler(name, directory).start()
+    atexit.register(profiler.stop)
+    print(f"🔬 Profiling enabled → {directory}")
+    return profiler
@@ -11,6 +11,7 @@ Features:
 import os
 import json
 import logging
+import threading
 from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 from supabase import create_client
@@ -50,6 +51,9 @@ class PullTracker:
                 tracker.fail_marketplace(marketplace, str(e))
 
         tracker.finish_pull()
+
+    Marketplace updates are serialized, so pipeline stages running several
+    marketplaces at once can share one tracker.
     """
 
     def __init__(
@@ -79,6 +83,7 @@ class PullTracker:
         self.total_row_count: int = 0
 
         self._client = None
+        self._lock = threading.RLock()
 
     @property
     def client(self):
@@ -166,47 +171,50 @@ class PullTracker:
 
     def start_marketplace(self, marketplace_code: str):
         """Mark marketplace as in progress."""
-        self.marketplace_status[marketplace_code] = {
-            "status": "in_progress",
-            "started_at": datetime.utcnow().isoformat(),
-            "retries": self.marketplace_status.get(marketplace_code, {}).get("retries", 0)
-        }
-        self._update_status("in_progress")
+        with self._lock:
+            self.marketplace_status[marketplace_code] = {
+                "status": "in_progress",
+                "started_at": datetime.utcnow().isoformat(),
+                "retries": self.marketplace_status.get(marketplace_code, {}).get("retries", 0)
+            }
+            self._update_status("in_progress")
         logger.info(f"Started processing {marketplace_code}")
 
     def complete_marketplace(self, marketplace_code: str, row_count: int = 0):
         """Mark marketplace as completed."""
-        self.marketplace_status[marketplace_code] = {
-            "status": "completed",
-            "row_count": row_count,
-            "completed_at": datetime.utcnow().isoformat()
-        }
-        self.total_row_count += row_count
-
-        # Update checkpoint
-        self.checkpoint_data["last_completed_marketplace"] = marketplace_code
-
-        self._update_status("in_progress")
+        with self._lock:
+            self.marketplace_status[marketplace_code] = {
+                "status": "completed",
+                "row_count": row_count,
+                "completed_at": datetime.utcnow().isoformat()
+            }
+            self.total_row_count += row_count
+
+            # Update checkpoint
+            self.checkpoint_data["last_completed_marketplace"] = marketplace_code
+
+            self._update_status("in_progress")
         logger.info(f"Completed {marketplace_code} with {row_count} rows")
 
     def fail_marketplace(self, marketplace_code: str, error: str, increment_retry: bool = True):
         """Mark marketplace as failed."""
-        current = self.marketplace_status.get(marketplace_code, {})
-        retries = current.get("retries", 0)
-
-        if increment_retry:
-            retries += 1
-
-        self.marketplace_status[marketplace_code] = {
-            "status": "failed",
-            "error": error,
-            "retries": retries,
-            "failed_at": datetime.utcnow().isoformat()
-        }
-        self.error_count += 1
-        self.last_error = f"{marketplace_code}: {error}"
-
-        self._update_status("partial")
+        with self._lock:
+            current = self.marketplace_status.get(marketplace_code, {})
+            retries = current.get("retries", 0)
+
+            if increment_retry:
+                retries += 1
+
+            self.marketplace_status[marketplace_code] = {
+                "status": "failed",
+                "error": error,
+                "retries": retries,
+                "failed_at": datetime.utcnow().isoformat()
+            }
+            self.error_count += 1
+            self.last_error = f"{marketplace_code}: {error}"
+
+            self._update_status("partial")
         logger.error(f"Failed {marketplace_code} (retry {retries}): {error}")
 
     def get_incomplete_marketplaces(self, all_marketplaces: List[str]) -> List[str]:
@@ -0,0 +1,132 @@
+"""
+Region Runner Module
+Runs one pull for several SP-API regions concurrently in a single process.
+
+NA, EU, FE and UAE each have their own refresh token, endpoint and request
+quota, so nothing is gained by pulling them one after another. run_regions()
+starts one thread per region; the pull function it is given creates that
+region's own SPAPIClient (own RateLimitHandler, own token provider) and is
+handed the WriterPool shared by all regions, so Supabase sees one bounded
+set of writers however many regions run.
+
+Regions without a refresh token configured are skipped with a warning.
+A region that raises is reported as one failed result instead of stopping
+the others. send_region_summary() sends one consolidated summary / partial
+alert for the whole run through alerting.py.
+
+Usage:
+    results = run_regions(
+        ["NA", "EU", "FE", "UAE"],
+        lambda region, writers: pull_region_data(region, writer_pool=writers, send_alerts=False)
+    )
+    send_region_summary("sales_traffic", "2026-02-01", results, duration)
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from .auth import get_refresh_token_for_region
+from .alerting import alert_partial, send_summary
+from .pipeline import WriterPool, DB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+ALL_REGIONS = ["NA", "EU", "FE", "UAE"]
+
+
+def configured_regions(regions: List[str]) -> List[str]:
+    """Regions with a refresh token set (others are skipped with a warning)."""
+    available = []
+    for region in regions:
+        try:
+            get_refresh_token_for_region(region)
+            available.append(region.upper())
+        except ValueError as e:
+            print(f"⚠️  Skipping {region}: {e}")
+    return available
+
+
+def run_regions(
+    regions: List[str],
+    pull_region: Callable[[str, WriterPool], List[dict]],
+    writer_pool_size: int = DB_WORKERS
+) -> Dict[str, List[dict]]:
+    """
+    Run pull_region(region, writer_pool) for every region at once.
+
+    Args:
+        regions: Region codes ('NA', 'EU', 'FE', 'UAE')
+        pull_region: Pulls one region; returns its per-marketplace result dicts
+        writer_pool_size: Supabase writers shared by all regions
+
+    Returns:
+        region -> result dicts (each tagged with "region")
+    """
+    regions = configured_regions(regions)
+    results: Dict[str, List[dict]] = {}
+    lock = threading.Lock()
+    writers = WriterPool(writer_pool_size)
+
+    def run(region: str):
+        started = time.time()
+        try:
+            region_results = pull_region(region, writers)
+        except Exception as e:
+            logger.error(f"Region {region} failed: {e}")
+            print(f"❌ Region {region} failed: {e}")
+            region_results = [{
+                "marketplace": region,
+                "status": "failed",
+                "asin_count": 0,
+                "error": str(e)
+            }]
+        for result in region_results:
+            result["region"] = region
+        with lock:
+            results[region] = region_results
+        print(f"🌍 {region} finished in {time.time() - started:.1f}s")
+
+    print(f"🌍 Pulling {', '.join(regions)} concurrently ({writer_pool_size} shared DB writers)")
+    threads = [threading.Thread(target=run, args=(region,), name=f"region-{region}") for region in regions]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        writers.shutdown()
+
+    return {region: results[region] for region in regions if region in results}
+
+
+def send_region_summary(
+    pull_type: str,
+    pull_date: str,
+    results_by_region: Dict[str, List[dict]],
+    duration_seconds: float,
+    row_key: str = "asin_count"
+) -> Optional[dict]:
+    """
+    One summary for a multi-region run: a partial-completion alert listing
+    every failed region/marketplace, otherwise send_summary() over all results.
+    """
+    results = [r for region_results in results_by_region.values() for r in region_results]
+    if not results:
+        return None
+
+    total_rows = sum(r.get(row_key, 0) or 0 for r in results)
+    completed = [f"{r['region']}/{r['marketplace']}" for r in results if r["status"] == "completed"]
+    # Spooled rows aren't in Supabase yet: alert like a failure
+    failed = [f"{r['region']}/{r['marketplace']}" for r in results if r["status"] in ("failed", "spooled")]
+
+    if failed:
+        errors = {
+            f"{r['region']}/{r['marketplace']}":
+                ("spooled, not yet written: " if r["status"] == "spooled" else "") + (r.get("error") or "Unknown")
+            for r in results if r["status"] in ("failed", "spooled")
+        }
+        alert_partial(pull_type, pull_date, completed, failed, errors)
+        return None
+    return send_summary(pull_type, pull_date, results, total_rows, duration_seconds)
@@ -5,15 +5,17 @@ Handles report creation, polling, and downloading for Sales & Traffic reports
 Updated to use SPAPIClient for automatic retry and rate limiting.
 """
 
-import os
 import gzip
 import json
 import time
 import logging
 import requests
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 from datetime import date, datetime
 
+from .api_client import apply_endpoint_override
+from .metrics import timed_stage
+
 # Import the new API client (optional import for backward compatibility)
 try:
     from utils.api_client import SPAPIClient
@@ -30,6 +32,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"   # UAE uses EU endpoint, different token
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # Amazon Marketplace IDs
 MARKETPLACE_IDS = {
     "USA": {"id": "ATVPDKIKX0DER", "region": "NA"},
@@ -124,6 +128,7 @@ def create_report(
     return report_id
 
 
+@timed_stage("queue_wait")
 def poll_report_status(
     access_token: str = None,
     report_id: str = None,
@@ -190,23 +195,20 @@ def poll_report_status(
         time.sleep(poll_interval)
 
 
-def download_report(
+def download_report_body(
     access_token: str = None,
     report_document_id: str = None,
     region: str = "NA",
     client: "SPAPIClient" = None
-) -> Dict[str, Any]:
+) -> Tuple[bytes, Optional[str]]:
     """
-    Download and parse a completed report.
+    Download a completed report's document as delivered (still compressed).
 
-    Args:
-        access_token: Valid SP-API access token (deprecated, use client instead)
-        report_document_id: The document ID from poll_report_status
-        region: API region ('NA', 'EU', 'FE')
-        client: SPAPIClient instance (preferred - handles retry and rate limiting)
+    Split from parsing so a pipeline can download on a network thread and
+    parse in a worker process (see parse_report_body).
 
     Returns:
-        Parsed report data as dictionary
+        (body bytes, compressionAlgorithm or None)
 
     Raises:
         requests.HTTPError: If download fails
@@ -232,20 +234,21 @@ def download_report(
 
     # Step 2: Download the actual report (S3 URL - no auth needed, but use client for retry)
     if client is not None:
-        # Use client session for retry on download, but no SP-API auth header
-        report_response = client.session.get(download_url, timeout=client.timeout)
-        report_response.raise_for_status()
+        # Client download: no SP-API auth header, bytes/time go to metrics
+        report_response = client.download(download_url)
     else:
         report_response = requests.get(download_url)
         report_response.raise_for_status()
 
-    # Step 3: Decompress if needed
-    content = report_response.content
-    if compression == "GZIP":
-        content = gzip.decompress(content)
+    return report_response.content, compression
 
-    # Step 4: Parse JSON
-    report_data = json.loads(content.decode("utf-8"))
+
+@timed_stage("parse")
+def parse_report_body(body: bytes, compression: Optional[str] = None) -> Dict[str, Any]:
+    """Decompress (if needed) and parse a Sales & Traffic report document."""
+    if compression == "GZIP":
+        body = gzip.decompress(body)
+    report_data = json.loads(body.decode("utf-8"))
 
     asin_count = len(report_data.get("salesAndTrafficByAsin", []))
     logger.info(f"Downloaded report with {asin_count} ASINs")
@@ -254,27 +257,49 @@ def download_report(
     return report_data
 
 
-def pull_single_day_report(
+def download_report(
     access_token: str = None,
-    marketplace_code: str = None,
-    report_date: date = None,
+    report_document_id: str = None,
     region: str = "NA",
     client: "SPAPIClient" = None
 ) -> Dict[str, Any]:
     """
-    High-level function to create, poll, and download a single day's report.
+    Download and parse a completed report.
 
     Args:
         access_token: Valid SP-API access token (deprecated, use client instead)
-        marketplace_code: Marketplace code (e.g., 'USA', 'UK')
-        report_date: The date to pull data for
+        report_document_id: The document ID from poll_report_status
         region: API region ('NA', 'EU', 'FE')
         client: SPAPIClient instance (preferred - handles retry and rate limiting)
 
     Returns:
-        Parsed report data
+        Parsed report data as dictionary
+
+    Raises:
+        requests.HTTPError: If download fails
+    """
+    body, compression = download_report_body(
+        access_token=access_token,
+        report_document_id=report_document_id,
+        region=region,
+        client=client
+    )
+    return parse_report_body(body, compression)
+
+
+def fetch_single_day_report_body(
+    access_token: str = None,
+    marketplace_code: str = None,
+    report_date: date = None,
+    region: str = "NA",
+    client: "SPAPIClient" = None
+) -> Tuple[bytes, Optional[str]]:
+    """
+    Create, poll, and download a single day's report without parsing it.
+
+    Returns:
+        (body bytes, compressionAlgorithm or None) for parse_report_body()
     """
-    # Create report
     report_id = create_report(
         access_token=access_token,
         marketplace_code=marketplace_code,
@@ -283,7 +308,6 @@ def pull_single_day_report(
         client=client
     )
 
-    # Poll until complete
     result = poll_report_status(
         access_token=access_token,
         report_id=report_id,
@@ -291,12 +315,39 @@ def pull_single_day_report(
         client=client
     )
 
-    # Download and parse
-    report_data = download_report(
+    return download_report_body(
         access_token=access_token,
         report_document_id=result["reportDocumentId"],
         region=region,
         client=client
     )
 
-    return report_data
+
+def pull_single_day_report(
+    access_token: str = None,
+    marketplace_code: str = None,
+    report_date: date = None,
+    region: str = "NA",
+    client: "SPAPIClient" = None
+) -> Dict[str, Any]:
+    """
+    High-level function to create, poll, and download a single day's report.
+
+    Args:
+        access_token: Valid SP-API access token (deprecated, use client instead)
+        marketplace_code: Marketplace code (e.g., 'USA', 'UK')
+        report_date: The date to pull data for
+        region: API region ('NA', 'EU', 'FE')
+        client: SPAPIClient instance (preferred - handles retry and rate limiting)
+
+    Returns:
+        Parsed report data
+    """
+    body, compression = fetch_single_day_report_body(
+        access_token=access_token,
+        marketplace_code=marketplace_code,
+        report_date=report_date,
+        region=region,
+        client=client
+    )
+    return parse_report_body(body, compression)
@@ -25,6 +25,9 @@ from io import BytesIO
 from typing import Dict, List, Optional, Any, Tuple, Set, Callable
 from datetime import date
 
+from .api_client import apply_endpoint_override
+from .metrics import get_metrics
+
 try:
     import ijson
 except ImportError:
@@ -47,6 +50,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # Amazon Marketplace IDs (same as sqp_reports.py)
 MARKETPLACE_IDS = {
     "USA": {"id": "ATVPDKIKX0DER", "region": "NA"},
@@ -263,7 +268,19 @@ def stream_and_filter_search_terms(
     print(f"  Streaming download from S3 (compression: {compression})...")
     logger.info(f"Starting stream download, filtering against {len(sqp_keywords_set)} SQP keywords")
 
-    # Stream the S3 response
+    # Stream the S3 response. Download, decompression and ijson parsing are
+    # interleaved, so everything but the upserts is recorded as the download.
+    stream_started = time.perf_counter()
+    upsert_seconds = 0.0
+
+    def flush(rows: List[Dict]) -> int:
+        nonlocal upsert_seconds
+        started = time.perf_counter()
+        try:
+            return upsert_callback(rows)
+        finally:
+            upsert_seconds += time.perf_counter() - started
+
     response = requests.get(download_url, stream=True, timeout=600)
     response.raise_for_status()
 
@@ -315,27 +332,31 @@ def stream_and_filter_search_terms(
 
             # Upsert when buffer is full
             if len(batch_buffer) >= batch_size:
-                upserted = upsert_callback(batch_buffer)
+                upserted = flush(batch_buffer)
                 total_rows += upserted
                 batch_buffer = []
 
         # Flush remaining buffer
         if batch_buffer:
-            upserted = upsert_callback(batch_buffer)
+            upserted = flush(batch_buffer)
             total_rows += upserted
 
     except Exception as e:
         # Flush any buffered rows before re-raising
         if batch_buffer:
             try:
-                upserted = upsert_callback(batch_buffer)
+                upserted = flush(batch_buffer)
                 total_rows += upserted
                 print(f"    Flushed {len(batch_buffer)} buffered rows before error")
             except Exception:
                 pass
         raise RuntimeError(f"Error streaming Search Terms Report: {str(e)}") from e
     finally:
+        wire_bytes = response.raw.tell() if hasattr(response.raw, "tell") else 0
         response.close()
+        get_metrics().record_download(
+            download_url, wire_bytes, time.perf_counter() - stream_started - upsert_seconds
+        )
 
     print(f"  Stream complete: scanned {total_scanned:,} items, matched {len(matched_terms):,} terms, {total_rows:,} rows upserted")
     logger.info(f"Stream complete: {total_scanned} scanned, {len(matched_terms)} matched, {total_rows} rows")
@@ -366,14 +387,17 @@ def download_and_filter_fallback(
     print(f"  WARNING: Using memory-based fallback (not streaming)")
     logger.warning("Using memory-based fallback for Search Terms Report")
 
+    started = time.perf_counter()
     response = requests.get(download_url, timeout=600)
     response.raise_for_status()
+    get_metrics().record_download(download_url, len(response.content), time.perf_counter() - started)
 
-    content = response.content
-    if compression == "GZIP":
-        content = gzip.decompress(content)
+    with get_metrics().timed("parse"):
+        content = response.content
+        if compression == "GZIP":
+            content = gzip.decompress(content)
 
-    report_data = json.loads(content.decode("utf-8"))
+        report_data = json.loads(content.decode("utf-8"))
     items = report_data.get("dataByDepartmentAndSearchTerm", [])
 
     print(f"  Downloaded {len(items):,} items, filtering against {len(sqp_keywords_set):,} SQP keywords...")
@@ -0,0 +1,67 @@
+"""
+Settlement Index Module
+Local reportDocumentId -> settlement_id map for pull_settlements.py.
+
+Report documents never change, so once a document's settlement ID is known
+(peeked or downloaded) later runs can decide whether to skip it without
+requesting the document at all. The file is only a cache: a missing or
+corrupt index just means documents are peeked again.
+
+Environment:
+- SP_SETTLEMENT_INDEX_PATH: index file (default: <tmpdir>/sp-api-settlement-index.json);
+  the settlements workflow keeps it between runs with actions/cache
+"""
+
+import os
+import json
+import tempfile
+import threading
+from typing import Dict, Optional
+
+
+class SettlementIndex:
+    """
+    Usage:
+        index = SettlementIndex()
+        settlement_id = index.get(report_document_id)
+        index.put(report_document_id, settlement_id)
+        index.save()
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get(
+            "SP_SETTLEMENT_INDEX_PATH",
+            os.path.join(tempfile.gettempdir(), "sp-api-settlement-index.json")
+        )
+        try:
+            with open(self.path, "r") as f:
+                self._entries: Dict[str, str] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+        self._dirty = False
+        # Settlement pipeline workers share one index
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, report_document_id: str) -> Optional[str]:
+        return self._entries.get(report_document_id)
+
+    def put(self, report_document_id: str, settlement_id: str):
+        with self._lock:
+            if settlement_id and self._entries.get(report_document_id) != settlement_id:
+                self._entries[report_document_id] = settlement_id
+                self._dirty = True
+
+    def save(self):
+        """Write the index if it changed (temp file + os.replace, never a partial file)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=0, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
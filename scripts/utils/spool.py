@@ -0,0 +1,478 @@
+"""
+Write-Ahead Spool Module
+Durable local spool between report download and Supabase writes.
+
+A downloaded report is expensive (createReport quota, queue wait); a failed
+upsert shouldn't throw it away. Pull scripts append the parsed rows to a
+spool stream first and a drainer applies them to Supabase with retries.
+If Supabase stays down the rows stay on disk, and the next run (or
+scripts/drain_spool.py) resumes from the last acknowledged record instead of
+re-requesting the report.
+
+Layout (one directory per stream, e.g. wal/orders/):
+- 00000001.jsonl.gz, 00000002.jsonl.gz, ...  append-only segments; each
+  record is its own gzip member holding one JSON line, so `zcat` reads a
+  segment. Every process appends to a new segment, so a torn write from a
+  crashed run only loses that run's incomplete tail member
+- ack.json      {"segment": n, "offset": bytes}: everything before this
+                position has been applied (written atomically after each record)
+- dead.jsonl.gz records that can never be applied (a non-transient error such
+                as a constraint violation, or anything with
+                `drain_spool.py --dead-letter`), moved aside so they don't
+                block the records behind them
+- .lock         flock held while reading and advancing ack.json (not while
+                a sink runs)
+
+A record names a sink - a function registered with @spool_sink (db.py) -
+plus its keyword arguments. Drainers claim records in order but apply them
+outside the lock, so threads writing through one stream (every marketplace
+of a pull) upsert concurrently; ack.json only moves past a record once it
+and every record before it are done. Records are applied at least once
+(a crash, or two processes draining one stream, can repeat a record), so
+sinks must be idempotent (upserts are). A record that fails with a
+transient error (network, timeout, 5xx) stays pending; pull scripts count
+that as a failure.
+
+Usage:
+    spool = get_spool("orders")
+    try:
+        upserted = spool.write_through("upsert_orders_asin_data", rows=rows, ...)
+    except SpoolPending as e:
+        ...  # rows are safe on disk; drained by the next run
+
+Environment:
+- SP_WAL_DIR: spool root (default: wal)
+- SP_WAL_SEGMENT_MB: rotate segments above this size (default: 64)
+- SP_WAL_RETRIES: attempts per record per drain (default: 5)
+"""
+
+import os
+import json
+import time
+import zlib
+import gzip
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .metrics import current_timings, attributed_to
+
+logger = logging.getLogger(__name__)
+
+WAL_DIR = os.environ.get("SP_WAL_DIR", "wal")
+SEGMENT_BYTES = int(float(os.environ.get("SP_WAL_SEGMENT_MB", "64")) * 1024 * 1024)
+DRAIN_RETRIES = int(os.environ.get("SP_WAL_RETRIES", "5"))
+
+# Backoff between attempts at one record: 2, 4, 8, ... seconds, capped
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# SQLSTATE classes worth retrying later: connection, resources, operator
+# intervention (statement timeout, shutdown), transaction rollback
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+# Registered sinks: name -> function(**kwargs)
+SINKS: Dict[str, Callable[..., Any]] = {}
+
+
+class SpoolPending(Exception):
+    """A spooled record could not be applied yet; it stays on disk for the next drain."""
+
+    def __init__(self, stream: str, position: Tuple[int, int], error: str):
+        self.stream = stream
+        self.position = position
+        self.error = error
+        super().__init__(f"Spooled to {stream} (not yet written to Supabase): {error}")
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True if a sink error may go away on a later drain (Supabase down, timeout,
+    rate limit); False if the record itself is bad and retrying can't help.
+    """
+    if isinstance(error, (KeyError, TypeError, ValueError)):
+        return False
+    code = getattr(error, "code", None)
+    if isinstance(code, str) and code:
+        # postgrest APIError: SQLSTATE, PostgREST code (PGRST...) or HTTP status
+        if code.isdigit() and len(code) == 3:
+            return code == "429" or code.startswith("5")
+        if code.startswith("PGRST"):
+            return False
+        return code[:2] in TRANSIENT_SQLSTATE_CLASSES
+    # Network and timeout errors (requests / httpx / OSError) and anything unknown
+    return True
+
+
+def spool_sink(name: Optional[str] = None):
+    """Decorator: register a function as a spool sink (by its name unless given)."""
+    def decorator(func):
+        SINKS[name or func.__name__] = func
+        return func
+    return decorator
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot spool {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__date__" in obj and len(obj) == 1:
+        return date.fromisoformat(obj["__date__"])
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _segment_name(index: int) -> str:
+    return f"{index:08d}.jsonl.gz"
+
+
+class WriteAheadSpool:
+    """
+    One spool stream: append records, drain them into their sinks.
+
+    Positions are (segment, byte offset) pairs; a record is acknowledged once
+    the ack position is past it.
+    """
+
+    def __init__(self, stream: str, directory: str = WAL_DIR):
+        self.stream = stream
+        self.path = os.path.join(directory, stream)
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        # Sink return values for records drained by this process, by position
+        self._results: Dict[Tuple[int, int], Any] = {}
+        # Errors of records this process dead-lettered, by position
+        self._errors: Dict[Tuple[int, int], BaseException] = {}
+        # PullTimings active when a record was appended (in-process attribution only)
+        self._timings: Dict[Tuple[int, int], Any] = {}
+        # Segment this process appends to (never one an earlier run wrote)
+        self._segment: Optional[int] = None
+        # Drain state (guarded by _state): records being applied by a thread
+        # of this process, records done but not yet under the ack (position ->
+        # next position), positions where the next record starts elsewhere
+        # (segment end, torn tail), and records that failed transiently
+        self._state = threading.Condition()
+        self._claimed: set = set()
+        self._completed: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._gaps: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._failed: Dict[Tuple[int, int], str] = {}
+        self._ack: Tuple[int, int] = (0, 0)
+
+    # ------------------------------------------------------------------
+    # Segments and ack
+    # ------------------------------------------------------------------
+
+    def _segments(self) -> list:
+        return sorted(
+            int(name.split(".", 1)[0]) for name in os.listdir(self.path)
+            if name.endswith(".jsonl.gz") and name[:8].isdigit()
+        )
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.path, _segment_name(index))
+
+    def _read_ack(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.path, "ack.json")) as f:
+                ack = json.load(f)
+            return int(ack["segment"]), int(ack["offset"])
+        except (OSError, ValueError, KeyError):
+            segments = self._segments()
+            return (segments[0] if segments else 1), 0
+
+    def _write_ack(self, position: Tuple[int, int]):
+        tmp = os.path.join(self.path, "ack.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segment": position[0], "offset": position[1], "acked_at": datetime.utcnow().isoformat() + "Z"}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, "ack.json"))
+
+    # ------------------------------------------------------------------
+    # Append
+    # ------------------------------------------------------------------
+
+    def append(self, sink: str, **kwargs) -> Tuple[int, int]:
+        """Durably append a record for sink; returns its position."""
+        if sink not in SINKS:
+            raise KeyError(f"Unknown spool sink: {sink}")
+        line = json.dumps(
+            {"sink": sink, "kwargs": kwargs, "written_at": datetime.utcnow().isoformat() + "Z"},
+            default=_encode, separators=(",", ":")
+        ) + "\n"
+        member = gzip.compress(line.encode("utf-8"))
+
+        with self._lock:
+            index = self._segment
+            if index is None or os.path.getsize(self._segment_path(index)) >= SEGMENT_BYTES:
+                segments = self._segments()
+                index = max(segments[-1] + 1 if segments else 1, self._read_ack()[0])
+                self._segment = index
+            path = self._segment_path(index)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+
+        position = (index, offset)
+        timings = current_timings()
+        if timings is not None:
+            self._timings[position] = timings
+        return position
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def _records(self, start: Tuple[int, int]) -> Iterator[Tuple[Tuple[int, int], Tuple[int, int], Dict[str, Any]]]:
+        """
+        Yield (position, next_position, record) from start onward.
+
+        An incomplete member ends its segment: in the newest segment it is a
+        write in progress (stop there); in an older one it is a crashed run's
+        torn write (skip to the next segment).
+        """
+        segments = self._segments()
+        for index in segments:
+            if index < start[0]:
+                continue
+            offset = start[1] if index == start[0] else 0
+            try:
+                with open(self._segment_path(index), "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                # Fully acknowledged and cleaned up by a concurrent drain
+                continue
+            position = 0
+            while position < len(data):
+                decompressor = zlib.decompressobj(wbits=31)
+                try:
+                    line = decompressor.decompress(data[position:])
+                    complete = decompressor.eof
+                except zlib.error:
+                    complete = False
+                if not complete:
+                    if index == segments[-1]:
+                        return
+                    logger.warning(f"Skipping torn spool record in {self.stream}/{_segment_name(index)} at {offset + position}")
+                    break
+                consumed = len(data) - position - len(decompressor.unused_data)
+                record = json.loads(line.decode("utf-8"), object_hook=_decode)
+                yield (index, offset + position), (index, offset + position + consumed), record
+                position += consumed
+
+    def pending(self) -> int:
+        """Records appended but not yet applied (or dead-lettered)."""
+        with self._state:
+            done = set(self._completed)
+        return sum(1 for position, _, _ in self._records(self._read_ack()) if position not in done)
+
+    # ------------------------------------------------------------------
+    # Drain
+    # ------------------------------------------------------------------
+
+    def _apply(self, position: Tuple[int, int], record: Dict[str, Any], retries: int):
+        sink = SINKS.get(record["sink"])
+        if sink is None:
+            raise KeyError(f"Unknown spool sink: {record['sink']} (is its module imported?)")
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with attributed_to(self._timings.get(position)):
+                    return sink(**record["kwargs"])
+            except Exception as e:
+                if attempt >= retries or not is_transient(e):
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE ** attempt)
+                print(f"    ⚠️  Spool {self.stream}: {record['sink']} failed ({str(e)[:120]}), "
+                      f"retry {attempt}/{retries - 1} in {delay:.0f}s")
+                time.sleep(delay)
+
+    def _cleanup(self, ack: Tuple[int, int]):
+        """Delete segments entirely before the ack position."""
+        for index in self._segments():
+            if index < ack[0]:
+                try:
+                    os.remove(self._segment_path(index))
+                except OSError:
+                    pass
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive flock on .lock (serializes ack.json across threads and processes)."""
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _claim(self, position: Tuple[int, int], skip_failed: bool) -> bool:
+        """Claim a record for this thread; False if it is done or taken. Caller holds _state."""
+        if (position < self._ack or position in self._claimed or position in self._completed
+                or (skip_failed and position in self._failed)):
+            return False
+        self._claimed.add(position)
+        return True
+
+    def _complete(self, position: Tuple[int, int], next_position: Tuple[int, int], value: Any = None,
+                  error: Optional[BaseException] = None):
+        """Record a finished (applied or dead-lettered) record and advance ack.json past every done prefix."""
+        with self._file_lock(), self._state:
+            self._claimed.discard(position)
+            self._failed.pop(position, None)
+            self._timings.pop(position, None)
+            if error is not None:
+                self._errors[position] = error
+            self._results[position] = value
+            self._completed[position] = next_position
+
+            # Another process may have moved the ack; never move it back
+            ack = max(self._read_ack(), self._ack)
+            start = ack
+            while True:
+                if ack in self._completed:
+                    ack = self._completed.pop(ack)
+                elif ack in self._gaps:
+                    ack = self._gaps.pop(ack)
+                else:
+                    break
+            for done in [p for p in self._completed if p < ack]:
+                del self._completed[done]
+            for gap in [p for p in self._gaps if p < ack]:
+                del self._gaps[gap]
+            self._ack = ack
+            if ack != start:
+                self._write_ack(ack)
+                self._cleanup(ack)
+            self._state.notify_all()
+
+    def drain(self, retries: int = DRAIN_RETRIES, dead_letter: bool = False, until: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Apply pending records in order, acknowledging each.
+
+        A record failing with a non-transient error is moved to dead.jsonl.gz
+        and the drain carries on. Stops at the first record that still fails
+        with a transient error after retries (unless dead_letter, which moves
+        every failing record aside), or once the record at until has been
+        applied.
+
+        With until (write_through), records another thread is applying are
+        skipped rather than waited on, and so are records that already failed
+        transiently in this run, so one stuck record doesn't hold up every
+        later write; the call then waits for the record at until itself.
+
+        Returns:
+            {"applied": n, "dead_lettered": n, "pending": n, "error": str | None}
+        """
+        summary = {"applied": 0, "dead_lettered": 0, "pending": 0, "error": None}
+        with self._file_lock():
+            start = self._read_ack()
+
+        expected = start
+        for position, next_position, record in self._records(start):
+            if until is not None and position > until:
+                break
+            with self._state:
+                if position != expected:
+                    self._gaps[expected] = position
+                expected = next_position
+                if not self._claim(position, skip_failed=until is not None):
+                    continue
+            try:
+                value = self._apply(position, record, retries)
+            except Exception as e:
+                if not dead_letter and is_transient(e):
+                    with self._state:
+                        self._claimed.discard(position)
+                        self._failed[position] = str(e)
+                        self._state.notify_all()
+                    summary["error"] = str(e)
+                    if until is None or position == until:
+                        break
+                    continue
+                self._dead_letter(record, str(e))
+                summary["dead_lettered"] += 1
+                self._complete(position, next_position, error=e)
+            else:
+                summary["applied"] += 1
+                self._complete(position, next_position, value=value)
+
+        if until is not None:
+            with self._state:
+                self._state.wait_for(lambda: until not in self._claimed)
+        summary["pending"] = self.pending()
+        return summary
+
+    def _dead_letter(self, record: Dict[str, Any], error: str):
+        record = dict(record, error=error, dead_lettered_at=datetime.utcnow().isoformat() + "Z")
+        line = json.dumps(record, default=_encode, separators=(",", ":")) + "\n"
+        with open(os.path.join(self.path, "dead.jsonl.gz"), "ab") as f:
+            f.write(gzip.compress(line.encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"    ☠️  Spool {self.stream}: {record['sink']} moved to dead.jsonl.gz: {error[:200]}")
+
+    def write_through(self, sink: str, **kwargs) -> Any:
+        """
+        Append a record, then drain up to and including it.
+
+        Returns the sink's return value. Raises SpoolPending if the record
+        still fails after retries; the record stays spooled. If the record
+        itself was dead-lettered, the sink's error is raised. Other threads
+        writing through the same stream run their sinks concurrently.
+        """
+        position = self.append(sink, **kwargs)
+        summary = self.drain(until=position)
+        with self._state:
+            if position in self._errors:
+                self._results.pop(position, None)
+                raise self._errors.pop(position)
+            if position in self._results:
+                return self._results.pop(position)
+            error = self._failed.get(position)
+        raise SpoolPending(self.stream, position, error or summary["error"] or "not applied yet")
+
+
+# One spool per stream for the run
+_spools: Dict[str, WriteAheadSpool] = {}
+_spools_lock = threading.Lock()
+
+
+def get_spool(stream: str) -> WriteAheadSpool:
+    """Get the process-wide spool for stream (e.g. 'orders', 'sales_traffic')."""
+    with _spools_lock:
+        spool = _spools.get(stream)
+        if spool is None:
+            spool = _spools[stream] = WriteAheadSpool(stream)
+        return spool
+
+
+def drain_pending(stream: str) -> Dict[str, Any]:
+    """
+    Drain whatever a previous run left in stream before pulling new data.
+    Prints a line only when there was a backlog.
+    """
+    spool = get_spool(stream)
+    backlog = spool.pending()
+    if not backlog:
+        return {"applied": 0, "dead_lettered": 0, "pending": 0, "error": None}
+    print(f"📼 {backlog} spooled {stream} record(s) from an earlier run - draining...")
+    summary = spool.drain()
+    if summary["pending"]:
+        print(f"   ⚠️  {summary['pending']} still pending: {summary['error']}")
+    else:
+        print(f"   ✅ Applied {summary['applied']} spooled record(s)")
+    return summary
@@ -15,7 +15,7 @@ Key differences from Sales & Traffic reports:
 Updated to use SPAPIClient for automatic retry and rate limiting.
 """
 
-import os
+import io
 import gzip
 import json
 import time
@@ -24,6 +24,10 @@ import calendar
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import date, datetime, timedelta
 
+from .api_client import apply_endpoint_override
+from .metrics import get_metrics, timed_stage
+from .memory import get_memory_budget
+
 try:
     from utils.api_client import SPAPIClient
 except ImportError:
@@ -39,6 +43,8 @@ ENDPOINTS = {
     "UAE": "sellingpartnerapi-eu.amazon.com"   # UAE uses EU endpoint, different token
 }
 
+apply_endpoint_override(ENDPOINTS)
+
 # Amazon Marketplace IDs
 MARKETPLACE_IDS = {
     "USA": {"id": "ATVPDKIKX0DER", "region": "NA"},
@@ -403,6 +409,7 @@ def _create_brand_analytics_report(
 # Report Polling
 # =============================================================================
 
+@timed_stage("queue_wait")
 def poll_report_status(
     client: "SPAPIClient",
     report_id: str,
@@ -458,21 +465,22 @@ def poll_report_status(
 # Report Download & Parsing
 # =============================================================================
 
-def download_report(
+def download_report_body(
     client: "SPAPIClient",
     report_document_id: str,
     region: str = "NA"
-) -> Dict[str, Any]:
+) -> Tuple[Any, Optional[str]]:
     """
-    Download and parse a completed report.
+    Download a completed report's document as delivered (still compressed).
 
-    Args:
-        client: SPAPIClient instance
-        report_document_id: The document ID from poll_report_status
-        region: API region
+    The document is streamed (S3 URL - no SP-API auth needed) into a
+    memory-budgeted buffer that moves to a temp file when the run is short
+    on memory. Decompressing and decoding the JSON is left to
+    decode_report_body() (in a pipeline's worker process when pulled
+    through pull_sqp.py, see read_report_body()).
 
     Returns:
-        Parsed report data as dictionary
+        (body file, compressionAlgorithm or None); the caller closes the file
     """
     endpoint = get_endpoint(region)
     url = f"https://{endpoint}/reports/2021-06-30/documents/{report_document_id}"
@@ -483,16 +491,71 @@ def download_report(
     download_url = doc_info["url"]
     compression = doc_info.get("compressionAlgorithm")
 
-    # Download the actual report (S3 URL - no SP-API auth needed)
-    report_response = client.session.get(download_url, timeout=client.timeout)
-    report_response.raise_for_status()
+    budget = get_memory_budget()
+    body = budget.spool_file("SQP/SCP report download")
+    try:
+        with budget.track("download"):
+            client.download_to(download_url, body)
+    except Exception:
+        body.close()
+        raise
+    return body, compression
+
+
+def read_report_body(body) -> bytes:
+    """
+    Bytes of a body from download_report_body(), closing the file.
+
+    For handing the document to a worker process (files don't pickle); call
+    it as the parse starts so queued bodies stay in their budgeted buffers.
+    """
+    try:
+        body.seek(0)
+        return body.read()
+    finally:
+        body.close()
+
+
+def decode_report_body(body, compression: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decompress (if needed) and decode a report document's JSON, streaming.
+
+    Args:
+        body: Document bytes, or a file from download_report_body() (read
+            from the start, not closed)
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = io.BytesIO(body)
+    else:
+        body.seek(0)
+    with get_metrics().timed("parse"):
+        raw = gzip.GzipFile(fileobj=body, mode="rb") if compression == "GZIP" else body
+        return json.load(io.TextIOWrapper(raw, encoding="utf-8"))
+
+
+def download_report(
+    client: "SPAPIClient",
+    report_document_id: str,
+    region: str = "NA"
+) -> Dict[str, Any]:
+    """
+    Download and parse a completed report.
 
-    content = report_response.content
-    if compression == "GZIP":
-        content = gzip.decompress(content)
+    Args:
+        client: SPAPIClient instance
+        report_document_id: The document ID from poll_report_status
+        region: API region
 
-    report_data = json.loads(content.decode("utf-8"))
-    return report_data
+    Returns:
+        Parsed report data as dictionary
+    """
+    # Decoded straight from the budgeted buffer: no compressed + decompressed
+    # byte copies held next to the parsed JSON
+    body, compression = download_report_body(client, report_document_id, region)
+    try:
+        return decode_report_body(body, compression)
+    finally:
+        body.close()
 
 
 def _extract_currency(currency_amount: Optional[Dict]) -> Tuple[Optional[float], Optional[str]]:
@@ -502,6 +565,7 @@ def _extract_currency(currency_amount: Optional[Dict]) -> Tuple[Optional[float],
     return currency_amount.get("amount"), currency_amount.get("currencyCode")
 
 
+@timed_stage("parse")
 def parse_sqp_response(
     report_data: Dict[str, Any],
     marketplace_id: str,
@@ -633,6 +697,7 @@ def parse_sqp_response(
     return rows
 
 
+@timed_stage("parse")
 def parse_scp_response(
     report_data: Dict[str, Any],
     marketplace_id: str,
@@ -734,6 +799,91 @@ def parse_scp_response(
 # High-Level Pull Functions
 # =============================================================================
 
+def fetch_sqp_report_body(
+    client: "SPAPIClient",
+    marketplace_code: str,
+    asins: List[str],
+    period_start: date,
+    period_end: date,
+    period_type: str = "WEEK",
+    region: str = "NA"
+) -> Tuple[Any, Optional[str]]:
+    """
+    Create, poll, and download the SQP report for one ASIN batch without
+    parsing it. Returns (body file, compression) as from download_report_body().
+    """
+    report_id = create_sqp_report(
+        client=client,
+        marketplace_code=marketplace_code,
+        asins=asins,
+        period_start=period_start,
+        period_end=period_end,
+        period_type=period_type,
+        region=region
+    )
+
+    # SQP reports can take longer to process than SCP
+    result = poll_report_status(client=client, report_id=report_id, region=region, max_wait_seconds=600)
+    return download_report_body(client=client, report_document_id=result["reportDocumentId"], region=region)
+
+
+def fetch_scp_report_body(
+    client: "SPAPIClient",
+    marketplace_code: str,
+    asins: List[str],
+    period_start: date,
+    period_end: date,
+    period_type: str = "WEEK",
+    region: str = "NA"
+) -> Tuple[Any, Optional[str]]:
+    """SCP counterpart of fetch_sqp_report_body()."""
+    report_id = create_scp_report(
+        client=client,
+        marketplace_code=marketplace_code,
+        asins=asins,
+        period_start=period_start,
+        period_end=period_end,
+        period_type=period_type,
+        region=region
+    )
+
+    result = poll_report_status(client=client, report_id=report_id, region=region)
+    return download_report_body(client=client, report_document_id=result["reportDocumentId"], region=region)
+
+
+def parse_sqp_report_body(
+    body: bytes,
+    compression: Optional[str],
+    marketplace_id: str,
+    period_start: date,
+    period_end: date,
+    period_type: str
+) -> Tuple[List[Dict], int]:
+    """
+    Decode and parse an SQP document into (rows, query_count).
+
+    Module-level with picklable arguments (body as bytes from
+    read_report_body()), so it can run in a pipeline's process pool.
+    """
+    report_data = decode_report_body(body, compression)
+    rows = parse_sqp_response(report_data, marketplace_id, period_start, period_end, period_type)
+    query_count = len(set(r["search_query"] for r in rows)) if rows else 0
+    return rows, query_count
+
+
+def parse_scp_report_body(
+    body: bytes,
+    compression: Optional[str],
+    marketplace_id: str,
+    period_start: date,
+    period_end: date,
+    period_type: str
+) -> List[Dict]:
+    """Decode and parse an SCP document into rows (process-pool safe)."""
+    report_data = decode_report_body(body, compression)
+    return parse_scp_response(report_data, marketplace_id, period_start, period_end, period_type)
+
+
 def pull_sqp_batch(
     client: "SPAPIClient",
     marketplace_code: str,